@@ -0,0 +1,28 @@
+"""
+Client identity for per-client features (pre-generated game hand-out, rate limiting)
+Clients are identified by IP address, or by API key when CLIENT_ID_TRUST_API_KEY says
+the X-API-Key header has been authenticated upstream (an unchecked key is free to
+rotate, and would give every request a fresh identity)
+"""
+
+from starlette.requests import HTTPConnection
+from starlette.types import Scope
+
+from app.core.config import get_settings
+
+API_KEY_HEADER = b"x-api-key"
+
+
+def scope_client_id(scope: Scope, trust_api_key: bool = False) -> str:
+    """Client identifier straight from an ASGI scope (middleware, without building a Request)"""
+    if trust_api_key:
+        for name, value in scope["headers"]:
+            if name == API_KEY_HEADER and value:
+                return "key:" + value.decode("latin-1")
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+def client_id(connection: HTTPConnection) -> str:
+    """Stable identifier for the calling client"""
+    return scope_client_id(connection.scope, get_settings().CLIENT_ID_TRUST_API_KEY)
@@ -32,15 +32,177 @@ class Settings(BaseSettings):
     # Gemini LLM settings
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
     GOOGLE_MODEL: str = os.getenv("GOOGLE_MODEL", "gemini-2.0-flash-exp")
+    GEMINI_BASE_URL: str = os.getenv("GEMINI_BASE_URL", "")  # empty = Google's endpoint; e.g. a proxy or benchmarks/fake_gemini.py
     
     # Request settings
     REQUEST_TIMEOUT: int = int(os.getenv("REQUEST_TIMEOUT", "60"))
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "4000"))
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.7"))
     
-    # Rate limiting
+    # Outbound HTTP connection pool (Gemini); REQUEST_TIMEOUT is the read timeout
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_WRITE_TIMEOUT: float = float(os.getenv("HTTP_WRITE_TIMEOUT", "10"))
+    HTTP_POOL_TIMEOUT: float = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "True").lower() == "true"
+    HTTP_WARM_CONNECTIONS: int = int(os.getenv("HTTP_WARM_CONNECTIONS", "2"))
+    
+    # Retries for Gemini calls: full-jitter exponential backoff within a global retry budget
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+    RETRY_BASE_DELAY: float = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+    RETRY_MAX_DELAY: float = float(os.getenv("RETRY_MAX_DELAY", "8"))
+    RETRY_MAX_RETRY_AFTER: float = float(os.getenv("RETRY_MAX_RETRY_AFTER", "20"))  # longer server hints are surfaced
+    RETRY_BUDGET_RATIO: float = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))  # retries per request
+    RETRY_BUDGET_MIN_PER_SECOND: float = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "0.2"))
+    RETRY_BUDGET_MAX_TOKENS: float = float(os.getenv("RETRY_BUDGET_MAX_TOKENS", "10"))
+    
+    # Hedged requests: race a second Gemini call when the first is slow
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "False").lower() == "true"
+    HEDGE_DELAY: float = float(os.getenv("HEDGE_DELAY", "0"))  # seconds; 0 = observed HEDGE_PERCENTILE latency
+    HEDGE_PERCENTILE: float = float(os.getenv("HEDGE_PERCENTILE", "0.9"))
+    HEDGE_MIN_DELAY: float = float(os.getenv("HEDGE_MIN_DELAY", "2"))
+    HEDGE_MAX_RATE: float = float(os.getenv("HEDGE_MAX_RATE", "0.1"))  # hedges per request
+    HEDGE_TEMPERATURE: float = float(os.getenv("HEDGE_TEMPERATURE", "-1"))  # -1 = same as TEMPERATURE
+    
+    # Circuit breaker around Gemini: fail fast (or serve a stored game) during outages
+    BREAKER_ENABLED: bool = os.getenv("BREAKER_ENABLED", "True").lower() == "true"
+    BREAKER_WINDOW: int = int(os.getenv("BREAKER_WINDOW", "20"))  # recent calls considered
+    BREAKER_MIN_CALLS: int = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+    BREAKER_FAILURE_RATE: float = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+    BREAKER_SLOW_CALL_SECONDS: float = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "30"))
+    BREAKER_SLOW_CALL_RATE: float = float(os.getenv("BREAKER_SLOW_CALL_RATE", "0.8"))
+    BREAKER_OPEN_SECONDS: float = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    BREAKER_HALF_OPEN_CALLS: int = int(os.getenv("BREAKER_HALF_OPEN_CALLS", "2"))
+    BREAKER_FALLBACK_ENABLED: bool = os.getenv("BREAKER_FALLBACK_ENABLED", "True").lower() == "true"
+    
+    # Adaptive (AIMD) concurrency limit on Gemini calls; excess calls queue briefly
+    AIMD_ENABLED: bool = os.getenv("AIMD_ENABLED", "True").lower() == "true"
+    AIMD_INITIAL_LIMIT: int = int(os.getenv("AIMD_INITIAL_LIMIT", "8"))
+    AIMD_MIN_LIMIT: int = int(os.getenv("AIMD_MIN_LIMIT", "1"))
+    AIMD_MAX_LIMIT: int = int(os.getenv("AIMD_MAX_LIMIT", "64"))
+    AIMD_DECREASE_FACTOR: float = float(os.getenv("AIMD_DECREASE_FACTOR", "0.7"))  # limit multiplier on overload
+    AIMD_LATENCY_SPIKE_FACTOR: float = float(os.getenv("AIMD_LATENCY_SPIKE_FACTOR", "3"))  # x average latency
+    AIMD_MAX_QUEUE: int = int(os.getenv("AIMD_MAX_QUEUE", "100"))
+    AIMD_QUEUE_TIMEOUT: float = float(os.getenv("AIMD_QUEUE_TIMEOUT", "10"))  # seconds a call may wait for a slot
+    
+    # Warm pool: pre-generated games per "type:category:difficulty" bucket, refilled in the background
+    WARM_POOL_ENABLED: bool = os.getenv("WARM_POOL_ENABLED", "False").lower() == "true"
+    WARM_POOL_BUCKETS: str = os.getenv(
+        "WARM_POOL_BUCKETS",
+        "quiz:stress-reduction:medium,quiz:anxiety-management:medium,memory-match:mindfulness:easy,sorting:coping-skills:medium"
+    )
+    WARM_POOL_SIZE: int = int(os.getenv("WARM_POOL_SIZE", "5"))  # games kept per bucket
+    WARM_POOL_LOW_WATER: int = int(os.getenv("WARM_POOL_LOW_WATER", "2"))  # refill at or below this depth
+    WARM_POOL_REFILL_CONCURRENCY: int = int(os.getenv("WARM_POOL_REFILL_CONCURRENCY", "1"))
+    WARM_POOL_REFILL_INTERVAL: float = float(os.getenv("WARM_POOL_REFILL_INTERVAL", "5"))  # seconds between checks
+    WARM_POOL_MAX_INFLIGHT: int = int(os.getenv("WARM_POOL_MAX_INFLIGHT", "4"))  # refill only below this many Gemini calls
+    WARM_POOL_MAX_SERVES: int = int(os.getenv("WARM_POOL_MAX_SERVES", "1"))  # distinct clients per pooled game
+    WARM_POOL_MAX_AGE: float = float(os.getenv("WARM_POOL_MAX_AGE", "3600"))  # seconds a pooled game is served; 0 = no limit
+    
+    # Batch generation (/generate/batch)
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "4"))  # items generated at once per batch
+    
+    # Asynchronous jobs (/jobs): background workers, bounded queue, pluggable store
+    JOB_STORE: str = os.getenv("JOB_STORE", "memory")  # memory, sqlite or redis
+    JOB_SQLITE_PATH: str = os.getenv("JOB_SQLITE_PATH", "jobs.db")
+    JOB_KEY_PREFIX: str = os.getenv("JOB_KEY_PREFIX", "gamegpt:job:")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_QUEUE_SIZE: int = int(os.getenv("JOB_QUEUE_SIZE", "100"))  # queued jobs before POST /jobs is rejected
+    JOB_TTL: int = int(os.getenv("JOB_TTL", "3600"))  # seconds a finished job stays retrievable
+    JOB_UNFINISHED_TTL: int = int(os.getenv("JOB_UNFINISHED_TTL", "7200"))  # abandoned queued/running jobs
+    JOB_CLEANUP_INTERVAL: float = float(os.getenv("JOB_CLEANUP_INTERVAL", "60"))
+    JOB_WEBHOOK_TIMEOUT: float = float(os.getenv("JOB_WEBHOOK_TIMEOUT", "10"))
+    JOB_WEBHOOK_MAX_ATTEMPTS: int = int(os.getenv("JOB_WEBHOOK_MAX_ATTEMPTS", "3"))
+    
+    # Streaming (/generate/stream): events buffered before a slow reader pauses the upstream read
+    STREAM_QUEUE_SIZE: int = int(os.getenv("STREAM_QUEUE_SIZE", "32"))
+    
+    # Validate streamed output as it arrives; abort and retry clearly invalid generations
+    STREAM_VALIDATION_ENABLED: bool = os.getenv("STREAM_VALIDATION_ENABLED", "True").lower() == "true"
+    STREAM_VALIDATION_MAX_RESTARTS: int = int(os.getenv("STREAM_VALIDATION_MAX_RESTARTS", "1"))
+    # Also route /generate through the validated stream instead of a single generateContent call
+    STREAM_VALIDATION_FOR_GENERATE: bool = os.getenv("STREAM_VALIDATION_FOR_GENERATE", "False").lower() == "true"
+    
+    # Structured output: ask Gemini for application/json constrained by a schema generated
+    # from the game models, and skip the free-text repair path in ResponseProcessor
+    STRUCTURED_OUTPUT_ENABLED: bool = os.getenv("STRUCTURED_OUTPUT_ENABLED", "False").lower() == "true"
+    
+    # MAX_TOKENS recovery: resume a free-text response Gemini cut off with continuation
+    # requests (the partial output as the model turn) instead of failing the generation
+    CONTINUATION_ENABLED: bool = os.getenv("CONTINUATION_ENABLED", "True").lower() == "true"
+    CONTINUATION_MAX_ROUNDS: int = int(os.getenv("CONTINUATION_MAX_ROUNDS", "2"))  # continuation requests per response
+    
+    # Identify clients (rate limits, warm pool hand-out) by X-API-Key instead of IP. The key is
+    # not checked here, so enable only behind a gateway that authenticates it
+    CLIENT_ID_TRUST_API_KEY: bool = os.getenv("CLIENT_ID_TRUST_API_KEY", "False").lower() == "true"
+    
+    # Rate limiting: per client (see CLIENT_ID_TRUST_API_KEY), RATE_LIMIT_REQUESTS per RATE_LIMIT_WINDOW
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
     RATE_LIMIT_REQUESTS: int = int(os.getenv("RATE_LIMIT_REQUESTS", "100"))
     RATE_LIMIT_WINDOW: int = int(os.getenv("RATE_LIMIT_WINDOW", "3600"))  # 1 hour
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory, redis (requires REDIS_URL)
+    RATE_LIMIT_KEY_PREFIX: str = os.getenv("RATE_LIMIT_KEY_PREFIX", "gamegpt:ratelimit:")
+    RATE_LIMIT_EXEMPT_PATHS: str = os.getenv("RATE_LIMIT_EXEMPT_PATHS", "/,/health,/stats,/metrics,/docs,/redoc,/openapi.json")
+    
+    # Generation cache
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+    CACHE_TTL: int = int(os.getenv("CACHE_TTL", "3600"))  # 1 hour fresh
+    CACHE_STALE_TTL: int = int(os.getenv("CACHE_STALE_TTL", "86400"))  # served stale while revalidating
+    CACHE_KEY_PREFIX: str = os.getenv("CACHE_KEY_PREFIX", "gamegpt:cache:")
+    
+    # Near-duplicate prompt cache (MinHash/LSH): reuse games generated for similar prompts
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "False").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8"))  # estimated Jaccard similarity
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "4096"))
+    SEMANTIC_CACHE_TTL: int = int(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+    SEMANTIC_CACHE_NUM_PERM: int = int(os.getenv("SEMANTIC_CACHE_NUM_PERM", "64"))  # MinHash signature length
+    SEMANTIC_CACHE_BANDS: int = int(os.getenv("SEMANTIC_CACHE_BANDS", "16"))  # LSH bands (NUM_PERM / BANDS rows each)
+    
+    # Coalesce concurrent identical /generate requests onto one Gemini call
+    SINGLE_FLIGHT_ENABLED: bool = os.getenv("SINGLE_FLIGHT_ENABLED", "True").lower() == "true"
+    
+    # Redis (optional, shared between replicas)
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+    
+    # Cross-replica deduplication (requires REDIS_URL)
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "True").lower() == "true"
+    DEDUP_KEY_PREFIX: str = os.getenv("DEDUP_KEY_PREFIX", "gamegpt:dedup:")
+    DEDUP_LEASE_TTL_MS: int = int(os.getenv("DEDUP_LEASE_TTL_MS", "15000"))
+    DEDUP_RESULT_TTL: int = int(os.getenv("DEDUP_RESULT_TTL", "300"))
+    DEDUP_MAX_WAIT: float = float(os.getenv("DEDUP_MAX_WAIT", "90"))
+    DEDUP_POLL_INTERVAL: float = float(os.getenv("DEDUP_POLL_INTERVAL", "0.5"))
+    
+    # Metrics: per-stage counts and latency histograms for /stats and /metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    METRICS_WINDOWS: str = os.getenv("METRICS_WINDOWS", "60,300,900")  # /stats percentile windows, seconds
+    
+    # Tracing: spans per request, Server-Timing headers, sampled export
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "True").lower() == "true"
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))  # share of requests exported
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none")  # none, file, otlp
+    TRACE_EXPORT_PATH: str = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+    TRACE_EXPORT_ENDPOINT: str = os.getenv("TRACE_EXPORT_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACE_EXPORT_INTERVAL: float = float(os.getenv("TRACE_EXPORT_INTERVAL", "5"))
+    TRACE_EXPORT_BATCH_SIZE: int = int(os.getenv("TRACE_EXPORT_BATCH_SIZE", "64"))
+    TRACE_EXPORT_QUEUE_SIZE: int = int(os.getenv("TRACE_EXPORT_QUEUE_SIZE", "2048"))
+    TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "gamegpt-backend")
+    
+    # Runtime monitor: event-loop lag and memory in /stats
+    RUNTIME_MONITOR_INTERVAL: float = float(os.getenv("RUNTIME_MONITOR_INTERVAL", "0.5"))  # seconds; 0 disables
+    RUNTIME_MONITOR_SAMPLES: int = int(os.getenv("RUNTIME_MONITOR_SAMPLES", "600"))  # lag samples kept
+    
+    # LLM transport: passthrough, or record / replay Gemini exchanges for reproducible workloads
+    LLM_TRANSPORT_MODE: str = os.getenv("LLM_TRANSPORT_MODE", "passthrough")  # passthrough, record, replay
+    LLM_RECORD_DIR: str = os.getenv("LLM_RECORD_DIR", "recordings")
+    LLM_RECORD_MAX_BYTES: int = int(os.getenv("LLM_RECORD_MAX_BYTES", "52428800"))  # compressed, per file
+    LLM_RECORD_MAX_FILES: int = int(os.getenv("LLM_RECORD_MAX_FILES", "20"))  # oldest files deleted beyond this
+    LLM_RECORD_QUEUE_SIZE: int = int(os.getenv("LLM_RECORD_QUEUE_SIZE", "1000"))  # records dropped beyond this
+    LLM_REPLAY_TIMING: bool = os.getenv("LLM_REPLAY_TIMING", "True").lower() == "true"  # keep recorded latency
+    LLM_REPLAY_ON_MISS: str = os.getenv("LLM_REPLAY_ON_MISS", "error")  # error (404), passthrough
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -9,9 +9,25 @@ import logging
 
 from app.core.config import get_settings
 from app.core.logging_config import get_logger
+from app.core.redis_client import create_redis_client
+from app.core.http_pool import HTTPConnectionPool
+from app.core.llm_transport import InteractionLog, create_llm_transport
 from app.services.prompt_builder import PromptBuilder
 from app.services.llm_service import LLMService
 from app.services.response_processor import ResponseProcessor
+from app.services.generation_cache import GenerationCache
+from app.services.semantic_cache import SemanticCache
+from app.services.generation_pipeline import GenerationPipeline
+from app.services.single_flight import SingleFlight
+from app.services.distributed_dedup import DistributedDeduplicator
+from app.services.stream_generator import StreamingGenerator
+from app.services.warm_pool import WarmPool
+from app.services.batch_generator import BatchGenerator
+from app.services.job_store import create_job_store
+from app.services.job_manager import JobManager
+from app.services.rate_limiter import RateLimiter
+from app.core.tracing import TraceExporter
+from app.core.runtime_monitor import RuntimeMonitor
 
 logger = get_logger(__name__)
 
@@ -33,13 +49,119 @@ class ServiceContainer:
         self.logger.info("Initializing service container...")
         
         # Initialize services in dependency order
+        self._services['redis'] = create_redis_client(self.settings.REDIS_URL)
+        self._services['trace_exporter'] = TraceExporter()
+        self._services['runtime_monitor'] = RuntimeMonitor()
+        self._services['rate_limiter'] = RateLimiter(redis_client=self._services['redis'])
+        self._services['interaction_log'] = (
+            InteractionLog() if self.settings.LLM_TRANSPORT_MODE.lower() == "record" else None
+        )
+        self._services['llm_transport'] = None
+        self._services['http_pool'] = HTTPConnectionPool(wrap_transport=self._wrap_llm_transport)
         self._services['prompt_builder'] = PromptBuilder()
-        self._services['llm_service'] = LLMService()
         self._services['response_processor'] = ResponseProcessor()
+        self._services['llm_service'] = LLMService(
+            http_pool=self._services['http_pool'],
+            response_processor=self._services['response_processor']
+        )
+        self._services['generation_cache'] = GenerationCache(redis_client=self._services['redis'])
+        self._services['semantic_cache'] = SemanticCache(prompt_builder=self._services['prompt_builder'])
+        self._services['single_flight'] = SingleFlight()
+        
+        # Optional: cross-replica deduplication only when Redis is configured
+        self._services['distributed_dedup'] = None
+        if self._services['redis'] is not None and self.settings.DEDUP_ENABLED:
+            self._services['distributed_dedup'] = DistributedDeduplicator(self._services['redis'])
+        
+        self._services['stream_generator'] = StreamingGenerator(
+            prompt_builder=self._services['prompt_builder'],
+            llm_service=self._services['llm_service'],
+            response_processor=self._services['response_processor'],
+            generation_cache=self._services['generation_cache']
+        )
+        self._services['generation_pipeline'] = GenerationPipeline(
+            prompt_builder=self._services['prompt_builder'],
+            llm_service=self._services['llm_service'],
+            response_processor=self._services['response_processor'],
+            generation_cache=self._services['generation_cache'],
+            single_flight=self._services['single_flight'],
+            distributed_dedup=self._services['distributed_dedup'],
+            stream_generator=self._services['stream_generator'],
+            semantic_cache=self._services['semantic_cache']
+        )
+        self._services['warm_pool'] = WarmPool(
+            pipeline=self._services['generation_pipeline'],
+            prompt_builder=self._services['prompt_builder'],
+            http_pool=self._services['http_pool'],
+            circuit_breaker=self._services['llm_service'].circuit_breaker,
+            concurrency_limiter=self._services['llm_service'].concurrency_limiter
+        )
+        self._services['generation_pipeline'].warm_pool = self._services['warm_pool']
+        self._services['batch_generator'] = BatchGenerator(pipeline=self._services['generation_pipeline'])
+        self._services['job_manager'] = JobManager(
+            pipeline=self._services['generation_pipeline'],
+            store=create_job_store(
+                self.settings.JOB_STORE,
+                redis_client=self._services['redis'],
+                sqlite_path=self.settings.JOB_SQLITE_PATH,
+                prefix=self.settings.JOB_KEY_PREFIX,
+                ttl=self.settings.JOB_TTL,
+                unfinished_ttl=self.settings.JOB_UNFINISHED_TTL
+            )
+        )
         
         self._initialized = True
         self.logger.info("Service container initialized successfully")
     
+    async def startup(self) -> None:
+        """Initialize services, warm outbound connections and start background workers"""
+        self.initialize()
+        await self.get_trace_exporter().start()
+        await self.get_runtime_monitor().start()
+        if self._services['interaction_log'] is not None:
+            await self._services['interaction_log'].start()
+        await self.get_job_manager().start()
+        if self.settings.GOOGLE_API_KEY:
+            await self.get_llm_service().warm_up()
+            await self.get_warm_pool().start()
+    
+    def _wrap_llm_transport(self, transport: Any) -> Any:
+        """Record or replay Gemini calls beneath the pool, per LLM_TRANSPORT_MODE"""
+        self._services['llm_transport'] = create_llm_transport(
+            self.settings.LLM_TRANSPORT_MODE, transport, self._services['interaction_log']
+        )
+        return self._services['llm_transport'] or transport
+    
+    def get_trace_exporter(self) -> TraceExporter:
+        """Get TraceExporter service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['trace_exporter']
+    
+    def get_runtime_monitor(self) -> RuntimeMonitor:
+        """Get RuntimeMonitor service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['runtime_monitor']
+    
+    def get_llm_transport(self) -> Optional[Any]:
+        """Get the record / replay transport (None in passthrough mode)"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['llm_transport']
+    
+    def get_rate_limiter(self) -> RateLimiter:
+        """Get RateLimiter service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['rate_limiter']
+    
+    def get_http_pool(self) -> HTTPConnectionPool:
+        """Get the shared outbound HTTPConnectionPool"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['http_pool']
+    
     def get_prompt_builder(self) -> PromptBuilder:
         """Get PromptBuilder service"""
         if not self._initialized:
@@ -58,6 +180,60 @@ class ServiceContainer:
             self.initialize()
         return self._services['response_processor']
     
+    def get_generation_cache(self) -> GenerationCache:
+        """Get GenerationCache service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['generation_cache']
+    
+    def get_semantic_cache(self) -> SemanticCache:
+        """Get SemanticCache service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['semantic_cache']
+    
+    def get_single_flight(self) -> SingleFlight:
+        """Get SingleFlight service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['single_flight']
+    
+    def get_distributed_dedup(self) -> Optional[DistributedDeduplicator]:
+        """Get DistributedDeduplicator service (None when Redis is not configured)"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['distributed_dedup']
+    
+    def get_generation_pipeline(self) -> GenerationPipeline:
+        """Get GenerationPipeline service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['generation_pipeline']
+    
+    def get_stream_generator(self) -> StreamingGenerator:
+        """Get StreamingGenerator service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['stream_generator']
+    
+    def get_batch_generator(self) -> BatchGenerator:
+        """Get BatchGenerator service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['batch_generator']
+    
+    def get_job_manager(self) -> JobManager:
+        """Get JobManager service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['job_manager']
+    
+    def get_warm_pool(self) -> WarmPool:
+        """Get WarmPool service"""
+        if not self._initialized:
+            self.initialize()
+        return self._services['warm_pool']
+    
     async def health_check_all(self) -> Dict[str, Any]:
         """Perform health check on all services"""
         if not self._initialized:
@@ -71,9 +247,21 @@ class ServiceContainer:
         
         try:
             # Check each service
+            health_status["services"]["rate_limiter"] = self.get_rate_limiter().health_check()
+            health_status["services"]["trace_exporter"] = self.get_trace_exporter().health_check()
+            health_status["services"]["runtime_monitor"] = self.get_runtime_monitor().health_check()
             health_status["services"]["prompt_builder"] = self.get_prompt_builder().health_check()
             health_status["services"]["llm_service"] = await self.get_llm_service().health_check()
+            health_status["services"]["circuit_breaker"] = self.get_llm_service().circuit_breaker.health_check()
             health_status["services"]["response_processor"] = self.get_response_processor().health_check()
+            health_status["services"]["generation_cache"] = self.get_generation_cache().health_check()
+            health_status["services"]["semantic_cache"] = self.get_semantic_cache().health_check()
+            health_status["services"]["job_manager"] = self.get_job_manager().health_check()
+            health_status["services"]["warm_pool"] = self.get_warm_pool().health_check()
+            if self._services['interaction_log'] is not None:
+                health_status["services"]["interaction_log"] = self._services['interaction_log'].health_check()
+            if self.get_distributed_dedup() is not None:
+                health_status["services"]["distributed_dedup"] = self.get_distributed_dedup().health_check()
             
             # Check if any service is unhealthy
             for service_name, service_health in health_status["services"].items():
@@ -87,16 +275,30 @@ class ServiceContainer:
         
         return health_status
     
-    def shutdown(self) -> None:
+    async def shutdown(self) -> None:
         """Shutdown all services"""
         self.logger.info("Shutting down service container...")
         
-        # Close any async resources
-        if 'llm_service' in self._services:
-            llm_service = self._services['llm_service']
-            if hasattr(llm_service, 'client'):
-                # Note: This would need to be handled properly in async context
-                pass
+        # Stop background work first, then release connections it may still be using
+        closers = [
+            ('job_manager', lambda service: service.stop()),
+            ('warm_pool', lambda service: service.stop()),
+            ('single_flight', lambda service: service.close()),
+            ('generation_cache', lambda service: service.close()),
+            ('llm_service', lambda service: service.close()),
+            ('interaction_log', lambda service: service.stop()),
+            ('trace_exporter', lambda service: service.stop()),
+            ('runtime_monitor', lambda service: service.stop()),
+            ('redis', lambda service: service.close())
+        ]
+        for name, close in closers:
+            service = self._services.get(name)
+            if service is None:
+                continue
+            try:
+                await close(service)
+            except Exception as e:
+                self.logger.error(f"Failed to close {name}: {str(e)}")
         
         self._services.clear()
         self._initialized = False
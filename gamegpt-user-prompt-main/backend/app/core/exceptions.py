@@ -3,7 +3,7 @@ Custom Exception Classes and Error Handling for GameGPT Backend
 Provides structured error handling with proper HTTP status codes
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from enum import Enum
 import logging
 from fastapi import HTTPException
@@ -32,6 +32,15 @@ class ErrorCode(Enum):
     GEMINI_API_ERROR = "GEMINI_API_ERROR"
     GEMINI_RATE_LIMIT = "GEMINI_RATE_LIMIT"
     GEMINI_QUOTA_EXCEEDED = "GEMINI_QUOTA_EXCEEDED"
+    GEMINI_CIRCUIT_OPEN = "GEMINI_CIRCUIT_OPEN"
+    GEMINI_THROTTLED = "GEMINI_THROTTLED"
+    
+    # Client Errors
+    RATE_LIMIT_EXCEEDED = "RATE_LIMIT_EXCEEDED"
+    
+    # Job Errors
+    JOB_NOT_FOUND = "JOB_NOT_FOUND"
+    JOB_QUEUE_FULL = "JOB_QUEUE_FULL"
     
     # System Errors
     INTERNAL_ERROR = "INTERNAL_ERROR"
@@ -146,6 +155,32 @@ class ExternalServiceException(GameGPTException):
         )
 
 
+class CircuitOpenException(ExternalServiceException):
+    """Raised without calling the external service while its circuit breaker is open"""
+    
+    def __init__(self, service_name: str, retry_after: float):
+        super().__init__(
+            message=f"External service '{service_name}' is temporarily unavailable (circuit breaker open)",
+            error_code=ErrorCode.GEMINI_CIRCUIT_OPEN,
+            service_name=service_name,
+            details={"retry_after": f"{int(retry_after) + 1}s", "circuit_state": "open"}
+        )
+        self.status_code = 503
+
+
+class ThrottledException(ExternalServiceException):
+    """Raised without calling the external service when its adaptive concurrency limit is saturated"""
+    
+    def __init__(self, service_name: str, limit: int, queue_length: int, reason: str):
+        super().__init__(
+            message=f"Too many concurrent requests to external service '{service_name}'; retry shortly",
+            error_code=ErrorCode.GEMINI_THROTTLED,
+            service_name=service_name,
+            details={"concurrency_limit": limit, "queue_length": queue_length, "reason": reason}
+        )
+        self.status_code = 503
+
+
 def create_error_response(
     error_code: ErrorCode,
     message: str,
@@ -172,6 +207,24 @@ def create_error_response(
     )
 
 
+def error_detail_for(error: Exception) -> Tuple[Dict[str, Any], int]:
+    """
+    Structured ErrorDetail and HTTP status for an error that is reported in a
+    response body rather than raised (batch items, async jobs)
+    """
+    if isinstance(error, HTTPException) and isinstance(error.detail, dict):
+        return error.detail, error.status_code
+    if isinstance(error, GameGPTException):
+        detail = ErrorDetail(code=error.error_code.value, message=error.message, details=error.details)
+        return detail.dict(), error.status_code
+    detail = ErrorDetail(
+        code=ErrorCode.INTERNAL_ERROR.value,
+        message="Internal server error during game generation",
+        details={"error": str(error)}
+    )
+    return detail.dict(), 500
+
+
 def handle_service_error(
     error: Exception,
     service_name: str,
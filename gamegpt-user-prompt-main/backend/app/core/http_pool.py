@@ -0,0 +1,225 @@
+"""
+Managed HTTP connection pool for outbound API calls
+One long-lived httpx.AsyncClient with explicit pool limits, keep-alive expiry,
+per-phase timeouts and optional HTTP/2 multiplexing; connections are warmed at
+startup and pool utilization / connection reuse are tracked per request
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:  # h2 is an optional dependency (httpx[http2])
+    HTTP2_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Response body that reports back when it is closed, i.e. when the connection is released"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                on_close, self._on_close = self._on_close, None
+                on_close()
+
+
+class _InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Wraps the pooled transport to count in-flight requests and new vs reused connections"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, pool: "HTTPConnectionPool"):
+        self._transport = transport
+        self._pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        pool = self._pool
+        opened = False
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            nonlocal opened
+            if event == "connection.connect_tcp.complete":
+                opened = True
+
+        request.extensions = {**request.extensions, "trace": trace}
+        pool._request_started()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            # Includes cancellation, e.g. the losing side of a hedged request
+            pool._request_finished(opened, None, failed=True)
+            raise
+        http_version = response.extensions.get("http_version")
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(response.stream, lambda: pool._request_finished(opened, http_version)),
+            extensions=response.extensions
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    @property
+    def connections(self) -> list:
+        # httpcore's pool is not part of httpx's public API; degrade to [] if it moves
+        connection_pool = getattr(self._transport, "_pool", None)
+        return list(getattr(connection_pool, "connections", []))
+
+
+class HTTPConnectionPool:
+    """Owns the shared outbound AsyncClient and its lifecycle"""
+
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        wrap_transport: Optional[Callable[[httpx.AsyncBaseTransport], httpx.AsyncBaseTransport]] = None
+    ):
+        """
+        transport replaces the pooled network transport (e.g. a mock); it is still instrumented.
+        wrap_transport layers a transport over it (e.g. record / replay)
+        """
+        self.settings = get_settings()
+        self.logger = logger
+
+        self.limits = httpx.Limits(
+            max_connections=self.settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=self.settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=self.settings.HTTP_KEEPALIVE_EXPIRY
+        )
+        self.timeout = httpx.Timeout(
+            connect=self.settings.HTTP_CONNECT_TIMEOUT,
+            read=self.settings.REQUEST_TIMEOUT,
+            write=self.settings.HTTP_WRITE_TIMEOUT,
+            pool=self.settings.HTTP_POOL_TIMEOUT
+        )
+        self.http2 = self.settings.HTTP2_ENABLED and HTTP2_AVAILABLE
+        if self.settings.HTTP2_ENABLED and not HTTP2_AVAILABLE:
+            self.logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed; using HTTP/1.1")
+
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)
+        if wrap_transport is not None:
+            transport = wrap_transport(transport)
+        self._transport = _InstrumentedTransport(transport, self)
+        self.client = httpx.AsyncClient(transport=self._transport, timeout=self.timeout)
+
+        self._counters = {
+            "requests": 0,
+            "failed_requests": 0,
+            "new_connections": 0,
+            "reused_connections": 0
+        }
+        self._http_versions: Dict[str, int] = {}
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._warmup: Dict[str, Any] = {}
+        self._closed = False
+
+    def _request_started(self) -> None:
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+    def _request_finished(self, opened: bool, http_version: Optional[bytes], failed: bool = False) -> None:
+        self._in_flight -= 1
+        self._counters["requests"] += 1
+        if failed:
+            self._counters["failed_requests"] += 1
+        if opened:
+            self._counters["new_connections"] += 1
+        elif not failed:
+            self._counters["reused_connections"] += 1
+        if http_version:
+            version = http_version.decode("ascii", errors="replace")
+            self._http_versions[version] = self._http_versions.get(version, 0) + 1
+
+    async def warm(self, url: str, connections: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Open connections to url ahead of the first real request (DNS, TCP, TLS, HTTP/2 preface)
+        Any HTTP response counts as success; failures are logged, never raised
+        """
+        if connections is None:
+            connections = self.settings.HTTP_WARM_CONNECTIONS
+        if self.http2:
+            # One multiplexed connection carries all concurrent streams
+            connections = min(connections, 1)
+        if connections <= 0:
+            return {}
+
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(self.client.head(url) for _ in range(connections)),
+            return_exceptions=True
+        )
+        errors = [str(result) or type(result).__name__ for result in results if isinstance(result, Exception)]
+
+        self._warmup = {
+            "target": url,
+            "requested": connections,
+            "succeeded": connections - len(errors),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        if errors:
+            self._warmup["error"] = errors[0]
+            self.logger.warning(f"Connection warm-up to {url} failed for {len(errors)}/{connections}: {errors[0]}")
+        else:
+            self.logger.info(f"Warmed {connections} connection(s) to {url} in {self._warmup['elapsed_ms']}ms")
+        return self._warmup
+
+    async def close(self) -> None:
+        """Close the client and every pooled connection"""
+        if self._closed:
+            return
+        self._closed = True
+        await self.client.aclose()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def in_flight(self) -> int:
+        """Requests currently holding a connection"""
+        return self._in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool utilization and connection reuse"""
+        connections = self._transport.connections
+        idle = sum(1 for connection in connections if connection.is_idle())
+        completed = self._counters["requests"] - self._counters["failed_requests"]
+        return {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "open_connections": len(connections),
+            "idle_connections": idle,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "utilization": (
+                round(self._in_flight / self.limits.max_connections, 4) if self.limits.max_connections else None
+            ),
+            **self._counters,
+            "reuse_ratio": round(self._counters["reused_connections"] / completed, 4) if completed else None,
+            "http_versions": dict(self._http_versions),
+            "warmup": dict(self._warmup),
+            "closed": self._closed
+        }
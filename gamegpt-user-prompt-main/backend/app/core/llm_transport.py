@@ -0,0 +1,388 @@
+"""
+Record and replay transports for Gemini calls
+LLM_TRANSPORT_MODE=record wraps the network transport and logs every
+generateContent / streamGenerateContent exchange (request payload, raw response
+and the arrival time of each chunk) to gzip-compressed JSONL files in
+LLM_RECORD_DIR. Records are queued in memory and written by a background task,
+so recording never blocks a request; when the queue is full they are dropped.
+LLM_TRANSPORT_MODE=replay answers the same calls from those files, matched by a
+hash of the request payload, optionally with the recorded timing
+"""
+
+import asyncio
+import codecs
+import glob
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+LLM_METHODS = ("generateContent", "streamGenerateContent")
+FILE_PATTERN = "interactions-*.jsonl.gz"
+FLUSH_BATCH_SIZE = 64
+FLUSH_INTERVAL = 1.0
+
+
+def llm_method(request: httpx.Request) -> Optional[str]:
+    """Gemini method of a request, or None for anything else (e.g. connection warm-up)"""
+    if request.method != "POST":
+        return None
+    method = request.url.path.rpartition(":")[2]
+    return method if method in LLM_METHODS else None
+
+
+def payload_key(method: str, body: bytes) -> str:
+    """Replay key: the method and the request payload, independent of key order and whitespace"""
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        canonical = body.decode("utf-8", errors="replace")
+    return hashlib.sha256(f"{method}\n{canonical}".encode()).hexdigest()[:32]
+
+
+def prompt_fingerprint(payload: Dict[str, Any]) -> str:
+    """Hash of the prompt text alone, to group recordings of one prompt across settings"""
+    text = "".join(
+        part.get("text", "") for content in payload.get("contents", []) for part in content.get("parts", [])
+    )
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def interaction_text(record: Dict[str, Any]) -> Optional[str]:
+    """Generated text of a recorded successful exchange (joined across stream events)"""
+    if record.get("status") != 200:
+        return None
+    body = "".join(chunk for _, chunk in record.get("chunks", []))
+    try:
+        if record.get("method") == "streamGenerateContent":
+            events = [json.loads(line[5:]) for line in body.splitlines() if line.startswith("data:")]
+        else:
+            events = [json.loads(body)]
+    except ValueError:
+        return None
+    return "".join(
+        part.get("text", "")
+        for event in events
+        for candidate in event.get("candidates", [])[:1]
+        for part in candidate.get("content", {}).get("parts", [])
+    )
+
+
+def load_interactions(directory: str) -> Iterator[Dict[str, Any]]:
+    """Records of every log file in the directory, oldest file first; a torn tail (crash) is skipped"""
+    for path in sorted(glob.glob(os.path.join(directory, FILE_PATTERN))):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except (OSError, EOFError) as e:
+            logger.warning(f"Stopped reading interaction log {path}: {str(e)}")
+
+
+class InteractionLog:
+    """
+    Background writer of interaction records
+    Each flush appends one gzip member to the current file, so files stay readable
+    after a crash; a file is rotated past LLM_RECORD_MAX_BYTES (compressed) and the
+    oldest files beyond LLM_RECORD_MAX_FILES are deleted
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.settings = get_settings()
+        self.logger = logger
+        self.directory = directory or self.settings.LLM_RECORD_DIR
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._path: Optional[str] = None
+        self._sequence = 0
+        self._counters = {
+            "recorded": 0,
+            "written": 0,
+            "dropped": 0,
+            "write_errors": 0,
+            "bytes_written": 0,
+            "files_rotated": 0
+        }
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Queue a record; never blocks"""
+        self._counters["recorded"] += 1
+        if len(self._pending) >= self.settings.LLM_RECORD_QUEUE_SIZE:
+            self._counters["dropped"] += 1
+            return
+        self._pending.append(record)
+        if self._wakeup is not None and len(self._pending) >= FLUSH_BATCH_SIZE:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._worker is not None:
+            return
+        await asyncio.to_thread(os.makedirs, self.directory, exist_ok=True)
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+        self.logger.info(f"Recording Gemini interactions to {self.directory}")
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(len(self._pending), FLUSH_BATCH_SIZE))]
+            data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in batch).encode()
+            try:
+                await asyncio.to_thread(self._write, data)
+                self._counters["written"] += len(batch)
+            except Exception as e:
+                self._counters["write_errors"] += 1
+                self.logger.warning(f"Failed to write {len(batch)} interaction records: {str(e)}")
+
+    def _write(self, data: bytes) -> None:
+        if self._path is None or os.path.getsize(self._path) >= self.settings.LLM_RECORD_MAX_BYTES:
+            self._rotate()
+        compressed = gzip.compress(data)
+        with open(self._path, "ab") as handle:
+            handle.write(compressed)
+        self._counters["bytes_written"] += len(compressed)
+
+    def _rotate(self) -> None:
+        if self._path is not None:
+            self._counters["files_rotated"] += 1
+        os.makedirs(self.directory, exist_ok=True)
+        self._sequence += 1
+        name = f"interactions-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{self._sequence:04d}.jsonl.gz"
+        self._path = os.path.join(self.directory, name)
+        open(self._path, "ab").close()
+        files = sorted(glob.glob(os.path.join(self.directory, FILE_PATTERN)), key=os.path.getmtime)
+        for stale in files[:max(0, len(files) - self.settings.LLM_RECORD_MAX_FILES)]:
+            if stale != self._path:
+                os.remove(stale)
+
+    def health_check(self) -> Dict[str, Any]:
+        running = self._worker is not None and not self._worker.done()
+        return {"status": "healthy" if running else "degraded", "service": "interaction_log"}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "current_file": os.path.basename(self._path) if self._path else None,
+            "pending": len(self._pending),
+            **self._counters
+        }
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    """Passes the response body through and hands the exchange to the log once it is closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, record: Dict[str, Any], started: float, log: InteractionLog):
+        self._stream = stream
+        self._record = record
+        self._started = started
+        self._log = log
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._complete = False
+
+    async def __aiter__(self):
+        chunks = self._record["chunks"]
+        async for chunk in self._stream:
+            text = self._decoder.decode(chunk)
+            if text:
+                chunks.append([round((time.perf_counter() - self._started) * 1000, 1), text])
+            yield chunk
+        self._complete = True
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._record is not None:
+                record, self._record = self._record, None
+                record["complete"] = self._complete
+                record["elapsed_ms"] = round((time.perf_counter() - self._started) * 1000, 1)
+                self._log.append(record)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Sends requests over the wrapped transport and records the Gemini calls among them"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, log: InteractionLog):
+        self._transport = transport
+        self.log = log
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        method = llm_method(request)
+        if method is None:
+            return await self._transport.handle_async_request(request)
+
+        body = await request.aread()
+        # Recorded bodies are kept as text, so ask for them uncompressed
+        request.headers["Accept-Encoding"] = "identity"
+        payload = json.loads(body)
+        started = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        record = {
+            "ts": datetime.now().isoformat(),
+            "key": payload_key(method, body),
+            "fingerprint": prompt_fingerprint(payload),
+            "method": method,
+            "request": payload,
+            "status": response.status_code,
+            "headers": {
+                name: response.headers[name] for name in ("content-type", "retry-after") if name in response.headers
+            },
+            "headers_ms": round((time.perf_counter() - started) * 1000, 1),
+            "chunks": []
+        }
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response.stream, record, started, self.log),
+            extensions=response.extensions
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    @property
+    def _pool(self):
+        # Lets the pool instrumentation see the wrapped transport's connections
+        return getattr(self._transport, "_pool", None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": "record", **self.log.stats()}
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: List[list], started: float, preserve_timing: bool):
+        self._chunks = chunks
+        self._started = started
+        self._preserve_timing = preserve_timing
+
+    async def __aiter__(self):
+        for offset_ms, text in self._chunks:
+            if self._preserve_timing:
+                delay = self._started + offset_ms / 1000 - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield text.encode()
+
+    async def aclose(self) -> None:
+        pass
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Answers Gemini calls from recorded interactions keyed by payload hash
+    Several recordings of one payload are served in turn. Unmatched calls get a
+    404 Gemini error, or go to the wrapped transport with LLM_REPLAY_ON_MISS=passthrough;
+    other requests (e.g. connection warm-up) are answered locally
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, directory: Optional[str] = None):
+        self.settings = get_settings()
+        self.logger = logger
+        self._transport = transport
+        self.directory = directory or self.settings.LLM_RECORD_DIR
+        self.preserve_timing = self.settings.LLM_REPLAY_TIMING
+        self.passthrough_on_miss = self.settings.LLM_REPLAY_ON_MISS.lower() == "passthrough"
+        self._recordings: Dict[str, Deque[Dict[str, Any]]] = {}
+        loaded = 0
+        for record in load_interactions(self.directory):
+            if "key" in record and record.get("complete", True):
+                self._recordings.setdefault(record["key"], deque()).append(record)
+                loaded += 1
+        self._counters = {"loaded": loaded, "hits": 0, "misses": 0, "passed_through": 0}
+        self.logger.info(f"Replaying {loaded} recorded Gemini interactions ({len(self._recordings)} distinct) "
+                         f"from {self.directory}")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        method = llm_method(request)
+        if method is None:
+            if self.passthrough_on_miss:
+                return await self._transport.handle_async_request(request)
+            return httpx.Response(200, request=request)
+
+        started = time.perf_counter()
+        recordings = self._recordings.get(payload_key(method, await request.aread()))
+        if not recordings:
+            self._counters["misses"] += 1
+            if self.passthrough_on_miss:
+                self._counters["passed_through"] += 1
+                return await self._transport.handle_async_request(request)
+            return httpx.Response(404, json={"error": {
+                "code": 404,
+                "message": "No recorded interaction for this request",
+                "status": "NOT_FOUND"
+            }})
+
+        self._counters["hits"] += 1
+        record = recordings[0]
+        recordings.rotate(-1)
+        if self.preserve_timing:
+            await asyncio.sleep(record.get("headers_ms", 0) / 1000)
+        return httpx.Response(
+            status_code=record["status"],
+            headers=record.get("headers", {}),
+            stream=_ReplayStream(record.get("chunks", []), started, self.preserve_timing)
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    @property
+    def _pool(self):
+        # Lets the pool instrumentation see the wrapped transport's connections
+        return getattr(self._transport, "_pool", None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "replay",
+            "directory": self.directory,
+            "distinct_payloads": len(self._recordings),
+            "preserve_timing": self.preserve_timing,
+            "on_miss": "passthrough" if self.passthrough_on_miss else "error",
+            **self._counters
+        }
+
+
+def create_llm_transport(
+    mode: str,
+    transport: httpx.AsyncBaseTransport,
+    log: Optional[InteractionLog] = None
+) -> Optional[httpx.AsyncBaseTransport]:
+    """Record or replay transport over the network transport, or None for passthrough"""
+    mode = mode.lower()
+    if mode == "record":
+        return RecordingTransport(transport, log or InteractionLog())
+    if mode == "replay":
+        return ReplayTransport(transport)
+    if mode != "passthrough":
+        logger.warning(f"Unknown LLM_TRANSPORT_MODE '{mode}'; using passthrough")
+    return None
@@ -0,0 +1,299 @@
+"""
+Metrics for the generation pipeline
+Per-stage call, success and error counts (by ErrorCode) and latency histograms.
+Recording is a few integer operations: latencies go into log-linear buckets
+(16 linear steps per power of two of microseconds, so a reported percentile is
+within ~3% of the true value), kept in time slots from which /stats computes
+percentiles over sliding windows; /metrics exports since-start Prometheus buckets,
+along with gauges of the services' current state
+"""
+
+import bisect
+import math
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.core.config import get_settings
+from app.core.exceptions import ErrorCode, GameGPTException
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Microseconds up to 2^38 (~76 hours); longer latencies land in the last bucket
+MAX_BUCKET = SUB_BUCKETS * (38 - SUB_BUCKET_BITS) + SUB_BUCKETS - 1
+
+# Cumulative `le` bounds (seconds) exported to Prometheus
+PROMETHEUS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# Stages of a generation, named like the operations in handle_service_error, with the
+# code reported for errors that carry none of their own
+STAGES = {
+    "generate": ErrorCode.INTERNAL_ERROR,
+    "build_full_prompt": ErrorCode.PROMPT_BUILDER_ERROR,
+    "generate_response": ErrorCode.LLM_SERVICE_ERROR,
+    "process_response": ErrorCode.RESPONSE_PROCESSOR_ERROR
+}
+
+
+class Gauge(NamedTuple):
+    """A current value for /metrics, one sample per label set (e.g. {"cache": "semantic"})"""
+    name: str
+    help: str
+    samples: List[Tuple[Dict[str, str], float]]
+
+
+def bucket_index(seconds: float) -> int:
+    """Log-linear bucket for a latency: exact below 16us, then 16 buckets per doubling"""
+    micros = int(seconds * 1_000_000)
+    if micros < SUB_BUCKETS:
+        return micros if micros > 0 else 0
+    shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+    index = (shift << SUB_BUCKET_BITS) + (micros >> shift)
+    return index if index < MAX_BUCKET else MAX_BUCKET
+
+
+def bucket_bounds(index: int) -> Tuple[float, float]:
+    """[lower, upper) of a bucket, in seconds"""
+    shift = max(0, (index >> SUB_BUCKET_BITS) - 1)
+    mantissa = index - (shift << SUB_BUCKET_BITS)
+    return (mantissa << shift) / 1_000_000, ((mantissa + 1) << shift) / 1_000_000
+
+
+def percentile_of(counts: Dict[int, int], total: int, fraction: float) -> Optional[float]:
+    """Percentile (seconds, bucket midpoint) of sparse bucket counts"""
+    if not total:
+        return None
+    rank = max(1, math.ceil(fraction * total))
+    seen = 0
+    for index in sorted(counts):
+        seen += counts[index]
+        if seen >= rank:
+            lower, upper = bucket_bounds(index)
+            return (lower + upper) / 2
+    return None
+
+
+def error_code_of(error: BaseException, default: ErrorCode = ErrorCode.INTERNAL_ERROR) -> str:
+    """ErrorCode value an error is reported with"""
+    if isinstance(error, GameGPTException):
+        return error.error_code.value
+    if isinstance(error, HTTPException) and isinstance(error.detail, dict):
+        return error.detail.get("code", default.value)
+    if isinstance(error, TimeoutError):
+        return ErrorCode.TIMEOUT_ERROR.value
+    # Wrapped errors (e.g. a rejected hedging candidate) report their cause
+    cause = getattr(error, "error", None)
+    if isinstance(cause, BaseException):
+        return error_code_of(cause, default)
+    return default.value
+
+
+class SlidingHistogram:
+    """
+    Latency buckets per time slot in a ring covering the longest window
+    A window is answered by merging the slots it spans, so it slides in steps of one slot
+    """
+
+    def __init__(self, window: float, slot_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.slot_seconds = slot_seconds
+        self.slots = max(1, math.ceil(window / slot_seconds))
+        self._clock = clock
+        # Per ring position: (slot number, sparse bucket counts, sample count)
+        self._ring: List[Optional[Tuple[int, Dict[int, int], List[int]]]] = [None] * self.slots
+
+    def record(self, index: int) -> None:
+        slot = int(self._clock() // self.slot_seconds)
+        position = slot % self.slots
+        entry = self._ring[position]
+        if entry is None or entry[0] != slot:
+            entry = (slot, {}, [0])
+            self._ring[position] = entry
+        counts = entry[1]
+        counts[index] = counts.get(index, 0) + 1
+        entry[2][0] += 1
+
+    def merged(self, window: float) -> Tuple[Dict[int, int], int]:
+        """Bucket counts and sample count over the last `window` seconds"""
+        current = int(self._clock() // self.slot_seconds)
+        oldest = current - min(self.slots, max(1, math.ceil(window / self.slot_seconds))) + 1
+        merged: Dict[int, int] = {}
+        total = 0
+        for entry in self._ring:
+            if entry is None or not oldest <= entry[0] <= current:
+                continue
+            for index, count in entry[1].items():
+                merged[index] = merged.get(index, 0) + count
+            total += entry[2][0]
+        return merged, total
+
+
+class StageTimer:
+    """Context manager timing one call of a stage; cancellations are not recorded"""
+
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: "StageMetrics"):
+        self.stage = stage
+
+    def __enter__(self) -> "StageTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self.started
+        if exc is None:
+            self.stage.record(elapsed)
+        elif isinstance(exc, Exception):
+            self.stage.record(elapsed, exc)
+        return False
+
+
+class StageMetrics:
+    """Counters and latency histograms of one pipeline stage"""
+
+    def __init__(
+        self,
+        name: str,
+        windows: Tuple[int, ...],
+        default_error_code: ErrorCode = ErrorCode.INTERNAL_ERROR,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.windows = windows
+        self.default_error_code = default_error_code
+        self.requests = 0
+        self.successes = 0
+        self.errors: Dict[str, int] = {}
+        self.latency_sum = 0.0
+        # Since start, for Prometheus (cumulated on export)
+        self.prometheus_counts = [0] * (len(PROMETHEUS_BUCKETS) + 1)
+        # Six slots per shortest window
+        self.recent = SlidingHistogram(max(windows), min(windows) / 6, clock=clock)
+
+    def time(self) -> StageTimer:
+        return StageTimer(self)
+
+    def record(self, seconds: float, error: Optional[BaseException] = None) -> None:
+        self.requests += 1
+        if error is None:
+            self.successes += 1
+        else:
+            code = error_code_of(error, self.default_error_code)
+            self.errors[code] = self.errors.get(code, 0) + 1
+        self.latency_sum += seconds
+        self.prometheus_counts[bisect.bisect_left(PROMETHEUS_BUCKETS, seconds)] += 1
+        self.recent.record(bucket_index(seconds))
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts, error rate, mean and windowed p50/p95/p99 (milliseconds)"""
+        def milliseconds(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 2) if seconds is not None else None
+
+        windows = {}
+        for window in self.windows:
+            counts, total = self.recent.merged(window)
+            windows[f"{window}s"] = {
+                "count": total,
+                **{
+                    f"p{int(fraction * 100)}_ms": milliseconds(percentile_of(counts, total, fraction))
+                    for fraction in (0.5, 0.95, 0.99)
+                }
+            }
+        return {
+            "requests": self.requests,
+            "successes": self.successes,
+            "errors": sum(self.errors.values()),
+            "errors_by_code": dict(self.errors),
+            "error_rate": round(1 - self.successes / self.requests, 4) if self.requests else 0.0,
+            "avg_ms": milliseconds(self.latency_sum / self.requests) if self.requests else None,
+            "windows": windows
+        }
+
+
+class MetricsRegistry:
+    """Stage metrics for this process"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.settings = get_settings()
+        self._clock = clock
+        self.windows = tuple(
+            sorted({int(window) for window in self.settings.METRICS_WINDOWS.split(",") if window.strip()})
+        ) or (60,)
+        self._stages: Dict[str, StageMetrics] = {}
+        for name in STAGES:
+            self.stage(name)
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.METRICS_ENABLED
+
+    def stage(self, name: str) -> StageMetrics:
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = StageMetrics(
+                name, self.windows, STAGES.get(name, ErrorCode.INTERNAL_ERROR), clock=self._clock
+            )
+        return stage
+
+    def time(self, name: str) -> Any:
+        """Context manager recording one call of a stage (a no-op when metrics are disabled)"""
+        if not self.settings.METRICS_ENABLED:
+            return _NOT_TIMED
+        return StageTimer(self.stage(name))
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: stage.stats() for name, stage in self._stages.items()}
+
+    def prometheus(self, gauges: Iterable[Gauge] = ()) -> str:
+        """All stage metrics, then the given gauges, in the Prometheus text exposition format (0.0.4)"""
+        lines = [
+            "# HELP gamegpt_stage_requests_total Calls of each generation pipeline stage",
+            "# TYPE gamegpt_stage_requests_total counter"
+        ]
+        lines += [f'gamegpt_stage_requests_total{{stage="{name}"}} {stage.requests}'
+                  for name, stage in self._stages.items()]
+        lines += [
+            "# HELP gamegpt_stage_errors_total Failed calls of each stage by error code",
+            "# TYPE gamegpt_stage_errors_total counter"
+        ]
+        lines += [f'gamegpt_stage_errors_total{{stage="{name}",code="{code}"}} {count}'
+                  for name, stage in self._stages.items() for code, count in sorted(stage.errors.items())]
+        lines += [
+            "# HELP gamegpt_stage_duration_seconds Latency of each stage",
+            "# TYPE gamegpt_stage_duration_seconds histogram"
+        ]
+        for name, stage in self._stages.items():
+            cumulative = 0
+            for bound, count in zip(PROMETHEUS_BUCKETS, stage.prometheus_counts):
+                cumulative += count
+                lines.append(f'gamegpt_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'gamegpt_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {stage.requests}')
+            lines.append(f'gamegpt_stage_duration_seconds_sum{{stage="{name}"}} {stage.latency_sum}')
+            lines.append(f'gamegpt_stage_duration_seconds_count{{stage="{name}"}} {stage.requests}')
+        for gauge in gauges:
+            lines += [f"# HELP {gauge.name} {gauge.help}", f"# TYPE {gauge.name} gauge"]
+            for labels, value in gauge.samples:
+                label_text = ",".join(f'{label}="{text}"' for label, text in labels.items())
+                lines.append(f"{gauge.name}{{{label_text}}} {value}" if label_text else f"{gauge.name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class _NotTimed:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NotTimed":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOT_TIMED = _NotTimed()
+
+
+@lru_cache()
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide metrics registry"""
+    return MetricsRegistry()
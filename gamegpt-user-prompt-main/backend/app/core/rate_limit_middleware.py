@@ -0,0 +1,106 @@
+"""
+Rate limiting middleware
+Plain ASGI (no BaseHTTPMiddleware) so streamed responses pass through untouched and
+the per-request cost stays a bucket update plus a few header tuples
+"""
+
+import json
+from typing import Callable, List, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.client_identity import scope_client_id
+from app.core.exceptions import ErrorCode, create_error_response
+from app.services.rate_limiter import RateLimitDecision, RateLimiter
+
+# Scope entry holding (client, latest decision) for endpoints that charge extra
+_SCOPE_KEY = "gamegpt.rate_limit"
+
+
+def rate_limit_headers(limiter: RateLimiter, result: RateLimitDecision) -> List[Tuple[bytes, bytes]]:
+    """RateLimit-* headers (IETF httpapi draft) and Retry-After when limited"""
+    headers = [
+        (b"ratelimit-limit", limiter.limit_header),
+        (b"ratelimit-remaining", b"%d" % result.tokens),
+        (b"ratelimit-reset", b"%d" % result.reset_after),
+        (b"ratelimit-policy", limiter.policy_header)
+    ]
+    if not result.allowed:
+        headers.append((b"retry-after", b"%d" % result.retry_after))
+    return headers
+
+
+class RateLimitMiddleware:
+    """Reject clients over their RATE_LIMIT_REQUESTS / RATE_LIMIT_WINDOW allowance with 429"""
+
+    def __init__(self, app: ASGIApp, get_limiter: Callable[[], RateLimiter]):
+        """get_limiter is called per request, so the limiter follows the service container's lifecycle"""
+        self.app = app
+        self.get_limiter = get_limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        limiter = self.get_limiter()
+        if not limiter.applies_to(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        client = scope_client_id(scope, limiter.trust_api_key)
+        result = await limiter.check(client)
+        if not result.allowed:
+            await self._reject(send, result, rate_limit_headers(limiter, result))
+            return
+        scope[_SCOPE_KEY] = (client, result)
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # The endpoint may have charged more since (charge_extra)
+                headers = rate_limit_headers(limiter, scope[_SCOPE_KEY][1])
+                message["headers"] = [*message.get("headers", ()), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    async def _reject(self, send: Send, result: RateLimitDecision, headers: List[Tuple[bytes, bytes]]) -> None:
+        # Same body shape as errors raised through create_error_response (ErrorDetail fields),
+        # built as a plain dict: rejections are the hot path under abuse
+        retry_after = result.retry_after
+        body = json.dumps({"detail": {
+            "code": ErrorCode.RATE_LIMIT_EXCEEDED.value,
+            "message": f"Rate limit exceeded; retry in {retry_after}s",
+            "details": {"limit": result.limit, "retry_after": retry_after},
+            "timestamp": None
+        }}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *headers
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def charge_extra(scope: Scope, limiter: RateLimiter, cost: float) -> None:
+    """
+    Take cost more tokens for a request that does the work of several (e.g. a batch
+    of generations), on top of the one the middleware took. The response's RateLimit-*
+    headers report the bucket after it; raises 429 RATE_LIMIT_EXCEEDED if it is short
+    """
+    charged = scope.get(_SCOPE_KEY)
+    if charged is None or cost <= 0:
+        return  # Exempt path or rate limiting disabled
+    client = charged[0]
+    result = await limiter.check(client, cost)
+    scope[_SCOPE_KEY] = (client, result)
+    if not result.allowed:
+        raise create_error_response(
+            error_code=ErrorCode.RATE_LIMIT_EXCEEDED,
+            message=f"Rate limit exceeded; retry in {result.retry_after}s",
+            details={"limit": result.limit, "retry_after": result.retry_after},
+            status_code=429
+        )
@@ -0,0 +1,31 @@
+"""
+Redis client factory for GameGPT Backend
+Redis is optional - every feature that uses it must keep working without it
+"""
+
+from typing import Any, Optional
+
+from app.core.logging_config import get_logger
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # redis is an optional dependency
+    redis_asyncio = None
+
+logger = get_logger(__name__)
+
+
+def create_redis_client(url: str) -> Optional[Any]:
+    """Create an asyncio Redis client, or None if Redis is not configured/available"""
+    if not url:
+        return None
+
+    if redis_asyncio is None:
+        logger.warning("REDIS_URL is set but the 'redis' package is not installed; Redis features disabled")
+        return None
+
+    try:
+        return redis_asyncio.from_url(url, decode_responses=True)
+    except Exception as e:
+        logger.error(f"Failed to create Redis client: {str(e)}")
+        return None
@@ -0,0 +1,116 @@
+"""
+Runtime monitor
+Event-loop lag and process memory, for spotting blocking code and leaks under load.
+A background task sleeps RUNTIME_MONITOR_INTERVAL seconds at a time; how much later
+than requested it wakes up is the time the loop spent running other callbacks
+without yielding, which every request in flight waited out as well
+"""
+
+import asyncio
+import gc
+import math
+import os
+import resource
+import sys
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> int:
+    """Highest resident set size so far (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RuntimeMonitor:
+    """Samples event-loop lag in the background; memory is read when stats are requested"""
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.logger = logger
+        self.interval = self.settings.RUNTIME_MONITOR_INTERVAL
+        self._lags: Deque[float] = deque(maxlen=max(1, self.settings.RUNTIME_MONITOR_SAMPLES))
+        self._max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._started_rss = rss_bytes()
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._started_rss = rss_bytes()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self._lags.append(lag)
+            if lag > self._max_lag:
+                self._max_lag = lag
+
+    def health_check(self) -> Dict[str, Any]:
+        """Health check for the runtime monitor"""
+        running = self._task is not None and not self._task.done()
+        return {
+            "status": "healthy" if running or not self.enabled else "degraded",
+            "service": "runtime_monitor"
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Event-loop lag percentiles over the recent samples, memory and open tasks"""
+        def milliseconds(seconds: float) -> float:
+            return round(seconds * 1000, 2)
+
+        lags = sorted(self._lags)
+        event_loop: Dict[str, Any] = {"samples": len(lags), "interval_s": self.interval}
+        if lags:
+            for fraction in (0.5, 0.99):
+                index = min(len(lags) - 1, max(0, math.ceil(fraction * len(lags)) - 1))
+                event_loop[f"lag_p{int(fraction * 100)}_ms"] = milliseconds(lags[index])
+            event_loop["lag_max_ms"] = milliseconds(lags[-1])
+        event_loop["lag_max_since_start_ms"] = milliseconds(self._max_lag)
+
+        def megabytes(value: Optional[int]) -> Optional[float]:
+            return round(value / 2**20, 1) if value is not None else None
+
+        rss = rss_bytes()
+        try:
+            tasks = len(asyncio.all_tasks())
+        except RuntimeError:
+            tasks = None
+        return {
+            "event_loop": event_loop,
+            "rss_mb": megabytes(rss),
+            "rss_growth_mb": megabytes(rss - self._started_rss) if rss is not None and self._started_rss else None,
+            "peak_rss_mb": megabytes(max(peak_rss_bytes(), rss or 0)),
+            "asyncio_tasks": tasks,
+            "gc_collections": [generation["collections"] for generation in gc.get_stats()]
+        }
@@ -0,0 +1,335 @@
+"""
+Request tracing
+TracingMiddleware opens a root span per HTTP request and keeps the current span in a
+contextvar, so `with span("name"):` anywhere below it (including tasks created while
+handling the request) records a child span; outside a request it does nothing.
+Every traced response carries a Server-Timing header with the time per span name.
+Sampled traces (TRACE_SAMPLE_RATE, or the sampled flag of an incoming W3C
+traceparent) are handed to the TraceExporter, which writes them in OTLP/JSON to
+a local file or POSTs them to a collector in the background
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import httpx
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("gamegpt_current_span", default=None)
+
+
+class Trace:
+    """Spans of one request; appended as they finish"""
+
+    __slots__ = ("trace_id", "sampled", "spans", "root")
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List["Span"] = []
+        self.root: Optional["Span"] = None
+
+    def server_timing(self) -> str:
+        """Server-Timing value: milliseconds per span name (repeats summed) and the total so far"""
+        durations: Dict[str, float] = {}
+        for finished in self.spans:
+            if finished is not self.root:
+                durations[finished.name] = durations.get(finished.name, 0.0) + finished.duration_ms
+        entries = [f"{name};dur={duration:.1f}" for name, duration in durations.items()]
+        if self.root is not None:
+            entries.append(f"total;dur={(time.time_ns() - self.root.start_ns) / 1e6:.1f}")
+        return ", ".join(entries)
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "_token")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: Optional[str] = None
+        self._token = None
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.error = f"{type(exc).__name__}: {exc}"[:200]
+        _current_span.reset(self._token)
+        self.trace.spans.append(self)
+        return False
+
+
+class _NoSpan:
+    """Stand-in outside a traced request"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, **attributes: Any) -> Any:
+    """Child span of the current span; a no-op when no request is being traced"""
+    parent = _current_span.get()
+    if parent is None:
+        return _NO_SPAN
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+
+def current_span() -> Any:
+    return _current_span.get() or _NO_SPAN
+
+
+def parse_traceparent(value: str) -> Optional[tuple]:
+    """(trace id, parent span id, sampled) from a W3C traceparent header, or None if malformed"""
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def otlp_payload(traces: List[Trace], service_name: str) -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest for finished traces"""
+    def attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    spans = []
+    for trace in traces:
+        for finished in trace.spans:
+            record = {
+                "traceId": trace.trace_id,
+                "spanId": finished.span_id,
+                "name": finished.name,
+                "kind": 2 if finished is trace.root else 1,  # SERVER / INTERNAL
+                "startTimeUnixNano": str(finished.start_ns),
+                "endTimeUnixNano": str(finished.end_ns),
+                "attributes": [attribute(key, value) for key, value in finished.attributes.items()],
+                "status": {"code": 2, "message": finished.error} if finished.error else {"code": 1}
+            }
+            if finished.parent_id:
+                record["parentSpanId"] = finished.parent_id
+            spans.append(record)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": "gamegpt.tracing"}, "spans": spans}]
+        }]
+    }
+
+
+class TraceExporter:
+    """
+    Batches sampled traces and exports them off the request path
+    TRACE_EXPORTER=file appends one OTLP/JSON request per line to TRACE_EXPORT_PATH
+    (the OpenTelemetry Collector file format); TRACE_EXPORTER=otlp POSTs it to
+    TRACE_EXPORT_ENDPOINT (an OTLP/HTTP JSON receiver). When the buffer is full,
+    new traces are dropped rather than slowing requests down
+    """
+
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self.settings = get_settings()
+        self.logger = logger
+        self.exporter = self.settings.TRACE_EXPORTER.lower()
+        if self.exporter not in ("none", "file", "otlp"):
+            self.logger.warning(f"Unknown TRACE_EXPORTER '{self.exporter}'; traces will not be exported")
+            self.exporter = "none"
+        self.http_client = http_client
+        self._pending: Deque[Trace] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._counters = {
+            "traces": 0,
+            "sampled": 0,
+            "exported": 0,
+            "dropped": 0,
+            "export_errors": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter != "none"
+
+    def health_check(self) -> Dict[str, Any]:
+        """Health check for the trace exporter"""
+        running = self._worker is not None and not self._worker.done()
+        return {
+            "status": "healthy" if running or not self.enabled else "degraded",
+            "service": "trace_exporter",
+            "exporter": self.exporter
+        }
+
+    def sample(self) -> bool:
+        """Head sampling decision for a request without an incoming traceparent"""
+        return self.enabled and random.random() < self.settings.TRACE_SAMPLE_RATE
+
+    def submit(self, trace: Trace) -> None:
+        """Queue a finished trace if it was sampled"""
+        self._counters["traces"] += 1
+        if not trace.sampled or not self.enabled:
+            return
+        self._counters["sampled"] += 1
+        if len(self._pending) >= self.settings.TRACE_EXPORT_QUEUE_SIZE:
+            self._counters["dropped"] += 1
+            return
+        self._pending.append(trace)
+        if self._wakeup is not None and len(self._pending) >= self.settings.TRACE_EXPORT_BATCH_SIZE:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        """Start the background export loop"""
+        if not self.enabled or self._worker is not None:
+            return
+        if self.exporter == "otlp" and self.http_client is None:
+            self.http_client = httpx.AsyncClient(timeout=10.0)
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+        target = self.settings.TRACE_EXPORT_PATH if self.exporter == "file" else self.settings.TRACE_EXPORT_ENDPOINT
+        self.logger.info(f"Exporting sampled traces ({self.settings.TRACE_SAMPLE_RATE:.0%}) to {target}")
+
+    async def stop(self) -> None:
+        """Stop the loop and flush what is still buffered"""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        await self.flush()
+        if self.http_client is not None:
+            await self.http_client.aclose()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.settings.TRACE_EXPORT_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(len(self._pending), self.settings.TRACE_EXPORT_BATCH_SIZE))]
+            payload = json.dumps(otlp_payload(batch, self.settings.TRACE_SERVICE_NAME), separators=(",", ":"))
+            try:
+                if self.exporter == "file":
+                    await asyncio.to_thread(self._append_line, payload)
+                else:
+                    response = await self.http_client.post(
+                        self.settings.TRACE_EXPORT_ENDPOINT,
+                        content=payload,
+                        headers={"Content-Type": "application/json"}
+                    )
+                    response.raise_for_status()
+                self._counters["exported"] += len(batch)
+            except Exception as e:
+                self._counters["export_errors"] += 1
+                self.logger.warning(f"Failed to export {len(batch)} traces: {str(e)}")
+
+    def _append_line(self, line: str) -> None:
+        with open(self.settings.TRACE_EXPORT_PATH, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+    def stats(self) -> Dict[str, Any]:
+        """Traced, sampled, exported and dropped traces"""
+        return {
+            "exporter": self.exporter,
+            "sample_rate": self.settings.TRACE_SAMPLE_RATE,
+            "pending": len(self._pending),
+            **self._counters
+        }
+
+
+class TracingMiddleware:
+    """Root span, Server-Timing header and export hand-off for every HTTP request"""
+
+    def __init__(self, app: ASGIApp, get_exporter: Callable[[], TraceExporter]):
+        self.app = app
+        self.get_exporter = get_exporter
+        self.settings = get_settings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        exporter = self.get_exporter()
+        parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+        if parent is not None:
+            trace = Trace(parent[0], sampled=parent[2] and exporter.enabled)
+        else:
+            trace = Trace(f"{random.getrandbits(128):032x}", sampled=exporter.sample())
+
+        root = Span(trace, f"{scope['method']} {scope['path']}", parent[1] if parent else None, {
+            "http.method": scope["method"],
+            "http.target": scope["path"]
+        })
+        trace.root = root
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"server-timing", trace.server_timing().encode())
+                ]
+            await send(message)
+
+        try:
+            with root:
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            exporter.submit(trace)
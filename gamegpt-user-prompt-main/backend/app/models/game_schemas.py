@@ -4,18 +4,56 @@ Defines the data structures for API requests and responses
 """
 
 from typing import List, Dict, Any, Optional, Union, Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, HttpUrl
 from datetime import datetime
 
 
+# Supported game types (mirrors GameType in prompt_templates)
+GameTypeName = Literal[
+    "quiz",
+    "drag-drop", 
+    "memory-match",
+    "word-puzzle",
+    "sorting",
+    "matching",
+    "story-sequence",
+    "fill-blank",
+    "card-flip",
+    "puzzle-assembly",
+    "anxiety-adventure"
+]
+
+DifficultyName = Literal["easy", "medium", "hard"]
+
+
 class GameGenerationRequest(BaseModel):
     """Request model for game generation - equivalent to n8n webhook input"""
     prompt: str = Field(..., description="User's game request prompt", min_length=1, max_length=2000)
     
+    # Optional structured parameters; when gameType is omitted it is inferred from the prompt
+    gameType: Optional[GameTypeName] = Field(None, description="Requested game type")
+    difficulty: Optional[DifficultyName] = Field(None, description="Requested difficulty")
+    targetAge: Optional[str] = Field(None, description="Target age group", max_length=100)
+    estimatedTime: Optional[int] = Field(None, description="Desired play time in minutes", ge=5, le=30)
+    theme: Optional[str] = Field(None, description="Therapeutic theme or wellness topic", max_length=200)
+    
+    def structured_parameters(self) -> Dict[str, Any]:
+        """The structured parameters that were actually provided"""
+        return {
+            name: value
+            for name, value in self.dict(exclude={"prompt"}).items()
+            if value is not None
+        }
+    
     class Config:
         json_schema_extra = {
             "example": {
-                "prompt": "A quiz about recognizing and managing stress for teens"
+                "prompt": "A quiz about recognizing and managing stress for teens",
+                "gameType": "quiz",
+                "difficulty": "medium",
+                "targetAge": "13-17",
+                "estimatedTime": 15,
+                "theme": "stress-management"
             }
         }
 
@@ -229,11 +267,17 @@ class WordPuzzleContent(BaseModel):
 
 
 # Puzzle Assembly Game Content Models
+class GridPosition(BaseModel):
+    """Cell of the puzzle grid"""
+    x: int
+    y: int
+
+
 class PuzzlePiece(BaseModel):
     """Puzzle piece model"""
     id: str
     image: str
-    correctPosition: Dict[str, int]  # {"x": 0, "y": 0}
+    correctPosition: GridPosition
 
 
 class PuzzleAssemblyContent(BaseModel):
@@ -292,20 +336,8 @@ class GameSchema(BaseModel):
     id: str = Field(..., pattern=r"^game-\d{8}-\d{4}$")
     title: str = Field(..., max_length=60)
     description: str
-    type: Literal[
-        "quiz",
-        "drag-drop", 
-        "memory-match",
-        "word-puzzle",
-        "sorting",
-        "matching",
-        "story-sequence",
-        "fill-blank",
-        "card-flip",
-        "puzzle-assembly",
-        "anxiety-adventure"
-    ]
-    difficulty: Literal["easy", "medium", "hard"]
+    type: GameTypeName
+    difficulty: DifficultyName
     category: Literal[
         "mental-wellness",
         "coping-skills",
@@ -368,3 +400,74 @@ class GameSchema(BaseModel):
                 "theme": "stress-management"
             }
         }
+
+
+class BatchGenerationRequest(BaseModel):
+    """Batch of generation requests run concurrently through the pipeline"""
+    items: List[GameGenerationRequest] = Field(..., min_length=1, description="Games to generate")
+    stream: bool = Field(False, description="Stream per-item results as NDJSON as they finish")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"prompt": "A quiz about recognizing and managing stress for teens", "gameType": "quiz"},
+                    {"prompt": "A memory game about mindfulness practices", "difficulty": "easy"}
+                ],
+                "stream": False
+            }
+        }
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one batch item: the game, or the structured error it failed with"""
+    index: int
+    status: Literal["ok", "error"]
+    game: Optional[GameSchema] = None
+    error: Optional[Dict[str, Any]] = None
+    status_code: int = 200
+    elapsed_ms: float
+
+
+class BatchGenerationResponse(BaseModel):
+    """Per-item results of a batch, in request order"""
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+    elapsed_ms: float
+
+
+class JobCreateRequest(BaseModel):
+    """Submit a generation to run in the background"""
+    request: GameGenerationRequest
+    callbackUrl: Optional[HttpUrl] = Field(None, description="POSTed the finished job (same body as GET /jobs/{id})")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "request": {"prompt": "A quiz about recognizing and managing stress for teens", "gameType": "quiz"},
+                "callbackUrl": "https://example.com/hooks/gamegpt"
+            }
+        }
+
+
+class JobCallbackStatus(BaseModel):
+    """Delivery state of the completion webhook"""
+    url: str
+    status: Optional[Literal["pending", "delivered", "failed"]] = None
+    attempts: int = 0
+
+
+class JobResponse(BaseModel):
+    """Status of an asynchronous generation job, with its game or error once finished"""
+    id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    createdAt: str
+    startedAt: Optional[str] = None
+    finishedAt: Optional[str] = None
+    queueWaitMs: Optional[float] = None
+    runMs: Optional[float] = None
+    result: Optional[GameSchema] = None
+    error: Optional[Dict[str, Any]] = None
+    statusCode: Optional[int] = None
+    callback: Optional[JobCallbackStatus] = None
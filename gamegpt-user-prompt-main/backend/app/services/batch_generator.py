@@ -0,0 +1,125 @@
+"""
+Batch Generation Service
+Runs many GameGenerationRequests through the generation pipeline with a bounded
+number in flight; every item gets its own result or structured error, so one
+failure does not sink the batch
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.exceptions import error_detail_for
+from app.models.game_schemas import (
+    BatchGenerationResponse,
+    BatchItemResult,
+    GameGenerationRequest
+)
+from app.services.generation_pipeline import GenerationPipeline
+
+logger = get_logger(__name__)
+
+
+class BatchGenerator:
+    """Bounded-concurrency fan-out over GenerationPipeline.generate"""
+
+    def __init__(self, pipeline: GenerationPipeline):
+        self.settings = get_settings()
+        self.logger = logger
+        self.pipeline = pipeline
+        self._counters = {
+            "batches": 0,
+            "items": 0,
+            "items_succeeded": 0,
+            "items_failed": 0,
+            "batches_cancelled": 0
+        }
+
+    @property
+    def concurrency(self) -> int:
+        return max(1, self.settings.BATCH_CONCURRENCY)
+
+    async def run(
+        self,
+        items: List[GameGenerationRequest],
+        client_id: Optional[str] = None
+    ) -> BatchGenerationResponse:
+        """Generate every item and return the results in request order"""
+        started = time.perf_counter()
+        results: List[Optional[BatchItemResult]] = [None] * len(items)
+        async for result in self.as_completed(items, client_id):
+            results[result.index] = result
+        succeeded = sum(1 for result in results if result.status == "ok")
+        return BatchGenerationResponse(
+            results=results,
+            succeeded=succeeded,
+            failed=len(items) - succeeded,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+
+    async def as_completed(
+        self,
+        items: List[GameGenerationRequest],
+        client_id: Optional[str] = None
+    ) -> AsyncIterator[BatchItemResult]:
+        """
+        Yield item results as they finish
+        At most BATCH_CONCURRENCY items run at once; if the consumer stops early
+        (e.g. a streaming client disconnects) the remaining items are cancelled
+        """
+        self._counters["batches"] += 1
+        self._counters["items"] += len(items)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        self.logger.info(f"Starting batch of {len(items)} items (concurrency {self.concurrency})")
+
+        async def one(index: int, request: GameGenerationRequest) -> BatchItemResult:
+            async with semaphore:
+                return await self._generate_item(index, request, client_id)
+
+        tasks = [asyncio.create_task(one(index, request)) for index, request in enumerate(items)]
+        finished = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                finished += 1
+                yield result
+        finally:
+            if finished < len(tasks):
+                self._counters["batches_cancelled"] += 1
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _generate_item(
+        self,
+        index: int,
+        request: GameGenerationRequest,
+        client_id: Optional[str]
+    ) -> BatchItemResult:
+        started = time.perf_counter()
+        try:
+            game_schema = await self.pipeline.generate(request, client_id=client_id)
+        except Exception as e:
+            self._counters["items_failed"] += 1
+            error, status_code = error_detail_for(e)
+            self.logger.warning(f"Batch item {index} failed: {error['code']}")
+            return BatchItemResult(
+                index=index,
+                status="error",
+                error=error,
+                status_code=status_code,
+                elapsed_ms=round((time.perf_counter() - started) * 1000, 1)
+            )
+        self._counters["items_succeeded"] += 1
+        return BatchItemResult(
+            index=index,
+            status="ok",
+            game=game_schema,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch and per-item counters"""
+        return {"concurrency": self.concurrency, **self._counters}
@@ -0,0 +1,183 @@
+"""
+Circuit Breaker for the Gemini dependency
+Trips open when recent calls fail or run slow too often, so requests fail fast
+(or fall back to stored games) during an outage instead of waiting out REQUEST_TIMEOUT
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.exceptions import CircuitOpenException
+from app.services.retry import is_retryable
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass; outcomes go into a sliding window of the last BREAKER_WINDOW calls.
+    Open: calls are rejected immediately for BREAKER_OPEN_SECONDS.
+    Half-open: up to BREAKER_HALF_OPEN_CALLS probe calls pass; if they all succeed the
+    breaker closes, any failure reopens it.
+    """
+
+    def __init__(self, name: str = "gemini", clock: Callable[[], float] = time.monotonic):
+        self.settings = get_settings()
+        self.logger = logger
+        self.name = name
+        self._clock = clock
+
+        self.window_size = self.settings.BREAKER_WINDOW
+        self.min_calls = self.settings.BREAKER_MIN_CALLS
+        self.failure_rate_threshold = self.settings.BREAKER_FAILURE_RATE
+        self.slow_call_seconds = self.settings.BREAKER_SLOW_CALL_SECONDS
+        self.slow_rate_threshold = self.settings.BREAKER_SLOW_CALL_RATE
+        self.open_seconds = self.settings.BREAKER_OPEN_SECONDS
+        self.half_open_calls = self.settings.BREAKER_HALF_OPEN_CALLS
+
+        self.state = STATE_CLOSED
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=self.window_size)  # (failed, slow)
+        self._opened_at: Optional[float] = None
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._counters = {
+            "calls": 0,
+            "failures": 0,
+            "slow_calls": 0,
+            "rejected": 0,
+            "opened": 0,
+            "half_opened": 0,
+            "closed": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.BREAKER_ENABLED
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn through the breaker; raises CircuitOpenException while open"""
+        if not self.enabled:
+            return await fn()
+
+        probe = self._before_call()
+        started = self._clock()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Abandoned (e.g. a hedge loser): says nothing about upstream health
+            if probe:
+                self._probes_in_flight -= 1
+            raise
+        except Exception as e:
+            self._record(probe, failed=is_retryable(e), duration=self._clock() - started)
+            raise
+        self._record(probe, failed=False, duration=self._clock() - started)
+        return result
+
+    def _before_call(self) -> bool:
+        """Admit or reject a call; returns True if the call is a half-open probe"""
+        if self.state == STATE_OPEN:
+            if self._clock() - self._opened_at < self.open_seconds:
+                self._reject()
+            self._transition(STATE_HALF_OPEN)
+
+        if self.state == STATE_HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_calls:
+                self._reject()
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def _reject(self) -> None:
+        self._counters["rejected"] += 1
+        retry_after = max(0.0, self.open_seconds - (self._clock() - self._opened_at)) if self._opened_at else 0.0
+        raise CircuitOpenException(service_name=self.name, retry_after=retry_after)
+
+    def _record(self, probe: bool, failed: bool, duration: float) -> None:
+        slow = duration >= self.slow_call_seconds
+        self._counters["calls"] += 1
+        self._counters["failures"] += int(failed)
+        self._counters["slow_calls"] += int(slow)
+
+        if probe:
+            self._probes_in_flight -= 1
+            if failed or slow:
+                self._transition(STATE_OPEN)
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self._transition(STATE_CLOSED)
+            return
+
+        if self.state != STATE_CLOSED:
+            # A call admitted before the breaker opened; its outcome is already stale
+            return
+
+        self._window.append((failed, slow))
+        if len(self._window) < self.min_calls:
+            return
+        failure_rate, slow_rate = self._rates()
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_rate_threshold:
+            self.logger.error(
+                f"Circuit breaker for {self.name} opening: failure rate {failure_rate:.0%}, "
+                f"slow-call rate {slow_rate:.0%} over the last {len(self._window)} calls"
+            )
+            self._transition(STATE_OPEN)
+
+    def _rates(self) -> Tuple[float, float]:
+        if not self._window:
+            return 0.0, 0.0
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow = sum(1 for _, is_slow in self._window if is_slow)
+        return failures / len(self._window), slow / len(self._window)
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        self.logger.warning(f"Circuit breaker for {self.name}: {self.state} -> {state}")
+        self.state = state
+        if state == STATE_OPEN:
+            self._opened_at = self._clock()
+            self._counters["opened"] += 1
+        elif state == STATE_HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            self._counters["half_opened"] += 1
+        else:
+            self._window.clear()
+            self._opened_at = None
+            self._counters["closed"] += 1
+
+    def health_check(self) -> Dict[str, Any]:
+        """Breaker state for /health; anything but closed is reported as degraded"""
+        return {
+            "status": "healthy" if self.state == STATE_CLOSED or not self.enabled else "degraded",
+            "service": "circuit_breaker",
+            "dependency": self.name,
+            "state": self.state if self.enabled else "disabled"
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        failure_rate, slow_rate = self._rates()
+        open_for = None
+        if self.state == STATE_OPEN and self._opened_at is not None:
+            open_for = round(self._clock() - self._opened_at, 1)
+        return {
+            "enabled": self.enabled,
+            "state": self.state,
+            "window_calls": len(self._window),
+            "window_failure_rate": round(failure_rate, 4),
+            "window_slow_rate": round(slow_rate, 4),
+            "open_for_s": open_for,
+            **self._counters
+        }
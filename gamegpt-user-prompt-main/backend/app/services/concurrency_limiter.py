@@ -0,0 +1,245 @@
+"""
+Adaptive Concurrency Limiter for Gemini calls (AIMD)
+Caps concurrent upstream calls at a limit that grows by one per limit's worth of
+healthy calls and is cut multiplicatively on 429s, timeouts, overload errors and
+latency spikes; callers over the limit wait briefly in a FIFO queue
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.exceptions import ErrorCode, GameGPTException, ThrottledException
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class Permit:
+    """One admitted call: when it started and whether the limit was in full use"""
+    started: float
+    saturated: bool
+
+
+def overload_reason(error: Optional[BaseException]) -> Optional[str]:
+    """Why an error signals upstream overload, or None if it says nothing about load"""
+    if not isinstance(error, GameGPTException):
+        return None
+    if error.error_code == ErrorCode.GEMINI_RATE_LIMIT:
+        return "rate_limit"
+    if error.error_code == ErrorCode.TIMEOUT_ERROR:
+        return "timeout"
+    if error.error_code == ErrorCode.GEMINI_API_ERROR and error.details.get("external_status_code") == 503:
+        return "overloaded"
+    return None
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on concurrent calls
+    One decrease per congestion event: calls that started before the last cut do not cut again
+    """
+
+    # Successful calls before latency spikes are judged against the running average
+    MIN_LATENCY_SAMPLES = 20
+    LATENCY_EWMA_ALPHA = 0.1
+
+    def __init__(self, name: str = "gemini", clock: Callable[[], float] = time.monotonic):
+        self.settings = get_settings()
+        self.logger = logger
+        self.name = name
+        self._clock = clock
+
+        self.min_limit = max(1, self.settings.AIMD_MIN_LIMIT)
+        self.max_limit = max(self.min_limit, self.settings.AIMD_MAX_LIMIT)
+        self.decrease_factor = self.settings.AIMD_DECREASE_FACTOR
+        self.spike_factor = self.settings.AIMD_LATENCY_SPIKE_FACTOR
+        self.max_queue = self.settings.AIMD_MAX_QUEUE
+        self.queue_timeout = self.settings.AIMD_QUEUE_TIMEOUT
+
+        self._limit = float(min(self.max_limit, max(self.min_limit, self.settings.AIMD_INITIAL_LIMIT)))
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease_at = float("-inf")
+        self._latency_ewma: Optional[float] = None
+        self._latency_samples = 0
+        self._peak_queue = 0
+        self._counters = {
+            "admitted": 0,
+            "queued": 0,
+            "queue_wait_ms_total": 0.0,
+            "throttled_queue_full": 0,
+            "throttled_timeout": 0,
+            "increases": 0,
+            "decreases": 0
+        }
+        self._decreases_by_reason: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.AIMD_ENABLED
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, math.floor(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_length(self) -> int:
+        return len(self._waiters)
+
+    def has_headroom(self) -> bool:
+        """Whether a new call would be admitted without queueing"""
+        return not self.enabled or (not self._waiters and self._in_flight < self.limit)
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn within the limit, feeding its latency and outcome back into the limit"""
+        if not self.enabled:
+            return await fn()
+        permit = await self.acquire()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Abandoned (e.g. a hedge loser): no signal either way
+            self.release(permit, track_outcome=False)
+            raise
+        except Exception as e:
+            self.release(permit, error=e)
+            raise
+        self.release(permit)
+        return result
+
+    async def acquire(self) -> Permit:
+        """Wait for a slot; raises ThrottledException if the queue is full or the wait too long"""
+        if not self._waiters and self._in_flight < self.limit:
+            return self._admit(queued=False)
+
+        if len(self._waiters) >= self.max_queue:
+            self._counters["throttled_queue_full"] += 1
+            self.logger.warning(f"{self.name} concurrency queue full ({self.max_queue}); rejecting call")
+            raise ThrottledException(self.name, self.limit, len(self._waiters), reason="queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._peak_queue = max(self._peak_queue, len(self._waiters))
+        self._counters["queued"] += 1
+        queued_at = self._clock()
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as the wait ended; pass it on
+                self._in_flight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._counters["throttled_timeout"] += 1
+                self.logger.warning(f"{self.name} call waited {self.queue_timeout}s for a concurrency slot; rejecting")
+                raise ThrottledException(self.name, self.limit, len(self._waiters), reason="timeout") from None
+            raise
+        finally:
+            self._counters["queue_wait_ms_total"] += (self._clock() - queued_at) * 1000
+        # _wake already counted this call as in flight
+        return self._admit(queued=True, reserved=True)
+
+    def _admit(self, queued: bool, reserved: bool = False) -> Permit:
+        if not reserved:
+            self._in_flight += 1
+        self._counters["admitted"] += 1
+        return Permit(started=self._clock(), saturated=queued or self._in_flight >= self.limit)
+
+    def _wake(self) -> None:
+        """Hand free slots to waiters in arrival order"""
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    def release(
+        self,
+        permit: Permit,
+        error: Optional[BaseException] = None,
+        track_latency: bool = True,
+        track_outcome: bool = True
+    ) -> None:
+        """
+        Return a slot and adjust the limit
+        track_latency=False for calls whose duration is not comparable (e.g. whole streams)
+        """
+        self._in_flight -= 1
+        if track_outcome:
+            self._adjust(permit, error, track_latency)
+        self._wake()
+
+    def _adjust(self, permit: Permit, error: Optional[BaseException], track_latency: bool) -> None:
+        reason = overload_reason(error)
+        if reason is None and error is None and track_latency:
+            latency = self._clock() - permit.started
+            if self._is_spike(latency):
+                reason = "latency_spike"
+            self._record_latency(latency)
+
+        if reason is not None:
+            self._decrease(permit, reason)
+        elif error is None and permit.saturated:
+            # Additive increase: about +1 per limit's worth of successful calls, only while the limit is in use
+            previous = self.limit
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            if self.limit > previous:
+                self._counters["increases"] += 1
+
+    def _is_spike(self, latency: float) -> bool:
+        return (
+            self._latency_samples >= self.MIN_LATENCY_SAMPLES
+            and self._latency_ewma is not None
+            and latency > self.spike_factor * self._latency_ewma
+        )
+
+    def _record_latency(self, latency: float) -> None:
+        self._latency_samples += 1
+        if self._latency_ewma is None:
+            self._latency_ewma = latency
+        else:
+            self._latency_ewma += self.LATENCY_EWMA_ALPHA * (latency - self._latency_ewma)
+
+    def _decrease(self, permit: Permit, reason: str) -> None:
+        if permit.started < self._last_decrease_at:
+            # Part of a congestion event that was already acted on
+            return
+        previous = self.limit
+        self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+        self._last_decrease_at = self._clock()
+        self._counters["decreases"] += 1
+        self._decreases_by_reason[reason] = self._decreases_by_reason.get(reason, 0) + 1
+        self.logger.warning(f"{self.name} concurrency limit {previous} -> {self.limit} ({reason})")
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limit, queue and throttling counters"""
+        queued = self._counters["queued"]
+        return {
+            "enabled": self.enabled,
+            "limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self._in_flight,
+            "queue_length": len(self._waiters),
+            "peak_queue_length": self._peak_queue,
+            **{name: value for name, value in self._counters.items() if name != "queue_wait_ms_total"},
+            "avg_queue_wait_ms": round(self._counters["queue_wait_ms_total"] / queued, 1) if queued else 0.0,
+            "throttled": self._counters["throttled_queue_full"] + self._counters["throttled_timeout"],
+            "decreases_by_reason": dict(self._decreases_by_reason),
+            "latency_ewma_ms": round(self._latency_ewma * 1000, 1) if self._latency_ewma is not None else None
+        }
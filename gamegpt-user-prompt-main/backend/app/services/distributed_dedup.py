@@ -0,0 +1,250 @@
+"""
+Distributed Deduplication Service
+Cross-replica request deduplication and result sharing via Redis
+
+One replica takes a lease on the generation key and runs the pipeline; replicas
+that receive the same request meanwhile wait for the published result instead
+of calling Gemini themselves.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Delete/extend the lease only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Messages published on the completion channel
+_DONE = "done"
+_FAILED = "failed"
+
+
+class DistributedDeduplicator:
+    """
+    Redis lease + result publication for cross-replica deduplication
+
+    - The owner holds a lease (SET NX PX) that it renews while generating, so a
+      crashed owner's lease expires after DEDUP_LEASE_TTL_MS.
+    - The result is stored under a result key and announced on a pub/sub channel.
+      An owner whose generation fails leaves a short-lived failure marker instead.
+    - Waiters listen on the channel (or poll if pub/sub is unavailable). When the
+      lease is released or expires without a result (a failed or crashed owner)
+      one of them takes it over with SET NX and retries, while the others keep
+      waiting on it, so a failure on a 429/5xx is not followed by a burst of
+      retries. They give up after DEDUP_MAX_WAIT seconds, generating locally
+      instead.
+
+    Redis errors never fail a request: the caller falls back to generating locally.
+    """
+
+    def __init__(self, redis_client: Any):
+        self.settings = get_settings()
+        self.logger = logger
+        self.client = redis_client
+        self.prefix = self.settings.DEDUP_KEY_PREFIX
+        self.lease_ttl_ms = self.settings.DEDUP_LEASE_TTL_MS
+        self.result_ttl = self.settings.DEDUP_RESULT_TTL
+        self.max_wait = self.settings.DEDUP_MAX_WAIT
+        self.poll_interval = self.settings.DEDUP_POLL_INTERVAL
+        self._counters = {
+            "owned": 0,
+            "waited": 0,
+            "shared_results": 0,
+            "lease_takeovers": 0,
+            "owner_failures": 0,
+            "wait_timeouts": 0,
+            "redis_errors": 0
+        }
+
+    def health_check(self) -> Dict[str, Any]:
+        """Health check for distributed deduplication"""
+        return {"status": "healthy", "service": "distributed_dedup"}
+
+    def _lease_key(self, key: str) -> str:
+        return f"{self.prefix}{key}:lease"
+
+    def _result_key(self, key: str) -> str:
+        return f"{self.prefix}{key}:result"
+
+    def _failed_key(self, key: str) -> str:
+        return f"{self.prefix}{key}:failed"
+
+    def _channel(self, key: str) -> str:
+        return f"{self.prefix}{key}:done"
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run fn on exactly one replica for a key and share its result with the others"""
+        token = uuid.uuid4().hex
+
+        try:
+            result = await self._get_result(key)
+            if result is not None:
+                self._counters["shared_results"] += 1
+                return result
+            acquired = await self._acquire(key, token)
+        except Exception as e:
+            self._counters["redis_errors"] += 1
+            self.logger.warning(f"Distributed dedup unavailable, generating locally: {str(e)}")
+            return await fn()
+
+        if acquired:
+            return await self._run_as_owner(key, token, fn)
+        return await self._wait_for_result(key, token, fn)
+
+    async def _acquire(self, key: str, token: str) -> bool:
+        return bool(await self.client.set(self._lease_key(key), token, nx=True, px=self.lease_ttl_ms))
+
+    async def _get_result(self, key: str) -> Optional[Dict[str, Any]]:
+        data = await self.client.get(self._result_key(key))
+        return json.loads(data) if data else None
+
+    async def _run_as_owner(
+        self,
+        key: str,
+        token: str,
+        fn: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        self._counters["owned"] += 1
+        await self._safe_redis(self.client.delete(self._failed_key(key)))
+        heartbeat = asyncio.create_task(self._renew_lease(key, token))
+        outcome = _FAILED
+        failed = False
+
+        try:
+            result = await fn()
+            await self._safe_redis(
+                self.client.set(self._result_key(key), json.dumps(result), ex=self.result_ttl)
+            )
+            outcome = _DONE
+            return result
+        except Exception:
+            # Mark the failure (not a cancellation) so waiters stop waiting on this key
+            failed = True
+            raise
+        finally:
+            # Stop renewing before releasing, so a late renew cannot race the release
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            if failed:
+                await self._safe_redis(
+                    self.client.set(self._failed_key(key), _FAILED, px=self.lease_ttl_ms)
+                )
+            await self._safe_redis(self.client.eval(_RELEASE_SCRIPT, 1, self._lease_key(key), token))
+            await self._safe_redis(self.client.publish(self._channel(key), outcome))
+
+    async def _renew_lease(self, key: str, token: str) -> None:
+        """Keep the lease alive while the owner is still generating"""
+        interval = self.lease_ttl_ms / 3000
+        while True:
+            await asyncio.sleep(interval)
+            renewed = await self._safe_redis(
+                self.client.eval(_RENEW_SCRIPT, 1, self._lease_key(key), token, self.lease_ttl_ms)
+            )
+            if renewed is None:
+                continue  # Transient Redis error: the lease may still be ours, retry next tick
+            if not renewed:
+                self.logger.warning(f"Lost dedup lease for {key[:12]} while generating")
+                return
+
+    async def _wait_for_result(
+        self,
+        key: str,
+        token: str,
+        fn: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Wait for another replica's result
+        Takes over the lease if the owner failed or its lease expired
+        """
+        self._counters["waited"] += 1
+        deadline = time.monotonic() + self.max_wait
+        pubsub = await self._subscribe(key)
+
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    result = await self._get_result(key)
+                    if result is not None:
+                        self._counters["shared_results"] += 1
+                        return result
+
+                    # Owner failed or crashed: one waiter takes over the lease and
+                    # retries, the others wait on it
+                    failed = await self.client.get(self._failed_key(key))
+                    if await self._acquire(key, token):
+                        if failed:
+                            self._counters["owner_failures"] += 1
+                            self.logger.warning(f"Shared generation {key[:12]} failed, retrying as owner")
+                        else:
+                            self._counters["lease_takeovers"] += 1
+                        break
+                except Exception as e:
+                    self._counters["redis_errors"] += 1
+                    self.logger.warning(f"Distributed dedup wait failed, generating locally: {str(e)}")
+                    return await fn()
+
+                await self._wait_for_notification(pubsub, deadline)
+            else:
+                self._counters["wait_timeouts"] += 1
+                self.logger.warning(f"Timed out waiting for shared result {key[:12]}, generating locally")
+                return await fn()
+        finally:
+            if pubsub is not None:
+                await self._safe_redis(pubsub.unsubscribe())
+                await self._safe_redis(pubsub.close())
+
+        return await self._run_as_owner(key, token, fn)
+
+    async def _subscribe(self, key: str) -> Optional[Any]:
+        """Subscribe to the completion channel; None means fall back to polling"""
+        if not hasattr(self.client, "pubsub"):
+            return None
+        try:
+            pubsub = self.client.pubsub()
+            await pubsub.subscribe(self._channel(key))
+            return pubsub
+        except Exception as e:
+            self._counters["redis_errors"] += 1
+            self.logger.debug(f"Pub/sub unavailable, polling instead: {str(e)}")
+            return None
+
+    async def _wait_for_notification(self, pubsub: Optional[Any], deadline: float) -> None:
+        timeout = max(0.0, min(self.poll_interval, deadline - time.monotonic()))
+        if pubsub is None:
+            await asyncio.sleep(timeout)
+            return
+        try:
+            await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        except Exception:
+            await asyncio.sleep(timeout)
+
+    async def _safe_redis(self, operation: Awaitable[Any]) -> Any:
+        try:
+            return await operation
+        except Exception as e:
+            self._counters["redis_errors"] += 1
+            self.logger.warning(f"Distributed dedup Redis operation failed: {str(e)}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Deduplication counters"""
+        return dict(self._counters)
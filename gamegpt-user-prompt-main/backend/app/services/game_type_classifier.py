@@ -0,0 +1,145 @@
+"""
+Game Type Classifier
+Fast local keyword/n-gram classifier that picks the most likely game types for a prompt,
+so the prompt builder only has to include the matching content templates
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from app.core.logging_config import get_logger
+from app.services.prompt_templates import GameType
+
+logger = get_logger(__name__)
+
+# Weighted cue phrases per game type (unigrams and bigrams, lowercase).
+# Explicit game names score highest; softer cues describe what the game does.
+GAME_TYPE_KEYWORDS: Dict[GameType, Dict[str, float]] = {
+    GameType.QUIZ: {
+        "quiz": 5, "trivia": 4, "questions": 3, "question": 2, "test": 2,
+        "multiple choice": 4, "true false": 4, "knowledge": 1, "assess": 1, "check": 0.5
+    },
+    GameType.DRAG_DROP: {
+        "drag drop": 5, "drag": 4, "drop": 2, "zones": 3, "zone": 3, "place": 1, "categorize": 1.5
+    },
+    GameType.MEMORY_MATCH: {
+        "memory match": 5, "memory": 4, "flip pairs": 3, "concentration": 2, "remember": 1.5, "recall": 1.5
+    },
+    GameType.WORD_PUZZLE: {
+        "word puzzle": 5, "crossword": 5, "word search": 5, "word": 2, "words": 2,
+        "vocabulary": 2, "spelling": 2, "letters": 1.5
+    },
+    GameType.SORTING: {
+        "sorting": 5, "sort": 4, "classify": 3, "categories": 2.5, "category": 1.5,
+        "group": 1.5, "organize": 1.5, "healthy unhealthy": 2
+    },
+    GameType.MATCHING: {
+        "matching": 5, "match": 3, "connect": 2.5, "pair": 1.5, "pairs": 1.5,
+        "link": 1.5, "triggers": 1, "coping strategies": 1
+    },
+    GameType.STORY_SEQUENCE: {
+        "story sequence": 5, "sequence": 4, "story": 3, "order": 2.5, "steps": 2.5,
+        "step": 1.5, "process": 1.5, "timeline": 3, "narrative": 2, "routine": 1.5
+    },
+    GameType.FILL_BLANK: {
+        "fill blank": 5, "fill blanks": 5, "fill": 3, "blank": 4, "blanks": 4,
+        "complete sentences": 3, "cloze": 4, "sentence": 1.5, "sentences": 1.5
+    },
+    GameType.CARD_FLIP: {
+        "card flip": 5, "flashcards": 5, "flashcard": 5, "flash cards": 5, "cards": 2.5,
+        "card": 2, "flip": 2.5, "definitions": 1.5, "terms": 1.5
+    },
+    GameType.PUZZLE_ASSEMBLY: {
+        "puzzle assembly": 5, "jigsaw": 5, "assemble": 3, "pieces": 3, "puzzle": 2,
+        "picture": 1.5, "image": 1, "visual": 1.5
+    },
+    GameType.ANXIETY_ADVENTURE: {
+        "anxiety adventure": 5, "adventure": 4, "scenario": 3, "scenarios": 3, "choose": 2,
+        "choices": 2, "situation": 1.5, "situations": 1.5, "role play": 3, "panic": 1.5,
+        "anxiety": 1.5, "anxious": 1.5, "social anxiety": 2
+    }
+}
+
+# Cue phrases per GameSchema.category, used to route requests to pre-generated games
+CATEGORY_KEYWORDS: Dict[str, Dict[str, float]] = {
+    "stress-reduction": {"stress": 3, "stressed": 3, "stress management": 4, "stressful": 2, "relax": 1.5, "relaxation": 2},
+    "anxiety-management": {"anxiety": 3, "anxious": 3, "worry": 2, "worries": 2, "panic": 2, "nervous": 1.5, "fear": 1.5},
+    "mindfulness": {"mindfulness": 4, "mindful": 3, "meditation": 3, "breathing": 2, "present moment": 3, "grounding": 2},
+    "depression-support": {"depression": 4, "depressed": 3, "sadness": 2, "sad": 1.5, "low mood": 3, "hopeless": 2},
+    "coping-skills": {"coping": 4, "cope": 3, "coping strategies": 4, "resilience": 2, "overwhelm": 1.5},
+    "emotional-intelligence": {"emotions": 3, "emotion": 3, "feelings": 3, "feeling": 2, "empathy": 3, "emotional": 2},
+    "self-care": {"self care": 4, "selfcare": 4, "sleep": 2, "hygiene": 2, "healthy habits": 3, "routine": 1},
+    "cognitive-behavioral": {"cbt": 4, "cognitive": 3, "thoughts": 2, "negative thoughts": 3, "thinking traps": 3, "reframe": 2, "reframing": 2},
+    "interpersonal-skills": {"friends": 2, "friendship": 3, "social skills": 4, "communication": 3, "relationships": 3, "conflict": 2, "bullying": 2},
+    "mental-wellness": {"mental health": 3, "wellness": 3, "wellbeing": 3, "well being": 3, "mental wellness": 4}
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _ngrams(text: str) -> List[str]:
+    tokens = _TOKEN_PATTERN.findall(text.lower().replace("-", " "))
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def classify_category(text: str) -> Optional[str]:
+    """Most likely GameSchema.category for a piece of text, or None without a clear signal"""
+    scores: Dict[str, float] = {}
+    for ngram in _ngrams(text):
+        for category, cues in CATEGORY_KEYWORDS.items():
+            if ngram in cues:
+                scores[category] = scores.get(category, 0.0) + cues[ngram]
+    if not scores:
+        return None
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    # Ambiguous between two categories: better no answer than a wrong one
+    if len(ranked) > 1 and ranked[1][1] == ranked[0][1]:
+        return None
+    return ranked[0][0]
+
+
+class GameTypeClassifier:
+    """Scores prompts against per-type keyword cues and returns the top candidates"""
+
+    def __init__(self, max_types: int = 3, relative_threshold: float = 0.5, min_score: float = 3.0):
+        self.logger = logger
+        self.max_types = max_types
+        self.relative_threshold = relative_threshold
+        # Top score needed to prune at all: an explicit game name or several softer cues,
+        # not one incidental word such as "check" or "anxiety"
+        self.min_score = min_score
+
+        # Flatten the cue table into one n-gram -> [(type, weight)] lookup
+        self._cues: Dict[str, List[Tuple[GameType, float]]] = {}
+        for game_type, cues in GAME_TYPE_KEYWORDS.items():
+            for phrase, weight in cues.items():
+                self._cues.setdefault(phrase, []).append((game_type, weight))
+
+    def score(self, text: str) -> Dict[GameType, float]:
+        """Score every game type for a piece of text"""
+        scores: Dict[GameType, float] = {}
+        for ngram in _ngrams(text):
+            for game_type, weight in self._cues.get(ngram, ()):
+                scores[game_type] = scores.get(game_type, 0.0) + weight
+        return scores
+
+    def classify(self, text: str) -> List[GameType]:
+        """
+        Return the one to three most likely game types, best first
+        An empty list means the prompt carries no usable signal (no cue, or only weak ones)
+        """
+        scores = self.score(text)
+        if not scores:
+            return []
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        top_score = ranked[0][1]
+        if top_score < self.min_score:
+            self.logger.debug(f"No game type scored {self.min_score} or more (scores: { {t.value: v for t, v in ranked} })")
+            return []
+        selected = [
+            game_type for game_type, value in ranked[:self.max_types]
+            if value >= top_score * self.relative_threshold
+        ]
+        self.logger.debug(f"Classified prompt as {[t.value for t in selected]} (scores: { {t.value: v for t, v in ranked} })")
+        return selected
@@ -0,0 +1,297 @@
+"""
+Generation Cache Service
+Two-tier cache in front of the Gemini generation pipeline:
+an in-process LRU/TTL tier and an optional shared Redis tier
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple, Set
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.models.game_schemas import GameGenerationRequest
+from app.services.prompt_templates import PromptTemplates
+
+logger = get_logger(__name__)
+
+# Lookup states returned by GenerationCache.get
+CACHE_FRESH = "fresh"
+CACHE_STALE = "stale"
+CACHE_MISS = "miss"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a user prompt so trivially different spellings share a cache entry"""
+    return re.sub(r"\s+", " ", prompt).strip().lower()
+
+
+@dataclass
+class CacheEntry:
+    """A cached game payload with its freshness window (wall-clock seconds)"""
+    value: Dict[str, Any]
+    fresh_until: float
+    stale_until: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.fresh_until
+
+    def is_expired(self, now: float) -> bool:
+        return now >= self.stale_until
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "value": self.value,
+            "fresh_until": self.fresh_until,
+            "stale_until": self.stale_until
+        })
+
+    @classmethod
+    def from_json(cls, data: str) -> "CacheEntry":
+        payload = json.loads(data)
+        return cls(
+            value=payload["value"],
+            fresh_until=payload["fresh_until"],
+            stale_until=payload["stale_until"]
+        )
+
+
+class MemoryCacheTier:
+    """In-process LRU cache tier with per-entry TTL"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, now: float) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.is_expired(now):
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def newest_first(self):
+        """Iterate entries from most to least recently used, including stale ones"""
+        return reversed(list(self._entries.values()))
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+class RedisCacheTier:
+    """
+    Shared cache tier backed by Redis
+    Any Redis failure is logged and treated as a miss - the cache must never fail a request
+    """
+
+    def __init__(self, client: Any, prefix: str):
+        self.client = client
+        self.prefix = prefix
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        try:
+            data = await self.client.get(self.prefix + key)
+            return CacheEntry.from_json(data) if data else None
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis cache read failed: {str(e)}")
+            return None
+
+    async def set(self, key: str, entry: CacheEntry, now: float) -> None:
+        ttl = max(1, int(entry.stale_until - now))
+        try:
+            await self.client.set(self.prefix + key, entry.to_json(), ex=ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis cache write failed: {str(e)}")
+
+
+class GenerationCache:
+    """
+    Two-tier generation cache with stale-while-revalidate
+
+    Entries are fresh for CACHE_TTL seconds, then served stale (while a background
+    refresh runs) until CACHE_STALE_TTL, after which they are dropped.
+    """
+
+    def __init__(self, redis_client: Optional[Any] = None, clock: Callable[[], float] = time.time):
+        self.settings = get_settings()
+        self.logger = logger
+        self.clock = clock
+        self.enabled = self.settings.CACHE_ENABLED
+        self.ttl = self.settings.CACHE_TTL
+        self.stale_ttl = max(self.settings.CACHE_STALE_TTL, self.ttl)
+        self.memory = MemoryCacheTier(self.settings.CACHE_MAX_ENTRIES)
+        self.redis = RedisCacheTier(redis_client, self.settings.CACHE_KEY_PREFIX) if redis_client else None
+
+        self._refreshing: Set[str] = set()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self._counters = {
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "refreshes": 0,
+            "refresh_failures": 0
+        }
+
+    def health_check(self) -> Dict[str, Any]:
+        """Health check for generation cache"""
+        return {
+            "status": "healthy",
+            "service": "generation_cache",
+            "enabled": self.enabled,
+            "redis": self.redis is not None
+        }
+
+    def build_key(self, request: GameGenerationRequest) -> str:
+        """
+        Build the cache key for a generation request
+        Combines the normalized prompt, structured parameters, model settings
+        and the template fingerprint
+        """
+        key_material = {
+            "prompt": normalize_prompt(request.prompt),
+            "parameters": request.structured_parameters(),
+            "model": self.settings.GOOGLE_MODEL,
+            "temperature": self.settings.TEMPERATURE,
+            "templates": PromptTemplates.fingerprint()
+        }
+        raw = json.dumps(key_material, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Look up a key in both tiers, returning (value, state)"""
+        now = self.clock()
+
+        entry = self.memory.get(key, now)
+        if entry is not None:
+            self._counters["memory_hits"] += 1
+        elif self.redis is not None:
+            entry = await self.redis.get(key)
+            if entry is not None and not entry.is_expired(now):
+                self._counters["redis_hits"] += 1
+                self.memory.set(key, entry)
+            else:
+                entry = None
+
+        if entry is None:
+            self._counters["misses"] += 1
+            return None, CACHE_MISS
+
+        if entry.is_fresh(now):
+            return entry.value, CACHE_FRESH
+
+        self._counters["stale_hits"] += 1
+        return entry.value, CACHE_STALE
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a value in both tiers"""
+        now = self.clock()
+        entry = CacheEntry(value=value, fresh_until=now + self.ttl, stale_until=now + self.stale_ttl)
+        self.memory.set(key, entry)
+        if self.redis is not None:
+            await self.redis.set(key, entry, now)
+        self._counters["sets"] += 1
+
+    async def get_or_generate(
+        self,
+        key: str,
+        generate: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Return a cached value, generating it on a miss
+        Stale values are returned immediately and refreshed in the background
+        """
+        value, state = await self.get(key)
+
+        if state == CACHE_FRESH:
+            return value
+
+        if state == CACHE_STALE:
+            self._schedule_refresh(key, generate)
+            return value
+
+        value = await generate()
+        await self.set(key, value)
+        return value
+
+    def find_fallback(self, game_types: List[str], difficulty: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Most recent in-process game of one of the given types (any type if empty)
+        and difficulty, for serving while generation is unavailable
+        """
+        for entry in self.memory.newest_first():
+            game = entry.value
+            if game_types and game.get("type") not in game_types:
+                continue
+            if difficulty and game.get("difficulty") != difficulty:
+                continue
+            return game
+        return None
+
+    def _schedule_refresh(self, key: str, generate: Callable[[], Awaitable[Dict[str, Any]]]) -> None:
+        """Start a background revalidation for a stale key (at most one per key)"""
+        if key in self._refreshing:
+            return
+
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, generate))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(self, key: str, generate: Callable[[], Awaitable[Dict[str, Any]]]) -> None:
+        try:
+            value = await generate()
+            await self.set(key, value)
+            self._counters["refreshes"] += 1
+        except Exception as e:
+            self._counters["refresh_failures"] += 1
+            self.logger.warning(f"Background cache refresh failed: {str(e)}")
+        finally:
+            self._refreshing.discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for sizing and monitoring"""
+        hits = self._counters["memory_hits"] + self._counters["redis_hits"]
+        lookups = hits + self._counters["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.memory),
+            "max_entries": self.memory.max_entries,
+            "hits": hits,
+            **self._counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.memory.evictions,
+            "expirations": self.memory.expirations,
+            "redis_errors": self.redis.errors if self.redis else 0
+        }
+
+    async def close(self) -> None:
+        """Cancel any in-flight background refreshes"""
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        if self._refresh_tasks:
+            await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
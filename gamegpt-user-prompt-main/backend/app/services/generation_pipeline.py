@@ -0,0 +1,197 @@
+"""
+Generation Pipeline Service
+Runs the full n8n-equivalent workflow: PromptBuilder -> LLMService -> ResponseProcessor
+Sits behind the generation cache so repeated prompts skip the Gemini round trip
+(and, with the semantic cache, so do near-duplicate prompts), and coalesces concurrent identical requests onto a single upstream call,
+both within this process and (with Redis) across replicas
+"""
+
+from typing import Dict, Any, Optional
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.core.tracing import span
+from app.core.exceptions import handle_service_error, handle_external_service_error, CircuitOpenException
+from app.models.game_schemas import GameGenerationRequest, GameSchema
+from app.services.prompt_builder import PromptBuilder
+from app.services.llm_service import LLMService
+from app.services.response_processor import ResponseProcessor
+from app.services.generation_cache import GenerationCache
+from app.services.semantic_cache import SemanticCache
+from app.services.single_flight import SingleFlight
+from app.services.distributed_dedup import DistributedDeduplicator
+from app.services.stream_generator import StreamingGenerator
+from app.services.hedging import CandidateRejected
+
+logger = get_logger(__name__)
+
+
+class GenerationPipeline:
+    """Orchestrates game generation across the prompt, LLM and processing services"""
+
+    def __init__(
+        self,
+        prompt_builder: PromptBuilder,
+        llm_service: LLMService,
+        response_processor: ResponseProcessor,
+        generation_cache: GenerationCache,
+        single_flight: SingleFlight,
+        distributed_dedup: Optional[DistributedDeduplicator] = None,
+        stream_generator: Optional[StreamingGenerator] = None,
+        semantic_cache: Optional[SemanticCache] = None
+    ):
+        self.settings = get_settings()
+        self.logger = logger
+        self.prompt_builder = prompt_builder
+        self.llm_service = llm_service
+        self.response_processor = response_processor
+        self.generation_cache = generation_cache
+        self.single_flight = single_flight
+        self.distributed_dedup = distributed_dedup
+        self.stream_generator = stream_generator
+        self.semantic_cache = semantic_cache
+        # Set by the ServiceContainer; the warm pool refills through run()
+        self.warm_pool = None
+        self.metrics = get_metrics()
+        self._counters = {
+            "circuit_open_fallbacks": 0,
+            "circuit_open_failures": 0
+        }
+
+    def health_check(self) -> Dict[str, Any]:
+        """Health check for generation pipeline"""
+        return {"status": "healthy", "service": "generation_pipeline"}
+
+    async def generate(self, request: GameGenerationRequest, client_id: Optional[str] = None) -> GameSchema:
+        """
+        Generate a game, serving it from the warm pool or the generation cache when possible
+        Each caller gets its own GameSchema instance, even when the call was shared;
+        pooled games are only handed out when the client is known (client_id)
+        """
+        with self.metrics.time("generate"), span("generate"):
+            return await self._generate(request, client_id)
+
+    async def _generate(self, request: GameGenerationRequest, client_id: Optional[str]) -> GameSchema:
+        if self.warm_pool is not None and client_id is not None:
+            pooled = self.warm_pool.take(request, client_id)
+            if pooled is not None:
+                return GameSchema(**pooled)
+
+        key = self.generation_cache.build_key(request)
+
+        try:
+            if not self.generation_cache.enabled:
+                game_data = await self._run_similar(key, request)
+            else:
+                game_data = await self.generation_cache.get_or_generate(
+                    key,
+                    lambda: self._run_similar(key, request)
+                )
+        except CircuitOpenException as e:
+            game_data = self.find_fallback(request)
+            if game_data is None:
+                self._counters["circuit_open_failures"] += 1
+                raise handle_external_service_error(e, "gemini", e.status_code)
+            self._counters["circuit_open_fallbacks"] += 1
+            self.logger.warning(f"Gemini circuit open; serving stored game {game_data.get('id')} instead")
+        return GameSchema(**game_data)
+
+    def find_fallback(self, request: GameGenerationRequest) -> Optional[Dict[str, Any]]:
+        """A stored game matching the request's game type(s) and difficulty, if any"""
+        if not self.settings.BREAKER_FALLBACK_ENABLED:
+            return None
+        game_types, _ = self.prompt_builder.select_game_types(request)
+        return self.generation_cache.find_fallback(
+            [game_type.value for game_type in game_types],
+            request.difficulty
+        )
+
+    async def _run_similar(self, key: str, request: GameGenerationRequest) -> Dict[str, Any]:
+        """Reuse the game of a near-duplicate prompt, or generate and index a new one"""
+        if self.semantic_cache is None or not self.semantic_cache.enabled:
+            return await self._run_shared(key, request)
+
+        # Excluding this exact key lets a stale exact-cache entry actually be regenerated
+        match = self.semantic_cache.lookup(request, exclude_key=key)
+        if match is not None:
+            return match[0]
+        game_data = await self._run_shared(key, request)
+        self.semantic_cache.add(request, key, game_data)
+        return game_data
+
+    async def _run_shared(self, key: str, request: GameGenerationRequest) -> Dict[str, Any]:
+        """Run the pipeline once for all concurrent identical requests"""
+        if not self.settings.SINGLE_FLIGHT_ENABLED:
+            return await self._run_deduplicated(key, request)
+        return await self.single_flight.do(key, lambda: self._run_deduplicated(key, request))
+
+    async def _run_deduplicated(self, key: str, request: GameGenerationRequest) -> Dict[str, Any]:
+        """Run the pipeline on only one replica when cross-replica dedup is available"""
+        if self.distributed_dedup is None:
+            return await self._run_to_dict(request)
+        return await self.distributed_dedup.run(key, lambda: self._run_to_dict(request))
+
+    async def _run_to_dict(self, request: GameGenerationRequest) -> Dict[str, Any]:
+        game_schema = await self.run(request)
+        return game_schema.dict()
+
+    async def run(self, request: GameGenerationRequest) -> GameSchema:
+        """
+        Run the uncached pipeline
+        Stage failures are mapped to structured HTTP errors
+        """
+        # Step 1: Build the full therapeutic prompt (equivalent to Edit Fields node)
+        self.logger.info("Building therapeutic prompt...")
+        try:
+            with self.metrics.time("build_full_prompt"), span("build_full_prompt"):
+                prompt_result = self.prompt_builder.build_prompt(request)
+            full_prompt = prompt_result.prompt
+        except Exception as e:
+            raise handle_service_error(e, "prompt_builder", "build_full_prompt")
+
+        # Step 2: Process through LLM (equivalent to Basic LLM Chain node)
+        self.logger.info("Processing through LLM...")
+        if self.stream_generator is not None and self.settings.STREAM_VALIDATION_FOR_GENERATE:
+            try:
+                # Validated stream: aborts and retries clearly invalid output early
+                with self.metrics.time("generate_response"), span("generate_response"):
+                    raw_response = await self.stream_generator.generate_text(
+                        full_prompt, request, game_types=prompt_result.game_types
+                    )
+            except CircuitOpenException:
+                # Handled in generate(), which can fall back to a stored game
+                raise
+            except Exception as e:
+                raise handle_external_service_error(e, "gemini", getattr(e, 'status_code', None))
+
+            try:
+                return self._process_response(raw_response)
+            except Exception as e:
+                raise handle_service_error(e, "response_processor", "process_response")
+
+        # Steps 2 and 3 together, so a hedged call is only accepted once its response validates
+        try:
+            return await self.llm_service.generate_validated(
+                full_prompt,
+                self._process_response,
+                prompt_result.game_types
+            )
+        except CandidateRejected as e:
+            raise handle_service_error(e.error, "response_processor", "process_response")
+        except CircuitOpenException:
+            raise
+        except Exception as e:
+            raise handle_external_service_error(e, "gemini", getattr(e, 'status_code', None))
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests answered while the Gemini circuit breaker was open"""
+        return dict(self._counters)
+
+    def _process_response(self, raw_response: str) -> GameSchema:
+        # Step 3: Clean and parse response (equivalent to Code node)
+        self.logger.info("Processing LLM response...")
+        with self.metrics.time("process_response"), span("process_response"):
+            return self.response_processor.process_response(
+                raw_response, structured=self.llm_service.structured_output
+            )
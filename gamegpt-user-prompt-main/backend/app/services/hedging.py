@@ -0,0 +1,156 @@
+"""
+Request Hedging for Gemini calls
+When a call is slower than a fixed delay (or the observed latency percentile), a second
+request is raced against it; the first response that passes validation wins and the
+other is cancelled. Hedges are rate-capped with a token bucket.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.services.retry import RetryBudget
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class CandidateRejected(Exception):
+    """A response arrived but failed validation; wraps the validation error"""
+
+    def __init__(self, error: Exception):
+        self.error = error
+        super().__init__(str(error))
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies (seconds)"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+
+
+class HedgePolicy:
+    """Decides when to hedge and races the candidates"""
+
+    MIN_SAMPLES = 20
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.settings = get_settings()
+        self.logger = logger
+        self.latencies = LatencyTracker()
+        # Hedges per request, with the same bucket mechanics as the retry budget
+        self.budget = RetryBudget(
+            ratio=self.settings.HEDGE_MAX_RATE,
+            min_per_second=0.0,
+            max_tokens=max(1.0, self.settings.HEDGE_MAX_RATE * 10),
+            clock=clock
+        )
+        self._clock = clock
+        self._counters = {
+            "requests": 0,
+            "hedges_fired": 0,
+            "hedges_won": 0,
+            "primary_won_after_hedge": 0,
+            "hedges_rate_limited": 0,
+            "losers_cancelled": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.HEDGE_ENABLED
+
+    def delay(self) -> float:
+        """Fixed HEDGE_DELAY, or the observed latency percentile once enough calls were seen"""
+        if self.settings.HEDGE_DELAY > 0:
+            return self.settings.HEDGE_DELAY
+        observed = self.latencies.percentile(self.settings.HEDGE_PERCENTILE)
+        if observed is None or len(self.latencies) < self.MIN_SAMPLES:
+            return self.settings.HEDGE_MIN_DELAY
+        return max(self.settings.HEDGE_MIN_DELAY, observed)
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[], Awaitable[T]]
+    ) -> T:
+        """
+        Race primary against a delayed hedge
+        Each callable must raise on failure (including failed validation); the first
+        candidate to return a value wins
+        """
+        self._counters["requests"] += 1
+        self.budget.record_request()
+        tasks: Dict[asyncio.Task, str] = {asyncio.create_task(self._timed(primary)): "primary"}
+
+        try:
+            delay = self.delay()
+            done, _ = await asyncio.wait(set(tasks), timeout=delay)
+            if done:
+                return next(iter(done)).result()
+
+            if not self.budget.try_acquire():
+                self._counters["hedges_rate_limited"] += 1
+                return await next(iter(tasks))
+
+            self._counters["hedges_fired"] += 1
+            self.logger.info(f"Primary Gemini call still running after {delay:.2f}s; firing hedge")
+            tasks[asyncio.create_task(self._timed(hedge))] = "hedge"
+
+            errors: List[BaseException] = []
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        continue
+                    if tasks[task] == "hedge":
+                        self._counters["hedges_won"] += 1
+                    else:
+                        self._counters["primary_won_after_hedge"] += 1
+                    self._counters["losers_cancelled"] += len(pending)
+                    return task.result()
+
+            # Both failed: prefer a validation failure (a response did arrive) over a transport error
+            rejected = [error for error in errors if isinstance(error, CandidateRejected)]
+            raise (rejected or errors)[0]
+
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _timed(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        started = self._clock()
+        result = await fn()
+        self.latencies.record(self._clock() - started)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self._counters["requests"]
+        return {
+            "enabled": self.enabled,
+            **self._counters,
+            "hedge_rate": round(self._counters["hedges_fired"] / requests, 4) if requests else 0.0,
+            "current_delay_s": round(self.delay(), 3),
+            "latency_samples": len(self.latencies)
+        }
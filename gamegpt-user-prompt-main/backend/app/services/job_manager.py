@@ -0,0 +1,287 @@
+"""
+Job Manager for asynchronous generation
+POST /jobs enqueues a generation and returns at once; a fixed pool of background
+workers runs queued jobs through the generation pipeline, records the outcome in
+the job store and notifies the job's callback URL
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.exceptions import ErrorCode, ErrorDetail, create_error_response, error_detail_for
+from app.models.game_schemas import GameGenerationRequest, JobCallbackStatus, JobResponse
+from app.services.generation_pipeline import GenerationPipeline
+from app.services.hedging import LatencyTracker
+from app.services.job_store import Job, JobStore, JOB_FAILED, JOB_RUNNING, JOB_SUCCEEDED
+
+logger = get_logger(__name__)
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+class JobManager:
+    """Bounded job queue, worker pool, webhook delivery and TTL cleanup"""
+
+    def __init__(
+        self,
+        pipeline: GenerationPipeline,
+        store: JobStore,
+        webhook_client: Optional[httpx.AsyncClient] = None
+    ):
+        self.settings = get_settings()
+        self.logger = logger
+        self.pipeline = pipeline
+        self.store = store
+        # Callback hosts are arbitrary, so they do not share the Gemini connection pool
+        self.webhook_client = webhook_client or httpx.AsyncClient(timeout=self.settings.JOB_WEBHOOK_TIMEOUT)
+
+        self.workers = max(1, self.settings.JOB_WORKERS)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, self.settings.JOB_QUEUE_SIZE))
+        self._worker_tasks: List[asyncio.Task] = []
+        self._cleanup_task: Optional[asyncio.Task] = None
+        self._webhook_tasks: Set[asyncio.Task] = set()
+        self._busy = 0
+        self.queue_wait = LatencyTracker(window=500)
+        self.run_time = LatencyTracker(window=500)
+        self._counters = {
+            "submitted": 0,
+            "rejected_queue_full": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "callbacks_delivered": 0,
+            "callbacks_failed": 0,
+            "expired_removed": 0
+        }
+
+    def health_check(self) -> Dict[str, Any]:
+        """Health check for the job workers"""
+        running = sum(1 for task in self._worker_tasks if not task.done())
+        return {
+            "status": "healthy" if running == self.workers else "degraded",
+            "service": "job_manager",
+            "store": self.store.name,
+            "workers_running": running
+        }
+
+    async def start(self) -> None:
+        """Start the worker pool and the cleanup loop"""
+        if self._worker_tasks:
+            return
+        self._worker_tasks = [asyncio.create_task(self._worker(number)) for number in range(self.workers)]
+        self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+        self.logger.info(
+            f"Job manager started: {self.workers} workers, queue size {self._queue.maxsize}, store {self.store.name}"
+        )
+
+    async def stop(self) -> None:
+        """Stop workers, fail jobs that can no longer run here, and close the store"""
+        tasks = [*self._worker_tasks, *self._webhook_tasks]
+        if self._cleanup_task is not None:
+            tasks.append(self._cleanup_task)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._cleanup_task = None
+
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            await self._fail_unrunnable(job, "Server shut down before the job started")
+        await self.webhook_client.aclose()
+        await self.store.close()
+
+    async def submit(
+        self,
+        request: GameGenerationRequest,
+        callback_url: Optional[str] = None,
+        client_id: Optional[str] = None
+    ) -> Job:
+        """Queue a generation; raises a 503 JOB_QUEUE_FULL error when the queue is at capacity"""
+        if self._queue.full():
+            self._counters["rejected_queue_full"] += 1
+            raise self._queue_full_error()
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            request=request.dict(exclude_none=True),
+            client_id=client_id,
+            callback_url=callback_url,
+            callback_status="pending" if callback_url else None
+        )
+        await self.store.save(job)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # Filled up while the job was being saved
+            self._counters["rejected_queue_full"] += 1
+            await self._fail_unrunnable(job, "Job queue is full")
+            raise self._queue_full_error()
+
+        self._counters["submitted"] += 1
+        self.logger.info(f"Queued job {job.id} ({self._queue.qsize()}/{self._queue.maxsize} queued)")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await self.store.get(job_id)
+
+    def view(self, job: Job) -> JobResponse:
+        """API representation of a job; also the webhook body"""
+        return JobResponse(
+            id=job.id,
+            status=job.status,
+            createdAt=_isoformat(job.created_at),
+            startedAt=_isoformat(job.started_at),
+            finishedAt=_isoformat(job.finished_at),
+            queueWaitMs=job.queue_wait_ms,
+            runMs=job.run_ms,
+            result=job.result,
+            error=job.error,
+            statusCode=job.status_code,
+            callback=(
+                JobCallbackStatus(url=job.callback_url, status=job.callback_status, attempts=job.callback_attempts)
+                if job.callback_url else None
+            )
+        )
+
+    def _queue_full_error(self):
+        return create_error_response(
+            error_code=ErrorCode.JOB_QUEUE_FULL,
+            message="Too many queued generation jobs; retry later",
+            details={"queue_size": self._queue.maxsize},
+            status_code=503
+        )
+
+    async def _fail_unrunnable(self, job: Job, reason: str) -> None:
+        job.status = JOB_FAILED
+        job.finished_at = time.time()
+        job.error = ErrorDetail(code=ErrorCode.SERVICE_UNAVAILABLE.value, message=reason).dict()
+        job.status_code = 503
+        try:
+            await self.store.save(job)
+        except Exception as e:
+            self.logger.error(f"Failed to record job {job.id} as failed: {str(e)}")
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            job = await self._queue.get()
+            self._busy += 1
+            try:
+                await self._run_job(job)
+            except asyncio.CancelledError:
+                await self._fail_unrunnable(job, "Server shut down while the job was running")
+                raise
+            except Exception as e:
+                # Store failures must not kill the worker
+                self.logger.error(f"Job worker {number} failed on job {job.id}: {str(e)}")
+            finally:
+                self._busy -= 1
+                self._queue.task_done()
+
+    async def _run_job(self, job: Job) -> None:
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        self.queue_wait.record(job.started_at - job.created_at)
+        await self.store.save(job)
+
+        try:
+            game_schema = await self.pipeline.generate(
+                GameGenerationRequest(**job.request), client_id=job.client_id
+            )
+        except Exception as e:
+            job.status = JOB_FAILED
+            job.error, job.status_code = error_detail_for(e)
+            self._counters["failed"] += 1
+            self.logger.warning(f"Job {job.id} failed: {job.error['code']}")
+        else:
+            job.status = JOB_SUCCEEDED
+            job.result = game_schema.dict()
+            job.status_code = 200
+            self._counters["succeeded"] += 1
+            self.logger.info(f"Job {job.id} succeeded with game {game_schema.id}")
+        job.finished_at = time.time()
+        self.run_time.record(job.finished_at - job.started_at)
+        await self.store.save(job)
+
+        if job.callback_url:
+            # Delivery (with retries) must not hold up the next queued job
+            task = asyncio.create_task(self._deliver_callback(job))
+            self._webhook_tasks.add(task)
+            task.add_done_callback(self._webhook_tasks.discard)
+
+    async def _deliver_callback(self, job: Job) -> None:
+        attempts = max(1, self.settings.JOB_WEBHOOK_MAX_ATTEMPTS)
+        for attempt in range(1, attempts + 1):
+            job.callback_attempts = attempt
+            body = self.view(job).dict()
+            try:
+                response = await self.webhook_client.post(job.callback_url, json=body)
+                if response.status_code < 300:
+                    job.callback_status = "delivered"
+                    self._counters["callbacks_delivered"] += 1
+                    break
+                error = f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+            self.logger.warning(f"Callback for job {job.id} failed (attempt {attempt}/{attempts}): {error}")
+            if attempt < attempts:
+                await asyncio.sleep(min(30.0, 2.0 ** (attempt - 1)))
+        else:
+            job.callback_status = "failed"
+            self._counters["callbacks_failed"] += 1
+
+        try:
+            await self.store.save(job)
+        except Exception as e:
+            self.logger.error(f"Failed to record callback status for job {job.id}: {str(e)}")
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.JOB_CLEANUP_INTERVAL)
+            try:
+                await self.cleanup()
+            except Exception as e:
+                self.logger.error(f"Job cleanup failed: {str(e)}")
+
+    async def cleanup(self) -> int:
+        """Remove finished jobs past JOB_TTL and abandoned jobs past JOB_UNFINISHED_TTL"""
+        now = time.time()
+        removed = await self.store.delete_expired(
+            finished_before=now - self.settings.JOB_TTL,
+            unfinished_before=now - self.settings.JOB_UNFINISHED_TTL
+        )
+        if removed:
+            self._counters["expired_removed"] += removed
+            self.logger.info(f"Removed {removed} expired jobs")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, worker utilization and queue-wait vs run-time latency"""
+        def latency(tracker: LatencyTracker) -> Dict[str, Optional[float]]:
+            return {
+                f"p{int(fraction * 100)}_ms": (
+                    round(tracker.percentile(fraction) * 1000, 1) if len(tracker) else None
+                )
+                for fraction in (0.5, 0.95, 0.99)
+            }
+
+        return {
+            "store": self.store.name,
+            "workers": self.workers,
+            "busy_workers": self._busy,
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "pending_callbacks": len(self._webhook_tasks),
+            **self._counters,
+            "queue_wait": latency(self.queue_wait),
+            "run_time": latency(self.run_time)
+        }
@@ -0,0 +1,224 @@
+"""
+Job Store for asynchronous generation jobs
+Pluggable persistence behind the job API: in-process memory, a local SQLite file,
+or Redis (shared between replicas)
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+FINISHED_STATES = {JOB_SUCCEEDED, JOB_FAILED}
+
+
+@dataclass
+class Job:
+    """A generation job and its outcome (wall-clock timestamps in seconds)"""
+    id: str
+    request: Dict[str, Any]
+    client_id: Optional[str] = None
+    callback_url: Optional[str] = None
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[Dict[str, Any]] = None
+    status_code: Optional[int] = None
+    callback_status: Optional[str] = None
+    callback_attempts: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def queue_wait_ms(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return round((self.started_at - self.created_at) * 1000, 1)
+
+    @property
+    def run_ms(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at) * 1000, 1)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, data: str) -> "Job":
+        return cls(**json.loads(data))
+
+
+class JobStore(ABC):
+    """Persistence interface for jobs; implementations must be safe to call from the event loop"""
+
+    name = "abstract"
+
+    @abstractmethod
+    async def save(self, job: Job) -> None:
+        """Insert or replace a job"""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Job]:
+        """A job by id, or None if unknown or expired"""
+
+    @abstractmethod
+    async def delete_expired(self, finished_before: float, unfinished_before: float) -> int:
+        """
+        Drop jobs that finished before finished_before, and jobs created before
+        unfinished_before that never finished (abandoned by a crashed worker);
+        returns how many were removed
+        """
+
+    async def close(self) -> None:
+        """Release any resources held by the store"""
+
+
+class MemoryJobStore(JobStore):
+    """Jobs held in this process only; lost on restart and not visible to other replicas"""
+
+    name = "memory"
+
+    def __init__(self):
+        # Stored serialized so callers never share mutable state with the store
+        self._jobs: Dict[str, Tuple[float, Optional[float], str]] = {}
+
+    async def save(self, job: Job) -> None:
+        self._jobs[job.id] = (job.created_at, job.finished_at if job.finished else None, job.to_json())
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        stored = self._jobs.get(job_id)
+        return Job.from_json(stored[2]) if stored else None
+
+    async def delete_expired(self, finished_before: float, unfinished_before: float) -> int:
+        expired = [
+            job_id for job_id, (created_at, finished_at, _) in self._jobs.items()
+            if (finished_at < finished_before if finished_at is not None else created_at < unfinished_before)
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Jobs in a local SQLite file; survive restarts of a single instance
+    sqlite3 calls are blocking, so they run in a worker thread behind a lock
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " finished_at REAL,"
+            " data TEXT NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)")
+        self._connection.commit()
+        self._lock = asyncio.Lock()
+
+    async def _run(self, fn, *args):
+        async with self._lock:
+            return await asyncio.to_thread(fn, *args)
+
+    def _save(self, job: Job) -> None:
+        self._connection.execute(
+            "INSERT OR REPLACE INTO jobs (id, created_at, finished_at, data) VALUES (?, ?, ?, ?)",
+            (job.id, job.created_at, job.finished_at if job.finished else None, job.to_json())
+        )
+        self._connection.commit()
+
+    def _get(self, job_id: str) -> Optional[Job]:
+        row = self._connection.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_json(row[0]) if row else None
+
+    def _delete_expired(self, finished_before: float, unfinished_before: float) -> int:
+        cursor = self._connection.execute(
+            "DELETE FROM jobs WHERE finished_at < ? OR (finished_at IS NULL AND created_at < ?)",
+            (finished_before, unfinished_before)
+        )
+        self._connection.commit()
+        return cursor.rowcount
+
+    async def save(self, job: Job) -> None:
+        await self._run(self._save, job)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await self._run(self._get, job_id)
+
+    async def delete_expired(self, finished_before: float, unfinished_before: float) -> int:
+        return await self._run(self._delete_expired, finished_before, unfinished_before)
+
+    async def close(self) -> None:
+        await self._run(self._connection.close)
+
+
+class RedisJobStore(JobStore):
+    """
+    Jobs in Redis, readable from every replica
+    Finished jobs get a Redis TTL, so expiry needs no sweep; unfinished jobs
+    carry a generous TTL in case the replica running them dies
+    """
+
+    name = "redis"
+
+    def __init__(self, client: Any, prefix: str, ttl: int, unfinished_ttl: int):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.unfinished_ttl = unfinished_ttl
+
+    async def save(self, job: Job) -> None:
+        ttl = self.ttl if job.finished else self.unfinished_ttl
+        await self.client.set(self.prefix + job.id, job.to_json(), ex=max(1, ttl))
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        data = await self.client.get(self.prefix + job_id)
+        return Job.from_json(data) if data else None
+
+    async def delete_expired(self, finished_before: float, unfinished_before: float) -> int:
+        # Redis expires keys itself
+        return 0
+
+
+def create_job_store(backend: str, redis_client: Optional[Any], sqlite_path: str,
+                     prefix: str, ttl: int, unfinished_ttl: int) -> JobStore:
+    """Job store for JOB_STORE; falls back to memory when the chosen backend is unavailable"""
+    backend = backend.lower()
+    if backend == "redis":
+        if redis_client is not None:
+            return RedisJobStore(redis_client, prefix, ttl, unfinished_ttl)
+        logger.warning("JOB_STORE=redis but Redis is not configured; using the in-memory job store")
+    elif backend == "sqlite":
+        try:
+            return SQLiteJobStore(sqlite_path)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open SQLite job store at {sqlite_path}: {str(e)}; using the in-memory job store")
+    elif backend != "memory":
+        logger.warning(f"Unknown JOB_STORE '{backend}'; using the in-memory job store")
+    return MemoryJobStore()
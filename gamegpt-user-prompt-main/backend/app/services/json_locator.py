@@ -0,0 +1,116 @@
+"""
+JSON Locator for free-text LLM output
+Finds the game object in a response wrapped in markdown fences and prose, in one
+pass over the text
+"""
+
+import json
+from typing import NamedTuple, Optional
+
+
+class JsonSpan(NamedTuple):
+    """
+    text[start:end] is the object; complete is False when it was never closed (truncated
+    output), and valid is True when it parses as JSON as it is
+    """
+    start: int
+    end: int
+    complete: bool
+    valid: bool = False
+
+
+def locate_json_object(text: str) -> Optional[JsonSpan]:
+    """
+    Outermost balanced {...} in text, or None if there is no '{'
+
+    Braces are matched with string literals and escapes taken into account, so a
+    '}' inside a value does not end the object (inside an object a backslash
+    escapes the next character, as it may only appear in strings anyway). Outside
+    objects quotes are prose and are ignored. When there are several top-level
+    objects (e.g. a "{name}" placeholder in the preamble) the longest is returned;
+    when one is still open at the end of the text, that one is returned, running
+    to the end.
+
+    A '{' inside quoted prose ('the "{ x" notation') starts a candidate whose quotes
+    are out of step with the real object's, so it ends inside one of its strings.
+    A candidate that does not parse is therefore checked against the object opened
+    by the next '{' after the parse error: if that one runs past the candidate's end,
+    it replaces the candidate.
+
+    Linear time, and fast because the Python loop runs once per brace: the text
+    between two braces is handled with str.find/str.count/str.replace. Scanning
+    resumes after each object instead of backtracking, and only a candidate longer
+    than the best so far is parsed (so the parsed lengths add up to at most the
+    text), up to its first error, after which the check goes on.
+    """
+    best: Optional[JsonSpan] = None
+    start = text.find("{")
+    while start != -1:
+        span = _match_object(text, start)
+        if not span.complete:
+            return span
+        if best is None or span.end - span.start > best.end - best.start:
+            # Parsed only now, and then it is the longest so far whatever the check returns
+            best = span = _check_parse(text, span)
+            if not span.complete:
+                return span
+        start = text.find("{", span.end)
+    return best
+
+
+def _check_parse(text: str, span: JsonSpan) -> JsonSpan:
+    """span marked valid if it parses, else the object that overtakes it, if any (see locate_json_object)"""
+    try:
+        json.loads(text[span.start:span.end])
+        return span._replace(valid=True)
+    except json.JSONDecodeError as e:
+        error = span.start + e.pos
+    except (ValueError, RecursionError):
+        return span
+
+    # Without quotes the braces cannot be out of step
+    inner = text.find("{", error)
+    if inner == -1 or inner >= span.end or text.find('"', span.start, span.end) == -1:
+        return span
+    overtaking = _match_object(text, inner)
+    if overtaking.end <= span.end:
+        return span
+    return _check_parse(text, overtaking) if overtaking.complete else overtaking
+
+
+def _match_object(text: str, start: int) -> JsonSpan:
+    """The object opened by the brace at start, up to its matching brace or the end of the text"""
+    depth = 1
+    in_string = False
+    position = start + 1
+    # Next '{' and '}' at or after position; each is searched for again only once passed
+    next_open = text.find("{", position)
+    next_close = text.find("}", position)
+    while next_close != -1:
+        brace = next_open if next_open != -1 and next_open < next_close else next_close
+
+        # Quotes between the previous brace and this one decide whether it is inside a string.
+        # Where there are backslashes, dropping escaped backslashes (pairs) leaves a backslash
+        # before exactly the escaped quotes, and at the end if the brace itself is escaped
+        escaped = False
+        if text.find("\\", position, brace) == -1:
+            quotes = text.count('"', position, brace)
+        else:
+            segment = text[position:brace].replace("\\\\", "")
+            quotes = segment.count('"') - segment.count('\\"')
+            escaped = segment.endswith("\\")
+        in_string ^= quotes % 2 == 1
+
+        position = brace + 1
+        if brace == next_open:
+            next_open = text.find("{", position)
+            if not (in_string or escaped):
+                depth += 1
+        else:
+            next_close = text.find("}", position)
+            if not (in_string or escaped):
+                depth -= 1
+                if depth == 0:
+                    return JsonSpan(start, position, True)
+    return JsonSpan(start, len(text), False)
+
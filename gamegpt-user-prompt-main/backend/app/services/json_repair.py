@@ -0,0 +1,256 @@
+"""
+JSON Repair for free-text LLM output
+Rewrites almost-JSON into JSON in one pass over its tokens, respecting string
+literals: commas and colons are regenerated from the structure (so missing and
+trailing commas disappear), Python literals become JSON literals, single-quoted
+strings and unquoted keys are double-quoted, doubled braces are collapsed, and
+a truncated document is closed
+"""
+
+import json
+import re
+
+# One token, skipping whitespace and the separators, which are regenerated. Strings may
+# be unterminated (truncated output) and then run to the end of the text, so every
+# position is scanned once
+_TOKEN = re.compile(r'''[\s,:]*+(
+    "[^"\\]*+(?:\\.[^"\\]*+)*+(?:"|\\?\Z)
+  | '[^'\\]*+(?:\\.[^'\\]*+)*+(?:'|\\?\Z)
+  | [{}\[\]]
+  | [^\s{}\[\]:,"']++
+)''', re.VERBOSE | re.DOTALL)
+
+# An unquoted value runs to the end of its line or the next ',', '}' or ']'
+_BARE_VALUE = re.compile(r'[^,{}\[\]\n]*')
+_NOT_BARE = frozenset('{}[]"\'')
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?')
+_CONTROL = re.compile(r'[\x00-\x1f]')
+_ESCAPE = re.compile(r'\\(u[0-9a-fA-F]{4}|.|\Z)', re.DOTALL)
+_PARTIAL_ESCAPE = re.compile(r'\\(?:u[0-9a-fA-F]{0,3})?\Z')
+_VALID_ESCAPES = frozenset('"\\/bfnrt')
+_SINGLE_QUOTED = re.compile(r'''\\.|"''', re.DOTALL)
+
+LITERALS = {
+    "true": "true", "false": "false", "null": "null",
+    "True": "true", "False": "false", "None": "null",
+    "NaN": "null", "Infinity": "null", "-Infinity": "null", "undefined": "null"
+}
+# Prefixes a value cut off by the end of the text is completed from
+_LITERAL_PREFIXES = {
+    word[:length]: value
+    for word, value in (("true", "true"), ("false", "false"), ("null", "null"),
+                        ("True", "true"), ("False", "false"), ("None", "null"))
+    for length in range(1, len(word))
+}
+
+
+def _control_escape(match: "re.Match") -> str:
+    return json.dumps(match.group())[1:-1]
+
+
+def _escape(match: "re.Match") -> str:
+    escaped = match.group(1)
+    if len(escaped) > 1 or escaped in _VALID_ESCAPES:
+        return match.group()
+    # \' is a Python-ism; any other stray backslash is kept as a literal backslash
+    return "'" if escaped == "'" else "\\\\" + escaped
+
+
+def _single_quoted(match: "re.Match") -> str:
+    token = match.group()
+    if token == '"':
+        return '\\"'
+    return "'" if token == "\\'" else token
+
+
+def _string(token: str, terminated: bool) -> str:
+    """A double-quoted JSON string for a string token"""
+    if token[0] == "'":
+        body = token[1:-1] if terminated else token[1:]
+        body = _SINGLE_QUOTED.sub(_single_quoted, body)
+    elif terminated:
+        body = token[1:-1]
+    else:
+        body = token[1:]
+    if not terminated:
+        # Drop an escape cut off by the end of the text (a backslash, or \u and up to three digits)
+        partial = _PARTIAL_ESCAPE.search(body, max(0, len(body) - 5))
+        if partial and (partial.start() - len(body[:partial.start()].rstrip("\\"))) % 2 == 0:
+            body = body[:partial.start()]
+    if "\\" in body:
+        body = _ESCAPE.sub(_escape, body)
+    if not body.isprintable():
+        body = _CONTROL.sub(_control_escape, body)
+    return '"' + body + '"'
+
+
+def _is_terminated(token: str) -> bool:
+    """Whether a string token that reaches the end of the text has its closing quote"""
+    if len(token) < 2 or token[-1] != token[0]:
+        return False
+    backslashes = len(token) - 1 - len(token[:-1].rstrip("\\"))
+    return backslashes % 2 == 0
+
+
+def repair_json(text: str) -> str:
+    """
+    JSON for the first object or array in text, repaired
+
+    Text before the first '{' or '[' and after the document closes is dropped.
+    Valid JSON comes out equivalent (re-serialized without insignificant
+    whitespace); the repairs are:
+    - commas and colons are emitted from the structure, so missing, doubled and
+      trailing ones do not matter
+    - True/False/None (and NaN, Infinity, undefined) become JSON literals, and
+      bare keys are quoted; any other unquoted value becomes a string running to
+      the end of its line or the next ',', '}' or ']' (so "http://x.com" or
+      "see the docs" stay whole)
+    - single-quoted strings are converted, and invalid escapes such as \\' fixed
+    - raw control characters inside strings are escaped
+    - '{{' ... '}}' is read as one object, and a mismatched closer also closes
+      the containers opened inside the one it matches
+    - at the end of a truncated text, an open string is closed, a partial
+      literal completed, a key without a value dropped and open containers closed
+    Linear in the length of the text.
+    """
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    if not starts:
+        return text
+    tokens = _TOKEN.findall(text, min(starts))
+    last = len(tokens) - 1  # The last token may have been cut off
+    # Token positions are only needed for unquoted values, so they are found on demand
+    spans = _TOKEN.finditer(text, min(starts))
+    span = None
+    span_index = -1
+    merged = 0  # Tokens up to this index were part of an unquoted value
+
+    def token_span(position: int) -> "re.Match":
+        nonlocal span, span_index
+        while span_index < position:
+            span = next(spans)
+            span_index += 1
+        return span
+
+    out = [tokens[0]]
+    stack = []                      # Saved state of the enclosing containers
+    in_object = tokens[0] == "{"    # Current container is an object (else an array)
+    need_key = in_object            # Object: next token is a key
+    need_comma = False              # An element has been emitted in the current container
+    key_mark = 0                    # Object: len(out) before the current key, to drop it if it gets no value
+    extra_braces = 0                # Object: doubled '{' still to be matched by a '}'
+    saved_objects = 0               # Objects among the enclosing containers (the rest are arrays)
+
+    for index in range(1, len(tokens)):
+        if index <= merged:
+            continue
+        token = tokens[index]
+        first = token[0]
+
+        if first == "}" or first == "]":
+            if first == "}" and in_object and extra_braces:
+                extra_braces -= 1
+                continue
+            # A closer for a container further out also closes the ones inside it
+            closes_object = first == "}"
+            saved_matches = saved_objects if closes_object else len(stack) - saved_objects
+            if closes_object != in_object and not saved_matches:
+                continue
+            while True:
+                if in_object and not need_key:
+                    del out[key_mark:]
+                closes_current = closes_object == in_object
+                out.append("}" if in_object else "]")
+                if not stack:
+                    return "".join(out)
+                in_object, need_key, need_comma, key_mark, extra_braces = stack.pop()
+                saved_objects -= in_object
+                if in_object:
+                    need_key = True
+                need_comma = True
+                if closes_current:
+                    break
+            continue
+
+        if in_object and need_key:
+            if first == "{":
+                if not need_comma:
+                    extra_braces += 1
+                continue
+            if first == "[":
+                continue
+            if first == '"' or first == "'":
+                if index == last and not _is_terminated(token):
+                    continue
+                key = _string(token, True)
+            else:
+                key = json.dumps(token)
+            key_mark = len(out)
+            if need_comma:
+                out.append(",")
+            out.append(key)
+            out.append(":")
+            need_key = False
+            continue
+
+        if first == "{" or first == "[":
+            if need_comma and not in_object:
+                out.append(",")
+            stack.append((in_object, need_key, need_comma, key_mark, extra_braces))
+            saved_objects += in_object
+            out.append(first)
+            in_object = first == "{"
+            need_key = in_object
+            need_comma = False
+            extra_braces = 0
+            continue
+
+        if first == '"':
+            # Most strings are already valid JSON
+            if "\\" not in token and token.isprintable() and (index < last or _is_terminated(token)):
+                value = token
+            else:
+                value = _string(token, index < last or _is_terminated(token))
+        elif first == "'":
+            value = _string(token, index < last or _is_terminated(token))
+        elif (token in LITERALS or _NUMBER.fullmatch(token)) and (
+            # Unless glued to more by a colon, as in 5:30 or "None: see notes"
+            index == last or tokens[index + 1][0] in _NOT_BARE or text[token_span(index).end(1)] != ":"
+        ):
+            value = LITERALS.get(token, token)
+        else:
+            start = token_span(index).start(1)
+            end = _BARE_VALUE.match(text, start).end()
+            # Take in the tokens inside the value (a string token may run past its end)
+            while span_index < last:
+                following = token_span(span_index + 1)
+                if following.start(1) >= end:
+                    break
+                merged = span_index
+                if following.end(1) > end:
+                    end = _BARE_VALUE.match(text, following.end(1)).end()
+            if end == len(text):
+                # Cut off by the end of the text
+                value = _LITERAL_PREFIXES.get(token) if merged < index else None
+                if value is None:
+                    break
+            else:
+                value = json.dumps(text[start:end].rstrip())
+        if in_object:
+            out.append(value)
+            need_key = True
+        else:
+            if need_comma:
+                out.append(",")
+            out.append(value)
+        need_comma = True
+
+    # Truncated: drop a key left without a value and close what is still open
+    while True:
+        if in_object and not need_key:
+            del out[key_mark:]
+        out.append("}" if in_object else "]")
+        if not stack:
+            break
+        in_object, need_key, need_comma, key_mark, extra_braces = stack.pop()
+        need_key = True
+    return "".join(out)
@@ -7,28 +7,131 @@ Handles communication with Google Gemini API
 import logging
 import json
 import asyncio
-from typing import Dict, Any, Optional
+import math
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, NamedTuple, Optional, AsyncIterator, Callable, TypeVar
 import httpx
 from app.core.config import get_settings
 from app.core.logging_config import get_logger
 from app.core.exceptions import ExternalServiceException, ErrorCode
+from app.core.http_pool import HTTPConnectionPool
+from app.core.metrics import get_metrics
+from app.core.tracing import span
+from app.services.response_processor import ResponseProcessor
+from app.services.response_schema import build_response_schema
+from app.services.retry import RetryEngine
+from app.services.hedging import HedgePolicy, CandidateRejected
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.concurrency_limiter import AdaptiveConcurrencyLimiter
 
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
+# Sent after the cut-off output (as the model turn) to have Gemini resume it
+CONTINUATION_INSTRUCTION = (
+    "Your previous response was cut off by the output length limit. Continue it from exactly "
+    "where it stopped: reply with only the remaining text, starting with the next character. "
+    "Do not repeat any of it, do not start over, and do not add code fences or commentary."
+)
+
+
+class GeminiReply(NamedTuple):
+    """Generated text of one generateContent call, with why and how far it got"""
+    text: str
+    finish_reason: Optional[str]
+    prompt_tokens: int
+    output_tokens: int
+    seconds: float
+
 
 class LLMService:
     """Service for handling Gemini API calls"""
     
-    def __init__(self):
+    API_BASE_URL = "https://generativelanguage.googleapis.com"
+    
+    def __init__(
+        self,
+        http_pool: Optional[HTTPConnectionPool] = None,
+        response_processor: Optional[ResponseProcessor] = None
+    ):
         self.settings = get_settings()
         self.logger = logger
-        self.client = httpx.AsyncClient(timeout=self.settings.REQUEST_TIMEOUT)
+        # GEMINI_BASE_URL redirects calls, e.g. to a proxy or a local fake for load tests
+        self.api_base_url = (self.settings.GEMINI_BASE_URL or self.API_BASE_URL).rstrip("/")
+        self.http_pool = http_pool or HTTPConnectionPool()
+        self.client = self.http_pool.client
+        self.retry_engine = RetryEngine()
+        self.hedge_policy = HedgePolicy()
+        self.circuit_breaker = CircuitBreaker("gemini")
+        self.concurrency_limiter = AdaptiveConcurrencyLimiter("gemini")
+        self.metrics = get_metrics()
+        # Stitches continuations of responses cut off by MAX_TOKENS
+        self.response_processor = response_processor or ResponseProcessor()
+        self._continuation_counters = {
+            "truncated_responses": 0,
+            "continued_responses": 0,
+            "continuation_requests": 0,
+            "still_truncated": 0,
+            "continuation_errors": 0,
+            "continuation_output_tokens": 0,
+            "continuation_prompt_tokens": 0,
+            "output_tokens_saved": 0,
+            "continuation_ms_total": 0.0,
+            "regenerate_ms_estimate_total": 0.0
+        }
         
     async def __aenter__(self):
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+        await self.close()
+    
+    async def warm_up(self) -> Dict[str, Any]:
+        """Open pooled connections to Gemini before the first request"""
+        return await self.http_pool.warm(self.api_base_url)
+    
+    async def close(self) -> None:
+        """Close the HTTP client and its pooled connections"""
+        await self.http_pool.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retry, hedging, circuit breaker, concurrency limit and continuation statistics for Gemini calls"""
+        return {
+            "retries": self.retry_engine.stats(),
+            "hedging": self.hedge_policy.stats(),
+            "circuit_breaker": self.circuit_breaker.stats(),
+            "concurrency": self.concurrency_limiter.stats(),
+            "continuation": self.continuation_stats()
+        }
+    
+    def continuation_stats(self) -> Dict[str, Any]:
+        """
+        Responses cut off by MAX_TOKENS and what resuming them saved over a full regenerate
+        A regenerate would produce the cut-off output again: output_tokens_saved counts it,
+        and its latency is estimated at the first call's rate for the whole stitched output
+        """
+        counters = self._continuation_counters
+        continued = counters["continued_responses"]
+        
+        def average(total: float) -> Optional[float]:
+            return round(total / continued, 1) if continued else None
+        
+        return {
+            **{key: value for key, value in counters.items() if not key.endswith("_total")},
+            "avg_continuation_ms": average(counters["continuation_ms_total"]),
+            "avg_regenerate_ms_estimate": average(counters["regenerate_ms_estimate_total"]),
+            "avg_latency_saved_ms": average(
+                counters["regenerate_ms_estimate_total"] - counters["continuation_ms_total"]
+            )
+        }
+    
+    @property
+    def structured_output(self) -> bool:
+        """Whether responses are requested as schema-constrained JSON"""
+        return self.settings.STRUCTURED_OUTPUT_ENABLED
     
     async def health_check(self) -> Dict[str, Any]:
         """Health check for Gemini service"""
@@ -48,7 +151,7 @@ class LLMService:
             }
             
             response = await self.client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/{self.settings.GOOGLE_MODEL}:generateContent",
+                self._model_url("generateContent"),
                 headers={"Content-Type": "application/json"},
                 json=test_payload,
                 params={"key": self.settings.GOOGLE_API_KEY}
@@ -72,14 +175,60 @@ class LLMService:
                 "error": str(e)
             }
     
-    async def generate_response(self, prompt: str) -> str:
+    async def generate_validated(
+        self,
+        prompt: str,
+        validate: Callable[[str], T],
+        game_types: Optional[List[str]] = None
+    ) -> T:
+        """
+        Generate a response and validate it, hedging slow calls when enabled
+        The first response that passes validate wins; a response that fails it
+        is raised as CandidateRejected wrapping the validation error
+        """
+        async def candidate(temperature: Optional[float]) -> T:
+            raw_response = await self.generate_response(prompt, game_types, temperature)
+            try:
+                return validate(raw_response)
+            except Exception as e:
+                raise CandidateRejected(e)
+        
+        if not self.hedge_policy.enabled:
+            return await candidate(None)
+        
+        hedge_temperature = self.settings.HEDGE_TEMPERATURE if self.settings.HEDGE_TEMPERATURE >= 0 else None
+        return await self.hedge_policy.run(
+            lambda: candidate(None),
+            lambda: candidate(hedge_temperature)
+        )
+    
+    async def generate_response(
+        self,
+        prompt: str,
+        game_types: Optional[List[str]] = None,
+        temperature: Optional[float] = None
+    ) -> str:
         """
         Generate response from Gemini - equivalent to Basic LLM Chain node
+        game_types narrows the response schema in structured output mode
         """
         self.logger.info("Generating response using Gemini API")
         
+        with self.metrics.time("generate_response"), span("generate_response"):
+            return await self._generate_response(prompt, game_types, temperature)
+    
+    async def _generate_response(
+        self,
+        prompt: str,
+        game_types: Optional[List[str]],
+        temperature: Optional[float]
+    ) -> str:
         try:
-            return await self._call_gemini(prompt)
+            payload = self._build_payload(prompt, game_types, temperature)
+            reply = await self._request(payload)
+            if reply.finish_reason == "MAX_TOKENS":
+                return await self._continue(payload, reply)
+            return reply.text
                 
         except ExternalServiceException:
             # Re-raise external service exceptions as-is
@@ -93,23 +242,82 @@ class LLMService:
                 details={"operation": "generate_response"}
             )
     
-    async def _call_gemini(self, prompt: str) -> str:
-        """Call Google Gemini API with proper error handling"""
-        if not self.settings.GOOGLE_API_KEY:
-            raise ExternalServiceException(
-                message="Gemini API key not configured",
-                error_code=ErrorCode.CONFIGURATION_ERROR,
-                service_name="gemini",
-                details={"operation": "generate_response"}
+    async def _request(self, payload: Dict[str, Any]) -> GeminiReply:
+        # Each attempt takes a concurrency slot; calls rejected by the breaker or
+        # throttled locally never reach Gemini
+        return await self.retry_engine.run(
+            "generate_response",
+            lambda: self.concurrency_limiter.run(
+                lambda: self.circuit_breaker.call(lambda: self._call_gemini(payload))
             )
+        )
+    
+    async def _continue(self, payload: Dict[str, Any], reply: GeminiReply) -> str:
+        """
+        Resume a response cut off by MAX_TOKENS instead of failing or regenerating it
+        Each round sends the output so far as the model turn and asks for the rest;
+        ResponseProcessor stitches the pieces, and validates the result like any response.
+        A failed continuation request ends the rounds with the text received so far, which
+        may still repair into a valid game; the error is counted rather than raised.
+        Structured output is not continued: the schema would make Gemini start a new object
+        """
+        counters = self._continuation_counters
+        counters["truncated_responses"] += 1
+        self.logger.warning(f"Gemini response cut off by MAX_TOKENS after {reply.output_tokens} tokens")
+        if not self.settings.CONTINUATION_ENABLED or self.structured_output or self.settings.CONTINUATION_MAX_ROUNDS < 1:
+            return reply.text
         
-        # Gemini API endpoint
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.settings.GOOGLE_MODEL}:generateContent"
+        counters["continued_responses"] += 1
+        text = reply.text
+        output_tokens = reply.output_tokens
+        seconds = 0.0
+        for _ in range(self.settings.CONTINUATION_MAX_ROUNDS):
+            counters["continuation_requests"] += 1
+            try:
+                with span("continuation"):
+                    piece = await self._request(self._continuation_payload(payload, text))
+            except Exception as e:
+                counters["continuation_errors"] += 1
+                self.logger.warning(f"Continuation request failed, keeping the output so far: {str(e)}")
+                break
+            counters["continuation_output_tokens"] += piece.output_tokens
+            counters["continuation_prompt_tokens"] += piece.prompt_tokens
+            output_tokens += piece.output_tokens
+            seconds += piece.seconds
+            text = self.response_processor.stitch_continuation(text, piece.text)
+            if piece.finish_reason != "MAX_TOKENS":
+                break
+        else:
+            counters["still_truncated"] += 1
         
-        headers = {
-            "Content-Type": "application/json"
+        counters["output_tokens_saved"] += reply.output_tokens
+        counters["continuation_ms_total"] += seconds * 1000
+        if reply.output_tokens:
+            counters["regenerate_ms_estimate_total"] += reply.seconds * 1000 * output_tokens / reply.output_tokens
+        return text
+    
+    def _continuation_payload(self, payload: Dict[str, Any], partial: str) -> Dict[str, Any]:
+        """The original request with the output so far as the model turn and a request to go on"""
+        return {
+            **payload,
+            "contents": [
+                {"role": "user", "parts": payload["contents"][0]["parts"]},
+                {"role": "model", "parts": [{"text": partial}]},
+                {"role": "user", "parts": [{"text": CONTINUATION_INSTRUCTION}]}
+            ]
         }
-        
+    
+    def _model_url(self, method: str) -> str:
+        """Gemini REST endpoint for the configured model"""
+        return f"{self.api_base_url}/v1beta/models/{self.settings.GOOGLE_MODEL}:{method}"
+    
+    def _build_payload(
+        self,
+        prompt: str,
+        game_types: Optional[List[str]] = None,
+        temperature: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Request body shared by generateContent and streamGenerateContent"""
         payload = {
             "contents": [
                 {
@@ -119,59 +327,140 @@ class LLMService:
                 }
             ],
             "generationConfig": {
-                "temperature": self.settings.TEMPERATURE,
+                "temperature": self.settings.TEMPERATURE if temperature is None else temperature,
                 "maxOutputTokens": self.settings.MAX_TOKENS
             }
         }
         
+        if self.structured_output:
+            generation_config = payload["generationConfig"]
+            generation_config["responseMimeType"] = "application/json"
+            # None when no selected type's content can be expressed: plain JSON mode
+            response_schema = build_response_schema(game_types)
+            if response_schema is not None:
+                generation_config["responseSchema"] = response_schema
+        
+        return payload
+    
+    def _check_api_key(self) -> None:
+        if not self.settings.GOOGLE_API_KEY:
+            raise ExternalServiceException(
+                message="Gemini API key not configured",
+                error_code=ErrorCode.CONFIGURATION_ERROR,
+                service_name="gemini",
+                details={"operation": "generate_response"}
+            )
+    
+    def _parse_retry_after(self, headers: Optional[httpx.Headers], error_text: str) -> Optional[float]:
+        """Server-requested delay in seconds from a Retry-After header or a google.rpc.RetryInfo detail"""
+        header = headers.get("retry-after") if headers is not None else None
+        if header:
+            try:
+                return max(0.0, float(header))
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(header)
+                    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+                except (TypeError, ValueError):
+                    pass
+        
+        try:
+            body = json.loads(error_text)
+            details = body.get("error", {}).get("details", [])
+        except (json.JSONDecodeError, AttributeError):
+            return None
+        for detail in details if isinstance(details, list) else []:
+            if isinstance(detail, dict) and detail.get("@type", "").endswith("google.rpc.RetryInfo"):
+                delay = str(detail.get("retryDelay", ""))
+                try:
+                    return max(0.0, float(delay.rstrip("s")))
+                except ValueError:
+                    return None
+        return None
+    
+    def _raise_for_status(self, status_code: int, error_text: str, headers: Optional[httpx.Headers] = None) -> None:
+        """Map a non-200 Gemini response to an ExternalServiceException"""
+        if status_code == 200:
+            return
+        
+        self.logger.error(f"Gemini API error: {status_code} - {error_text}")
+        retry_after = self._parse_retry_after(headers, error_text)
+        
+        # Map specific error codes
+        if status_code == 429:
+            details = {"retry_after": f"{math.ceil(retry_after)}s" if retry_after is not None else "60s"}
+            if retry_after is not None:
+                details["retry_after_seconds"] = retry_after
+            raise ExternalServiceException(
+                message="Rate limit exceeded for Gemini API",
+                error_code=ErrorCode.GEMINI_RATE_LIMIT,
+                service_name="gemini",
+                status_code=status_code,
+                details=details
+            )
+        elif status_code == 403:
+            raise ExternalServiceException(
+                message="API quota exceeded for Gemini",
+                error_code=ErrorCode.GEMINI_QUOTA_EXCEEDED,
+                service_name="gemini",
+                status_code=status_code
+            )
+        else:
+            details = {"error_text": error_text}
+            if retry_after is not None:
+                details["retry_after_seconds"] = retry_after
+            raise ExternalServiceException(
+                message=f"Gemini API error: {status_code}",
+                error_code=ErrorCode.GEMINI_API_ERROR,
+                service_name="gemini",
+                status_code=status_code,
+                details=details
+            )
+    
+    async def _call_gemini(self, payload: Dict[str, Any]) -> GeminiReply:
+        """Call Google Gemini API with proper error handling"""
+        self._check_api_key()
+        
+        # Gemini API endpoint
+        url = self._model_url("generateContent")
+        
+        headers = {
+            "Content-Type": "application/json"
+        }
+        
         params = {"key": self.settings.GOOGLE_API_KEY}
         
         self.logger.debug(f"Calling Gemini API with model: {self.settings.GOOGLE_MODEL}")
         
         try:
-            response = await self.client.post(
-                url,
-                headers=headers,
-                json=payload,
-                params=params
-            )
+            started = time.perf_counter()
+            # One span per attempt, so retries and hedges show up in the trace
+            with span("gemini_request") as request_span:
+                response = await self.client.post(
+                    url,
+                    headers=headers,
+                    json=payload,
+                    params=params
+                )
+                request_span.set_attribute("http.status_code", response.status_code)
             
-            if response.status_code != 200:
-                error_text = response.text
-                self.logger.error(f"Gemini API error: {response.status_code} - {error_text}")
-                
-                # Map specific error codes
-                if response.status_code == 429:
-                    raise ExternalServiceException(
-                        message="Rate limit exceeded for Gemini API",
-                        error_code=ErrorCode.GEMINI_RATE_LIMIT,
-                        service_name="gemini",
-                        status_code=response.status_code,
-                        details={"retry_after": "60s"}
-                    )
-                elif response.status_code == 403:
-                    raise ExternalServiceException(
-                        message="API quota exceeded for Gemini",
-                        error_code=ErrorCode.GEMINI_QUOTA_EXCEEDED,
-                        service_name="gemini",
-                        status_code=response.status_code
-                    )
-                else:
-                    raise ExternalServiceException(
-                        message=f"Gemini API error: {response.status_code}",
-                        error_code=ErrorCode.GEMINI_API_ERROR,
-                        service_name="gemini",
-                        status_code=response.status_code,
-                        details={"error_text": error_text}
-                    )
+            self._raise_for_status(response.status_code, response.text, response.headers)
                 
             result = response.json()
             
             # Extract the generated text from Gemini response
             try:
-                generated_text = result["candidates"][0]["content"]["parts"][0]["text"]
+                candidate = result["candidates"][0]
+                generated_text = candidate["content"]["parts"][0]["text"]
                 self.logger.debug(f"Successfully received response from Gemini (length: {len(generated_text)} chars)")
-                return generated_text
+                usage = result.get("usageMetadata") or {}
+                return GeminiReply(
+                    text=generated_text,
+                    finish_reason=candidate.get("finishReason"),
+                    prompt_tokens=usage.get("promptTokenCount", 0),
+                    output_tokens=usage.get("candidatesTokenCount", len(generated_text) // 4),  # ~4 characters per token
+                    seconds=time.perf_counter() - started
+                )
             except (KeyError, IndexError) as e:
                 self.logger.error(f"Unexpected Gemini response format: {result}")
                 raise ExternalServiceException(
@@ -195,3 +484,109 @@ class LLMService:
                 service_name="gemini",
                 details={"operation": "connection"}
             )
+    
+    async def stream_response(self, prompt: str, game_types: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """
+        Stream generated text from Gemini's streamGenerateContent (SSE) endpoint
+        Yields text chunks as they arrive; closing the iterator aborts the upstream request
+        Opening the stream is retried; once text has been yielded a failure is final
+        """
+        self._check_api_key()
+        self.logger.info("Streaming response using Gemini API")
+        
+        limiter = self.concurrency_limiter
+        
+        async def open_attempt():
+            # The concurrency slot is held until the stream is closed
+            permit = await limiter.acquire() if limiter.enabled else None
+            try:
+                response = await self.circuit_breaker.call(lambda: self._open_stream(prompt, game_types))
+            except BaseException as e:
+                if permit is not None:
+                    limiter.release(permit, error=e, track_outcome=not isinstance(e, asyncio.CancelledError))
+                raise
+            return permit, response
+        
+        permit, response = await self.retry_engine.run("stream_response", open_attempt)
+        
+        stream_error: Optional[BaseException] = None
+        completed = False
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    chunk = json.loads(line[5:].strip())
+                except json.JSONDecodeError:
+                    self.logger.warning("Skipping malformed Gemini stream event")
+                    continue
+                
+                # The final event may carry only finishReason/usage metadata
+                for candidate in chunk.get("candidates", [])[:1]:
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            yield part["text"]
+            completed = True
+                            
+        except httpx.TimeoutException:
+            stream_error = ExternalServiceException(
+                message="Gemini API stream timed out",
+                error_code=ErrorCode.TIMEOUT_ERROR,
+                service_name="gemini",
+                details={"timeout": self.settings.REQUEST_TIMEOUT}
+            )
+            raise stream_error
+        except httpx.TransportError:
+            stream_error = ExternalServiceException(
+                message="Gemini API stream was interrupted",
+                error_code=ErrorCode.GEMINI_API_ERROR,
+                service_name="gemini",
+                details={"operation": "stream"}
+            )
+            raise stream_error
+        finally:
+            await response.aclose()
+            if permit is not None:
+                # Stream duration depends on output length and reader speed, so only errors adjust the limit
+                # A stream abandoned by its reader says nothing about upstream health
+                limiter.release(
+                    permit,
+                    error=stream_error,
+                    track_latency=False,
+                    track_outcome=completed or stream_error is not None
+                )
+    
+    async def _open_stream(self, prompt: str, game_types: Optional[List[str]]) -> httpx.Response:
+        """Send the streaming request and check its status; the body is left unread"""
+        request = self.client.build_request(
+            "POST",
+            self._model_url("streamGenerateContent"),
+            headers={"Content-Type": "application/json"},
+            json=self._build_payload(prompt, game_types),
+            params={"key": self.settings.GOOGLE_API_KEY, "alt": "sse"}
+        )
+        
+        try:
+            response = await self.client.send(request, stream=True)
+        except httpx.TimeoutException:
+            raise ExternalServiceException(
+                message="Gemini API stream timed out",
+                error_code=ErrorCode.TIMEOUT_ERROR,
+                service_name="gemini",
+                details={"timeout": self.settings.REQUEST_TIMEOUT}
+            )
+        except httpx.ConnectError:
+            raise ExternalServiceException(
+                message="Failed to connect to Gemini API",
+                error_code=ErrorCode.GEMINI_API_ERROR,
+                service_name="gemini",
+                details={"operation": "connection"}
+            )
+        
+        if response.status_code != 200:
+            try:
+                error_text = (await response.aread()).decode("utf-8", errors="replace")
+            finally:
+                await response.aclose()
+            self._raise_for_status(response.status_code, error_text, response.headers)
+        return response
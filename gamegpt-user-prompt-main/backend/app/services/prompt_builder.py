@@ -5,35 +5,135 @@ Builds the comprehensive therapeutic prompt for AI game generation
 """
 
 import logging
-from typing import Dict, Any
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Tuple
 from app.core.logging_config import get_logger
-from app.services.prompt_templates import PromptBuilder as ModularPromptBuilder
+from app.models.game_schemas import GameGenerationRequest
+from app.services.prompt_templates import PromptBuilder as ModularPromptBuilder, GameType
+from app.services.game_type_classifier import GameTypeClassifier
 
 logger = get_logger(__name__)
 
 
+@dataclass
+class PromptBuildResult:
+    """A built prompt plus how much it was pruned relative to the all-templates prompt"""
+    prompt: str
+    game_types: List[str] = field(default_factory=list)
+    type_source: str = "all"  # "request", "classifier" or "all"
+    full_chars: int = 0
+
+    @property
+    def pruned_chars(self) -> int:
+        return len(self.prompt)
+
+    @property
+    def reduction(self) -> float:
+        """Fraction of the full prompt that was pruned away"""
+        if not self.full_chars:
+            return 0.0
+        return max(0.0, 1 - self.pruned_chars / self.full_chars)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "game_types": self.game_types,
+            "type_source": self.type_source,
+            "full_chars": self.full_chars,
+            "prompt_chars": self.pruned_chars,
+            "reduction": round(self.reduction, 4),
+            # ~4 characters per token for English prompt text
+            "estimated_tokens_saved": (self.full_chars - self.pruned_chars) // 4
+        }
+
+
 class PromptBuilder:
     """Builds comprehensive therapeutic prompts for game generation"""
-    
+
     def __init__(self):
         self.logger = logger
         self.modular_builder = ModularPromptBuilder()
-        
+        self.classifier = GameTypeClassifier()
+        # Size of the unpruned prompt minus the user text, computed once
+        self._full_template_chars = len(self.modular_builder.build_full_prompt(""))
+        self._counters = {
+            "prompts_built": 0,
+            "prompts_pruned": 0,
+            "chars_full": 0,
+            "chars_sent": 0
+        }
+
     def health_check(self) -> Dict[str, Any]:
         """Health check for prompt builder service"""
         return {"status": "healthy", "service": "prompt_builder"}
-    
+
     def build_full_prompt(self, user_prompt: str) -> str:
         """
         Build the full therapeutic prompt - equivalent to Edit Fields node
         Uses modular templates for better maintainability
         """
         self.logger.info(f"Building full prompt for user request: {user_prompt[:100]}...")
-        
+
         try:
             full_prompt = self.modular_builder.build_full_prompt(user_prompt)
             self.logger.debug(f"Generated full prompt of length: {len(full_prompt)}")
             return full_prompt
         except Exception as e:
             self.logger.error(f"Failed to build prompt: {str(e)}")
-            raise Exception(f"Prompt building failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Prompt building failed: {str(e)}")
+
+    def select_game_types(self, request: GameGenerationRequest) -> Tuple[List[GameType], str]:
+        """
+        Decide which game types the prompt needs templates for
+        Returns (game types, source); an empty list means all types
+        """
+        if request.gameType:
+            return [GameType(request.gameType)], "request"
+
+        classified = self.classifier.classify(" ".join(filter(None, [request.prompt, request.theme])))
+        if classified:
+            return classified, "classifier"
+        return [], "all"
+
+    def build_prompt(self, request: GameGenerationRequest) -> PromptBuildResult:
+        """
+        Build a prompt pruned to the requested or most likely game types
+        Structured request parameters are passed through to the prompt verbatim
+        """
+        self.logger.info(f"Building prompt for user request: {request.prompt[:100]}...")
+
+        try:
+            game_types, type_source = self.select_game_types(request)
+            prompt = self.modular_builder.build_full_prompt(
+                request.prompt,
+                game_types or None,
+                request.structured_parameters()
+            )
+            result = PromptBuildResult(
+                prompt=prompt,
+                game_types=[game_type.value for game_type in game_types],
+                type_source=type_source,
+                full_chars=self._full_template_chars + len(request.prompt)
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to build prompt: {str(e)}")
+            raise Exception(f"Prompt building failed: {str(e)}")
+
+        self._counters["prompts_built"] += 1
+        if game_types:
+            self._counters["prompts_pruned"] += 1
+        self._counters["chars_full"] += result.full_chars
+        self._counters["chars_sent"] += result.pruned_chars
+
+        self.logger.info(
+            f"Built prompt of {result.pruned_chars} chars for types {result.game_types or 'all'} "
+            f"({result.type_source}), {result.reduction:.0%} smaller than the full prompt"
+        )
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregate prompt size reduction"""
+        chars_full = self._counters["chars_full"]
+        return {
+            **self._counters,
+            "reduction": round(1 - self._counters["chars_sent"] / chars_full, 4) if chars_full else 0.0
+        }
@@ -3,7 +3,8 @@ Prompt Templates for GameGPT Backend
 Modular prompt building with reusable templates
 """
 
-from typing import Dict, Any, List
+import hashlib
+from typing import Dict, Any, List, Optional
 from enum import Enum
 
 
@@ -39,6 +40,8 @@ class TherapeuticCategory(Enum):
 class PromptTemplates:
     """Centralized prompt templates for game generation"""
     
+    _fingerprint = None
+    
     # Core system prompt
     SYSTEM_PROMPT = """You are Dr. Evelyn Reed, the Lead Instructional Architect for the GameGPT Initiative. Your mission is to translate therapeutic concepts and educational goals into engaging, evidence-based micro-games. Our platform serves individuals seeking to improve their mental wellness, build coping skills, and learn about behavioral health in a safe, supportive, and interactive environment.
 
@@ -394,6 +397,24 @@ MENTAL HEALTH STANDARDS:
 OUTPUT REQUIREMENT:
 Return ONLY the JSON object. No markdown code blocks, no explanations, no additional text. Just pure, valid JSON that can be parsed immediately by the frontend game engine."""
 
+    @classmethod
+    def fingerprint(cls) -> str:
+        """
+        Stable hash of all template content
+        Used in cache keys so that editing any template invalidates old generations
+        """
+        if cls._fingerprint is None:
+            digest = hashlib.sha256()
+            for name in sorted(vars(cls)):
+                if not name.isupper():
+                    continue
+                value = getattr(cls, name)
+                if isinstance(value, dict):
+                    value = "\n".join(f"{key.value}={text}" for key, text in value.items())
+                digest.update(f"{name}:{value}\n".encode("utf-8"))
+            cls._fingerprint = digest.hexdigest()[:16]
+        return cls._fingerprint
+
 
 class PromptBuilder:
     """Builds comprehensive therapeutic prompts using modular templates"""
@@ -401,8 +422,16 @@ class PromptBuilder:
     def __init__(self):
         self.templates = PromptTemplates()
     
-    def build_full_prompt(self, user_prompt: str) -> str:
-        """Build the complete prompt using modular templates"""
+    def build_full_prompt(
+        self,
+        user_prompt: str,
+        game_types: Optional[List[GameType]] = None,
+        parameters: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Build the complete prompt using modular templates
+        When game_types is given, only those type descriptions and content templates are included
+        """
         
         # Build the full prompt by combining all sections
         prompt_sections = [
@@ -410,31 +439,54 @@ class PromptBuilder:
             self.templates.THERAPEUTIC_FOUNDATIONS,
             self.templates.GAME_MECHANICS_MAPPING,
             self.templates.IMPLEMENTATION_STRATEGY,
-            f"\nUser Request: {user_prompt}",
+            self._build_user_request(user_prompt, parameters),
             self.templates.ANALYSIS_REQUIREMENTS,
-            self._build_game_type_selection(),
+            self._build_game_type_selection(game_types),
             self.templates.JSON_SCHEMA_TEMPLATE,
-            self._build_content_templates(),
+            self._build_content_templates(game_types),
             self.templates.THERAPEUTIC_GUIDELINES,
             self.templates.OUTPUT_REQUIREMENTS
         ]
         
         return "\n\n".join(prompt_sections)
     
-    def _build_game_type_selection(self) -> str:
+    def _build_user_request(self, user_prompt: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+        """Build the user request section, including any structured parameters"""
+        request_text = f"\nUser Request: {user_prompt}"
+        
+        if parameters:
+            labels = {
+                "gameType": "Game type",
+                "difficulty": "Difficulty",
+                "targetAge": "Target age",
+                "estimatedTime": "Estimated time (minutes)",
+                "theme": "Theme"
+            }
+            request_text += "\n\nRequested parameters (must be followed exactly):"
+            for name, value in parameters.items():
+                request_text += f"\n- {labels.get(name, name)}: {value}"
+        
+        return request_text
+    
+    def _build_game_type_selection(self, game_types: Optional[List[GameType]] = None) -> str:
         """Build the game type selection section"""
-        game_types_text = "GAME TYPE SELECTION\n\nChoose the most appropriate type:\n\n"
+        selected = game_types or list(self.templates.GAME_TYPE_DESCRIPTIONS)
+        if len(selected) == 1:
+            game_types_text = "GAME TYPE SELECTION\n\nUse this game type:\n\n"
+        else:
+            game_types_text = "GAME TYPE SELECTION\n\nChoose the most appropriate type:\n\n"
         
-        for game_type, description in self.templates.GAME_TYPE_DESCRIPTIONS.items():
+        for game_type in selected:
+            description = self.templates.GAME_TYPE_DESCRIPTIONS[game_type]
             game_types_text += f"{game_type.value} - {description}\n\n"
         
         return game_types_text
     
-    def _build_content_templates(self) -> str:
-        """Build content structure templates for all game types"""
+    def _build_content_templates(self, game_types: Optional[List[GameType]] = None) -> str:
+        """Build content structure templates for the selected (default: all) game types"""
         content_section = "CONTENT STRUCTURES BY GAME TYPE\n\n"
         
-        for game_type, template in self.templates.CONTENT_TEMPLATES.items():
-            content_section += template + "\n\n"
+        for game_type in game_types or list(self.templates.CONTENT_TEMPLATES):
+            content_section += self.templates.CONTENT_TEMPLATES[game_type] + "\n\n"
         
         return content_section
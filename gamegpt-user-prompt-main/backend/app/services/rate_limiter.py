@@ -0,0 +1,236 @@
+"""
+Rate Limiter for inbound requests
+Per-client token buckets holding RATE_LIMIT_REQUESTS tokens that refill evenly over
+RATE_LIMIT_WINDOW seconds: a client may burst up to the full allowance, then gets
+one request per WINDOW / REQUESTS seconds. Buckets live in process memory, or in
+Redis (one atomic Lua script per request) so that every replica enforces one limit
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Refill, take and store in one round trip; Redis server time keeps replicas' clocks out of it
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = capacity
+if state[1] then
+    tokens = math.min(capacity, tonumber(state[1]) + math.max(0, now - tonumber(state[2])) * rate)
+end
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], ARGV[4])
+return {allowed, tostring(tokens)}
+"""
+
+
+class RateLimitDecision(NamedTuple):
+    """
+    Outcome of one check: the bucket state after it, from which the header values
+    (whole requests and seconds) are derived
+    """
+    allowed: bool
+    tokens: float
+    capacity: float
+    rate: float  # tokens per second
+    cost: float
+
+    @property
+    def limit(self) -> int:
+        return int(self.capacity)
+
+    @property
+    def remaining(self) -> int:
+        return int(self.tokens)
+
+    @property
+    def reset_after(self) -> int:
+        """Seconds until the bucket is full again"""
+        return math.ceil((self.capacity - self.tokens) / self.rate)
+
+    @property
+    def retry_after(self) -> int:
+        """Seconds until the request would be allowed (0 if it was)"""
+        if self.allowed:
+            return 0
+        return max(1, math.ceil((self.cost - self.tokens) / self.rate))
+
+
+# Skips the generated keyword-handling __new__; a check builds one per request
+_new_decision = tuple.__new__
+
+
+class MemoryRateLimitBackend:
+    """
+    Token buckets in this process
+    A check reads and updates its bucket without awaiting, so on the event loop it is
+    atomic without a lock. Buckets are kept in least-recently-used order; a bucket
+    untouched for a whole window is full again, indistinguishable from a new one,
+    and is dropped (checked every EVICT_EVERY calls)
+    """
+
+    EVICT_EVERY = 64
+
+    name = "memory"
+
+    def __init__(self, capacity: int, window: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(capacity)
+        self.window = float(window)
+        self.rate = self.capacity / self.window
+        self._clock = clock
+        # key -> [tokens, last update]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._checks = 0
+
+    def check(self, key: str, cost: float = 1.0) -> RateLimitDecision:
+        now = self._clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [self.capacity, now]
+            self._buckets[key] = bucket
+        else:
+            tokens = bucket[0] + (now - bucket[1]) * self.rate
+            bucket[0] = tokens if tokens < self.capacity else self.capacity
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+
+        allowed = bucket[0] >= cost
+        if allowed:
+            bucket[0] -= cost
+        self._checks += 1
+        if not self._checks % self.EVICT_EVERY:
+            self._evict_idle(now)
+        return _new_decision(RateLimitDecision, (allowed, bucket[0], self.capacity, self.rate, cost))
+
+    def _evict_idle(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if now - oldest[1] < self.window:
+                return
+            buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RedisRateLimitBackend:
+    """Token buckets in Redis hashes shared by all replicas; each expires after a window idle"""
+
+    name = "redis"
+
+    def __init__(self, client: Any, capacity: int, window: float, prefix: str):
+        self.client = client
+        self.capacity = float(capacity)
+        self.window = float(window)
+        self.rate = self.capacity / self.window
+        self.prefix = prefix
+        # EVALSHA, re-sending the script if Redis has not seen it
+        self._script = client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    async def check(self, key: str, cost: float = 1.0) -> RateLimitDecision:
+        allowed, tokens = await self._script(
+            keys=[self.prefix + key],
+            args=[self.capacity, self.rate, cost, int(self.window * 1000)]
+        )
+        return RateLimitDecision(bool(int(allowed)), float(tokens), self.capacity, self.rate, cost)
+
+
+class RateLimiter:
+    """
+    Per-client limit on inbound requests
+    With the Redis backend, a Redis error never fails a request: the check falls
+    back to this replica's in-memory buckets
+    """
+
+    def __init__(self, redis_client: Optional[Any] = None, clock: Callable[[], float] = time.monotonic):
+        self.settings = get_settings()
+        self.logger = logger
+        self.limit = max(1, self.settings.RATE_LIMIT_REQUESTS)
+        self.window = max(1, self.settings.RATE_LIMIT_WINDOW)
+        self.trust_api_key = self.settings.CLIENT_ID_TRUST_API_KEY
+        self.exempt_paths = frozenset(
+            path.strip() for path in self.settings.RATE_LIMIT_EXEMPT_PATHS.split(",") if path.strip()
+        )
+        # Also the fallback for the Redis backend
+        self.memory = MemoryRateLimitBackend(self.limit, self.window, clock=clock)
+        self.redis: Optional[RedisRateLimitBackend] = None
+
+        backend = self.settings.RATE_LIMIT_BACKEND.lower()
+        if backend == "redis":
+            if redis_client is not None:
+                self.redis = RedisRateLimitBackend(
+                    redis_client, self.limit, self.window, self.settings.RATE_LIMIT_KEY_PREFIX
+                )
+            else:
+                self.logger.warning("RATE_LIMIT_BACKEND=redis but Redis is not configured; using in-memory rate limits")
+        elif backend != "memory":
+            self.logger.warning(f"Unknown RATE_LIMIT_BACKEND '{backend}'; using in-memory rate limits")
+
+        self.policy = f"{self.limit};w={self.window}"
+        # Constant RateLimit-* header values, encoded once
+        self.limit_header = str(self.limit).encode()
+        self.policy_header = self.policy.encode()
+        self._counters = {
+            "allowed": 0,
+            "limited": 0,
+            "redis_errors": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.RATE_LIMIT_ENABLED
+
+    @property
+    def backend(self) -> str:
+        return (self.redis or self.memory).name
+
+    def applies_to(self, path: str) -> bool:
+        return self.enabled and path not in self.exempt_paths
+
+    async def check(self, client: str, cost: float = 1.0) -> RateLimitDecision:
+        """Take cost requests (default one) from the client's bucket"""
+        if self.redis is not None:
+            try:
+                result = await self.redis.check(client, cost)
+            except Exception as e:
+                self._counters["redis_errors"] += 1
+                self.logger.warning(f"Redis rate limit check failed, using local limits: {str(e)}")
+                result = self.memory.check(client, cost)
+        else:
+            result = self.memory.check(client, cost)
+
+        if result.allowed:
+            self._counters["allowed"] += 1
+        else:
+            self._counters["limited"] += 1
+        return result
+
+    def health_check(self) -> Dict[str, Any]:
+        """Health check for the rate limiter"""
+        return {"status": "healthy", "service": "rate_limiter", "backend": self.backend}
+
+    def stats(self) -> Dict[str, Any]:
+        """Policy, backend and allowed/limited counts"""
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend,
+            "policy": self.policy,
+            "tracked_clients": len(self.memory),
+            **self._counters
+        }
@@ -6,46 +6,89 @@ Processes and validates LLM responses into game schemas
 
 import json
 import re
+import time
 import logging
 from typing import Dict, Any
 from datetime import datetime
 from app.models.game_schemas import GameSchema
 from app.core.logging_config import get_logger
+from app.core.tracing import span
+from app.services.json_locator import locate_json_object
+from app.services.json_repair import repair_json
 
 logger = get_logger(__name__)
 
+_ARTIFACT_PREFIXES = ("Here's the JSON:", "Here is the JSON:", "JSON:", "Response:", "Game:", "```json", "```")
+_ARTIFACT_SUFFIXES = ("```", "End of JSON", "That's it!", "Hope this helps!")
+_OPENING_FENCE = re.compile(r'```[a-zA-Z]*\n?')
+# A continuation that reopens the code block it is continuing
+_CONTINUATION_FENCE = re.compile(r'\s*```(?:json\b[ \t]*\n?|[ \t]*\n(?=\s*[{\["]))', re.IGNORECASE)
+# Overlap between the end of a cut-off response and the start of its continuation that is
+# treated as repeated text; shorter matches are more likely to be coincidence
+_MIN_OVERLAP = 8
+_MAX_OVERLAP = 512
+# Leading characters of the object a continuation must repeat to count as starting over
+_RESTART_PREFIX = 24
+
+
+def _strip_bounds(text: str, start: int, end: int) -> tuple:
+    """Bounds of text[start:end].strip() within text"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
 
 class ResponseProcessor:
     """Processes LLM responses into validated game schemas"""
     
     def __init__(self):
         self.logger = logger
+        # Parse outcomes per output mode, to compare free text with structured output
+        self._counters = {
+            mode: {"responses": 0, "parsed_directly": 0, "repaired": 0, "failures": 0, "processing_ms_total": 0.0}
+            for mode in ("free_text", "structured")
+        }
+        self._stitch_counters = {"stitched": 0, "overlap_chars_dropped": 0, "fences_dropped": 0, "restarts": 0}
     
     def health_check(self) -> Dict[str, Any]:
         """Health check for response processor service"""
         return {"status": "healthy", "service": "response_processor"}
     
-    def process_response(self, raw_response: str) -> GameSchema:
+    def process_response(self, raw_response: str, structured: bool = False) -> GameSchema:
         """
         Process LLM response into GameSchema - equivalent to Code node
         This replicates the exact logic from the n8n Code node
+        Structured (schema-constrained) responses are parsed directly, skipping the repair path
         """
         self.logger.info("Processing LLM response...")
+        counters = self._counters["structured" if structured else "free_text"]
+        counters["responses"] += 1
+        started = time.perf_counter()
         
         try:
-            # Clean up potential markdown code fences (exact logic from n8n Code node)
-            cleaned_text = self._clean_markdown_fences(raw_response)
-            
-            # Parse the cleaned text into a real JSON object
-            json_data = self._parse_json(cleaned_text)
+            if structured:
+                json_data = self._parse_structured_json(raw_response)
+            else:
+                # Clean up potential markdown code fences (exact logic from n8n Code node)
+                with span("clean_fences"):
+                    cleaned_text = self._clean_markdown_fences(raw_response)
+                
+                # Parse the cleaned text into a real JSON object
+                json_data = self._parse_json(cleaned_text)
             
             # Validate and convert to GameSchema
-            game_schema = self._validate_game_schema(json_data)
+            with span("validate_schema"):
+                game_schema = self._validate_game_schema(json_data)
             
+            counters["processing_ms_total"] += (time.perf_counter() - started) * 1000
             self.logger.info(f"Successfully processed response into game: {game_schema.id}")
             return game_schema
             
         except Exception as e:
+            counters["failures"] += 1
+            counters["processing_ms_total"] += (time.perf_counter() - started) * 1000
             self.logger.error(f"Failed to process response: {str(e)}")
             self.logger.error(f"Exception type: {type(e).__name__}")
             self.logger.error(f"Raw response (first 1000 chars): {raw_response[:1000] if raw_response else 'None'}")
@@ -53,6 +96,34 @@ class ResponseProcessor:
             self.logger.error(f"Full traceback: {traceback.format_exc()}")
             raise Exception(f"Failed to process LLM response: {str(e)}")
     
+    def stitch_continuation(self, partial: str, continuation: str) -> str:
+        """
+        A response cut off by MAX_TOKENS followed by the continuation Gemini was asked for
+        Models resuming their own output tend to repeat its last characters and to
+        reopen the code block; the longest repeated overlap is kept once and a reopened
+        fence is dropped. A continuation that starts the object over replaces the partial
+        response instead
+        """
+        self._stitch_counters["stitched"] += 1
+        
+        fence = _CONTINUATION_FENCE.match(continuation)
+        if fence:
+            continuation = continuation[fence.end():]
+            self._stitch_counters["fences_dropped"] += 1
+        
+        start = partial.find("{")
+        restart = continuation.lstrip()
+        if start != -1 and len(partial) - start >= _RESTART_PREFIX and \
+                restart.startswith(partial[start:start + _RESTART_PREFIX]):
+            self._stitch_counters["restarts"] += 1
+            return restart
+        
+        for overlap in range(min(len(partial), len(continuation), _MAX_OVERLAP), _MIN_OVERLAP - 1, -1):
+            if partial.endswith(continuation[:overlap]):
+                self._stitch_counters["overlap_chars_dropped"] += overlap
+                return partial + continuation[overlap:]
+        return partial + continuation
+    
     def _clean_markdown_fences(self, raw_text: str) -> str:
         """
         Clean up potential markdown code fences
@@ -76,139 +147,110 @@ class ResponseProcessor:
     
     def _remove_additional_artifacts(self, text: str) -> str:
         """Remove additional LLM response artifacts"""
-        # Remove common prefixes
-        prefixes_to_remove = [
-            "Here's the JSON:",
-            "Here is the JSON:",
-            "JSON:",
-            "Response:",
-            "Game:",
-            "```json",
-            "```"
-        ]
+        # Work on bounds and slice once at the end, instead of copying the text per artifact
+        start, end = 0, len(text)
         
-        for prefix in prefixes_to_remove:
-            if text.startswith(prefix):
-                text = text[len(prefix):].strip()
+        # Remove common prefixes
+        for prefix in _ARTIFACT_PREFIXES:
+            if text.startswith(prefix, start, end):
+                start, end = _strip_bounds(text, start + len(prefix), end)
         
         # Remove common suffixes
-        suffixes_to_remove = [
-            "```",
-            "End of JSON",
-            "That's it!",
-            "Hope this helps!"
-        ]
-        
-        for suffix in suffixes_to_remove:
-            if text.endswith(suffix):
-                text = text[:-len(suffix)].strip()
-        
-        # Remove any remaining markdown artifacts
-        text = re.sub(r'^```[a-zA-Z]*\n?', '', text)  # Remove opening code blocks
-        text = re.sub(r'\n?```$', '', text)           # Remove closing code blocks
-        
-        return text
+        for suffix in _ARTIFACT_SUFFIXES:
+            if text.endswith(suffix, start, end):
+                start, end = _strip_bounds(text, start, end - len(suffix))
+        
+        # Remove any remaining markdown artifacts: an opening code block, then a closing one
+        opening = _OPENING_FENCE.match(text, start, end)
+        if opening:
+            start = opening.end()
+        # ('$' also matches before a final newline, which is kept)
+        tail = "\n" if text.endswith("```\n", start, end) else ""
+        if tail or text.endswith("```", start, end):
+            fence = end - len(tail) - 3
+            if fence > start and text[fence - 1] == "\n":
+                fence -= 1
+            return text[start:fence] + tail
+        
+        return text[start:end]
     
     def _parse_json(self, cleaned_text: str) -> Dict[str, Any]:
         """Parse cleaned text into JSON object"""
         self.logger.debug("Parsing cleaned text as JSON...")
         
         try:
-            json_data = json.loads(cleaned_text)
+            with span("json_loads"):
+                json_data = json.loads(cleaned_text)
+            self._counters["free_text"]["parsed_directly"] += 1
             return json_data
         except json.JSONDecodeError as e:
             self.logger.error(f"JSON parsing failed: {str(e)}")
             self.logger.debug(f"Problematic text (first 500 chars): {cleaned_text[:500]}")
             
             # Attempt to fix common JSON issues
-            fixed_text = self._attempt_json_fix(cleaned_text)
+            with span("json_fix"):
+                fixed_text = self._attempt_json_fix(cleaned_text)
             try:
-                return json.loads(fixed_text)
+                with span("json_loads"):
+                    json_data = json.loads(fixed_text)
+                self._counters["free_text"]["repaired"] += 1
+                return json_data
             except json.JSONDecodeError as e2:
                 self.logger.error(f"JSON fix also failed: {str(e2)}")
                 raise Exception(f"Invalid JSON in LLM response: {str(e)}")
     
+    def _parse_structured_json(self, raw_text: str) -> Dict[str, Any]:
+        """Parse a schema-constrained response; it is either valid JSON or truncated/blocked"""
+        try:
+            with span("json_loads"):
+                json_data = json.loads(raw_text)
+        except json.JSONDecodeError as e:
+            raise Exception(f"Invalid JSON in structured LLM response: {str(e)}")
+        if not isinstance(json_data, dict):
+            raise Exception("Structured LLM response is not a JSON object")
+        self._counters["structured"]["parsed_directly"] += 1
+        return json_data
+    
+    def stats(self) -> Dict[str, Any]:
+        """Parse outcomes and average processing time per output mode, and continuation stitching"""
+        result = {}
+        for mode, counters in self._counters.items():
+            responses = counters["responses"]
+            result[mode] = {
+                "responses": responses,
+                "parsed_directly": counters["parsed_directly"],
+                "repaired": counters["repaired"],
+                "failures": counters["failures"],
+                "failure_rate": round(counters["failures"] / responses, 4) if responses else 0.0,
+                "avg_processing_ms": round(counters["processing_ms_total"] / responses, 3) if responses else None
+            }
+        result["continuations"] = dict(self._stitch_counters)
+        return result
+    
     def _attempt_json_fix(self, text: str) -> str:
         """Attempt to fix common JSON formatting issues"""
         self.logger.debug("Attempting to fix JSON formatting issues...")
         
         # First, try to extract JSON from markdown if present
-        text = self._extract_json_from_markdown(text)
-        
-        # Common fixes - apply in order of specificity
-        fixes = [
-            # Fix double curly braces (common LLM issue) - do this first
-            (r'\{\{', r'{'),
-            (r'\}\}', r'}'),
-            # Fix boolean values (Python style to JSON)
-            (r':\s*True\b', ': true'),
-            (r':\s*False\b', ': false'),
-            (r':\s*None\b', ': null'),
-            # Fix trailing commas
-            (r',(\s*[}\]])', r'\1'),
-            # Fix missing commas between objects
-            (r'}(\s*){', r'},\1{'),
-            # Fix missing commas between array elements
-            (r'}(\s*)\[', r'},\1['),
-            (r'\](\s*){', r'],\1{'),
-        ]
-        
-        for pattern, replacement in fixes:
-            text = re.sub(pattern, replacement, text)
-        
-        # Additional cleaning
-        text = self._clean_json_text(text)
-        
-        return text
+        located = locate_json_object(text)
+        if located is None:
+            extracted = text
+        else:
+            extracted = text[located.start:located.end]
+            # Often that is all it takes (the locator parsed it)
+            if located.valid:
+                return extracted
+        
+        # Repair what is left (commas, Python literals, quoting, truncation) in one string-aware pass
+        with span("json_repair"):
+            return repair_json(extracted)
     
     def _extract_json_from_markdown(self, text: str) -> str:
-        """Extract JSON from markdown code blocks"""
-        # Look for JSON in code blocks with more flexible matching
-        json_patterns = [
-            r'```(?:json)?\s*(\{.*?\})\s*```',  # Standard markdown
-            r'```json\s*(\{.*?\})\s*```',        # Explicit json
-            r'```\s*(\{.*?\})\s*```',            # Generic code block
-        ]
-        
-        for pattern in json_patterns:
-            match = re.search(pattern, text, re.DOTALL)
-            if match:
-                return match.group(1)
-        
-        # Look for JSON without code blocks but with extra text
-        json_start = text.find('{')
-        json_end = text.rfind('}')
-        if json_start != -1 and json_end != -1 and json_end > json_start:
-            return text[json_start:json_end + 1]
-        
-        return text
-    
-    def _clean_json_text(self, text: str) -> str:
-        """Clean up common JSON text issues"""
-        # Remove any leading/trailing whitespace
-        text = text.strip()
-        
-        # Remove any text before the first {
-        first_brace = text.find('{')
-        if first_brace > 0:
-            text = text[first_brace:]
-        
-        # Remove any text after the last }
-        last_brace = text.rfind('}')
-        if last_brace != -1 and last_brace < len(text) - 1:
-            text = text[:last_brace + 1]
-        
-        # Remove control characters that can break JSON parsing
-        import string
-        printable = set(string.printable)
-        text = ''.join(char for char in text if char in printable or char in '\n\t')
-        
-        # Fix common string escaping issues
-        text = text.replace('\\"', '"')  # Unescape quotes
-        text = text.replace('\\n', '\\n')  # Keep newlines as \n
-        text = text.replace('\\t', '\\t')  # Keep tabs as \t
-        
-        return text
+        """Extract the outermost JSON object from fences and surrounding prose"""
+        located = locate_json_object(text)
+        if located is None:
+            return text
+        return text[located.start:located.end]
     
     def _validate_game_schema(self, json_data: Dict[str, Any]) -> GameSchema:
         """Validate JSON data against GameSchema"""
@@ -0,0 +1,170 @@
+"""
+Gemini Response Schema
+Converts the Pydantic game models into the OpenAPI subset Gemini accepts as
+generationConfig.responseSchema, so structured output mode can constrain decoding
+to a valid game instead of repairing free text afterwards
+"""
+
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence, Type
+
+from pydantic import BaseModel
+
+from app.core.logging_config import get_logger
+from app.models.game_schemas import (
+    GameSchema, QuizContent, DragDropContent, MemoryMatchContent, SortingContent,
+    MatchingContent, StorySequenceContent, FillBlankContent, CardFlipContent,
+    WordPuzzleContent, PuzzleAssemblyContent, AnxietyAdventureContent
+)
+
+logger = get_logger(__name__)
+
+# Content model per game type (GameSchema.content is an untyped dict)
+CONTENT_MODELS: Dict[str, Type[BaseModel]] = {
+    "quiz": QuizContent,
+    "drag-drop": DragDropContent,
+    "memory-match": MemoryMatchContent,
+    "sorting": SortingContent,
+    "matching": MatchingContent,
+    "story-sequence": StorySequenceContent,
+    "fill-blank": FillBlankContent,
+    "card-flip": CardFlipContent,
+    "word-puzzle": WordPuzzleContent,
+    "puzzle-assembly": PuzzleAssemblyContent,
+    "anxiety-adventure": AnxietyAdventureContent
+}
+
+# Filled in by the server after generation
+_SERVER_FIELDS = ("generatedAt", "version")
+
+_TYPE_NAMES = {
+    "object": "OBJECT",
+    "array": "ARRAY",
+    "string": "STRING",
+    "integer": "INTEGER",
+    "number": "NUMBER",
+    "boolean": "BOOLEAN"
+}
+
+
+class UnsupportedSchemaError(ValueError):
+    """The model uses a construct Gemini's responseSchema cannot express"""
+
+
+class _Converter:
+    """Inlines $refs and maps one JSON Schema document onto Gemini's Schema object"""
+
+    def __init__(self, document: Dict[str, Any]):
+        self.definitions = document.get("$defs", {})
+
+    def convert(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        if "$ref" in node:
+            return self.convert(self.definitions[node["$ref"].split("/")[-1]])
+
+        if "anyOf" in node:
+            variants = [variant for variant in node["anyOf"] if variant.get("type") != "null"]
+            nullable = len(variants) < len(node["anyOf"])
+            # Union[str, List[str]] and friends: constrain to the first (preferred) variant
+            schema = self.convert(variants[0])
+            if nullable:
+                schema["nullable"] = True
+            return self._describe(schema, node)
+
+        json_type = node.get("type")
+        if json_type not in _TYPE_NAMES:
+            raise UnsupportedSchemaError(f"unsupported schema node: {node}")
+
+        schema: Dict[str, Any] = {"type": _TYPE_NAMES[json_type]}
+
+        if "enum" in node:
+            schema["enum"] = [str(value) for value in node["enum"]]
+            if json_type == "string":
+                schema["format"] = "enum"
+        elif "const" in node:
+            schema["enum"] = [str(node["const"])]
+            schema["format"] = "enum"
+
+        if json_type == "object":
+            properties = node.get("properties")
+            if not properties:
+                # Dict[str, X] maps have no fixed keys, which responseSchema cannot describe
+                raise UnsupportedSchemaError("objects without fixed properties are not supported")
+            schema["properties"] = {name: self.convert(child) for name, child in properties.items()}
+            schema["propertyOrdering"] = list(properties)
+            if node.get("required"):
+                schema["required"] = list(node["required"])
+        elif json_type == "array":
+            schema["items"] = self.convert(node.get("items", {"type": "string"}))
+            for limit in ("minItems", "maxItems"):
+                if limit in node:
+                    schema[limit] = str(node[limit])
+        elif json_type in ("integer", "number"):
+            for limit in ("minimum", "maximum"):
+                if limit in node:
+                    schema[limit] = node[limit]
+
+        return self._describe(schema, node)
+
+    @staticmethod
+    def _describe(schema: Dict[str, Any], node: Dict[str, Any]) -> Dict[str, Any]:
+        notes = [node["description"]] if node.get("description") else []
+        if "pattern" in node:
+            notes.append(f"Must match {node['pattern']}")
+        if "maxLength" in node:
+            notes.append(f"At most {node['maxLength']} characters")
+        if notes and "description" not in schema:
+            schema["description"] = ". ".join(notes)
+        return schema
+
+
+def model_schema(model: Type[BaseModel], overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Gemini responseSchema for a single Pydantic model
+    overrides replaces top-level properties with ready-made Gemini schemas (None drops them)
+    """
+    document = model.model_json_schema()
+    overrides = overrides or {}
+    converter = _Converter(document)
+
+    properties = {}
+    for name, node in document["properties"].items():
+        if name not in overrides:
+            properties[name] = converter.convert(node)
+        elif overrides[name] is not None:
+            properties[name] = overrides[name]
+
+    schema = {"type": "OBJECT", "properties": properties, "propertyOrdering": list(properties)}
+    required = [name for name in document.get("required", []) if name in properties]
+    if required:
+        schema["required"] = required
+    return schema
+
+
+@lru_cache(maxsize=64)
+def _game_schema(game_types: Sequence[str]) -> Optional[Dict[str, Any]]:
+    expressible: List[str] = []
+    contents: List[Dict[str, Any]] = []
+    for game_type in game_types:
+        try:
+            contents.append(model_schema(CONTENT_MODELS[game_type]))
+            expressible.append(game_type)
+        except UnsupportedSchemaError as e:
+            logger.info(f"Leaving {game_type} out of the responseSchema: {e}")
+
+    if not contents:
+        return None
+
+    overrides: Dict[str, Optional[Dict[str, Any]]] = {name: None for name in _SERVER_FIELDS}
+    overrides["type"] = {"type": "STRING", "format": "enum", "enum": expressible}
+    overrides["content"] = contents[0] if len(contents) == 1 else {"anyOf": contents}
+    return model_schema(GameSchema, overrides)
+
+
+def build_response_schema(game_types: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    responseSchema for a game of one of the given types (all types when omitted)
+    Types whose content cannot be expressed (e.g. keyed maps) are left out of the
+    schema; None means none of them can be, and callers fall back to plain JSON mode
+    """
+    selected = tuple(game_types) if game_types else tuple(CONTENT_MODELS)
+    return _game_schema(selected)
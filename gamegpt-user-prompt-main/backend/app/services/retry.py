@@ -0,0 +1,222 @@
+"""
+Retry Engine for Gemini calls
+Exponential backoff with full jitter, server-provided retry delays (Retry-After / RetryInfo),
+ErrorCode-based classification and a global retry budget that caps retries to a share
+of recent requests, so an upstream brownout does not turn into a retry storm
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.exceptions import ErrorCode, ExternalServiceException, GameGPTException
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Always transient
+RETRYABLE_ERROR_CODES = {
+    ErrorCode.GEMINI_RATE_LIMIT,
+    ErrorCode.TIMEOUT_ERROR,
+    ErrorCode.SERVICE_UNAVAILABLE
+}
+
+# GEMINI_API_ERROR covers both transient (5xx, connection) and permanent (4xx, bad payload) failures
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an LLM failure is worth retrying"""
+    if not isinstance(error, GameGPTException):
+        return False
+    if error.error_code in RETRYABLE_ERROR_CODES:
+        return True
+    if error.error_code == ErrorCode.GEMINI_API_ERROR:
+        status_code = error.details.get("external_status_code")
+        if status_code is None:
+            # No HTTP response at all: connection failure
+            return error.details.get("operation") == "connection"
+        return status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server-requested delay carried by the exception, if any"""
+    if isinstance(error, ExternalServiceException):
+        value = error.details.get("retry_after_seconds")
+        if isinstance(value, (int, float)) and value >= 0:
+            return float(value)
+    return None
+
+
+class RetryBudget:
+    """
+    Token bucket of retries
+    Every request deposits `ratio` tokens and every retry withdraws one, so retries stay
+    below roughly ratio x request volume; a small per-second allowance keeps low-traffic
+    instances able to retry at all
+    """
+
+    def __init__(
+        self,
+        ratio: float,
+        min_per_second: float,
+        max_tokens: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._clock = clock
+        self._tokens = max_tokens
+        self._last_refill = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._last_refill) * self.min_per_second)
+        self._last_refill = now
+
+    def record_request(self) -> None:
+        self._refill()
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+class RetryEngine:
+    """Runs an async operation with classified, jittered, budgeted retries"""
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        max_retry_after: Optional[float] = None,
+        budget: Optional[RetryBudget] = None,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        rng: Callable[[], float] = random.random
+    ):
+        self.settings = get_settings()
+        self.logger = logger
+        self.max_attempts = max_attempts if max_attempts is not None else self.settings.RETRY_MAX_ATTEMPTS
+        self.base_delay = base_delay if base_delay is not None else self.settings.RETRY_BASE_DELAY
+        self.max_delay = max_delay if max_delay is not None else self.settings.RETRY_MAX_DELAY
+        self.max_retry_after = (
+            max_retry_after if max_retry_after is not None else self.settings.RETRY_MAX_RETRY_AFTER
+        )
+        self.budget = budget or RetryBudget(
+            ratio=self.settings.RETRY_BUDGET_RATIO,
+            min_per_second=self.settings.RETRY_BUDGET_MIN_PER_SECOND,
+            max_tokens=self.settings.RETRY_BUDGET_MAX_TOKENS
+        )
+        self._sleep = sleep
+        self._rng = rng
+
+        self._counters = {
+            "operations": 0,
+            "attempts": 0,
+            "retries": 0,
+            "succeeded_after_retry": 0,
+            "exhausted": 0,
+            "not_retryable": 0,
+            "budget_rejections": 0,
+            "retry_after_honored": 0,
+            "retry_after_too_long": 0,
+            "backoff_seconds_total": 0.0
+        }
+        self._retries_by_code: Dict[str, int] = {}
+
+    def backoff(self, retry_number: int) -> float:
+        """Full jitter: uniform in [0, min(max_delay, base_delay * 2^(retry_number - 1))]"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (retry_number - 1)))
+        return self._rng() * ceiling
+
+    def delay_for(self, error: Exception, retry_number: int) -> Optional[float]:
+        """Delay before the next attempt, or None if the server asked for longer than we will wait"""
+        server_delay = retry_after_seconds(error)
+        if server_delay is None:
+            return self.backoff(retry_number)
+        if server_delay > self.max_retry_after:
+            self._counters["retry_after_too_long"] += 1
+            return None
+        self._counters["retry_after_honored"] += 1
+        # Spread clients that were all told the same delay
+        return server_delay + self.backoff(1)
+
+    async def run(self, operation: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Call fn until it succeeds, fails permanently, or attempts/budget run out"""
+        self._counters["operations"] += 1
+        self.budget.record_request()
+        attempt = 1
+
+        while True:
+            self._counters["attempts"] += 1
+            try:
+                result = await fn()
+            except Exception as error:
+                delay = self._next_delay(operation, error, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await self._sleep(delay)
+                continue
+
+            if attempt > 1:
+                self._counters["succeeded_after_retry"] += 1
+                self.logger.info(f"{operation} succeeded on attempt {attempt}")
+            return result
+
+    def _next_delay(self, operation: str, error: Exception, attempt: int) -> Optional[float]:
+        """Decide whether to retry after a failed attempt; returns the delay or None to give up"""
+        code = error.error_code.value if isinstance(error, GameGPTException) else type(error).__name__
+
+        if not is_retryable(error):
+            self._counters["not_retryable"] += 1
+            return None
+        if attempt >= self.max_attempts:
+            self._counters["exhausted"] += 1
+            self.logger.warning(f"{operation} failed after {attempt} attempts ({code}); giving up")
+            return None
+
+        delay = self.delay_for(error, attempt)
+        if delay is None:
+            self.logger.warning(
+                f"{operation} failed with {code}; server asked to wait {retry_after_seconds(error):.0f}s, not retrying"
+            )
+            return None
+        if not self.budget.try_acquire():
+            self._counters["budget_rejections"] += 1
+            self.logger.warning(f"{operation} failed with {code}; retry budget exhausted, not retrying")
+            return None
+
+        self._counters["retries"] += 1
+        self._counters["backoff_seconds_total"] += delay
+        self._retries_by_code[code] = self._retries_by_code.get(code, 0) + 1
+        self.logger.warning(
+            f"Retrying {operation} after {code} (attempt {attempt + 1}/{self.max_attempts}) in {delay:.2f}s"
+        )
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        """Retry counters, retries per ErrorCode and remaining budget"""
+        return {
+            **self._counters,
+            "backoff_seconds_total": round(self._counters["backoff_seconds_total"], 3),
+            "retries_by_code": dict(self._retries_by_code),
+            "budget_tokens": round(self.budget.tokens, 2),
+            "max_attempts": self.max_attempts
+        }
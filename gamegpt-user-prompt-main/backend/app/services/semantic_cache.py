@@ -0,0 +1,314 @@
+"""
+Semantic Cache Service
+Near-duplicate prompt lookup in front of the Gemini pipeline: prompts are reduced to
+word and character-trigram shingles, sketched with MinHash and indexed with LSH bands,
+so "stress quiz for teens" can reuse the game generated for "a quiz on stress for teenagers".
+Runs entirely in-process (NumPy); no embedding service is involved.
+"""
+
+import hashlib
+import json
+import re
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.models.game_schemas import GameGenerationRequest
+from app.services.game_type_classifier import classify_category
+from app.services.prompt_builder import PromptBuilder
+from app.services.prompt_templates import PromptTemplates
+
+logger = get_logger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words that do not change what game is being asked for
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "for", "to", "of", "on", "in", "about", "with", "by", "at",
+    "my", "me", "i", "we", "our", "you", "your", "that", "this", "some", "is", "are", "be",
+    "please", "create", "make", "generate", "build", "design", "want", "need", "can", "could",
+    "would", "like", "give", "new", "fun", "game", "games", "interactive", "help", "helps"
+}
+
+# Collapse common spelling variants onto one token (applied after suffix stripping)
+SYNONYMS = {
+    "teenag": "teen", "adolescent": "teen", "youth": "teen",
+    "kid": "child", "children": "child", "student": "child",
+    "adult": "grownup",
+    "anxious": "anxiety", "stressful": "stress", "stressed": "stress",
+    "mindful": "mindfulness", "emotion": "feeling", "emotional": "feeling"
+}
+
+_SUFFIXES = ("ers", "ing", "ies", "ed", "es", "er", "s")
+
+_HIGH_BITS = np.uint64(32)
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lowercase, drop stopwords, strip common suffixes and map spelling variants"""
+    tokens = []
+    for word in _TOKEN_PATTERN.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        word = SYNONYMS.get(word, word)
+        stemmed = _stem(word)
+        tokens.append(SYNONYMS.get(stemmed, stemmed))
+    return tokens
+
+
+def shingles(text: str) -> Set[str]:
+    """Word shingles plus boundary-padded character trigrams (tolerates typos and inflections)"""
+    result: Set[str] = set()
+    for token in normalize_tokens(text):
+        result.add(token)
+        padded = f"#{token}#"
+        result.update(f"~{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return result
+
+
+class MinHasher:
+    """MinHash signatures via multiply-shift hashing of 32-bit shingle hashes"""
+
+    def __init__(self, num_perm: int, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # Odd multipliers make (a * x + b) mod 2^64 a universal family; the top 32 bits are kept
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, items: Set[str]) -> np.ndarray:
+        if not items:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        hashes = np.fromiter(
+            (zlib.crc32(item.encode("utf-8")) for item in items), dtype=np.uint64, count=len(items)
+        )
+        with np.errstate(over="ignore"):
+            permuted = (hashes[:, None] * self.a + self.b) >> _HIGH_BITS
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+@dataclass
+class SemanticEntry:
+    """A stored game with the prompt it was generated for"""
+    key: str
+    scope: bytes
+    prompt: str
+    value: Dict[str, Any]
+    expires_at: float
+
+
+class SemanticCache:
+    """
+    MinHash/LSH index over past prompts and their generated games
+
+    Only prompts with identical structured parameters, model settings, templates and
+    classified game types / category are compared, so a near-duplicate never changes
+    what kind of game is served. The index holds at most SEMANTIC_CACHE_MAX_ENTRIES
+    entries (least recently used evicted first) for SEMANTIC_CACHE_TTL seconds each.
+    """
+
+    def __init__(
+        self,
+        prompt_builder: PromptBuilder,
+        max_entries: Optional[int] = None,
+        threshold: Optional[float] = None,
+        num_perm: Optional[int] = None,
+        bands: Optional[int] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.settings = get_settings()
+        self.logger = logger
+        self.prompt_builder = prompt_builder
+        self.clock = clock
+        self.enabled = self.settings.SEMANTIC_CACHE_ENABLED
+        self.ttl = self.settings.SEMANTIC_CACHE_TTL
+        self.max_entries = max_entries if max_entries is not None else self.settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self.threshold = threshold if threshold is not None else self.settings.SEMANTIC_CACHE_THRESHOLD
+        num_perm = num_perm if num_perm is not None else self.settings.SEMANTIC_CACHE_NUM_PERM
+        bands = bands if bands is not None else self.settings.SEMANTIC_CACHE_BANDS
+        if bands <= 0 or num_perm % bands:
+            raise ValueError("SEMANTIC_CACHE_NUM_PERM must be a multiple of SEMANTIC_CACHE_BANDS")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+
+        # Signatures live in one growable matrix; slots are reused after eviction
+        self._signatures = np.zeros((min(1024, max(1, self.max_entries)), num_perm), dtype=np.uint32)
+        self._entries: Dict[int, SemanticEntry] = {}
+        self._slots_by_key: Dict[str, int] = {}
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+        self._free_slots: List[int] = []
+        self._next_slot = 0
+        self._buckets: List[Dict[bytes, Set[int]]] = [{} for _ in range(bands)]
+
+        self._counters = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "adds": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "candidates_total": 0,
+            "lookup_ms_total": 0.0
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def health_check(self) -> Dict[str, Any]:
+        """Health check for the semantic cache"""
+        return {"status": "healthy", "service": "semantic_cache", "enabled": self.enabled}
+
+    def scope(self, request: GameGenerationRequest) -> bytes:
+        """Everything besides prompt wording that must match for a game to be reused"""
+        text = " ".join(filter(None, [request.prompt, request.theme]))
+        game_types, _ = self.prompt_builder.select_game_types(request)
+        material = {
+            "parameters": request.structured_parameters(),
+            "game_types": sorted(game_type.value for game_type in game_types),
+            "category": classify_category(text),
+            "model": self.settings.GOOGLE_MODEL,
+            "temperature": self.settings.TEMPERATURE,
+            "templates": PromptTemplates.fingerprint()
+        }
+        return hashlib.blake2b(json.dumps(material, sort_keys=True).encode("utf-8"), digest_size=8).digest()
+
+    def _band_keys(self, scope: bytes, signature: np.ndarray) -> List[bytes]:
+        rows = self.rows
+        return [scope + signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+    def lookup(
+        self,
+        request: GameGenerationRequest,
+        exclude_key: Optional[str] = None
+    ) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Most similar stored game at or above the threshold, as (game, similarity)
+        exclude_key skips the entry stored under that exact cache key (e.g. when revalidating it)
+        """
+        started = time.perf_counter()
+        self._counters["lookups"] += 1
+        try:
+            signature = self.hasher.signature(shingles(request.prompt))
+            match = self._best_match(self.scope(request), signature, exclude_key)
+        finally:
+            self._counters["lookup_ms_total"] += (time.perf_counter() - started) * 1000
+
+        if match is None:
+            self._counters["misses"] += 1
+            return None
+        self._counters["hits"] += 1
+        slot, similarity = match
+        entry = self._entries[slot]
+        self._lru.move_to_end(slot)
+        self.logger.info(
+            f"Semantic cache hit ({similarity:.2f}): '{request.prompt[:60]}' ~ '{entry.prompt[:60]}'"
+        )
+        return entry.value, similarity
+
+    def _best_match(
+        self,
+        scope: bytes,
+        signature: np.ndarray,
+        exclude_key: Optional[str]
+    ) -> Optional[Tuple[int, float]]:
+        candidates: Set[int] = set()
+        for band, band_key in enumerate(self._band_keys(scope, signature)):
+            candidates.update(self._buckets[band].get(band_key, ()))
+        self._counters["candidates_total"] += len(candidates)
+        if not candidates:
+            return None
+
+        now = self.clock()
+        for slot in [slot for slot in candidates if self._entries[slot].expires_at <= now]:
+            self._remove(slot)
+            self._counters["expirations"] += 1
+            candidates.discard(slot)
+        if exclude_key is not None and exclude_key in self._slots_by_key:
+            candidates.discard(self._slots_by_key[exclude_key])
+        if not candidates:
+            return None
+
+        slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarities = (self._signatures[slots] == signature).mean(axis=1)
+        best = int(similarities.argmax())
+        if similarities[best] < self.threshold:
+            return None
+        return int(slots[best]), float(similarities[best])
+
+    def add(self, request: GameGenerationRequest, key: str, value: Dict[str, Any]) -> None:
+        """Index a generated game; replaces any entry with the same cache key"""
+        if key in self._slots_by_key:
+            self._remove(self._slots_by_key[key])
+        while len(self._entries) >= self.max_entries:
+            oldest, _ = self._lru.popitem(last=False)
+            self._remove(oldest, in_lru=False)
+            self._counters["evictions"] += 1
+
+        slot = self._allocate_slot()
+        signature = self.hasher.signature(shingles(request.prompt))
+        scope = self.scope(request)
+        self._signatures[slot] = signature
+        self._entries[slot] = SemanticEntry(
+            key=key, scope=scope, prompt=request.prompt, value=value, expires_at=self.clock() + self.ttl
+        )
+        self._slots_by_key[key] = slot
+        self._lru[slot] = None
+        for band, band_key in enumerate(self._band_keys(scope, signature)):
+            self._buckets[band].setdefault(band_key, set()).add(slot)
+        self._counters["adds"] += 1
+
+    def _allocate_slot(self) -> int:
+        if self._free_slots:
+            return self._free_slots.pop()
+        slot = self._next_slot
+        if slot >= len(self._signatures):
+            grown = np.zeros((min(self.max_entries, 2 * len(self._signatures)), self._signatures.shape[1]),
+                             dtype=np.uint32)
+            grown[:len(self._signatures)] = self._signatures
+            self._signatures = grown
+        self._next_slot += 1
+        return slot
+
+    def _remove(self, slot: int, in_lru: bool = True) -> None:
+        entry = self._entries.pop(slot)
+        del self._slots_by_key[entry.key]
+        if in_lru:
+            del self._lru[slot]
+        for band, band_key in enumerate(self._band_keys(entry.scope, self._signatures[slot])):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(slot)
+                if not bucket:
+                    del self._buckets[band][band_key]
+        self._free_slots.append(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate, index size and lookup cost"""
+        lookups = self._counters["lookups"]
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "num_perm": self.hasher.num_perm,
+            "bands": self.bands,
+            **{name: value for name, value in self._counters.items() if name not in ("lookup_ms_total", "candidates_total")},
+            "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+            "avg_candidates": round(self._counters["candidates_total"] / lookups, 2) if lookups else 0.0,
+            "avg_lookup_ms": round(self._counters["lookup_ms_total"] / lookups, 3) if lookups else 0.0,
+            "signature_bytes": int(self._signatures.nbytes)
+        }
@@ -0,0 +1,80 @@
+"""
+Single-Flight Service
+Coalesces concurrent identical requests so only one upstream call is made per key
+"""
+
+import asyncio
+from typing import Dict, Any, Callable, Awaitable, TypeVar
+
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    In-process request coalescing
+
+    The first caller for a key starts the work as an independent task; every
+    concurrent caller for the same key awaits that task through asyncio.shield,
+    so cancelling one waiter (e.g. a client disconnect) never cancels the shared
+    call or the other waiters.
+    """
+
+    def __init__(self):
+        self.logger = logger
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._counters = {
+            "leader_calls": 0,
+            "coalesced_calls": 0,
+            "cancelled_waiters": 0
+        }
+
+    def health_check(self) -> Dict[str, Any]:
+        """Health check for single-flight coalescing"""
+        return {"status": "healthy", "service": "single_flight", "inflight": len(self._inflight)}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn once per key among concurrent callers and share its result"""
+        task = self._inflight.get(key)
+
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._on_done(key, done))
+            self._counters["leader_calls"] += 1
+        else:
+            self._counters["coalesced_calls"] += 1
+            self.logger.debug(f"Coalesced request onto in-flight call {key[:12]}")
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                self._counters["cancelled_waiters"] += 1
+            raise
+
+    def _on_done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Coalescing counters; coalesced_calls is the number of upstream calls saved"""
+        return {
+            "inflight": len(self._inflight),
+            **self._counters,
+            "upstream_calls_saved": self._counters["coalesced_calls"]
+        }
+
+    async def close(self) -> None:
+        """Cancel any in-flight shared calls"""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
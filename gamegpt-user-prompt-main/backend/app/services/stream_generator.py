@@ -0,0 +1,300 @@
+"""
+Streaming Generation Service
+Streams a game to the client while Gemini is still generating it:
+header fields and content elements are emitted as soon as each is complete,
+followed by the fully validated GameSchema.
+Partial output is validated as it arrives; clearly invalid or degenerate
+generations are aborted and retried with corrective instructions.
+"""
+
+import asyncio
+import time
+from typing import Dict, Any, List, AsyncIterator, Optional, Callable, Awaitable
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.exceptions import GameGPTException, ErrorCode, ErrorDetail, CircuitOpenException
+from app.models.game_schemas import GameGenerationRequest
+from app.services.prompt_builder import PromptBuilder
+from app.services.llm_service import LLMService
+from app.services.response_processor import ResponseProcessor
+from app.services.generation_cache import GenerationCache, CACHE_FRESH
+from app.services.stream_parser import IncrementalGameParser, StreamEvent, EVENT_ITEM
+from app.services.stream_validator import StreamingValidator, StreamAbort, correction_instructions
+
+logger = get_logger(__name__)
+
+_END = object()
+
+
+class StreamingGenerator:
+    """
+    Producer/consumer bridge between the Gemini stream and an SSE response
+
+    The producer task reads from Gemini and pushes events into a bounded queue;
+    a slow reader fills the queue, which pauses the producer and therefore the
+    upstream read. Closing the consumer cancels the producer and aborts Gemini.
+    """
+
+    def __init__(
+        self,
+        prompt_builder: PromptBuilder,
+        llm_service: LLMService,
+        response_processor: ResponseProcessor,
+        generation_cache: GenerationCache
+    ):
+        self.settings = get_settings()
+        self.logger = logger
+        self.prompt_builder = prompt_builder
+        self.llm_service = llm_service
+        self.response_processor = response_processor
+        self.generation_cache = generation_cache
+        self._counters = {
+            "streams_started": 0,
+            "streams_completed": 0,
+            "streams_failed": 0,
+            "streams_cancelled": 0,
+            "cache_hits": 0,
+            "circuit_open_fallbacks": 0,
+            "time_to_first_item_ms_total": 0.0,
+            "time_to_first_item_count": 0,
+            "time_to_complete_ms_total": 0.0,
+            "time_to_complete_count": 0
+        }
+        self._aborts: Dict[str, int] = {}
+        self._tokens_generated_before_abort = 0
+        self._tokens_saved_estimate = 0
+        self._completed_output_tokens_total = 0
+        self._completed_outputs = 0
+
+    def health_check(self) -> Dict[str, Any]:
+        """Health check for streaming generation"""
+        return {"status": "healthy", "service": "stream_generator"}
+
+    async def stream(self, request: GameGenerationRequest) -> AsyncIterator[Dict[str, Any]]:
+        """Yield {"event": name, "data": payload} dicts for one generation"""
+        self._counters["streams_started"] += 1
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.settings.STREAM_QUEUE_SIZE)
+        producer = asyncio.create_task(self._produce(request, queue))
+        finished = False
+
+        try:
+            while True:
+                event = await queue.get()
+                if event is _END:
+                    finished = True
+                    break
+                yield event
+        finally:
+            if not finished:
+                self._counters["streams_cancelled"] += 1
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    async def _produce(self, request: GameGenerationRequest, queue: asyncio.Queue) -> None:
+        started = time.perf_counter()
+        first_item_ms: Optional[float] = None
+
+        try:
+            key = self.generation_cache.build_key(request)
+            if self.generation_cache.enabled:
+                cached, state = await self.generation_cache.get(key)
+                if state == CACHE_FRESH:
+                    self._counters["cache_hits"] += 1
+                    await queue.put({"event": "game", "data": cached})
+                    await queue.put(_END)
+                    self._counters["streams_completed"] += 1
+                    return
+
+            try:
+                prompt_result = self.prompt_builder.build_prompt(request)
+                full_prompt = prompt_result.prompt
+            except Exception as e:
+                raise GameGPTException(
+                    message=f"Prompt building failed: {str(e)}",
+                    error_code=ErrorCode.PROMPT_BUILDER_ERROR
+                )
+
+            async def emit(parsed: StreamEvent) -> None:
+                nonlocal first_item_ms
+                if parsed.kind == EVENT_ITEM and first_item_ms is None:
+                    first_item_ms = (time.perf_counter() - started) * 1000
+                await queue.put({"event": parsed.kind, "data": parsed.to_dict()})
+
+            async def restart(abort: StreamAbort, attempt: int) -> None:
+                nonlocal first_item_ms
+                first_item_ms = None
+                await queue.put({
+                    "event": "restart",
+                    "data": {"reason": abort.reason, "message": abort.message, "attempt": attempt}
+                })
+
+            try:
+                raw_text = await self.generate_text(full_prompt, request, emit, restart, prompt_result.game_types)
+            except CircuitOpenException:
+                fallback = self._find_fallback(prompt_result.game_types, request)
+                if fallback is None:
+                    raise
+                self._counters["circuit_open_fallbacks"] += 1
+                await queue.put({"event": "game", "data": fallback})
+                await queue.put(_END)
+                self._counters["streams_completed"] += 1
+                return
+
+            try:
+                game_schema = self.response_processor.process_response(
+                    raw_text, structured=self.llm_service.structured_output
+                )
+            except Exception as e:
+                raise GameGPTException(
+                    message=str(e),
+                    error_code=ErrorCode.RESPONSE_PROCESSOR_ERROR
+                )
+
+            game_data = game_schema.dict()
+            if self.generation_cache.enabled:
+                await self.generation_cache.set(key, game_data)
+
+            complete_ms = (time.perf_counter() - started) * 1000
+            self._record_timings(first_item_ms, complete_ms)
+            await queue.put({"event": "game", "data": game_data})
+            await queue.put({
+                "event": "metrics",
+                "data": {
+                    "time_to_first_item_ms": round(first_item_ms, 1) if first_item_ms is not None else None,
+                    "time_to_complete_ms": round(complete_ms, 1)
+                }
+            })
+            self._counters["streams_completed"] += 1
+            self.logger.info(
+                f"Streamed game {game_schema.id}: first item after "
+                f"{first_item_ms or 0:.0f}ms, complete after {complete_ms:.0f}ms"
+            )
+
+        except asyncio.CancelledError:
+            # Consumer went away; nobody is left to read the end marker
+            raise
+        except Exception as e:
+            self._counters["streams_failed"] += 1
+            self.logger.error(f"Streaming generation failed: {str(e)}")
+            await queue.put({"event": "error", "data": self._error_payload(e)})
+
+        await queue.put(_END)
+
+    async def generate_text(
+        self,
+        prompt: str,
+        request: GameGenerationRequest,
+        emit: Optional[Callable[[StreamEvent], Awaitable[None]]] = None,
+        on_restart: Optional[Callable[[StreamAbort, int], Awaitable[None]]] = None,
+        game_types: Optional[List[str]] = None
+    ) -> str:
+        """
+        Stream one generation with validation, restarting on early aborts
+        The final attempt runs unvalidated so the response processor gets the last word
+        """
+        validate = self.settings.STREAM_VALIDATION_ENABLED
+        attempts = 1 + (self.settings.STREAM_VALIDATION_MAX_RESTARTS if validate else 0)
+        attempt_prompt = prompt
+
+        for attempt in range(1, attempts):
+            validator = StreamingValidator(expected_type=request.gameType)
+            try:
+                return await self._stream_attempt(attempt_prompt, validator, emit, game_types)
+            except StreamAbort as abort:
+                self.logger.warning(f"Aborted streamed generation (attempt {attempt}): {abort}")
+                if on_restart is not None:
+                    await on_restart(abort, attempt)
+                attempt_prompt = prompt + correction_instructions(abort)
+
+        return await self._stream_attempt(attempt_prompt, None, emit, game_types)
+
+    async def _stream_attempt(
+        self,
+        prompt: str,
+        validator: Optional[StreamingValidator],
+        emit: Optional[Callable[[StreamEvent], Awaitable[None]]],
+        game_types: Optional[List[str]] = None
+    ) -> str:
+        parser = IncrementalGameParser()
+        stream = self.llm_service.stream_response(prompt, game_types)
+
+        try:
+            async for chunk in stream:
+                events = parser.feed(chunk)
+                if validator is not None:
+                    try:
+                        validator.check_progress(parser.text, parser.started)
+                        for parsed in events:
+                            validator.check_event(parsed)
+                    except StreamAbort as abort:
+                        self._record_abort(abort, parser.text)
+                        raise
+                if emit is not None:
+                    for parsed in events:
+                        await emit(parsed)
+        finally:
+            # Closing the generator closes the HTTP stream, which stops Gemini billing output
+            await stream.aclose()
+
+        self._completed_output_tokens_total += len(parser.text) // 4
+        self._completed_outputs += 1
+        return parser.text
+
+    def _record_abort(self, abort: StreamAbort, text: str) -> None:
+        """Count the abort and estimate output tokens saved versus letting it finish"""
+        generated = len(text) // 4  # ~4 characters per token
+        if self._completed_outputs:
+            expected = self._completed_output_tokens_total // self._completed_outputs
+        else:
+            expected = self.settings.MAX_TOKENS // 2
+        self._aborts[abort.reason] = self._aborts.get(abort.reason, 0) + 1
+        self._tokens_generated_before_abort += generated
+        self._tokens_saved_estimate += max(0, expected - generated)
+
+    def _find_fallback(self, game_types: List[str], request: GameGenerationRequest) -> Optional[Dict[str, Any]]:
+        """A stored game to serve while Gemini's circuit breaker is open"""
+        if not self.settings.BREAKER_FALLBACK_ENABLED:
+            return None
+        return self.generation_cache.find_fallback(game_types, request.difficulty)
+
+    def _error_payload(self, error: Exception) -> Dict[str, Any]:
+        if isinstance(error, GameGPTException):
+            detail = ErrorDetail(code=error.error_code.value, message=error.message, details=error.details)
+        else:
+            detail = ErrorDetail(code=ErrorCode.INTERNAL_ERROR.value, message="Streaming generation failed")
+        return detail.dict()
+
+    def _record_timings(self, first_item_ms: Optional[float], complete_ms: float) -> None:
+        if first_item_ms is not None:
+            self._counters["time_to_first_item_ms_total"] += first_item_ms
+            self._counters["time_to_first_item_count"] += 1
+        self._counters["time_to_complete_ms_total"] += complete_ms
+        self._counters["time_to_complete_count"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Stream counters and average time-to-first-item vs time-to-complete"""
+        counters = self._counters
+        ttfi_count = counters["time_to_first_item_count"]
+        ttc_count = counters["time_to_complete_count"]
+        return {
+            "streams_started": counters["streams_started"],
+            "streams_completed": counters["streams_completed"],
+            "streams_failed": counters["streams_failed"],
+            "streams_cancelled": counters["streams_cancelled"],
+            "cache_hits": counters["cache_hits"],
+            "circuit_open_fallbacks": counters["circuit_open_fallbacks"],
+            "avg_time_to_first_item_ms": (
+                round(counters["time_to_first_item_ms_total"] / ttfi_count, 1) if ttfi_count else None
+            ),
+            "avg_time_to_complete_ms": (
+                round(counters["time_to_complete_ms_total"] / ttc_count, 1) if ttc_count else None
+            ),
+            "validation": {
+                "enabled": self.settings.STREAM_VALIDATION_ENABLED,
+                "aborts": dict(self._aborts),
+                "aborts_total": sum(self._aborts.values()),
+                "tokens_generated_before_abort": self._tokens_generated_before_abort,
+                "estimated_tokens_saved": self._tokens_saved_estimate
+            }
+        }
@@ -0,0 +1,182 @@
+"""
+Incremental JSON Parser for streamed game output
+Emits game header fields and individual content elements as soon as each one is complete,
+while the rest of the LLM response is still being generated
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional, Union
+
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+PathElement = Union[str, int]
+
+# Event kinds
+EVENT_FIELD = "field"              # top-level game field, e.g. title, type, config, ui
+EVENT_CONTENT_FIELD = "content_field"  # scalar inside content, e.g. instructions, startId
+EVENT_ITEM = "item"                # one content element, e.g. a quiz question or a scenario
+
+_WHITESPACE = " \t\r\n"
+
+
+@dataclass
+class StreamEvent:
+    """A completed piece of the game JSON"""
+    kind: str
+    path: List[PathElement]
+    value: Any
+
+    def to_dict(self) -> dict:
+        if self.kind == EVENT_ITEM:
+            return {"collection": self.path[1], "key": self.path[2], "value": self.value}
+        return {"name": self.path[-1], "value": self.value}
+
+
+@dataclass
+class _Frame:
+    """An open JSON object or array"""
+    is_object: bool
+    path: List[PathElement]
+    state: str = "key"          # object: key|colon|value|after; array: value|after
+    key: Optional[str] = None
+    index: int = 0
+    value_start: int = -1
+    scalar_open: bool = False
+
+    def child_path(self) -> List[PathElement]:
+        return self.path + [self.key if self.is_object else self.index]
+
+
+class IncrementalGameParser:
+    """
+    Single-pass, resumable JSON scanner for the game object
+
+    Text before the first '{' (markdown fences, prose) is skipped. Only values that
+    are emitted are passed to json.loads; everything else is just scanned.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.started = False
+        self.complete = False
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = -1
+        self._string_is_key = False
+
+    def feed(self, chunk: str) -> List[StreamEvent]:
+        """Consume the next chunk of text and return any newly completed events"""
+        self.buffer += chunk
+        events: List[StreamEvent] = []
+        buffer = self.buffer
+        i = self.position
+
+        while i < len(buffer) and not self.complete:
+            char = buffer[i]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._end_string(i, events)
+                i += 1
+                continue
+
+            if not self.started:
+                if char == "{":
+                    self.started = True
+                    self._stack.append(_Frame(is_object=True, path=[]))
+                i += 1
+                continue
+
+            frame = self._stack[-1]
+
+            if frame.scalar_open and (char in _WHITESPACE or char in ",}]"):
+                frame.scalar_open = False
+                self._complete_value(frame, buffer[frame.value_start:i], events)
+
+            if char in _WHITESPACE:
+                pass
+            elif char == '"':
+                self._in_string = True
+                self._string_start = i
+                self._string_is_key = frame.is_object and frame.state == "key"
+                if not self._string_is_key:
+                    frame.value_start = i
+                    frame.state = "after"
+            elif char in "{[":
+                frame.value_start = i
+                frame.state = "after"
+                child = _Frame(is_object=char == "{", path=frame.child_path())
+                child.state = "key" if child.is_object else "value"
+                self._stack.append(child)
+            elif char in "}]":
+                self._stack.pop()
+                if not self._stack:
+                    self.complete = True
+                else:
+                    parent = self._stack[-1]
+                    self._complete_value(parent, buffer[parent.value_start:i + 1], events)
+            elif char == ":":
+                frame.state = "value"
+            elif char == ",":
+                if frame.is_object:
+                    frame.state = "key"
+                else:
+                    frame.index += 1
+                    frame.state = "value"
+            elif frame.state == "value":
+                frame.value_start = i
+                frame.scalar_open = True
+                frame.state = "after"
+            i += 1
+
+        self.position = i
+        return events
+
+    def _end_string(self, end: int, events: List[StreamEvent]) -> None:
+        frame = self._stack[-1]
+        if self._string_is_key:
+            raw_key = self.buffer[self._string_start:end + 1]
+            try:
+                frame.key = json.loads(raw_key)
+            except json.JSONDecodeError:
+                frame.key = raw_key[1:-1]
+            frame.state = "colon"
+        else:
+            self._complete_value(frame, self.buffer[frame.value_start:end + 1], events)
+
+    def _complete_value(self, parent: _Frame, text: str, events: List[StreamEvent]) -> None:
+        """Decide whether a completed value is worth emitting, and parse it if so"""
+        path = parent.child_path()
+        depth = len(path)
+
+        if depth == 1 and path[0] != "content":
+            kind = EVENT_FIELD
+        elif depth == 2 and path[0] == "content" and text[:1] not in "{[":
+            kind = EVENT_CONTENT_FIELD
+        elif depth == 3 and path[0] == "content":
+            kind = EVENT_ITEM
+        else:
+            return
+
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            # Malformed fragment; the final ResponseProcessor pass will repair or reject it
+            logger.debug(f"Skipping unparseable streamed value at {path}")
+            return
+        events.append(StreamEvent(kind=kind, path=path, value=value))
+
+    @property
+    def text(self) -> str:
+        """Everything received so far"""
+        return self.buffer
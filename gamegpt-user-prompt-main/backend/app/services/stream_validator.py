@@ -0,0 +1,192 @@
+"""
+Streaming Structural Validator
+Checks partially streamed game output against GameSchema and the per-type content rules,
+so clearly invalid or degenerate generations can be aborted before they finish
+"""
+
+import re
+from typing import Dict, Any, List, Optional, Type, get_args
+
+from pydantic import BaseModel, ValidationError
+
+from app.core.logging_config import get_logger
+from app.models.game_schemas import (
+    GameSchema, GameConfig, UIConfig,
+    QuizQuestion, DragDropItem, DropZone, MemoryPair, SortingItem, SortingCategory,
+    MatchingPair, StoryEvent, FillBlankPassage, FlipCard, WordPuzzleWord,
+    PuzzlePiece, AnxietyScenario
+)
+from app.services.stream_parser import StreamEvent, EVENT_FIELD, EVENT_ITEM
+
+logger = get_logger(__name__)
+
+# Abort reasons
+ABORT_PROSE = "prose_output"
+ABORT_INVALID_FIELD = "invalid_field"
+ABORT_WRONG_TYPE = "wrong_game_type"
+ABORT_INVALID_ITEM = "invalid_content_item"
+ABORT_WRONG_COLLECTION = "wrong_content_structure"
+ABORT_REPETITION = "repeated_content"
+ABORT_RUNAWAY = "runaway_output"
+
+# Enumerated top-level fields, checked as soon as they stream in
+_ENUM_FIELDS = {
+    name: set(get_args(GameSchema.model_fields[name].annotation))
+    for name in ("type", "difficulty", "category")
+}
+
+_MODEL_FIELDS: Dict[str, Type[BaseModel]] = {
+    "config": GameConfig,
+    "ui": UIConfig
+}
+
+# Content collections per game type and the model each element must satisfy
+CONTENT_ITEM_MODELS: Dict[str, Dict[str, Type[BaseModel]]] = {
+    "quiz": {"questions": QuizQuestion},
+    "drag-drop": {"items": DragDropItem, "dropZones": DropZone},
+    "memory-match": {"pairs": MemoryPair},
+    "sorting": {"items": SortingItem, "categories": SortingCategory},
+    "matching": {"pairs": MatchingPair},
+    "story-sequence": {"events": StoryEvent},
+    "fill-blank": {"passages": FillBlankPassage},
+    "card-flip": {"cards": FlipCard},
+    "word-puzzle": {"words": WordPuzzleWord},
+    "puzzle-assembly": {"pieces": PuzzlePiece},
+    "anxiety-adventure": {"scenarios": AnxietyScenario}
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+class StreamAbort(Exception):
+    """Raised when partial output is clearly invalid and the stream should be abandoned"""
+
+    def __init__(self, reason: str, message: str):
+        self.reason = reason
+        self.message = message
+        super().__init__(f"{reason}: {message}")
+
+
+class StreamingValidator:
+    """
+    Incremental validation for one streamed generation
+
+    Feed it every parser event plus the parser's progress; it raises StreamAbort
+    as soon as the output can no longer become a valid game.
+    """
+
+    def __init__(
+        self,
+        expected_type: Optional[str] = None,
+        prose_limit: int = 300,
+        max_items: int = 80,
+        max_duplicates: int = 2,
+        loop_window: int = 4000,
+        loop_block: int = 200,
+        loop_repeats: int = 3
+    ):
+        self.expected_type = expected_type
+        self.prose_limit = prose_limit
+        self.max_items = max_items
+        self.max_duplicates = max_duplicates
+        self.loop_window = loop_window
+        self.loop_block = loop_block
+        self.loop_repeats = loop_repeats
+
+        self.game_type: Optional[str] = None
+        self.item_count = 0
+        self._seen_items: Dict[str, int] = {}
+        self._pending_items: List[StreamEvent] = []
+        self._checked_length = 0
+
+    def check_progress(self, text: str, started: bool) -> None:
+        """Checks on the raw text that do not depend on parsed values"""
+        if not started:
+            preamble = text.replace("```json", "").replace("```", "").strip()
+            if len(preamble) > self.prose_limit:
+                raise StreamAbort(ABORT_PROSE, "response is prose instead of a JSON object")
+            return
+
+        # Degenerate loop: the same block repeated many times at the end of the output
+        if len(text) - self._checked_length >= self.loop_block * 2:
+            self._checked_length = len(text)
+            tail = text[-self.loop_window:]
+            block = tail[-self.loop_block:]
+            if len(block) == self.loop_block and block.strip() and tail.count(block) >= self.loop_repeats:
+                raise StreamAbort(ABORT_REPETITION, "output is looping on the same text")
+
+    def check_event(self, event: StreamEvent) -> None:
+        """Validate one completed field or content element"""
+        if event.kind == EVENT_FIELD:
+            self._check_field(event.path[0], event.value)
+        elif event.kind == EVENT_ITEM:
+            self.item_count += 1
+            if self.item_count > self.max_items:
+                raise StreamAbort(ABORT_RUNAWAY, f"more than {self.max_items} content elements")
+            if self.game_type is None:
+                # "type" normally precedes "content"; hold items until it arrives
+                self._pending_items.append(event)
+            else:
+                self._check_item(event)
+
+    def _check_field(self, name: str, value: Any) -> None:
+        if name in _ENUM_FIELDS and value not in _ENUM_FIELDS[name]:
+            raise StreamAbort(ABORT_INVALID_FIELD, f"'{name}' has invalid value {value!r}")
+
+        if name in _MODEL_FIELDS:
+            if not isinstance(value, dict):
+                raise StreamAbort(ABORT_INVALID_FIELD, f"'{name}' is not an object")
+            try:
+                _MODEL_FIELDS[name](**value)
+            except ValidationError as e:
+                raise StreamAbort(ABORT_INVALID_FIELD, f"'{name}' does not match the schema: {str(e)[:200]}")
+
+        if name == "type":
+            if self.expected_type and value != self.expected_type:
+                raise StreamAbort(ABORT_WRONG_TYPE, f"expected game type '{self.expected_type}', got '{value}'")
+            self.game_type = value
+            pending, self._pending_items = self._pending_items, []
+            for event in pending:
+                self._check_item(event)
+
+    def _check_item(self, event: StreamEvent) -> None:
+        collection = event.path[1]
+        models = CONTENT_ITEM_MODELS.get(self.game_type, {})
+
+        if collection not in models:
+            raise StreamAbort(
+                ABORT_WRONG_COLLECTION,
+                f"'{collection}' is not a content collection for {self.game_type} games"
+            )
+
+        value = event.value
+        if not isinstance(value, dict):
+            raise StreamAbort(ABORT_INVALID_ITEM, f"{collection}[{event.path[2]}] is not an object")
+
+        missing = [
+            name for name, info in models[collection].model_fields.items()
+            if info.is_required() and name not in value
+        ]
+        if missing:
+            raise StreamAbort(ABORT_INVALID_ITEM, f"{collection}[{event.path[2]}] is missing {', '.join(missing)}")
+
+        fingerprint = self._item_fingerprint(value)
+        repeats = self._seen_items.get(fingerprint, 0) + 1
+        self._seen_items[fingerprint] = repeats
+        if repeats > self.max_duplicates:
+            raise StreamAbort(ABORT_REPETITION, f"the same {collection} element was generated {repeats} times")
+
+    @staticmethod
+    def _item_fingerprint(value: Dict[str, Any]) -> str:
+        """Identity of an element ignoring its id, so renumbered repeats still match"""
+        parts = [str(v) for k, v in sorted(value.items()) if k != "id"]
+        return _NON_ALNUM.sub(" ", " ".join(parts).lower()).strip()
+
+
+def correction_instructions(abort: StreamAbort) -> str:
+    """Prompt suffix for the retry after an aborted stream"""
+    return (
+        "\n\nIMPORTANT CORRECTION: A previous attempt was rejected because "
+        f"{abort.message}. Follow the JSON structure exactly, use only the allowed values, "
+        "do not repeat content, and return ONLY the JSON object."
+    )
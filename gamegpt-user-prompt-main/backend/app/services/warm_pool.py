@@ -0,0 +1,315 @@
+"""
+Warm Pool of pre-generated games
+A background worker keeps a few validated games ready per configured
+(type, category, difficulty) bucket, refilling below a low-water mark while Gemini
+has spare capacity, so /generate can answer matching requests without an upstream call
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple, get_args
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.http_pool import HTTPConnectionPool
+from app.models.game_schemas import GameGenerationRequest, GameSchema, GameTypeName, DifficultyName
+from app.services.game_type_classifier import classify_category
+from app.services.prompt_builder import PromptBuilder
+
+logger = get_logger(__name__)
+
+Bucket = Tuple[str, str, str]  # (type, category, difficulty)
+
+GAME_TYPES = set(get_args(GameTypeName))
+DIFFICULTIES = set(get_args(DifficultyName))
+CATEGORIES = set(get_args(GameSchema.model_fields["category"].annotation))
+
+
+def parse_buckets(spec: str) -> List[Bucket]:
+    """Parse WARM_POOL_BUCKETS ("type:category:difficulty,..."); invalid entries are logged and skipped"""
+    buckets: List[Bucket] = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        parts = tuple(part.strip() for part in entry.split(":"))
+        if len(parts) != 3 or parts[0] not in GAME_TYPES or parts[1] not in CATEGORIES or parts[2] not in DIFFICULTIES:
+            logger.warning(f"Ignoring invalid warm pool bucket '{entry}' (expected type:category:difficulty)")
+            continue
+        if parts not in buckets:
+            buckets.append(parts)
+    return buckets
+
+
+@dataclass
+class PooledGame:
+    """A ready game and the clients it has already been handed to"""
+    game: Dict[str, Any]
+    created_at: float
+    served_to: Set[str] = field(default_factory=set)
+
+
+class WarmPool:
+    """Bounded per-bucket pools of ready games with a background refill worker"""
+
+    def __init__(
+        self,
+        pipeline: Any,
+        prompt_builder: PromptBuilder,
+        http_pool: HTTPConnectionPool,
+        circuit_breaker: Any,
+        buckets: Optional[List[Bucket]] = None,
+        concurrency_limiter: Optional[Any] = None
+    ):
+        """pipeline is the GenerationPipeline; refills run its uncached run()"""
+        self.settings = get_settings()
+        self.logger = logger
+        self.pipeline = pipeline
+        self.prompt_builder = prompt_builder
+        self.http_pool = http_pool
+        self.circuit_breaker = circuit_breaker
+        self.concurrency_limiter = concurrency_limiter
+
+        self.size = self.settings.WARM_POOL_SIZE
+        self.low_water = min(self.settings.WARM_POOL_LOW_WATER, self.size)
+        self.max_serves = max(1, self.settings.WARM_POOL_MAX_SERVES)
+        self.max_age = self.settings.WARM_POOL_MAX_AGE
+        self.buckets = buckets if buckets is not None else parse_buckets(self.settings.WARM_POOL_BUCKETS)
+
+        self._pools: Dict[Bucket, Deque[PooledGame]] = {bucket: deque() for bucket in self.buckets}
+        self._pending: Dict[Bucket, int] = {bucket: 0 for bucket in self.buckets}
+        self._hits: Dict[Bucket, int] = {bucket: 0 for bucket in self.buckets}
+        self._refill_tasks: Set[asyncio.Task] = set()
+        self._refill_slots = asyncio.Semaphore(max(1, self.settings.WARM_POOL_REFILL_CONCURRENCY))
+        self._refill_times: Deque[float] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._counters = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "ineligible": 0,
+            "refills_started": 0,
+            "refills_succeeded": 0,
+            "refills_failed": 0,
+            "refills_mismatched": 0,
+            "refills_skipped_busy": 0,
+            "expired": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.WARM_POOL_ENABLED and bool(self.buckets)
+
+    def health_check(self) -> Dict[str, Any]:
+        """Health check for the warm pool worker"""
+        running = self._worker is not None and not self._worker.done()
+        return {
+            "status": "healthy" if running or not self.enabled else "degraded",
+            "service": "warm_pool",
+            "worker_running": running
+        }
+
+    # Hand-out
+
+    def candidate_buckets(self, request: GameGenerationRequest) -> List[Bucket]:
+        """Pooled buckets a request may be answered from; empty if it needs a bespoke game"""
+        # Age and play-time constraints are not part of a bucket, so only a fresh game satisfies them
+        if request.targetAge or request.estimatedTime:
+            return []
+        category = classify_category(" ".join(filter(None, [request.prompt, request.theme])))
+        if category is None:
+            return []
+        game_types, _ = self.prompt_builder.select_game_types(request)
+        if not game_types:
+            return []
+        # Only the most likely type: a pooled game of a runner-up type would not be what was asked for
+        game_type = game_types[0].value
+        return [
+            bucket for bucket in self.buckets
+            if bucket[0] == game_type and bucket[1] == category
+            and (request.difficulty is None or bucket[2] == request.difficulty)
+        ]
+
+    def take(self, request: GameGenerationRequest, client_id: str) -> Optional[Dict[str, Any]]:
+        """A pooled game for the request that this client has not received before, or None"""
+        if not self.enabled:
+            return None
+        buckets = self.candidate_buckets(request)
+        if not buckets:
+            self._counters["ineligible"] += 1
+            return None
+
+        self._counters["lookups"] += 1
+        if self._expire(buckets):
+            self._wake()
+        for bucket in buckets:
+            pool = self._pools[bucket]
+            for pooled in pool:
+                if client_id in pooled.served_to:
+                    continue
+                pooled.served_to.add(client_id)
+                if len(pooled.served_to) >= self.max_serves:
+                    pool.remove(pooled)
+                    self._wake()
+                self._counters["hits"] += 1
+                self._hits[bucket] += 1
+                self.logger.info(f"Serving pre-generated game {pooled.game.get('id')} from warm pool {':'.join(bucket)}")
+                return pooled.game
+
+        self._counters["misses"] += 1
+        return None
+
+    def _expire(self, buckets: List[Bucket]) -> int:
+        """Drop games older than WARM_POOL_MAX_AGE from the buckets; returns how many"""
+        if self.max_age <= 0:
+            return 0
+        cutoff = time.monotonic() - self.max_age
+        expired = 0
+        for bucket in buckets:
+            # Games are appended as they are generated, so the oldest are on the left
+            pool = self._pools[bucket]
+            while pool and pool[0].created_at < cutoff:
+                pool.popleft()
+                expired += 1
+        if expired:
+            self._counters["expired"] += expired
+            self.logger.info(f"Dropped {expired} warm pool game(s) older than {self.max_age:g}s")
+        return expired
+
+    # Refill
+
+    async def start(self) -> None:
+        """Start the background refill worker"""
+        if not self.enabled or self._worker is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+        self.logger.info(
+            f"Warm pool started for {len(self.buckets)} bucket(s), {self.size} games each "
+            f"(refill below {self.low_water})"
+        )
+
+    async def stop(self) -> None:
+        """Stop the worker and cancel in-flight refills"""
+        tasks = list(self._refill_tasks)
+        if self._worker is not None:
+            tasks.append(self._worker)
+            self._worker = None
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self._schedule_refills()
+            except Exception as e:
+                self.logger.error(f"Warm pool refill scheduling failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.settings.WARM_POOL_REFILL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def has_spare_capacity(self) -> bool:
+        """
+        Refill only while user traffic leaves Gemini connections free, the adaptive
+        concurrency limit has headroom and the breaker is closed
+        """
+        if self.circuit_breaker.enabled and self.circuit_breaker.state != "closed":
+            return False
+        if self.concurrency_limiter is not None and not self.concurrency_limiter.has_headroom():
+            return False
+        return self.http_pool.in_flight < self.settings.WARM_POOL_MAX_INFLIGHT
+
+    def _schedule_refills(self) -> None:
+        self._expire(self.buckets)
+        # Emptiest buckets first
+        below = sorted(
+            (bucket for bucket in self.buckets
+             if len(self._pools[bucket]) + self._pending[bucket] <= self.low_water),
+            key=lambda bucket: len(self._pools[bucket]) + self._pending[bucket]
+        )
+        if not below:
+            return
+        if not self.has_spare_capacity():
+            self._counters["refills_skipped_busy"] += 1
+            return
+        for bucket in below:
+            for _ in range(self.size - len(self._pools[bucket]) - self._pending[bucket]):
+                self._pending[bucket] += 1
+                task = asyncio.create_task(self._refill(bucket))
+                self._refill_tasks.add(task)
+                task.add_done_callback(self._refill_tasks.discard)
+
+    async def _refill(self, bucket: Bucket) -> None:
+        try:
+            async with self._refill_slots:
+                # Capacity may have been taken while this refill was queued
+                while not self.has_spare_capacity():
+                    self._counters["refills_skipped_busy"] += 1
+                    await asyncio.sleep(self.settings.WARM_POOL_REFILL_INTERVAL)
+                self._counters["refills_started"] += 1
+                game_schema = await self.pipeline.run(self._refill_request(bucket))
+            self._add(bucket, game_schema.dict())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._counters["refills_failed"] += 1
+            self.logger.warning(f"Warm pool refill for {':'.join(bucket)} failed: {str(e)}")
+        finally:
+            self._pending[bucket] -= 1
+
+    def _refill_request(self, bucket: Bucket) -> GameGenerationRequest:
+        game_type, category, difficulty = bucket
+        topic = category.replace("-", " ")
+        return GameGenerationRequest(
+            prompt=f"A {difficulty} {game_type.replace('-', ' ')} game about {topic}",
+            gameType=game_type,
+            difficulty=difficulty,
+            theme=topic
+        )
+
+    def _add(self, bucket: Bucket, game: Dict[str, Any]) -> None:
+        """Pool a generated game in the bucket it actually belongs to"""
+        actual = (game.get("type"), game.get("category"), game.get("difficulty"))
+        if actual != bucket:
+            # Gemini picked another category or difficulty; keep it only if that bucket is pooled too
+            if actual not in self._pools or len(self._pools[actual]) >= self.size:
+                self._counters["refills_mismatched"] += 1
+                return
+            bucket = actual
+        now = time.monotonic()
+        self._pools[bucket].append(PooledGame(game=game, created_at=now))
+        self._counters["refills_succeeded"] += 1
+        self._refill_times.append(now)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool depth per bucket, hit rate, expirations and refill rate"""
+        now = time.monotonic()
+        while self._refill_times and now - self._refill_times[0] > 60:
+            self._refill_times.popleft()
+        lookups = self._counters["lookups"]
+        return {
+            "enabled": self.enabled,
+            "size": self.size,
+            "low_water": self.low_water,
+            "buckets": {
+                ":".join(bucket): {
+                    "depth": len(self._pools[bucket]),
+                    "pending": self._pending[bucket],
+                    "hits": self._hits[bucket]
+                }
+                for bucket in self.buckets
+            },
+            "depth": sum(len(pool) for pool in self._pools.values()),
+            **self._counters,
+            "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+            "refills_last_minute": len(self._refill_times),
+            "in_flight_refills": len(self._refill_tasks)
+        }
@@ -0,0 +1,153 @@
+"""
+MAX_TOKENS recovery: continuation requests against a full regenerate
+
+Generates one game per request (the golden games, --requests spread over the game
+types) with maxOutputTokens set to --max-tokens, low enough that Gemini — the fake
+server of benchmarks/fake_gemini.py, run in-process — cuts every reply off. Each
+request is run three ways:
+- none: the cut-off reply goes straight to ResponseProcessor (the behaviour
+  without continuation)
+- continuation: LLMService resumes it with up to CONTINUATION_MAX_ROUNDS
+  continuation requests, and ResponseProcessor stitches the pieces
+- regenerate: the request is sent again with a budget large enough for the
+  whole game (--regenerate-max-tokens)
+
+For each it reports how many games validated, end-to-end latency, Gemini calls
+and the prompt and output tokens Gemini processed, and then what continuation
+saved over regenerating. The fake replies after --latency plus --tokens-per-second
+of generation, and continuations repeat the last --continuation-overlap characters
+of the cut-off text, as models often do.
+
+Usage (from the backend directory):
+    python -m benchmarks.continuation
+    python -m benchmarks.continuation --requests 110 --max-tokens 300 --tokens-per-second 150
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-stub")
+
+from app.core.config import get_settings  # noqa: E402
+from app.core.http_pool import HTTPConnectionPool  # noqa: E402
+from app.models.game_schemas import GameGenerationRequest  # noqa: E402
+from app.services.llm_service import LLMService  # noqa: E402
+from app.services.prompt_builder import PromptBuilder  # noqa: E402
+from app.services.response_processor import ResponseProcessor  # noqa: E402
+from benchmarks.fake_gemini import FakeGemini, LatencyModel, create_app, parse_mix  # noqa: E402
+from benchmarks.llm_outputs import GAME_TYPES  # noqa: E402
+
+MODES = ("none", "continuation", "regenerate")
+
+
+async def run_mode(mode: str, args: argparse.Namespace) -> Dict[str, Any]:
+    settings = get_settings()
+    settings.MAX_TOKENS = args.max_tokens
+    settings.CONTINUATION_ENABLED = mode == "continuation"
+    settings.CONTINUATION_MAX_ROUNDS = args.rounds
+    settings.STRUCTURED_OUTPUT_ENABLED = False
+    settings.HEDGE_ENABLED = False
+    settings.AIMD_ENABLED = False  # No local queueing: the comparison is about Gemini time
+
+    fake = FakeGemini(
+        latency=LatencyModel(args.latency),
+        tokens_per_second=args.tokens_per_second,
+        mix=parse_mix(args.mix),
+        seed=args.seed,
+        continuation_overlap=args.continuation_overlap
+    )
+    response_processor = ResponseProcessor()
+    llm_service = LLMService(
+        http_pool=HTTPConnectionPool(transport=httpx.ASGITransport(app=create_app(fake))),
+        response_processor=response_processor
+    )
+    prompt_builder = PromptBuilder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    validated = 0
+
+    async def one(index: int) -> None:
+        nonlocal validated
+        game_type = GAME_TYPES[index % len(GAME_TYPES)]
+        prompt = prompt_builder.build_prompt(GameGenerationRequest(
+            prompt=f"A {game_type.replace('-', ' ')} game about managing stress for teens", gameType=game_type
+        ))
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if mode == "regenerate":
+                    payload = llm_service._build_payload(prompt.prompt, prompt.game_types)
+                    reply = await llm_service._request(payload)
+                    if reply.finish_reason == "MAX_TOKENS":
+                        payload["generationConfig"]["maxOutputTokens"] = args.regenerate_max_tokens
+                        reply = await llm_service._request(payload)
+                    text = reply.text
+                else:
+                    text = await llm_service.generate_response(prompt.prompt, prompt.game_types)
+                response_processor.process_response(text)
+                validated += 1
+            except Exception:
+                pass
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one(index) for index in range(args.requests)))
+    await llm_service.close()
+
+    return {
+        "mode": mode,
+        "validated": f"{validated}/{args.requests}",
+        "p50_ms": round(statistics.median(latencies)),
+        "mean_ms": round(statistics.fmean(latencies)),
+        "gemini_calls": fake.stats["requests"],
+        "prompt_tokens": fake.stats["prompt_tokens"],
+        "output_tokens": fake.stats["output_tokens"],
+        "stitching": response_processor.stats()["continuations"],
+        "estimate": llm_service.continuation_stats()
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=33, help="games generated per mode")
+    parser.add_argument("--concurrency", type=int, default=33)
+    parser.add_argument("--max-tokens", type=int, default=400, help="maxOutputTokens per call")
+    parser.add_argument("--rounds", type=int, default=get_settings().CONTINUATION_MAX_ROUNDS,
+                        help="continuation requests per response")
+    parser.add_argument("--regenerate-max-tokens", type=int, default=8192)
+    parser.add_argument("--latency", default="fixed:500", help="fake Gemini time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=300.0)
+    parser.add_argument("--continuation-overlap", type=int, default=40)
+    parser.add_argument("--mix", default="fenced=0.3,prefixed=0.1", help="free-text artifacts, as for the fake")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    results = {mode: await run_mode(mode, args) for mode in MODES}
+
+    columns = ("validated", "p50_ms", "mean_ms", "gemini_calls", "prompt_tokens", "output_tokens")
+    print(f"{'mode':<14}" + "".join(f"{column:>15}" for column in columns))
+    for mode, result in results.items():
+        print(f"{mode:<14}" + "".join(f"{str(result[column]):>15}" for column in columns))
+
+    continued, regenerated = results["continuation"], results["regenerate"]
+    print(f"\ncontinuation vs regenerate over {args.requests} games:")
+    print(f"  latency saved: p50 {regenerated['p50_ms'] - continued['p50_ms']:,} ms, "
+          f"mean {regenerated['mean_ms'] - continued['mean_ms']:,} ms per game")
+    print(f"  output tokens saved: {regenerated['output_tokens'] - continued['output_tokens']:,} "
+          f"({1 - continued['output_tokens'] / regenerated['output_tokens']:.0%}); "
+          f"prompt tokens added: {continued['prompt_tokens'] - regenerated['prompt_tokens']:,}")
+    estimate = continued["estimate"]
+    print(f"  LLMService's own estimate (/stats): {estimate['output_tokens_saved']:,} output tokens, "
+          f"{estimate['avg_latency_saved_ms']} ms per game")
+    print(f"  stitching: {continued['stitching']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,406 @@
+"""
+Fake Gemini: a local stand-in for generateContent and streamGenerateContent
+
+Serves the Gemini REST API shape (candidates, finishReason, usageMetadata, SSE
+events for ?alt=sse) so the backend can be load-tested without spending quota
+and without Google's latency in the results. Set GEMINI_BASE_URL to its address.
+
+Replies are a game of the requested type (the "Game type" request parameter, the
+single type of a pruned prompt, or the classified user request): the golden
+corpus game (benchmarks/golden/games) with a fresh id, rendered clean or with
+free-text artifacts per --mix. With --outputs DIR, DIR/<type>.json files are used
+as templates instead and DIR/<type>.txt files are served verbatim.
+
+Latency is a time to first token drawn from --latency plus generation at
+--tokens-per-second (streamed in chunks at that pace). Replies longer than the
+request's maxOutputTokens, and a --truncate-rate share of all replies, are cut
+off with finishReason MAX_TOKENS. A continuation request (the cut-off text as a
+model turn) gets the rest of that reply, starting --continuation-overlap characters
+early as models often do. --rate-limit-rate and --error-rate inject 429
+RESOURCE_EXHAUSTED (with a RetryInfo delay) and 500 INTERNAL responses, and more
+than --capacity concurrent requests are answered with 429. GET /stats reports
+what was served.
+
+Usage (from the backend directory):
+    python -m benchmarks.fake_gemini --port 8090 --latency lognormal:1500,0.4 --rate-limit-rate 0.02
+    GEMINI_BASE_URL=http://127.0.0.1:8090 GOOGLE_API_KEY=fake uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import re
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-stub")
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import JSONResponse, Response, StreamingResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from app.services.game_type_classifier import GameTypeClassifier  # noqa: E402
+from benchmarks.llm_outputs import GAME_TYPES, VARIANTS, load_game  # noqa: E402
+
+# Rough Gemini tokenization for English JSON
+CHARS_PER_TOKEN = 4
+TOKENS_PER_CHUNK = 24
+# Cut-off replies remembered for continuation requests
+MAX_PENDING_CONTINUATIONS = 1000
+
+_GAME_TYPE_PARAMETER = re.compile(r"^- Game type: ([a-z-]+)$", re.MULTILINE)
+_SINGLE_TYPE = re.compile(r"Use this game type:\s+([a-z-]+) - ")
+_USER_REQUEST = re.compile(r"^User Request: (.*)$", re.MULTILINE)
+
+
+class LatencyModel:
+    """
+    Seconds to first token, from a spec:
+    fixed:MS, uniform:LOW_MS,HIGH_MS, lognormal:MEDIAN_MS,SIGMA or exponential:MEAN_MS
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        kind, _, values = spec.partition(":")
+        self.kind = kind
+        self.values = [float(value) for value in values.split(",") if value]
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2, "exponential": 1}
+        if expected.get(kind) != len(self.values):
+            raise ValueError(f"invalid latency spec '{spec}'")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            milliseconds = self.values[0]
+        elif self.kind == "uniform":
+            milliseconds = rng.uniform(*self.values)
+        elif self.kind == "lognormal":
+            milliseconds = rng.lognormvariate(math.log(self.values[0]), self.values[1])
+        else:
+            milliseconds = rng.expovariate(1 / self.values[0])
+        return milliseconds / 1000
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'fenced=0.3,prefixed=0.1' -> share of replies per corpus variant (the rest are clean)"""
+    mix = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, share = entry.partition("=")
+        if name not in VARIANTS or name in ("clean", "truncated", "very_large"):
+            raise ValueError(f"unknown reply variant '{name}'")
+        mix[name] = float(share)
+    return mix
+
+
+def error_body(code: int, status: str, message: str, retry_delay: Optional[float] = None) -> Dict[str, Any]:
+    error: Dict[str, Any] = {"code": code, "message": message, "status": status}
+    if retry_delay is not None:
+        error["details"] = [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{retry_delay:g}s"}]
+    return {"error": error}
+
+
+class FakeGemini:
+    """Request handling and counters of the fake server"""
+
+    def __init__(
+        self,
+        latency: LatencyModel,
+        tokens_per_second: float = 200.0,
+        mix: Optional[Dict[str, float]] = None,
+        truncate_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        error_rate: float = 0.0,
+        capacity: int = 0,
+        retry_delay: float = 1.0,
+        outputs: Optional[str] = None,
+        seed: Optional[int] = None,
+        continuation_overlap: int = 0
+    ):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.mix = mix or {}
+        self.truncate_rate = truncate_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.retry_delay = retry_delay
+        self.continuation_overlap = continuation_overlap
+        # Text sent so far -> the whole reply, for each reply cut off by MAX_TOKENS
+        self.pending: "OrderedDict[str, str]" = OrderedDict()
+        self.rng = random.Random(seed)
+        self.classifier = GameTypeClassifier()
+        self.templates, self.canned = self._load_outputs(outputs)
+        self.in_flight = 0
+        self.counter = 0
+        self.stats: Dict[str, Any] = {
+            "requests": 0,
+            "streams": 0,
+            "by_status": {},
+            "by_game_type": {},
+            "by_variant": {},
+            "truncated": 0,
+            "continuations": 0,
+            "continuations_unmatched": 0,
+            "over_capacity": 0,
+            "max_in_flight": 0,
+            "prompt_tokens": 0,
+            "output_tokens": 0
+        }
+
+    @staticmethod
+    def _load_outputs(directory: Optional[str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+        templates = {game_type: load_game(game_type) for game_type in GAME_TYPES}
+        canned: Dict[str, str] = {}
+        if directory:
+            for game_type in GAME_TYPES:
+                base = os.path.join(directory, game_type)
+                if os.path.exists(base + ".json"):
+                    with open(base + ".json", encoding="utf-8") as handle:
+                        templates[game_type] = json.load(handle)
+                if os.path.exists(base + ".txt"):
+                    with open(base + ".txt", encoding="utf-8") as handle:
+                        canned[game_type] = handle.read()
+        return templates, canned
+
+    def game_type_for(self, prompt: str) -> str:
+        for pattern in (_GAME_TYPE_PARAMETER, _SINGLE_TYPE):
+            match = pattern.search(prompt)
+            if match and match.group(1) in GAME_TYPES:
+                return match.group(1)
+        request = _USER_REQUEST.search(prompt)
+        classified = self.classifier.classify(request.group(1) if request else prompt[:2000])
+        if classified:
+            return classified[0].value
+        return GAME_TYPES[self.counter % len(GAME_TYPES)]
+
+    def reply_text(self, game_type: str) -> Tuple[str, str]:
+        """(text, variant) for one reply"""
+        if game_type in self.canned:
+            return self.canned[game_type], "canned"
+        game = dict(self.templates[game_type])
+        game["id"] = f"game-{datetime.now():%Y%m%d}-{self.counter % 10000:04d}"
+        roll = self.rng.random()
+        variant = "clean"
+        for name, share in self.mix.items():
+            if roll < share:
+                variant = name
+                break
+            roll -= share
+        return VARIANTS[variant](game, self.counter), variant
+
+    def _count(self, key: str, value: Any) -> None:
+        self.stats[key][str(value)] = self.stats[key].get(str(value), 0) + 1
+
+    async def _admit(self, request: Request, stream: bool) -> Tuple[Optional[Response], Dict[str, Any]]:
+        """Parse the request and decide on injected errors; returns (error response, payload)"""
+        payload = await request.json()
+        self.counter += 1
+        self.stats["requests"] += 1
+        self.stats["streams"] += stream
+        if self.capacity and self.in_flight >= self.capacity:
+            self.stats["over_capacity"] += 1
+            return self._error(429, "RESOURCE_EXHAUSTED", "Resource has been exhausted (e.g. check quota).",
+                               self.retry_delay), payload
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            await asyncio.sleep(self.latency.sample(self.rng) / 4)
+            return self._error(429, "RESOURCE_EXHAUSTED", "Resource has been exhausted (e.g. check quota).",
+                               self.retry_delay), payload
+        if roll < self.rate_limit_rate + self.error_rate:
+            await asyncio.sleep(self.latency.sample(self.rng))
+            return self._error(500, "INTERNAL", "An internal error has occurred."), payload
+        return None, payload
+
+    def _error(self, code: int, status: str, message: str, retry_delay: Optional[float] = None) -> Response:
+        self._count("by_status", code)
+        return JSONResponse(error_body(code, status, message, retry_delay), status_code=code)
+
+    def _continuation(self, contents: List[Dict[str, Any]]) -> Optional[Tuple[str, str]]:
+        """(text sent so far, whole reply) when the request continues a cut-off reply"""
+        sent = "".join(
+            part.get("text", "") for content in contents if content.get("role") == "model"
+            for part in content.get("parts", [])
+        )
+        if not sent:
+            return None
+        self.stats["continuations"] += 1
+        whole = self.pending.pop(sent, None)
+        if whole is None:
+            # Not one of ours (or forgotten): answered like a new request, i.e. starting over
+            self.stats["continuations_unmatched"] += 1
+            return None
+        return sent, whole
+
+    def _generate(self, payload: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+        """(text, finishReason, usageMetadata) for a request"""
+        contents = payload.get("contents", [])
+        prompt = "".join(part.get("text", "") for content in contents for part in content.get("parts", []))
+        continuation = self._continuation(contents)
+        if continuation is not None:
+            sent, whole = continuation
+            overlap = min(self.continuation_overlap, len(sent))
+            text, offset = whole[len(sent) - overlap:], len(sent) - overlap
+        else:
+            game_type = self.game_type_for(prompt)
+            whole, variant = self.reply_text(game_type)
+            text, offset = whole, 0
+            self._count("by_game_type", game_type)
+            self._count("by_variant", variant)
+
+        finish_reason = "STOP"
+        max_tokens = payload.get("generationConfig", {}).get("maxOutputTokens")
+        if max_tokens and len(text) > max_tokens * CHARS_PER_TOKEN:
+            text, finish_reason = text[:max_tokens * CHARS_PER_TOKEN], "MAX_TOKENS"
+        elif continuation is None and self.rng.random() < self.truncate_rate:
+            text, finish_reason = text[:int(len(text) * self.rng.uniform(0.3, 0.9))], "MAX_TOKENS"
+        if finish_reason == "MAX_TOKENS":
+            self.stats["truncated"] += 1
+            self.pending[whole[:offset + len(text)]] = whole
+            if len(self.pending) > MAX_PENDING_CONTINUATIONS:
+                self.pending.popitem(last=False)
+
+        output_tokens = math.ceil(len(text) / CHARS_PER_TOKEN)
+        prompt_tokens = math.ceil(len(prompt) / CHARS_PER_TOKEN)
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["output_tokens"] += output_tokens
+        usage = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens
+        }
+        return text, finish_reason, usage
+
+    @staticmethod
+    def _candidate(text: Optional[str], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+        candidate: Dict[str, Any] = {"index": 0}
+        if text is not None:
+            candidate["content"] = {"parts": [{"text": text}], "role": "model"}
+        if finish_reason:
+            candidate["finishReason"] = finish_reason
+        return candidate
+
+    def _enter(self) -> None:
+        self.in_flight += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+
+    async def generate_content(self, request: Request, model: str) -> Response:
+        self._enter()
+        try:
+            error, payload = await self._admit(request, stream=False)
+            if error is not None:
+                return error
+            text, finish_reason, usage = self._generate(payload)
+            await asyncio.sleep(self.latency.sample(self.rng) + usage["candidatesTokenCount"] / self.tokens_per_second)
+            self._count("by_status", 200)
+            return JSONResponse({
+                "candidates": [self._candidate(text, finish_reason)],
+                "usageMetadata": usage,
+                "modelVersion": model
+            })
+        finally:
+            self.in_flight -= 1
+
+    async def stream_generate_content(self, request: Request, model: str) -> Response:
+        self._enter()
+        try:
+            error, payload = await self._admit(request, stream=True)
+        except BaseException:
+            self.in_flight -= 1
+            raise
+        if error is not None:
+            self.in_flight -= 1
+            return error
+        text, finish_reason, usage = self._generate(payload)
+        first_token = self.latency.sample(self.rng)
+        chunk_chars = TOKENS_PER_CHUNK * CHARS_PER_TOKEN
+        self._count("by_status", 200)
+
+        async def events():
+            try:
+                await asyncio.sleep(first_token)
+                for start in range(0, len(text), chunk_chars):
+                    if start:
+                        await asyncio.sleep(TOKENS_PER_CHUNK / self.tokens_per_second)
+                    chunk = {"candidates": [self._candidate(text[start:start + chunk_chars])], "modelVersion": model}
+                    yield f"data: {json.dumps(chunk)}\r\n\r\n"
+                final = {"candidates": [self._candidate(None, finish_reason)], "usageMetadata": usage, "modelVersion": model}
+                yield f"data: {json.dumps(final)}\r\n\r\n"
+            finally:
+                self.in_flight -= 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def dispatch(self, request: Request) -> Response:
+        model, _, method = request.path_params["model_method"].partition(":")
+        if method == "generateContent":
+            return await self.generate_content(request, model)
+        if method == "streamGenerateContent":
+            return await self.stream_generate_content(request, model)
+        return JSONResponse(error_body(404, "NOT_FOUND", f"Unknown method '{method}'"), status_code=404)
+
+    async def get_stats(self, request: Request) -> Response:
+        return JSONResponse({**self.stats, "in_flight": self.in_flight})
+
+
+def create_app(fake: FakeGemini) -> Starlette:
+    return Starlette(routes=[
+        Route("/v1beta/models/{model_method}", fake.dispatch, methods=["POST"]),
+        Route("/stats", fake.get_stats, methods=["GET"])
+    ])
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", default="lognormal:1500,0.4", help="time to first token distribution")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--mix", default="fenced=0.3,prefixed=0.1,trailing_comma=0.05,python_literals=0.03",
+                        help="share of replies per free-text artifact; the rest are clean JSON")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="share of replies cut off with MAX_TOKENS")
+    parser.add_argument("--continuation-overlap", type=int, default=0,
+                        help="characters of the cut-off text a continuation repeats")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 500")
+    parser.add_argument("--capacity", type=int, default=0, help="concurrent requests before 429 (0 = unlimited)")
+    parser.add_argument("--retry-delay", type=float, default=1.0, help="RetryInfo delay sent with 429s, seconds")
+    parser.add_argument("--outputs", help="directory of <type>.json templates / <type>.txt canned replies")
+    parser.add_argument("--seed", type=int)
+
+
+def from_arguments(args: argparse.Namespace) -> FakeGemini:
+    return FakeGemini(
+        latency=LatencyModel(args.latency),
+        tokens_per_second=args.tokens_per_second,
+        mix=parse_mix(args.mix),
+        truncate_rate=args.truncate_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        capacity=args.capacity,
+        retry_delay=args.retry_delay,
+        outputs=args.outputs,
+        seed=args.seed,
+        continuation_overlap=args.continuation_overlap
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    add_arguments(parser)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    try:
+        fake = from_arguments(args)
+    except ValueError as e:
+        parser.error(str(e))
+    uvicorn.run(create_app(fake), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
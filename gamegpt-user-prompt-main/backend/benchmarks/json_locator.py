@@ -0,0 +1,176 @@
+"""
+JSON locator: the single-pass brace matcher against the regex extraction it replaced
+
+Locates the game object in very large responses (golden games grown to --sizes
+characters) rendered fenced, wrapped in prose, with "{placeholder}" braces in the
+prose, followed by a code example, and truncated, plus adversarial inputs built
+to find worst cases: unclosed fences with a brace after every code block
+(quadratic for the lazy DOTALL regexes), floods of small objects, deep nesting
+and runs of escaped quotes.
+
+For each input it reports the p50 time and throughput of locating the object
+(_extract_json_from_markdown) and of fence/artifact stripping (_clean_markdown_fences),
+before and after, and whether each implementation returned the expected text.
+Every measurement runs in a child process that is stopped after --timeout seconds.
+
+Usage (from the backend directory):
+    python -m benchmarks.json_locator
+    python -m benchmarks.json_locator --sizes 150000,1000000 --timeout 5
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import re
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-stub")
+
+from app.services.response_processor import ResponseProcessor  # noqa: E402
+from benchmarks.llm_outputs import TRUNCATE_AT, enlarge, load_game  # noqa: E402
+
+DEFAULT_SIZES = "150000,1000000,4000000"
+DEFAULT_GAME_TYPES = "quiz,sorting,anxiety-adventure"
+
+
+def legacy_extract(text: str) -> str:
+    """ResponseProcessor._extract_json_from_markdown before the locator"""
+    json_patterns = [
+        r'```(?:json)?\s*(\{.*?\})\s*```',
+        r'```json\s*(\{.*?\})\s*```',
+        r'```\s*(\{.*?\})\s*```',
+    ]
+    for pattern in json_patterns:
+        match = re.search(pattern, text, re.DOTALL)
+        if match:
+            return match.group(1)
+    json_start = text.find('{')
+    json_end = text.rfind('}')
+    if json_start != -1 and json_end != -1 and json_end > json_start:
+        return text[json_start:json_end + 1]
+    return text
+
+
+def legacy_clean_fences(raw_text: str) -> str:
+    """ResponseProcessor._clean_markdown_fences (with _remove_additional_artifacts) before the locator"""
+    raw_text = raw_text.strip()
+    if raw_text.startswith("```json"):
+        raw_text = raw_text[7:-3].strip()
+    elif raw_text.startswith("```"):
+        raw_text = raw_text[3:-3].strip()
+    text = raw_text
+    for prefix in ["Here's the JSON:", "Here is the JSON:", "JSON:", "Response:", "Game:", "```json", "```"]:
+        if text.startswith(prefix):
+            text = text[len(prefix):].strip()
+    for suffix in ["```", "End of JSON", "That's it!", "Hope this helps!"]:
+        if text.endswith(suffix):
+            text = text[:-len(suffix)].strip()
+    text = re.sub(r'^```[a-zA-Z]*\n?', '', text)
+    text = re.sub(r'\n?```$', '', text)
+    return text
+
+
+class Case(NamedTuple):
+    name: str
+    text: str
+    expected: Optional[str]  # What locating the object should return; None: no single right answer
+
+
+def game_cases(game_type: str, size: int) -> List[Case]:
+    body = json.dumps(enlarge(load_game(game_type), size), indent=2, ensure_ascii=False)
+    code = f"\n\nLoad it with:\n```js\nconst game = loadGame({{ id: \"{game_type}\" }});\n```"
+    return [
+        Case("fenced", f"```json\n{body}\n```", body),
+        Case("prose", f"Here is the JSON for your game:\n\n```json\n{body}\n```\n\nHope this helps!", body),
+        Case("placeholders", f"A game for {{player}}:\n\n{body}\n\nReplace {{player}} with a name.", body),
+        Case("code_after", f"Here's the game:\n\n{body}{code}", body),
+        Case("truncated", body[:int(len(body) * TRUNCATE_AT)], body[:int(len(body) * TRUNCATE_AT)])
+    ]
+
+
+def adversarial_cases(size: int) -> List[Case]:
+    return [
+        Case("fence_storm", "```{}x" * (size // 6), "{}"),
+        Case("object_flood", "{}" * (size // 2), "{}"),
+        Case("deep_nesting", "{" * (size // 2) + "}" * (size // 2), None),
+        Case("escaped_quotes", '{"' + '\\"' * (size // 2) + '"}', None)
+    ]
+
+
+def _measure(call: Callable[[str], str], text: str, iterations: int, connection) -> None:
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = call(text)
+        latencies.append(time.perf_counter() - started)
+    connection.send((sorted(latencies)[len(latencies) // 2], result))
+
+
+def measure(call: Callable[[str], str], text: str, iterations: int, timeout: float) -> Optional[tuple]:
+    """(p50 seconds, result) from a forked child, or None when it ran out of time"""
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    child = context.Process(target=_measure, args=(call, text, iterations, sender))
+    child.start()
+    outcome = receiver.recv() if receiver.poll(timeout) else None
+    child.terminate()
+    child.join()
+    return outcome
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated response sizes, in characters")
+    parser.add_argument("--game-types", default=DEFAULT_GAME_TYPES, help="comma-separated golden games to grow")
+    parser.add_argument("--iterations", type=int, default=5, help="timed calls per input")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds per input and implementation")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    processor = ResponseProcessor()
+    implementations: Dict[str, Dict[str, Callable[[str], str]]] = {
+        "extract": {"before": legacy_extract, "after": processor._extract_json_from_markdown},
+        "clean_fences": {"before": legacy_clean_fences, "after": processor._clean_markdown_fences}
+    }
+
+    print(f"{'input':<34} {'KB':>7} {'stage':<13} {'before ms':>10} {'after ms':>10} "
+          f"{'after MB/s':>10} {'speedup':>8}  found (before/after)")
+    for size in [int(value) for value in args.sizes.split(",")]:
+        cases = [
+            Case(f"{game_type}/{case.name}", case.text, case.expected)
+            for game_type in args.game_types.split(",") for case in game_cases(game_type.strip(), size)
+        ] + adversarial_cases(size)
+        for case in cases:
+            for stage, calls in implementations.items():
+                results = {
+                    label: measure(call, case.text, args.iterations, args.timeout) for label, call in calls.items()
+                }
+
+                def milliseconds(label: str) -> str:
+                    result = results[label]
+                    return f"{result[0] * 1000:,.2f}" if result else f">{args.timeout * 1000:,.0f}"
+
+                def found(label: str) -> str:
+                    if results[label] is None:
+                        return "timeout"
+                    if stage != "extract" or case.expected is None:
+                        return "-"
+                    return "yes" if results[label][1] == case.expected else "no"
+
+                before, after = results["before"], results["after"]
+                if before and after:
+                    speedup = f"{before[0] / after[0]:,.1f}x"
+                elif after:
+                    speedup = f">{args.timeout / after[0]:,.0f}x"
+                else:
+                    speedup = "-"
+                mb_per_s = f"{len(case.text) / after[0] / 1e6:,.1f}" if after and after[0] else "-"
+                print(f"{case.name:<34} {len(case.text) / 1000:>7,.0f} {stage:<13} {milliseconds('before'):>10} "
+                      f"{milliseconds('after'):>10} {mb_per_s:>10} {speedup:>8}  {found('before')}/{found('after')}")
+
+
+if __name__ == "__main__":
+    main()
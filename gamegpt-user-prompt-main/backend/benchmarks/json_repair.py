@@ -0,0 +1,304 @@
+"""
+JSON repair: repair_json against the regex fixes it replaced
+
+Generates random JSON documents (seeded) whose strings are full of the characters
+that trip up text-level fixes — quotes, backslashes, braces, commas, colons,
+apostrophes, "True", URLs, newlines and non-ASCII text — and renders each one
+corrupted the ways LLMs corrupt JSON: trailing commas, missing commas, Python
+literals, single-quoted strings, unquoted keys and values, doubled braces, all of
+them at once, and cut off at a random point. tests/test_json_repair.py checks
+repair_json's properties on this corpus; here, the share of documents that come
+back as the original value (a prefix of it when truncated) is compared with the
+regex fixes and _clean_json_text that ResponseProcessor used before.
+
+Throughput (µs per KB of input) is then measured for both on the golden games
+grown to --sizes characters, and for repair_json alone on adversarial inputs
+(deep nesting, runs of quotes, braces and unquoted values) to check it stays linear.
+
+Usage (from the backend directory):
+    python -m benchmarks.json_repair
+    python -m benchmarks.json_repair --cases 5000 --seed 7 --sizes 4000,150000
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import string
+import time
+from typing import Any, Callable, Dict, List
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-stub")
+
+from app.services.json_repair import LITERALS, _NUMBER, repair_json  # noqa: E402
+from benchmarks.llm_outputs import GAME_TYPES, enlarge, load_game  # noqa: E402
+
+DEFAULT_SIZES = "4000,150000,1000000"
+
+# Pieces random strings are built from
+_FRAGMENTS = (
+    "calm", "breathe", " ", "  ", "Level 1", "it's", "don't", '"quoted"', "\\", "\\n", '\\"', "{", "}",
+    "{{name}}", "[", "]", ",", ", ]", ":", ": True", "True", "None", "null", "'", "\n", "\t",
+    "café", "naïve", "—", "😊", "日本", " ", "\x07", "// not a comment", "#",
+    "http://x.com/a?b=1", "5:30"
+)
+_IDENTIFIERS = ("id", "title", "score", "isCorrect", "nextScenario", "_meta", "True", "items2")
+
+# Corruptions applied while rendering, by name
+CORRUPTIONS: Dict[str, Dict[str, bool]] = {
+    "valid": {},
+    "trailing_commas": {"trailing_commas": True},
+    "missing_commas": {"missing_commas": True},
+    "python_literals": {"python_literals": True},
+    "single_quotes": {"single_quotes": True},
+    "unquoted_keys": {"unquoted_keys": True},
+    "unquoted_values": {"unquoted_values": True},
+    "double_braces": {"double_braces": True},
+    "mixed": {
+        "trailing_commas": True, "missing_commas": True, "python_literals": True,
+        "single_quotes": True, "unquoted_keys": True, "double_braces": True
+    },
+    "truncated": {"truncated": True}
+}
+
+
+def random_string(rng: random.Random) -> str:
+    return "".join(rng.choice(_FRAGMENTS) for _ in range(rng.randint(0, 6)))
+
+
+def random_value(rng: random.Random, depth: int = 0) -> Any:
+    kind = rng.random()
+    if depth < 4 and kind < 0.25:
+        return {
+            rng.choice(_IDENTIFIERS + (random_string(rng),)): random_value(rng, depth + 1)
+            for _ in range(rng.randint(0, 5))
+        }
+    if depth < 4 and kind < 0.45:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 5))]
+    if kind < 0.7:
+        return random_string(rng)
+    if kind < 0.8:
+        return rng.randint(-10**6, 10**6)
+    if kind < 0.87:
+        return round(rng.uniform(-1000, 1000), rng.randint(0, 4))
+    return rng.choice((True, False, None))
+
+
+def random_document(rng: random.Random) -> Any:
+    """A top-level object, or occasionally an array"""
+    value = random_value(rng)
+    while not isinstance(value, (dict, list)):
+        value = random_value(rng)
+    return value
+
+
+class Renderer:
+    """Serializes a value the way a model might, with the requested corruptions"""
+
+    def __init__(self, rng: random.Random, trailing_commas: bool = False, missing_commas: bool = False,
+                 python_literals: bool = False, single_quotes: bool = False, unquoted_keys: bool = False,
+                 unquoted_values: bool = False, double_braces: bool = False, truncated: bool = False):
+        self.rng = rng
+        self.trailing_commas = trailing_commas
+        self.missing_commas = missing_commas
+        self.python_literals = python_literals
+        self.single_quotes = single_quotes
+        self.unquoted_keys = unquoted_keys
+        self.unquoted_values = unquoted_values
+        self.double_braces = double_braces
+        self.truncated = truncated
+        self.indent = rng.choice((None, 2))
+
+    def render(self, value: Any) -> str:
+        text = self._value(value, 0)
+        if self.double_braces and isinstance(value, dict):
+            text = "{" + text + "}"
+        if self.truncated:
+            text = text[:self.rng.randint(1, max(1, len(text) - 1))]
+        return text
+
+    def _string(self, value: str) -> str:
+        if not (self.single_quotes and self.rng.random() < 0.5):
+            return json.dumps(value, ensure_ascii=False)
+        body = "".join(
+            "\\'" if char == "'" else '"' if char == '"' else json.dumps(char, ensure_ascii=False)[1:-1]
+            for char in value
+        )
+        return "'" + body + "'"
+
+    @staticmethod
+    def _can_unquote(value: str) -> bool:
+        """Whether value reads back the same written without quotes"""
+        if not value or value != value.strip() or any(char in value for char in ',{}[]\n"\''):
+            return False
+        first = value.split()[0]
+        # A literal or number glued on by a colon (5:30) is read as part of the value, unless it ends there
+        return (value[0] != ":" and not first.endswith(":")
+                and first not in LITERALS and not _NUMBER.fullmatch(first))
+
+    def _key(self, key: str) -> str:
+        if self.unquoted_keys and key.isidentifier() and self.rng.random() < 0.7:
+            return key
+        return self._string(key)
+
+    def _join(self, items: List[str], opener: str, closer: str, depth: int) -> str:
+        if not items:
+            return opener + closer
+        newline = "" if self.indent is None else "\n" + " " * (self.indent * (depth + 1))
+        parts = [newline + items[0]]
+        for item in items[1:]:
+            separator = " " if self.missing_commas and self.rng.random() < 0.4 else ", " if self.indent is None else ","
+            parts.append(separator + newline + item)
+        if self.trailing_commas and self.rng.random() < 0.7:
+            parts.append(",")
+        end = "" if self.indent is None else "\n" + " " * (self.indent * depth)
+        return opener + "".join(parts) + end + closer
+
+    def _value(self, value: Any, depth: int) -> str:
+        if isinstance(value, dict):
+            members = [f"{self._key(key)}: {self._value(item, depth + 1)}" for key, item in value.items()]
+            return self._join(members, "{", "}", depth)
+        if isinstance(value, list):
+            return self._join([self._value(item, depth + 1) for item in value], "[", "]", depth)
+        if isinstance(value, str):
+            if self.unquoted_values and self._can_unquote(value) and self.rng.random() < 0.7:
+                return value
+            return self._string(value)
+        if self.python_literals and (value is None or isinstance(value, bool)):
+            return repr(value)
+        return json.dumps(value)
+
+
+def legacy_fix(text: str) -> str:
+    """ResponseProcessor's regex fixes and _clean_json_text before repair_json"""
+    fixes = [
+        (r'\{\{', r'{'),
+        (r'\}\}', r'}'),
+        (r':\s*True\b', ': true'),
+        (r':\s*False\b', ': false'),
+        (r':\s*None\b', ': null'),
+        (r',(\s*[}\]])', r'\1'),
+        (r'}(\s*){', r'},\1{'),
+        (r'}(\s*)\[', r'},\1['),
+        (r'\](\s*){', r'],\1{'),
+    ]
+    for pattern, replacement in fixes:
+        text = re.sub(pattern, replacement, text)
+    text = text.strip()
+    first_brace = text.find('{')
+    if first_brace > 0:
+        text = text[first_brace:]
+    last_brace = text.rfind('}')
+    if last_brace != -1 and last_brace < len(text) - 1:
+        text = text[:last_brace + 1]
+    printable = set(string.printable)
+    text = ''.join(char for char in text if char in printable or char in '\n\t')
+    return text.replace('\\"', '"')
+
+
+def is_prefix_of(repaired: Any, original: Any) -> bool:
+    """Whether repaired is what is left of original after cutting its text short"""
+    if isinstance(original, dict):
+        return isinstance(repaired, dict) and all(
+            key in original and is_prefix_of(value, original[key]) for key, value in repaired.items()
+        )
+    if isinstance(original, list):
+        return isinstance(repaired, list) and len(repaired) <= len(original) and all(
+            is_prefix_of(value, item) for value, item in zip(repaired, original)
+        )
+    if isinstance(original, str):
+        return isinstance(repaired, str) and original.startswith(repaired)
+    if isinstance(original, bool) or original is None:
+        return repaired == original
+    return (isinstance(repaired, (int, float)) and not isinstance(repaired, bool)
+            and json.dumps(original).lstrip("-").startswith(json.dumps(repaired).lstrip("-")))  # "-0" loads as 0
+
+
+def succeeds(fix: Callable[[str], str], text: str, original: Any, truncated: bool) -> bool:
+    """Whether fix turns text back into the original value (a prefix of it when truncated)"""
+    try:
+        value = json.loads(fix(text))
+    except Exception:  # noqa: BLE001 - any failure counts against it
+        return False
+    return is_prefix_of(value, original) if truncated else value == original
+
+
+def compare(cases: int, seed: int) -> None:
+    print(f"{'corruption':<16} {'cases':>6} {'repair ok':>10} {'legacy ok':>10}")
+    for name, corruption in CORRUPTIONS.items():
+        rng = random.Random(f"{seed}/{name}")
+        passed = legacy_passed = 0
+        for _ in range(cases):
+            original = random_document(rng)
+            text = Renderer(rng, **corruption).render(original)
+            truncated = corruption.get("truncated", False)
+            passed += succeeds(repair_json, text, original, truncated)
+            legacy_passed += succeeds(legacy_fix, text, original, truncated)
+        print(f"{name:<16} {cases:>6} {passed / cases:>10.1%} {legacy_passed / cases:>10.1%}")
+
+
+def p50(call: Callable[[str], str], text: str, iterations: int) -> float:
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call(text)
+        latencies.append(time.perf_counter() - started)
+    return sorted(latencies)[len(latencies) // 2]
+
+
+def throughput(sizes: List[int], game_types: List[str], iterations: int, seed: int) -> None:
+    print(f"\n{'input':<34} {'KB':>7} {'legacy µs/KB':>13} {'repair µs/KB':>13} {'repair MB/s':>12}  ok (legacy/repair)")
+    for size in sizes:
+        for game_type in game_types:
+            game = enlarge(load_game(game_type), size)
+            for name in ("trailing_commas", "python_literals", "mixed", "truncated"):
+                rng = random.Random(f"{seed}/{game_type}/{name}")
+                text = Renderer(rng, **CORRUPTIONS[name]).render(game)
+                truncated = name == "truncated"
+                kilobytes = len(text) / 1000
+                legacy = p50(legacy_fix, text, iterations)
+                repair = p50(repair_json, text, iterations)
+                ok = ("yes" if succeeds(legacy_fix, text, game, truncated) else "no",
+                      "yes" if succeeds(repair_json, text, game, truncated) else "no")
+                print(f"{game_type + '/' + name:<34} {kilobytes:>7,.0f} {legacy * 1e6 / kilobytes:>13,.1f} "
+                      f"{repair * 1e6 / kilobytes:>13,.1f} {len(text) / repair / 1e6:>12,.1f}  {ok[0]}/{ok[1]}")
+
+    print(f"\n{'adversarial input':<34} {'KB':>7} {'repair µs/KB':>13}")
+    for size in sizes:
+        adversarial = {
+            "deep_arrays": "[" * size,
+            "deep_objects": '{"a":' * (size // 5),
+            "doubled_braces": "{" * (size // 2) + "}" * (size // 2),
+            "stray_closers": "{" + "]" * size,
+            "unmatched_closers": "[" + "[" * (size // 2) + "}" * (size // 2),
+            "unmatched_closers_in_object": '{"a": 1,, "c":' + '{"b":' * (size // 6) + "]" * (size // 6),
+            "escaped_quotes": '["' + '\\"' * (size // 2),
+            "apostrophes": "['" + "\\'" * (size // 2),
+            "bare_words": "[" + "True " * (size // 5),
+            "unquoted_values": "[" + "see http://x.com, " * (size // 18),
+            "unquoted_value_quotes": '{"a": x' + ' "y' * (size // 3)
+        }
+        for name, text in adversarial.items():
+            print(f"{name:<34} {len(text) / 1000:>7,.0f} {p50(repair_json, text, iterations) * 1e9 / len(text):>13,.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", type=int, default=2000, help="random documents per corruption")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated documents")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated input sizes for throughput, in characters")
+    parser.add_argument("--game-types", default="quiz,anxiety-adventure",
+                        help=f"comma-separated golden games to grow (of {', '.join(GAME_TYPES)})")
+    parser.add_argument("--iterations", type=int, default=5, help="timed calls per input")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    compare(args.cases, args.seed)
+    throughput([int(value) for value in args.sizes.split(",")],
+               [value.strip() for value in args.game_types.split(",")], args.iterations, args.seed)
+
+
+if __name__ == "__main__":
+    main()
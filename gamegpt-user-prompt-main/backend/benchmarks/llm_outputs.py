@@ -0,0 +1,137 @@
+"""
+Golden corpus of raw LLM outputs for the response-processing benchmarks
+
+One realistic game per game type lives in benchmarks/golden/games/<type>.json. Each
+is rendered the ways Gemini actually returns free text: clean JSON, fenced in
+```json, wrapped in prose, with trailing commas, with Python literals
+(True/False/None), cut off by MAX_TOKENS, and very large (content lists repeated
+to a target size). Rendering is deterministic, so a corpus sample is identified
+by "<game type>/<variant>" across runs and machines.
+"""
+
+import copy
+import json
+import math
+import os
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+GAMES_DIR = os.path.join(GOLDEN_DIR, "games")
+
+GAME_TYPES = (
+    "quiz",
+    "drag-drop",
+    "memory-match",
+    "word-puzzle",
+    "sorting",
+    "matching",
+    "story-sequence",
+    "fill-blank",
+    "card-flip",
+    "puzzle-assembly",
+    "anxiety-adventure"
+)
+
+# Share of the output that arrives before MAX_TOKENS cuts it off
+TRUNCATE_AT = 0.65
+# Size the very_large variant is grown to, in characters
+LARGE_CHARS = 150_000
+
+# Prose the model wraps around the JSON, rotated over game types
+_PREAMBLES = (
+    ("Sure! Here's a therapeutic game based on your request:\n\n", "\n\nLet me know if you'd like any changes."),
+    ("Here is the JSON for your game:\n\n", "\n\nHope this helps!"),
+    ("Absolutely. I designed this game to be supportive and age-appropriate.\n\n", "\n\nEnjoy the game!")
+)
+
+
+class Sample(NamedTuple):
+    game_type: str
+    variant: str
+    text: str
+    game: Dict[str, Any]  # What the text should parse to
+
+    @property
+    def key(self) -> str:
+        return f"{self.game_type}/{self.variant}"
+
+
+def load_game(game_type: str) -> Dict[str, Any]:
+    with open(os.path.join(GAMES_DIR, f"{game_type}.json"), encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def enlarge(game: Dict[str, Any], target_chars: int = LARGE_CHARS) -> Dict[str, Any]:
+    """Repeat the content lists (or scenarios) with fresh ids until the game is about target_chars"""
+    game = copy.deepcopy(game)
+    copies = max(1, math.ceil(target_chars / len(json.dumps(game, indent=2))))
+
+    def relabel(item: Dict[str, Any], n: int) -> Dict[str, Any]:
+        item = copy.deepcopy(item)
+        if n:
+            for key in ("id", "nextScenario"):
+                if isinstance(item.get(key), str):
+                    item[key] = f"{item[key]}-{n}"
+        return item
+
+    content = game["content"]
+    for key, value in content.items():
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            content[key] = [relabel(item, n) for n in range(copies) for item in value]
+        elif key == "scenarios":
+            content[key] = {
+                f"{name}-{n}" if n else name: relabel(scenario, n)
+                for n in range(copies) for name, scenario in value.items()
+            }
+    return game
+
+
+def _clean(game: Dict[str, Any], index: int) -> str:
+    return json.dumps(game, indent=2, ensure_ascii=False)
+
+
+def _fenced(game: Dict[str, Any], index: int) -> str:
+    return f"```json\n{_clean(game, index)}\n```"
+
+
+def _prefixed(game: Dict[str, Any], index: int) -> str:
+    before, after = _PREAMBLES[index % len(_PREAMBLES)]
+    return f"{before}```json\n{_clean(game, index)}\n```{after}"
+
+
+def _trailing_comma(game: Dict[str, Any], index: int) -> str:
+    # A comma after the last member of every object and array
+    return re.sub(r'([^\s,\[{])(\n\s*[}\]])', r'\1,\2', _clean(game, index))
+
+
+def _python_literals(game: Dict[str, Any], index: int) -> str:
+    literals = {"true": "True", "false": "False", "null": "None"}
+    return re.sub(r'(?m)(:\s|^\s+)(true|false|null)\b', lambda m: m.group(1) + literals[m.group(2)], _clean(game, index))
+
+
+def _truncated(game: Dict[str, Any], index: int) -> str:
+    text = _clean(game, index)
+    return text[:int(len(text) * TRUNCATE_AT)]
+
+
+VARIANTS: Dict[str, Callable[[Dict[str, Any], int], str]] = {
+    "clean": _clean,
+    "fenced": _fenced,
+    "prefixed": _prefixed,
+    "trailing_comma": _trailing_comma,
+    "python_literals": _python_literals,
+    "truncated": _truncated,
+    "very_large": _clean
+}
+
+
+def corpus(variants: Optional[List[str]] = None, large_chars: int = LARGE_CHARS) -> List[Sample]:
+    """Every game type rendered in every variant (or the given ones)"""
+    samples = []
+    for index, game_type in enumerate(GAME_TYPES):
+        game = load_game(game_type)
+        for variant in variants or VARIANTS:
+            source = enlarge(game, large_chars) if variant == "very_large" else game
+            samples.append(Sample(game_type, variant, VARIANTS[variant](source, index), source))
+    return samples
@@ -0,0 +1,344 @@
+"""
+Load test: open-loop load against /generate, with the backend's event-loop lag and memory
+
+Sends POST /generate at a fixed arrival rate (--arrivals constant) or as a Poisson
+process at that mean rate (--arrivals poisson), whether or not earlier requests
+have finished. Latency is measured from each request's scheduled start, so a
+saturated backend shows up as growing latency, not as a lower offered load.
+Every --report-interval seconds it prints throughput, latency percentiles and
+status counts for the interval, together with the backend's event-loop lag and
+RSS from GET /stats (`runtime`). The final summary covers the whole run,
+including the RSS growth rate, which is what a soak run is for.
+
+With --target, the backend at that URL is used as is (disable its rate limit or
+send --api-key). Without it, a fake Gemini (benchmarks/fake_gemini.py, options
+after --fake) and a backend pointed at it are started as subprocesses on free
+ports, with rate limiting and caching off so that every request reaches Gemini.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --rate 20 --duration 60
+    python -m benchmarks.load_test --rate 50 --duration 3600 --report-interval 60 --fake --latency lognormal:2000,0.5 --rate-limit-rate 0.02
+    python -m benchmarks.load_test --target http://localhost:8000 --rate 5 --duration 300
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.llm_outputs import GAME_TYPES
+
+TOPICS = (
+    "managing exam stress",
+    "calming anxiety before a presentation",
+    "recognizing emotions in friends",
+    "building a bedtime routine",
+    "coping with a move to a new school",
+    "noticing negative self-talk",
+    "practicing gratitude",
+    "handling conflict with siblings"
+)
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Recorder:
+    """Results of finished requests, read out per report interval and for the whole run"""
+
+    def __init__(self):
+        self.results: List[tuple] = []  # (finished at, latency seconds, status or error name)
+        self.sent = 0
+        self._reported = 0
+
+    def record(self, latency: float, status: str) -> None:
+        self.results.append((time.monotonic(), latency, status))
+
+    def interval(self) -> List[tuple]:
+        results = self.results[self._reported:]
+        self._reported = len(self.results)
+        return results
+
+
+def summarize(results: List[tuple], seconds: float) -> Dict[str, Any]:
+    ok = [latency for _, latency, status in results if status == "200"]
+    statuses: Dict[str, int] = {}
+    for _, _, status in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    def milliseconds(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "completed": len(results),
+        "ok": len(ok),
+        "throughput_rps": round(len(ok) / seconds, 2) if seconds > 0 else 0.0,
+        "p50_ms": milliseconds(percentile(ok, 0.50)),
+        "p90_ms": milliseconds(percentile(ok, 0.90)),
+        "p99_ms": milliseconds(percentile(ok, 0.99)),
+        "max_ms": milliseconds(max(ok) if ok else None),
+        "statuses": statuses
+    }
+
+
+async def one_request(client: httpx.AsyncClient, index: int, scheduled: float, recorder: Recorder,
+                      distinct_prompts: int) -> None:
+    variant = index % distinct_prompts if distinct_prompts else index
+    game_type = GAME_TYPES[variant % len(GAME_TYPES)]
+    topic = TOPICS[variant % len(TOPICS)]
+    body = {"prompt": f"A {game_type.replace('-', ' ')} game about {topic} (session {variant})", "gameType": game_type}
+    try:
+        response = await client.post("/generate", json=body)
+        status = str(response.status_code)
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    recorder.record(time.monotonic() - scheduled, status)
+
+
+async def measure_lag(interval: float, lags: List[float]) -> None:
+    """The driver's own event-loop lag; if it is high, the driver and not the backend is the bottleneck"""
+    while True:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def backend_runtime(client: httpx.AsyncClient) -> Dict[str, Any]:
+    try:
+        response = await client.get("/stats", timeout=10)
+        return response.json().get("runtime") or {}
+    except (httpx.HTTPError, ValueError):
+        return {}
+
+
+async def drive(args: argparse.Namespace, target: str) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    headers = {"X-API-Key": args.api_key} if args.api_key else {}
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    driver_lags: List[float] = []
+    samples: List[Dict[str, Any]] = []
+
+    async with httpx.AsyncClient(base_url=target, timeout=args.timeout, limits=limits, headers=headers) as client, \
+            httpx.AsyncClient(base_url=target, timeout=10) as stats_client:
+        print(f"{'time':>6} {'sent':>7} {'done':>7} {'ok rps':>7} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'lag p99':>8} {'lag max':>8} {'rss MB':>7}  statuses")
+        started = time.monotonic()
+        last_report = started
+        samples.append({"t": 0.0, **await backend_runtime(stats_client)})
+
+        async def sample() -> None:
+            nonlocal last_report
+            runtime = await backend_runtime(stats_client)
+            now = time.monotonic()
+            samples.append({"t": round(now - started, 1), **runtime})
+            report(now - started, recorder, summarize(recorder.interval(), now - last_report), runtime)
+            last_report = now
+
+        async def reporter() -> None:
+            # Separate from the arrival loop, so a slow /stats never delays arrivals
+            while True:
+                await asyncio.sleep(args.report_interval)
+                await sample()
+
+        background = [asyncio.create_task(measure_lag(0.05, driver_lags)), asyncio.create_task(reporter())]
+        tasks = set()
+        scheduled = started
+        index = 0
+
+        while scheduled < started + args.duration:
+            now = time.monotonic()
+            if scheduled > now:
+                await asyncio.sleep(scheduled - now)
+            task = asyncio.create_task(one_request(client, index, scheduled, recorder, args.distinct_prompts))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            recorder.sent += 1
+            index += 1
+            scheduled += rng.expovariate(args.rate) if args.arrivals == "poisson" else 1 / args.rate
+
+        offered_seconds = time.monotonic() - started
+        if tasks:
+            await asyncio.wait(tasks, timeout=args.timeout)
+        for task in background:
+            task.cancel()
+        await sample()
+
+    summary = summarize(recorder.results, offered_seconds)
+    summary["sent"] = recorder.sent
+    summary["offered_rps"] = round(recorder.sent / offered_seconds, 2)
+    summary["unfinished"] = recorder.sent - len(recorder.results)
+    summary["driver_lag_p99_ms"] = round((percentile(driver_lags, 0.99) or 0.0) * 1000, 1)
+    summary["backend"] = backend_summary(samples)
+    summary["samples"] = samples
+    return summary
+
+
+def report(elapsed: float, recorder: Recorder, interval: Dict[str, Any], runtime: Dict[str, Any]) -> None:
+    loop = runtime.get("event_loop", {})
+
+    def number(value: Any) -> str:
+        return f"{value:,.1f}" if isinstance(value, (int, float)) else "-"
+
+    statuses = " ".join(f"{status}:{count}" for status, count in sorted(interval["statuses"].items()))
+    print(f"{elapsed:>5.0f}s {recorder.sent:>7} {len(recorder.results):>7} {interval['throughput_rps']:>7.1f} "
+          f"{number(interval['p50_ms']):>8} {number(interval['p99_ms']):>8} {number(loop.get('lag_p99_ms')):>8} "
+          f"{number(loop.get('lag_max_ms')):>8} {number(runtime.get('rss_mb')):>7}  {statuses}")
+
+
+def backend_summary(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Event-loop lag extremes and RSS growth (least-squares slope) over the run"""
+    rss = [(sample["t"], sample["rss_mb"]) for sample in samples if sample.get("rss_mb") is not None]
+    lags = [sample.get("event_loop", {}) for sample in samples]
+    summary: Dict[str, Any] = {
+        "lag_p99_ms_worst": max((lag.get("lag_p99_ms", 0.0) for lag in lags), default=None),
+        "lag_max_ms": max((lag.get("lag_max_since_start_ms", 0.0) for lag in lags), default=None)
+    }
+    if len(rss) >= 2:
+        mean_t = sum(t for t, _ in rss) / len(rss)
+        mean_rss = sum(value for _, value in rss) / len(rss)
+        variance = sum((t - mean_t) ** 2 for t, _ in rss)
+        slope = sum((t - mean_t) * (value - mean_rss) for t, value in rss) / variance if variance else 0.0
+        summary.update({
+            "rss_start_mb": rss[0][1],
+            "rss_end_mb": rss[-1][1],
+            "rss_peak_mb": max(value for _, value in rss),
+            "rss_growth_mb_per_hour": round(slope * 3600, 1)
+        })
+    return summary
+
+
+def start_stack(args: argparse.Namespace, fake_args: List[str]) -> tuple:
+    """Start a fake Gemini and a backend using it; returns (backend URL, fake URL, processes)"""
+    fake_port, backend_port = free_port(), free_port()
+    output = None if args.verbose else subprocess.DEVNULL
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_gemini", "--port", str(fake_port), *fake_args],
+        stdout=output, stderr=output
+    )
+    env = {
+        **os.environ,
+        "GOOGLE_API_KEY": "fake",
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "HTTP2_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "CACHE_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "WARM_POOL_ENABLED": "false",
+        "REDIS_URL": "",
+        "LOG_LEVEL": "WARNING"
+    }
+    for assignment in args.env:
+        name, _, value = assignment.partition("=")
+        env[name] = value
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(backend_port), "--log-level", "warning",
+         "--no-access-log"],
+        env=env, stdout=output, stderr=output
+    )
+    processes = [backend, fake]
+    backend_url, fake_url = f"http://127.0.0.1:{backend_port}", f"http://127.0.0.1:{fake_port}"
+    deadline = time.monotonic() + 30
+    for url in (fake_url + "/stats", backend_url + "/"):
+        while True:
+            try:
+                httpx.get(url, timeout=1).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline or any(process.poll() is not None for process in processes):
+                    stop_stack(processes)
+                    raise SystemExit(f"could not start the load test stack ({url} not reachable); rerun with --verbose")
+                time.sleep(0.2)
+    return backend_url, fake_url, processes
+
+
+def stop_stack(processes: List[subprocess.Popen]) -> None:
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", help="backend base URL; omit to start a fake Gemini and a backend")
+    parser.add_argument("--rate", type=float, default=10.0, help="arrivals per second")
+    parser.add_argument("--arrivals", choices=("constant", "poisson"), default="constant")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of load")
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="client timeout per request")
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--distinct-prompts", type=int, default=0,
+                        help="cycle through this many prompts (0 = every prompt unique)")
+    parser.add_argument("--api-key", help="X-API-Key sent with every request")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra environment for the started backend")
+    parser.add_argument("--json", help="also write the summary and samples to this file")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="show the started processes' output")
+    parser.add_argument("--fake", nargs=argparse.REMAINDER, default=[],
+                        help="the rest of the arguments are benchmarks.fake_gemini options for the started stack")
+    args = parser.parse_args()
+    fake_args = args.fake
+    logging.disable(logging.CRITICAL)
+
+    processes: List[subprocess.Popen] = []
+    fake_url = None
+    target = args.target
+    if target is None:
+        target, fake_url, processes = start_stack(args, fake_args)
+        print(f"backend {target} -> fake Gemini {fake_url} {' '.join(fake_args)}")
+
+    try:
+        summary = asyncio.run(drive(args, target))
+        if fake_url:
+            summary["fake_gemini"] = httpx.get(fake_url + "/stats", timeout=5).json()
+    finally:
+        stop_stack(processes)
+
+    backend = summary["backend"]
+    print(f"\noffered {summary['offered_rps']} rps ({args.arrivals}), {summary['sent']} sent, "
+          f"{summary['ok']} ok, {summary['unfinished']} unfinished; statuses {summary['statuses']}")
+    print(f"throughput {summary['throughput_rps']} rps; latency p50 {summary['p50_ms']} ms, "
+          f"p90 {summary['p90_ms']} ms, p99 {summary['p99_ms']} ms, max {summary['max_ms']} ms")
+    print(f"backend event-loop lag: worst p99 {backend.get('lag_p99_ms_worst')} ms, max {backend.get('lag_max_ms')} ms")
+    if "rss_start_mb" in backend:
+        print(f"backend RSS {backend['rss_start_mb']} -> {backend['rss_end_mb']} MB "
+              f"(peak {backend['rss_peak_mb']} MB, trend {backend['rss_growth_mb_per_hour']:+} MB/hour)")
+    if "fake_gemini" in summary:
+        fake = summary["fake_gemini"]
+        print(f"fake Gemini: {fake['requests']} requests, statuses {fake['by_status']}, "
+              f"{fake['truncated']} truncated, max {fake['max_in_flight']} in flight")
+    if summary["driver_lag_p99_ms"] > 50:
+        print(f"warning: driver event-loop lag p99 {summary['driver_lag_p99_ms']} ms; the driver may be the bottleneck")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump({"arguments": vars(args), "fake_arguments": fake_args, **summary}, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
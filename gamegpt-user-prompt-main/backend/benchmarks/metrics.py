@@ -0,0 +1,73 @@
+"""
+Metrics: cost of recording one stage call
+
+Times StageMetrics.record and a full `with registry.time(stage)` block (timer
+object, two perf_counter reads, counters, Prometheus bucket and sliding-window
+histogram) over latencies drawn from a log-normal distribution, then checks the
+windowed percentiles against the exact ones and times a /stats and /metrics render.
+
+Usage (from the backend directory):
+    python -m benchmarks.metrics --records 1000000
+"""
+
+import argparse
+import logging
+import math
+import os
+import random
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-stub")
+
+from app.core.metrics import MetricsRegistry  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--median-ms", type=float, default=800.0, help="median of the synthetic latencies")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    rng = random.Random(args.seed)
+    mu = math.log(args.median_ms / 1000)
+    latencies = [rng.lognormvariate(mu, 0.6) for _ in range(args.records)]
+
+    registry = MetricsRegistry()
+    stage = registry.stage("generate_response")
+    started = time.perf_counter()
+    for seconds in latencies:
+        stage.record(seconds)
+    record_ns = (time.perf_counter() - started) / args.records * 1e9
+
+    timed = registry.stage("build_full_prompt")
+    started = time.perf_counter()
+    for _ in range(args.records):
+        with registry.time("build_full_prompt"):
+            pass
+    timer_ns = (time.perf_counter() - started) / args.records * 1e9
+
+    ordered = sorted(latencies)
+    stats = stage.stats()
+    window = stats["windows"][f"{max(registry.windows)}s"]
+    print(f"records: {args.records:,}")
+    print(f"StageMetrics.record:        {record_ns:7.0f} ns/call")
+    print(f"with registry.time(stage):  {timer_ns:7.0f} ns/call  ({timed.requests:,} recorded)")
+    print(f"{'percentile':>10} | {'exact ms':>9} | {'histogram ms':>12} | {'error':>6}")
+    for fraction in (0.5, 0.95, 0.99):
+        exact = ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+        estimate = window[f"p{int(fraction * 100)}_ms"]
+        print(f"{'p' + str(int(fraction * 100)):>10} | {exact:>9.2f} | {estimate:>12.2f} | {abs(estimate - exact) / exact:>6.1%}")
+
+    started = time.perf_counter()
+    registry.stats()
+    stats_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    registry.prometheus()
+    prometheus_ms = (time.perf_counter() - started) * 1000
+    print(f"/stats render: {stats_ms:.2f} ms  /metrics render: {prometheus_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
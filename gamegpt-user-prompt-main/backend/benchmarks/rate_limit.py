@@ -0,0 +1,108 @@
+"""
+Rate limiter: per-request overhead of the in-memory token buckets and the middleware
+
+Times MemoryRateLimitBackend.check on its own, then drives a minimal ASGI app
+directly (no server, no HTTP parsing) with and without RateLimitMiddleware in
+front, for requests spread over --clients distinct IPs and API keys. The
+difference is what the limiter adds to every non-exempt request.
+
+Usage (from the backend directory):
+    python -m benchmarks.rate_limit --requests 200000 --clients 10000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, List
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-stub")
+
+from app.core.rate_limit_middleware import RateLimitMiddleware  # noqa: E402
+from app.services.rate_limiter import MemoryRateLimitBackend, RateLimiter  # noqa: E402
+
+
+async def plain_app(scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def make_scopes(count: int, clients: int, rng: random.Random) -> List[Dict[str, Any]]:
+    scopes = []
+    for _ in range(count):
+        client = rng.randrange(clients)
+        headers = [(b"host", b"api.example.com"), (b"user-agent", b"bench")]
+        if client % 2:
+            headers.append((b"x-api-key", f"key-{client}".encode()))
+        scopes.append({
+            "type": "http",
+            "method": "POST",
+            "path": "/generate",
+            "headers": headers,
+            "client": (f"10.0.{client // 256 % 256}.{client % 256}", 50000)
+        })
+    return scopes
+
+
+async def drive(app, scopes: List[Dict[str, Any]]) -> float:
+    """Seconds per request through app"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for scope in scopes:
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / len(scopes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=100, help="RATE_LIMIT_REQUESTS per client")
+    parser.add_argument("--window", type=int, default=3600, help="RATE_LIMIT_WINDOW seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    rng = random.Random(args.seed)
+    keys = [f"ip:10.0.0.{rng.randrange(args.clients)}" for _ in range(args.requests)]
+    backend = MemoryRateLimitBackend(args.limit, args.window)
+    started = time.perf_counter()
+    limited = sum(not backend.check(key).allowed for key in keys)
+    check_us = (time.perf_counter() - started) / len(keys) * 1e6
+
+    # Settings are read at import, so the limiter's policy is overridden from the arguments
+    limiter = RateLimiter()
+    limiter.memory = MemoryRateLimitBackend(args.limit, args.window)
+    limiter.limit, limiter.window, limiter.policy = args.limit, args.window, f"{args.limit};w={args.window}"
+    limiter.limit_header, limiter.policy_header = str(args.limit).encode(), limiter.policy.encode()
+    limiter.trust_api_key = True  # Also time the X-API-Key header scan
+    middleware = RateLimitMiddleware(plain_app, get_limiter=lambda: limiter)
+    scopes = make_scopes(args.requests, args.clients, rng)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(drive(plain_app, scopes[:1000]))
+        loop.run_until_complete(drive(middleware, scopes[:1000]))
+        bare_us = loop.run_until_complete(drive(plain_app, scopes)) * 1e6
+        limited_us = loop.run_until_complete(drive(middleware, scopes)) * 1e6
+    finally:
+        loop.close()
+
+    stats = limiter.stats()
+    print(f"requests: {args.requests:,}  clients: {args.clients:,}  policy: {limiter.policy}")
+    print(f"backend check:          {check_us:6.2f} us/request  ({limited:,} limited, {len(backend):,} buckets)")
+    print(f"bare ASGI app:          {bare_us:6.2f} us/request")
+    print(f"with RateLimitMiddleware: {limited_us:4.2f} us/request")
+    print(f"middleware overhead:    {limited_us - bare_us:6.2f} us/request  "
+          f"({stats['allowed']:,} allowed, {stats['limited']:,} limited with 429)")
+
+
+if __name__ == "__main__":
+    main()
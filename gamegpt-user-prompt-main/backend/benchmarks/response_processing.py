@@ -0,0 +1,295 @@
+"""
+Response processing: CPU cost per stage over the golden corpus of raw LLM outputs
+
+Times PromptBuilder (full and pruned prompts) and each ResponseProcessor stage —
+fence stripping, json.loads, the repair path (locating the object and repairing
+it) and the repair_json pass on its own, GameSchema validation, and
+process_response end to end — on every game type rendered clean, fenced,
+prefixed, with trailing commas, with Python literals, truncated and very large
+(benchmarks/llm_outputs.py). Reports throughput, p50/p95/p99 latency and the
+peak memory allocated per call (tracemalloc).
+
+Every sample's outcome (exact: parses to the source game; altered: parses to
+something else; error) is checked against benchmarks/golden/expected.json, and
+timings against a local baseline (benchmarks/baselines/, not committed: it is
+only comparable on the machine that wrote it). Outcome changes and stages slower
+or allocating more than --tolerance over the baseline are flagged and make the
+run exit with status 1.
+
+Usage (from the backend directory):
+    python -m benchmarks.response_processing --save-baseline
+    python -m benchmarks.response_processing
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import warnings
+from typing import Any, Callable, Dict, List, Optional
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-stub")
+
+from app.models.game_schemas import GameGenerationRequest  # noqa: E402
+from app.services.json_repair import repair_json  # noqa: E402
+from app.services.prompt_builder import PromptBuilder  # noqa: E402
+from app.services.response_processor import ResponseProcessor  # noqa: E402
+from benchmarks.llm_outputs import GAME_TYPES, GOLDEN_DIR, LARGE_CHARS, VARIANTS, Sample, corpus  # noqa: E402
+
+EXPECTED_PATH = os.path.join(GOLDEN_DIR, "expected.json")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "response_processing.json")
+
+# Report order
+STAGES = (
+    "build_full_prompt",
+    "build_prompt",
+    "clean_fences",
+    "json_loads",
+    "json_fix",
+    "json_repair",
+    "validate_schema",
+    "process_response"
+)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def timed(call: Callable[[Any], Any], setup: Callable[[], Any], iterations: int) -> List[float]:
+    """Seconds per call; setup() builds each call's argument outside the timed region"""
+    call(setup())
+    latencies = []
+    for _ in range(iterations):
+        argument = setup()
+        started = time.perf_counter()
+        call(argument)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def allocated(call: Callable[[Any], Any], setup: Callable[[], Any], repeats: int = 3) -> float:
+    """Mean peak bytes allocated during one call"""
+    tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(repeats):
+            argument = setup()
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            call(argument)
+            total += tracemalloc.get_traced_memory()[1] - before
+        return total / repeats
+    finally:
+        tracemalloc.stop()
+
+
+def swallow(call: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """Time failing calls (e.g. truncated output) as well: the error path is part of the cost"""
+    def wrapper(argument: Any) -> Any:
+        try:
+            return call(argument)
+        except Exception:
+            return None
+    return wrapper
+
+
+def outcome(processor: ResponseProcessor, sample: Sample) -> str:
+    """exact, altered or error for one sample"""
+    try:
+        game = processor.process_response(sample.text)
+    except Exception:
+        return "error"
+    expected = processor._validate_game_schema(copy.deepcopy(sample.game))
+    return "exact" if game.dict(exclude={"generatedAt"}) == expected.dict(exclude={"generatedAt"}) else "altered"
+
+
+def stage_calls(processor: ResponseProcessor, sample: Sample) -> Dict[str, tuple]:
+    """(call, setup) per ResponseProcessor stage that production runs for this sample"""
+    text = sample.text
+    cleaned = processor._clean_markdown_fences(text)
+    calls = {"clean_fences": (processor._clean_markdown_fences, lambda: text)}
+
+    parsed: Optional[str] = None
+    try:
+        json.loads(cleaned)
+        parsed = cleaned
+        calls["json_loads"] = (json.loads, lambda: cleaned)
+    except json.JSONDecodeError:
+        calls["json_fix"] = (processor._attempt_json_fix, lambda: cleaned)
+        calls["json_repair"] = (repair_json, lambda: cleaned)
+        fixed = processor._attempt_json_fix(cleaned)
+        try:
+            json.loads(fixed)
+            parsed = fixed
+        except json.JSONDecodeError:
+            pass
+
+    if parsed is not None:
+        # Validation fills in defaults in place, so each call gets a freshly parsed dict
+        calls["validate_schema"] = (swallow(processor._validate_game_schema), lambda: json.loads(parsed))
+    calls["process_response"] = (swallow(processor.process_response), lambda: text)
+    return calls
+
+
+def summarize(latencies: List[float], chars: int, alloc_bytes: Optional[float]) -> Dict[str, Any]:
+    seconds = sum(latencies)
+    return {
+        "calls": len(latencies),
+        "ops_per_s": round(len(latencies) / seconds, 1),
+        "mb_per_s": round(chars / seconds / 1e6, 2) if chars else None,
+        "p50_us": round(percentile(latencies, 0.50) * 1e6, 1),
+        "p95_us": round(percentile(latencies, 0.95) * 1e6, 1),
+        "p99_us": round(percentile(latencies, 0.99) * 1e6, 1),
+        "alloc_kib": round(alloc_bytes / 1024, 1) if alloc_bytes is not None else None
+    }
+
+
+def run(variants: List[str], iterations: int, large_chars: int, measure_alloc: bool) -> tuple:
+    """Per-stage results keyed "<stage>/<variant>", and the outcome of every sample"""
+    prompt_builder = PromptBuilder()
+    processor = ResponseProcessor()
+    collected: Dict[str, Dict[str, Any]] = {}
+
+    def collect(key: str, call: Callable[[Any], Any], setup: Callable[[], Any], chars: int) -> None:
+        """chars: input text per call, for MB/s (0 where the input is not raw output)"""
+        entry = collected.setdefault(key, {"latencies": [], "chars": 0, "alloc": []})
+        entry["latencies"] += timed(call, setup, iterations)
+        entry["chars"] += chars * iterations
+        if measure_alloc:
+            entry["alloc"].append(allocated(call, setup))
+
+    for game_type in GAME_TYPES:
+        user_prompt = f"A {game_type.replace('-', ' ')} game about managing stress for teens"
+        request = GameGenerationRequest(prompt=user_prompt, gameType=game_type)
+        collect("build_full_prompt/-", prompt_builder.build_full_prompt, lambda: user_prompt, 0)
+        collect("build_prompt/-", prompt_builder.build_prompt, lambda: request, 0)
+
+    outcomes = {}
+    for sample in corpus(variants, large_chars):
+        outcomes[sample.key] = outcome(processor, sample)
+        for stage, (call, setup) in stage_calls(processor, sample).items():
+            collect(f"{stage}/{sample.variant}", call, setup, 0 if stage == "validate_schema" else len(sample.text))
+
+    order = {variant: index for index, variant in enumerate(("-", *VARIANTS))}
+    results = {
+        key: summarize(entry["latencies"], entry["chars"],
+                       sum(entry["alloc"]) / len(entry["alloc"]) if entry["alloc"] else None)
+        for key, entry in sorted(
+            collected.items(),
+            key=lambda item: (order[item[0].split("/")[1]], STAGES.index(item[0].split("/")[0]))
+        )
+    }
+    return results, outcomes
+
+
+def compare(current: Optional[float], baseline: Optional[float], tolerance: float) -> str:
+    """Change against the baseline, marked when beyond the tolerance"""
+    if current is None or not baseline:
+        return ""
+    change = current / baseline - 1
+    if change > tolerance:
+        return f"{change:+.0%} REGRESSION"
+    if change < -tolerance:
+        return f"{change:+.0%} faster"
+    return f"{change:+.0%}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50, help="timed calls per sample and stage")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="comma-separated corpus variants")
+    parser.add_argument("--large-chars", type=int, default=LARGE_CHARS, help="size of the very_large samples")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed p50/allocation growth over the baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--update-golden", action="store_true", help="accept the current outcomes as golden")
+    parser.add_argument("--no-alloc", action="store_true", help="skip the tracemalloc pass")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    # The services still use pydantic's v1-style .dict()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    variants = [variant.strip() for variant in args.variants.split(",") if variant.strip()]
+    unknown = set(variants) - set(VARIANTS)
+    if unknown:
+        parser.error(f"unknown variants: {', '.join(sorted(unknown))}")
+
+    results, outcomes = run(variants, args.iterations, args.large_chars, not args.no_alloc)
+
+    baseline: Dict[str, Any] = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        if baseline.get("large_chars") != args.large_chars:
+            print(f"note: baseline very_large samples are {baseline.get('large_chars')} chars, not {args.large_chars}")
+    baseline_stages = baseline.get("stages", {})
+
+    regressions = 0
+    print(f"{'stage':<18} {'variant':<16} {'calls':>6} {'ops/s':>10} {'MB/s':>7} "
+          f"{'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'alloc KiB':>10}  vs baseline (p50, alloc)")
+    for key, result in results.items():
+        stage, variant = key.split("/")
+        previous = baseline_stages.get(key, {})
+        latency_change = compare(result["p50_us"], previous.get("p50_us"), args.tolerance)
+        alloc_change = compare(result["alloc_kib"], previous.get("alloc_kib"), args.tolerance)
+        regressions += "REGRESSION" in latency_change + alloc_change
+        mb_per_s = f"{result['mb_per_s']:.2f}" if result["mb_per_s"] is not None else "-"
+        alloc_kib = f"{result['alloc_kib']:.1f}" if result["alloc_kib"] is not None else "-"
+        print(f"{stage:<18} {variant:<16} {result['calls']:>6} {result['ops_per_s']:>10,.0f} {mb_per_s:>7} "
+              f"{result['p50_us']:>9,.1f} {result['p95_us']:>9,.1f} {result['p99_us']:>9,.1f} {alloc_kib:>10}  "
+              f"{', '.join(filter(None, (latency_change, alloc_change)))}")
+
+    expected: Dict[str, str] = {}
+    if os.path.exists(EXPECTED_PATH):
+        with open(EXPECTED_PATH, encoding="utf-8") as handle:
+            expected = json.load(handle)
+    changed = {key: (expected.get(key), result) for key, result in outcomes.items() if expected.get(key) != result}
+
+    counts = {name: sum(result == name for result in outcomes.values()) for name in ("exact", "altered", "error")}
+    print(f"\noutcomes over {len(outcomes)} samples: "
+          f"{counts['exact']} exact, {counts['altered']} altered, {counts['error']} error")
+    for variant in variants:
+        row = {name: sum(outcomes[f"{game_type}/{variant}"] == name for game_type in GAME_TYPES)
+               for name in ("exact", "altered", "error")}
+        print(f"  {variant:<16} {row['exact']:>2} exact {row['altered']:>2} altered {row['error']:>2} error")
+
+    if args.update_golden:
+        with open(EXPECTED_PATH, "w", encoding="utf-8") as handle:
+            json.dump({**expected, **outcomes}, handle, indent=2, sort_keys=True)
+            handle.write("\n")
+        print(f"golden outcomes written to {EXPECTED_PATH}")
+    elif changed:
+        print(f"\n{len(changed)} outcomes differ from {EXPECTED_PATH}:")
+        for key, (before, after) in sorted(changed.items()):
+            print(f"  {key:<34} {before or 'missing'} -> {after}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "iterations": args.iterations,
+                "large_chars": args.large_chars,
+                "stages": results
+            }, handle, indent=2)
+            handle.write("\n")
+        print(f"baseline written to {args.baseline}")
+    elif baseline_stages:
+        print(f"\n{regressions} stage regressions over {args.tolerance:.0%} against {args.baseline}")
+    else:
+        print(f"\nno baseline at {args.baseline}; run with --save-baseline to create one")
+
+    if regressions or (changed and not args.update_golden):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Semantic cache: lookup latency and hit quality at scale
+
+Fills a SemanticCache with synthetic prompts (topic x audience x game type x detail
+phrases), then times lookups for paraphrases of indexed prompts (should hit) and
+for unseen prompts (should miss). Lookup time includes shingling, MinHash, scope
+hashing and LSH candidate scoring, i.e. everything /generate pays per request.
+
+Usage (from the backend directory):
+    python -m benchmarks.semantic_cache --entries 100000 --queries 2000
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from typing import List, Tuple
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-stub")
+
+from app.models.game_schemas import GameGenerationRequest  # noqa: E402
+from app.services.prompt_builder import PromptBuilder  # noqa: E402
+from app.services.semantic_cache import SemanticCache  # noqa: E402
+
+TOPICS = [
+    "stress", "anxiety", "mindfulness", "coping", "emotions", "self care", "friendship",
+    "sleep", "negative thoughts", "breathing", "worry", "sadness", "communication", "resilience"
+]
+AUDIENCES = ["teens", "kids", "adults", "college students", "seniors", "parents", "nurses", "athletes"]
+GAME_WORDS = ["quiz", "memory match", "sorting game", "word search", "card flip", "story sequence"]
+DETAILS = [
+    "at school", "before exams", "at work", "after a breakup", "during holidays", "on social media",
+    "in the morning", "at bedtime", "with family", "in sports", "after moving", "in hospital",
+    "for beginners", "in a new job", "during lockdown", "in traffic"
+]
+PARAPHRASES = [
+    ("{game} about {topic} for {audience} {detail}", "a {game} on {topic} for {audience} {detail}"),
+    ("{topic} {game} for {audience} {detail}", "please create a {topic} {game} for {audience} {detail}"),
+    ("{game} for {audience} about {topic} {detail}", "{game} about {topic} for {audience} {detail}!")
+]
+
+
+def synthetic_prompts(count: int, rng: random.Random) -> List[Tuple[str, str]]:
+    """(indexed prompt, paraphrase) pairs; a numeric tag keeps every prompt distinct"""
+    pairs = []
+    for index in range(count):
+        original, paraphrase = rng.choice(PARAPHRASES)
+        words = {
+            "game": rng.choice(GAME_WORDS),
+            "topic": rng.choice(TOPICS),
+            "audience": rng.choice(AUDIENCES),
+            "detail": f"{rng.choice(DETAILS)} group {index}"
+        }
+        pairs.append((original.format(**words), paraphrase.format(**words)))
+    return pairs
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--trace-memory", action="store_true", help="measure index memory (slows the build)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    rng = random.Random(args.seed)
+    pairs = synthetic_prompts(args.entries, rng)
+    cache = SemanticCache(PromptBuilder(), max_entries=args.entries, threshold=args.threshold)
+    cache.enabled = True
+    game = {"id": "game-20250101-0001"}
+
+    if args.trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    for index, (prompt, _) in enumerate(pairs):
+        cache.add(GameGenerationRequest(prompt=prompt), f"key-{index}", game)
+    build_s = time.perf_counter() - started
+    memory_mb = None
+    if args.trace_memory:
+        memory_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+
+    def timed_lookups(prompts: List[str]) -> Tuple[List[float], int]:
+        latencies, hits = [], 0
+        for prompt in prompts:
+            request = GameGenerationRequest(prompt=prompt)
+            started = time.perf_counter()
+            match = cache.lookup(request)
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits += match is not None
+        return latencies, hits
+
+    paraphrases = [paraphrase for _, paraphrase in rng.sample(pairs, min(args.queries, len(pairs)))]
+    unseen = [prompt for prompt, _ in synthetic_prompts(args.queries, random.Random(args.seed + 1))]
+    unseen = [prompt.replace(" group ", " cohort ") + " xyz" for prompt in unseen]
+
+    print(f"entries: {len(cache)}  build: {build_s:.1f}s ({len(cache) / build_s:,.0f} adds/s)")
+    if memory_mb is not None:
+        print(f"index memory (tracemalloc, excluding shared game payload): {memory_mb:.1f} MB")
+    print(f"signature matrix: {cache.stats()['signature_bytes'] / 1e6:.1f} MB")
+    print(f"{'queries':>12} | {'count':>6} | {'hit rate':>8} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | {'mean ms':>7}")
+    for name, prompts in (("paraphrases", paraphrases), ("unseen", unseen)):
+        latencies, hits = timed_lookups(prompts)
+        print(
+            f"{name:>12} | {len(prompts):>6} | {hits / len(prompts):>8.3f} | {percentile(latencies, 0.5):>7.3f} | "
+            f"{percentile(latencies, 0.95):>7.3f} | {percentile(latencies, 0.99):>7.3f} | {statistics.fmean(latencies):>7.3f}"
+        )
+    print(f"avg LSH candidates per lookup: {cache.stats()['avg_candidates']}")
+
+
+if __name__ == "__main__":
+    main()
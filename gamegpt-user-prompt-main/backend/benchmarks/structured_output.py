@@ -0,0 +1,200 @@
+"""
+Structured output vs free text: parse-failure rate and end-to-end latency
+
+Runs GenerationPipeline.run against a stubbed Gemini (httpx.MockTransport) in both modes.
+Free-text replies are drawn from a mix of the artifacts seen in real Gemini output
+(fences, prose prefixes, trailing commas, Python literals, truncation); structured
+replies are plain JSON, truncated at the same rate since MAX_TOKENS still applies.
+Upstream latency is simulated as a fixed overhead plus a per-character generation cost.
+
+Usage (from the backend directory):
+    python -m benchmarks.structured_output --requests 500
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import time
+from typing import Dict, Any, List
+
+import httpx
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-stub")
+
+from app.core.config import get_settings  # noqa: E402
+from app.core.http_pool import HTTPConnectionPool  # noqa: E402
+from app.models.game_schemas import GameGenerationRequest  # noqa: E402
+from app.services.generation_cache import GenerationCache  # noqa: E402
+from app.services.generation_pipeline import GenerationPipeline  # noqa: E402
+from app.services.llm_service import LLMService  # noqa: E402
+from app.services.prompt_builder import PromptBuilder  # noqa: E402
+from app.services.response_processor import ResponseProcessor  # noqa: E402
+from app.services.single_flight import SingleFlight  # noqa: E402
+
+# Share of free-text replies per artifact (the remainder is clean JSON)
+FREE_TEXT_MIX = {
+    "fenced": 0.30,
+    "prefixed": 0.10,
+    "trailing_comma": 0.08,
+    "python_literals": 0.04,
+    "truncated": 0.03
+}
+TRUNCATION_RATE = FREE_TEXT_MIX["truncated"]
+
+BASE_LATENCY_S = 0.02
+PER_CHAR_LATENCY_S = 0.000005
+
+
+def sample_game(index: int) -> Dict[str, Any]:
+    return {
+        "id": f"game-20250101-{index % 10000:04d}",
+        "title": "Stress Management Quiz",
+        "description": "Learn to recognize stress and practice healthy coping strategies",
+        "type": "quiz",
+        "difficulty": "medium",
+        "category": "stress-reduction",
+        "estimatedTime": 15,
+        "config": {"maxAttempts": 3, "timeLimit": 900, "showProgress": True, "allowRetry": True,
+                   "shuffleOptions": True, "showHints": True, "autoNext": False},
+        "content": {
+            "questions": [
+                {
+                    "id": f"q{n}",
+                    "question": f"Which strategy helps most in stressful situation {n}?",
+                    "type": "multiple-choice",
+                    "options": ["Deep breathing", "Ignoring it", "Skipping sleep", "Worrying more"],
+                    "correctAnswer": "Deep breathing",
+                    "explanation": "Slow breathing activates the body's relaxation response.",
+                    "hint": "Think about what calms your body"
+                }
+                for n in range(1, 9)
+            ]
+        },
+        "scoring": {"maxScore": 100, "pointsPerCorrect": 10, "pointsPerIncorrect": -2,
+                    "bonusForSpeed": 5, "bonusForStreak": 10},
+        "ui": {"theme": "colorful", "layout": "list", "animations": True, "sounds": False, "particles": True},
+        "theme": "stress-management"
+    }
+
+
+def free_text_reply(game: Dict[str, Any], rng: random.Random) -> str:
+    text = json.dumps(game, indent=2)
+    roll = rng.random()
+    for artifact, share in FREE_TEXT_MIX.items():
+        if roll < share:
+            break
+        roll -= share
+    else:
+        return text
+
+    if artifact == "fenced":
+        return f"```json\n{text}\n```"
+    if artifact == "prefixed":
+        return f"Here is the JSON for your game:\n\n{text}\n\nHope this helps!"
+    if artifact == "trailing_comma":
+        return text.replace('"autoNext": false', '"autoNext": false,')
+    if artifact == "python_literals":
+        return text.replace("true", "True").replace("false", "False")
+    return text[:int(len(text) * 0.8)]
+
+
+def structured_reply(game: Dict[str, Any], rng: random.Random) -> str:
+    text = json.dumps(game, separators=(",", ":"))
+    if rng.random() < TRUNCATION_RATE:
+        return text[:int(len(text) * 0.8)]
+    return text
+
+
+def stub_transport(structured: bool, seed: int, payloads: List[Dict[str, Any]]) -> httpx.MockTransport:
+    rng = random.Random(seed)
+    counter = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal counter
+        counter += 1
+        payloads.append(json.loads(request.content))
+        game = sample_game(counter)
+        text = structured_reply(game, rng) if structured else free_text_reply(game, rng)
+        await asyncio.sleep(BASE_LATENCY_S + PER_CHAR_LATENCY_S * len(text))
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+    return httpx.MockTransport(handler)
+
+
+async def run_mode(structured: bool, requests: int, concurrency: int, seed: int) -> Dict[str, Any]:
+    settings = get_settings()
+    settings.STRUCTURED_OUTPUT_ENABLED = structured
+
+    payloads: List[Dict[str, Any]] = []
+    llm_service = LLMService(http_pool=HTTPConnectionPool(transport=stub_transport(structured, seed, payloads)))
+    response_processor = ResponseProcessor()
+    pipeline = GenerationPipeline(
+        prompt_builder=PromptBuilder(),
+        llm_service=llm_service,
+        response_processor=response_processor,
+        generation_cache=GenerationCache(),
+        single_flight=SingleFlight()
+    )
+
+    request = GameGenerationRequest(prompt="A quiz about managing stress for teens", gameType="quiz")
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+
+    async def one() -> None:
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await pipeline.run(request)
+            except Exception:
+                failures += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    await llm_service.close()
+
+    latencies.sort()
+    mode = "structured" if structured else "free_text"
+    processor_stats = response_processor.stats()[mode]
+    return {
+        "mode": mode,
+        "requests": requests,
+        "parse_failures": failures,
+        "failure_rate": round(failures / requests, 4),
+        "repaired": processor_stats["repaired"],
+        "avg_processing_ms": processor_stats["avg_processing_ms"],
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 1),
+        "mean_ms": round(statistics.fmean(latencies), 1),
+        "response_schema_sent": sum(
+            1 for payload in payloads if "responseSchema" in payload["generationConfig"]
+        )
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    results = [
+        await run_mode(structured, args.requests, args.concurrency, args.seed)
+        for structured in (False, True)
+    ]
+
+    columns = list(results[0])
+    print(" | ".join(f"{column:>20}" for column in columns))
+    for result in results:
+        print(" | ".join(f"{str(result[column]):>20}" for column in columns))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
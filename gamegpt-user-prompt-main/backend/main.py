@@ -6,22 +6,35 @@ Uses Google Gemini as the only LLM provider
 
 import json
 import re
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional, Dict, Any
 import logging
 
-from fastapi import FastAPI, HTTPException, Request, Depends
+from fastapi import FastAPI, HTTPException, Request, Response, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import httpx
 from dotenv import load_dotenv
 import os
 
 # Import custom modules
-from app.models.game_schemas import GameGenerationRequest, GameSchema
+from app.models.game_schemas import (
+    GameGenerationRequest,
+    GameSchema,
+    BatchGenerationRequest,
+    BatchGenerationResponse,
+    JobCreateRequest,
+    JobResponse
+)
 from app.core.container import get_service_container, ServiceContainer
 from app.core.config import get_settings
 from app.core.logging_config import setup_logging
+from app.core.client_identity import client_id
+from app.core.rate_limit_middleware import RateLimitMiddleware, charge_extra
+from app.core.metrics import Gauge, get_metrics
+from app.core.tracing import TracingMiddleware
 from app.core.exceptions import (
     handle_service_error, 
     handle_validation_error, 
@@ -37,18 +50,37 @@ load_dotenv()
 setup_logging()
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize and warm services on startup, close them on shutdown"""
+    logger.info("Starting GameGPT Backend API...")
+    container = get_service_container()
+    await container.startup()
+    logger.info("Service container initialized successfully")
+    
+    yield
+    
+    logger.info("Shutting down GameGPT Backend API...")
+    await container.shutdown()
+    logger.info("Shutdown complete")
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="GameGPT Backend API",
     description="AI-powered therapeutic game generation service",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Get application settings
 settings = get_settings()
 
+# Per-client rate limits; added before CORS so 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware, get_limiter=lambda: get_service_container().get_rate_limiter())
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -58,30 +90,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so traces and Server-Timing cover the whole request, including rejections
+app.add_middleware(TracingMiddleware, get_exporter=lambda: get_service_container().get_trace_exporter())
+
 # Dependency injection for services
 def get_services() -> ServiceContainer:
     """Dependency injection for service container"""
     return get_service_container()
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup"""
-    logger.info("Starting GameGPT Backend API...")
-    container = get_service_container()
-    container.initialize()
-    logger.info("Service container initialized successfully")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    logger.info("Shutting down GameGPT Backend API...")
-    container = get_service_container()
-    container.shutdown()
-    logger.info("Shutdown complete")
-
-
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -94,26 +111,20 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 async def health_check(services: ServiceContainer = Depends(get_services)):
-    """Detailed health check with dependency injection"""
-    try:
-        health_status = await services.health_check_all()
-        return health_status
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        return {
-            "status": "unhealthy",
-            "timestamp": datetime.now().isoformat(),
-            "error": str(e)
-        }
+    """Health check endpoint, including the Gemini circuit breaker state"""
+    breaker = services.get_llm_service().circuit_breaker.health_check()
+    return {
+        "status": breaker["status"],
+        "timestamp": datetime.now().isoformat(),
+        "circuit_breaker": breaker["state"]
+    }
 
 
 @app.post("/generate", response_model=GameSchema)
 async def generate_game(
     request: GameGenerationRequest,
+    http_request: Request,
     services: ServiceContainer = Depends(get_services)
 ):
     """
@@ -124,30 +135,18 @@ async def generate_game(
     2. Edit Fields builds the full prompt
     3. LLM Chain processes the prompt
     4. Code cleans and parses the response
+    
+    Requests matching a warm pool bucket get a pre-generated game (never the same
+    one twice per client), repeated prompts are served from the generation cache,
+    and concurrent identical requests share a single Gemini call.
     """
     try:
         logger.info(f"Received game generation request: {request.prompt[:100]}...")
         
-        # Step 1: Build the full therapeutic prompt (equivalent to Edit Fields node)
-        logger.info("Building therapeutic prompt...")
-        try:
-            full_prompt = services.get_prompt_builder().build_full_prompt(request.prompt)
-        except Exception as e:
-            raise handle_service_error(e, "prompt_builder", "build_full_prompt")
-        
-        # Step 2: Process through LLM (equivalent to Basic LLM Chain node)
-        logger.info("Processing through LLM...")
-        try:
-            raw_response = await services.get_llm_service().generate_response(full_prompt)
-        except Exception as e:
-            raise handle_external_service_error(e, "gemini", getattr(e, 'status_code', None))
-        
-        # Step 3: Clean and parse response (equivalent to Code node)
-        logger.info("Processing LLM response...")
-        try:
-            game_schema = services.get_response_processor().process_response(raw_response)
-        except Exception as e:
-            raise handle_service_error(e, "response_processor", "process_response")
+        # Steps 1-3 run inside the generation pipeline, behind the generation cache
+        game_schema = await services.get_generation_pipeline().generate(
+            request, client_id=client_id(http_request)
+        )
         
         logger.info(f"Successfully generated game: {game_schema.id}")
         return game_schema
@@ -165,6 +164,137 @@ async def generate_game(
         )
 
 
+def _format_sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/generate/stream")
+async def generate_game_stream(
+    request: GameGenerationRequest,
+    services: ServiceContainer = Depends(get_services)
+):
+    """
+    Streaming game generation endpoint (Server-Sent Events)
+    
+    Events, in order:
+    - field: a top-level game field (title, type, difficulty, config, ui, ...) as soon as it is complete
+    - content_field: a scalar inside content (instructions, startId, ...)
+    - item: one content element (a quiz question, memory pair, scenario, ...)
+    - game: the fully validated GameSchema
+    - metrics: time-to-first-item and time-to-complete for this request
+    - error: structured error detail if generation fails mid-stream
+    """
+    logger.info(f"Received streaming generation request: {request.prompt[:100]}...")
+    
+    async def event_source():
+        async for event in services.get_stream_generator().stream(request):
+            yield _format_sse(event["event"], event["data"])
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/generate/batch", response_model=BatchGenerationResponse)
+async def generate_game_batch(
+    batch: BatchGenerationRequest,
+    http_request: Request,
+    services: ServiceContainer = Depends(get_services)
+):
+    """
+    Generate several games in one call
+    
+    Items run through the same pipeline as /generate (warm pool, caches, request
+    coalescing), at most BATCH_CONCURRENCY at a time. Each item gets either its game
+    or the structured error /generate would have returned for it.
+    
+    With "stream": true the response is NDJSON: one {"type": "item", ...} line per
+    item in completion order, then a {"type": "summary", ...} line.
+    """
+    if len(batch.items) > settings.BATCH_MAX_ITEMS:
+        raise create_error_response(
+            error_code=ErrorCode.INVALID_REQUEST,
+            message=f"Batch too large: {len(batch.items)} items (maximum {settings.BATCH_MAX_ITEMS})",
+            details={"field": "items", "max_items": settings.BATCH_MAX_ITEMS},
+            status_code=400
+        )
+    
+    # One token per item: the middleware took the first
+    await charge_extra(http_request.scope, services.get_rate_limiter(), len(batch.items) - 1)
+    
+    logger.info(f"Received batch generation request with {len(batch.items)} items")
+    batch_generator = services.get_batch_generator()
+    caller = client_id(http_request)
+    
+    if not batch.stream:
+        return await batch_generator.run(batch.items, client_id=caller)
+    
+    async def ndjson_lines():
+        started = datetime.now()
+        succeeded = failed = 0
+        async for result in batch_generator.as_completed(batch.items, client_id=caller):
+            if result.status == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+            yield json.dumps({"type": "item", **result.dict()}, default=str) + "\n"
+        elapsed_ms = (datetime.now() - started).total_seconds() * 1000
+        yield json.dumps({
+            "type": "summary",
+            "succeeded": succeeded,
+            "failed": failed,
+            "elapsed_ms": round(elapsed_ms, 1)
+        }) + "\n"
+    
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job(
+    job_request: JobCreateRequest,
+    http_request: Request,
+    response: Response,
+    services: ServiceContainer = Depends(get_services)
+):
+    """
+    Queue a game generation and return immediately
+    
+    Poll GET /jobs/{id} for the result. If callbackUrl is given, the finished job
+    (same body as GET /jobs/{id}) is POSTed to it. Returns 503 JOB_QUEUE_FULL when
+    JOB_QUEUE_SIZE jobs are already waiting.
+    """
+    job_manager = services.get_job_manager()
+    job = await job_manager.submit(
+        job_request.request,
+        callback_url=str(job_request.callbackUrl) if job_request.callbackUrl else None,
+        client_id=client_id(http_request)
+    )
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job_manager.view(job)
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, services: ServiceContainer = Depends(get_services)):
+    """Status of a generation job, with the game or structured error once it has finished"""
+    job_manager = services.get_job_manager()
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise create_error_response(
+            error_code=ErrorCode.JOB_NOT_FOUND,
+            message=f"Job '{job_id}' not found (unknown or expired)",
+            details={"job_id": job_id},
+            status_code=404
+        )
+    return job_manager.view(job)
+
+
 @app.post("/generate/debug")
 async def generate_game_debug(
     request: GameGenerationRequest,
@@ -178,25 +308,29 @@ async def generate_game_debug(
         
         # Step 1: Build prompt
         try:
-            full_prompt = services.get_prompt_builder().build_full_prompt(request.prompt)
+            prompt_result = services.get_prompt_builder().build_prompt(request)
+            full_prompt = prompt_result.prompt
         except Exception as e:
             raise handle_service_error(e, "prompt_builder", "build_full_prompt")
         
         # Step 2: Get LLM response
         try:
-            raw_response = await services.get_llm_service().generate_response(full_prompt)
+            raw_response = await services.get_llm_service().generate_response(full_prompt, prompt_result.game_types)
         except Exception as e:
             raise handle_external_service_error(e, "gemini", getattr(e, 'status_code', None))
         
         # Step 3: Process response
         try:
-            game_schema = services.get_response_processor().process_response(raw_response)
+            game_schema = services.get_response_processor().process_response(
+                raw_response, structured=services.get_llm_service().structured_output
+            )
         except Exception as e:
             raise handle_service_error(e, "response_processor", "process_response")
         
         return {
             "request": request.dict(),
             "full_prompt": full_prompt[:500] + "..." if len(full_prompt) > 500 else full_prompt,
+            "prompt_stats": prompt_result.summary(),
             "raw_response": raw_response[:500] + "..." if len(raw_response) > 500 else raw_response,
             "final_game": game_schema.dict()
         }
@@ -283,16 +417,78 @@ async def generate_test_game():
 
 
 @app.get("/stats")
-async def get_stats():
-    """Get API usage statistics"""
+async def get_stats(services: ServiceContainer = Depends(get_services)):
+    """Get API usage statistics, with per-stage latency percentiles over sliding windows"""
+    stages = get_metrics().stats()
+    generations = stages["generate"]
     return {
-        "total_requests": "Not implemented",
-        "successful_generations": "Not implemented", 
-        "error_rate": "Not implemented",
-        "avg_response_time": "Not implemented"
+        "total_requests": generations["requests"],
+        "successful_generations": generations["successes"],
+        "error_rate": generations["error_rate"],
+        "avg_response_time": generations["avg_ms"],
+        "stages": stages,
+        "prompt_builder": services.get_prompt_builder().stats(),
+        "response_processor": services.get_response_processor().stats(),
+        "rate_limit": services.get_rate_limiter().stats(),
+        "tracing": services.get_trace_exporter().stats(),
+        "runtime": services.get_runtime_monitor().stats(),
+        "http_pool": services.get_http_pool().stats(),
+        "llm_transport": services.get_llm_transport().stats() if services.get_llm_transport() else None,
+        "llm_service": services.get_llm_service().stats(),
+        "generation_pipeline": services.get_generation_pipeline().stats(),
+        "generation_cache": services.get_generation_cache().stats(),
+        "semantic_cache": services.get_semantic_cache().stats(),
+        "single_flight": services.get_single_flight().stats(),
+        "streaming": services.get_stream_generator().stats(),
+        "warm_pool": services.get_warm_pool().stats(),
+        "batch": services.get_batch_generator().stats(),
+        "jobs": services.get_job_manager().stats(),
+        "distributed_dedup": (
+            services.get_distributed_dedup().stats() if services.get_distributed_dedup() else None
+        )
     }
 
 
+# Numeric value of each circuit breaker state in gamegpt_circuit_breaker_state
+BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def service_gauges(services: ServiceContainer) -> list:
+    """Circuit breaker, adaptive concurrency limit and cache gauges for /metrics"""
+    llm_service = services.get_llm_service()
+    breaker = llm_service.circuit_breaker
+    limiter = llm_service.concurrency_limiter
+    dependency = {"dependency": breaker.name}
+    caches = {
+        "generation": services.get_generation_cache().stats(),
+        "semantic": services.get_semantic_cache().stats(),
+        "warm_pool": services.get_warm_pool().stats()
+    }
+    return [
+        Gauge("gamegpt_circuit_breaker_state", "Gemini circuit breaker state (0 closed, 1 half open, 2 open)",
+              [(dependency, BREAKER_STATE_VALUES[breaker.state] if breaker.enabled else 0)]),
+        Gauge("gamegpt_concurrency_limit", "Current adaptive (AIMD) limit on concurrent Gemini calls",
+              [(dependency, limiter.limit)]),
+        Gauge("gamegpt_concurrency_in_flight", "Gemini calls holding a concurrency slot",
+              [(dependency, limiter.in_flight)]),
+        Gauge("gamegpt_concurrency_queue_length", "Gemini calls waiting for a concurrency slot",
+              [(dependency, limiter.queue_length)]),
+        Gauge("gamegpt_cache_hit_ratio", "Hits per lookup since start",
+              [({"cache": name}, stats["hit_rate"]) for name, stats in caches.items()]),
+        Gauge("gamegpt_cache_entries", "Entries held (games ready, for the warm pool)",
+              [({"cache": name}, stats["depth"] if name == "warm_pool" else stats["entries"])
+               for name, stats in caches.items()])
+    ]
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_prometheus_metrics(services: ServiceContainer = Depends(get_services)):
+    """Per-stage counters and latency histograms, and service gauges, in the Prometheus text format"""
+    return PlainTextResponse(
+        get_metrics().prometheus(service_gauges(services)), media_type="text/plain; version=0.0.4"
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from app.core.config import get_settings  # noqa: E402
+from tests.fake_redis import FakeRedis  # noqa: E402
+
+
+@pytest.fixture
+def settings():
+    """The shared settings object; override attributes with monkeypatch.setattr"""
+    return get_settings()
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
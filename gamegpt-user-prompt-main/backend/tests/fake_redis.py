@@ -0,0 +1,122 @@
+"""
+In-memory stand-in for the redis.asyncio client used by the services
+
+Covers only what the services call: get/set (nx, px, ex), delete, eval of the
+lease scripts, and publish/pubsub. Setting down = True makes every call raise
+ConnectionError; fail_next["<method>"] = n fails the next n calls of one method.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class FakePubSub:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.channels: List[str] = []
+        self.messages: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+
+    async def subscribe(self, *channels: str) -> None:
+        self.redis._check("subscribe")
+        for channel in channels:
+            self.channels.append(channel)
+            self.redis._subscribers.setdefault(channel, []).append(self)
+
+    async def unsubscribe(self, *channels: str) -> None:
+        for channel in channels or list(self.channels):
+            subscribers = self.redis._subscribers.get(channel, [])
+            if self in subscribers:
+                subscribers.remove(self)
+            self.channels.remove(channel)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        self.redis._check("get_message")
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self) -> None:
+        await self.unsubscribe()
+
+
+class FakeRedis:
+    def __init__(self):
+        self.down = False
+        self.fail_next: Dict[str, int] = {}
+        self.calls: Dict[str, int] = {}
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._subscribers: Dict[str, List[FakePubSub]] = {}
+
+    def _check(self, method: str) -> None:
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.fail_next.get(method, 0) > 0:
+            self.fail_next[method] -= 1
+            raise ConnectionError(f"fake redis: {method} failed")
+        if self.down:
+            raise ConnectionError("fake redis: connection refused")
+
+    def _live(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[str]:
+        self._check("get")
+        return self._live(key)
+
+    async def set(self, key: str, value: Any, ex: Optional[float] = None, px: Optional[float] = None,
+                  nx: bool = False) -> Optional[bool]:
+        self._check("set")
+        if nx and self._live(key) is not None:
+            return None
+        ttl = ex if ex is not None else (px / 1000 if px is not None else None)
+        self._data[key] = (str(value), time.monotonic() + ttl if ttl is not None else None)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        self._check("delete")
+        removed = 0
+        for key in keys:
+            if self._live(key) is not None:
+                del self._data[key]
+                removed += 1
+        return removed
+
+    async def eval(self, script: str, numkeys: int, *args: Any) -> int:
+        """Compare-and-delete / compare-and-pexpire, the only scripts the services run"""
+        self._check("eval")
+        keys, argv = args[:numkeys], [str(arg) for arg in args[numkeys:]]
+        if self._live(keys[0]) != argv[0]:
+            return 0
+        if "'del'" in script:
+            del self._data[keys[0]]
+        elif "'pexpire'" in script:
+            value, _ = self._data[keys[0]]
+            self._data[keys[0]] = (value, time.monotonic() + int(argv[1]) / 1000)
+        else:
+            raise NotImplementedError(script)
+        return 1
+
+    async def publish(self, channel: str, message: str) -> int:
+        self._check("publish")
+        subscribers = self._subscribers.get(channel, [])
+        for pubsub in subscribers:
+            pubsub.messages.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(subscribers)
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self)
+
+    def ttl_ms(self, key: str) -> Optional[float]:
+        """Remaining TTL of a key in milliseconds, for assertions"""
+        if self._live(key) is None:
+            return None
+        expires_at = self._data[key][1]
+        return None if expires_at is None else (expires_at - time.monotonic()) * 1000
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from app.core.exceptions import CircuitOpenException, ErrorCode, ExternalServiceException
+from app.services.circuit_breaker import CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def breaker_settings(settings, monkeypatch):
+    monkeypatch.setattr(settings, "BREAKER_ENABLED", True)
+    monkeypatch.setattr(settings, "BREAKER_WINDOW", 10)
+    monkeypatch.setattr(settings, "BREAKER_MIN_CALLS", 4)
+    monkeypatch.setattr(settings, "BREAKER_FAILURE_RATE", 0.5)
+    monkeypatch.setattr(settings, "BREAKER_SLOW_CALL_SECONDS", 5)
+    monkeypatch.setattr(settings, "BREAKER_SLOW_CALL_RATE", 0.8)
+    monkeypatch.setattr(settings, "BREAKER_OPEN_SECONDS", 30)
+    monkeypatch.setattr(settings, "BREAKER_HALF_OPEN_CALLS", 2)
+    return settings
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breaker(breaker_settings, clock):
+    return CircuitBreaker(clock=clock)
+
+
+async def succeed(clock=None, seconds=0.0):
+    if clock is not None:
+        clock.now += seconds
+    return "ok"
+
+
+async def fail(status_code=503):
+    raise ExternalServiceException("gemini failed", ErrorCode.GEMINI_API_ERROR, "gemini", status_code=status_code)
+
+
+async def record_failures(breaker, count, status_code=503):
+    for _ in range(count):
+        with pytest.raises(ExternalServiceException):
+            await breaker.call(lambda: fail(status_code))
+
+
+async def test_opens_at_failure_rate_after_min_calls(breaker):
+    await record_failures(breaker, 3)
+    assert breaker.state == "closed"  # below BREAKER_MIN_CALLS
+
+    await breaker.call(succeed)
+    await record_failures(breaker, 1)
+    assert breaker.state == "open"
+
+
+async def test_permanent_errors_do_not_count(breaker):
+    await record_failures(breaker, 6, status_code=400)
+    assert breaker.state == "closed"
+    assert breaker.stats()["failures"] == 0
+
+
+async def test_slow_calls_open_it(breaker, clock):
+    for _ in range(4):
+        await breaker.call(lambda: succeed(clock, seconds=6))
+    assert breaker.state == "open"
+
+
+async def test_open_rejects_until_open_seconds_pass(breaker, clock):
+    await record_failures(breaker, 4)
+    clock.now += 10
+
+    with pytest.raises(CircuitOpenException) as rejected:
+        await breaker.call(succeed)
+    assert rejected.value.details["retry_after"] == "21s"
+    assert breaker.stats()["rejected"] == 1
+
+
+async def test_half_open_probes_close_it(breaker, clock):
+    await record_failures(breaker, 4)
+    clock.now += 30
+
+    assert await breaker.call(succeed) == "ok"
+    assert breaker.state == "half_open"
+    assert await breaker.call(succeed) == "ok"
+    assert breaker.state == "closed"
+    assert breaker.stats()["window_calls"] == 0
+
+
+async def test_failed_probe_reopens_it(breaker, clock):
+    await record_failures(breaker, 4)
+    clock.now += 30
+
+    await record_failures(breaker, 1)
+    assert breaker.state == "open"
+    assert breaker.stats()["opened"] == 2
+
+
+async def test_half_open_admits_limited_probes(breaker, clock):
+    await record_failures(breaker, 4)
+    clock.now += 30
+    release = asyncio.Event()
+
+    async def held():
+        await release.wait()
+        return "ok"
+
+    probes = [asyncio.create_task(breaker.call(held)) for _ in range(2)]
+    await asyncio.sleep(0)
+    with pytest.raises(CircuitOpenException):
+        await breaker.call(succeed)
+
+    release.set()
+    assert await asyncio.gather(*probes) == ["ok", "ok"]
+    assert breaker.state == "closed"
+
+
+async def test_cancelled_probe_frees_its_slot(breaker, clock):
+    await record_failures(breaker, 4)
+    clock.now += 30
+
+    probe = asyncio.create_task(breaker.call(asyncio.Event().wait))
+    await asyncio.sleep(0)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    assert breaker.state == "half_open"
+    assert breaker._probes_in_flight == 0
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from app.core.exceptions import ErrorCode, ExternalServiceException, ThrottledException
+from app.services.concurrency_limiter import AdaptiveConcurrencyLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def aimd_settings(settings, monkeypatch):
+    monkeypatch.setattr(settings, "AIMD_ENABLED", True)
+    monkeypatch.setattr(settings, "AIMD_INITIAL_LIMIT", 4)
+    monkeypatch.setattr(settings, "AIMD_MIN_LIMIT", 1)
+    monkeypatch.setattr(settings, "AIMD_MAX_LIMIT", 8)
+    monkeypatch.setattr(settings, "AIMD_DECREASE_FACTOR", 0.5)
+    monkeypatch.setattr(settings, "AIMD_LATENCY_SPIKE_FACTOR", 3)
+    monkeypatch.setattr(settings, "AIMD_MAX_QUEUE", 2)
+    monkeypatch.setattr(settings, "AIMD_QUEUE_TIMEOUT", 0.1)
+    return settings
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def limiter(aimd_settings, clock):
+    return AdaptiveConcurrencyLimiter(clock=clock)
+
+
+def rate_limited():
+    return ExternalServiceException("quota", ErrorCode.GEMINI_RATE_LIMIT, "gemini", status_code=429)
+
+
+async def test_rate_limit_cuts_the_limit_once_per_event(limiter, clock):
+    permits = [await limiter.acquire() for _ in range(3)]
+    clock.now += 1
+
+    for permit in permits:
+        limiter.release(permit, error=rate_limited())
+
+    # Calls already in flight at the first cut belong to the same congestion event
+    assert limiter.limit == 2
+    assert limiter.stats()["decreases_by_reason"] == {"rate_limit": 1}
+
+
+async def test_permanent_errors_leave_the_limit(limiter):
+    permit = await limiter.acquire()
+    limiter.release(permit, error=ExternalServiceException("bad", ErrorCode.GEMINI_API_ERROR, "gemini", status_code=400))
+    assert limiter.limit == 4
+
+
+async def test_saturated_successes_raise_the_limit(limiter):
+    # Four calls always in flight: +1 once a limit's worth of them succeeded at the limit,
+    # then no more, as four calls no longer fill the raised limit
+    permits = [await limiter.acquire() for _ in range(4)]
+    for _ in range(30):
+        limiter.release(permits.pop(0))
+        permits.append(await limiter.acquire())
+    assert limiter.limit == 5
+    assert limiter.stats()["increases"] == 1
+
+
+async def test_unsaturated_successes_do_not_raise_it(limiter):
+    for _ in range(20):
+        limiter.release(await limiter.acquire())
+    assert limiter.limit == 4
+
+
+async def test_latency_spike_cuts_the_limit(limiter, clock):
+    for _ in range(AdaptiveConcurrencyLimiter.MIN_LATENCY_SAMPLES):
+        permit = await limiter.acquire()
+        clock.now += 1
+        limiter.release(permit)
+
+    permit = await limiter.acquire()
+    clock.now += 5
+    limiter.release(permit)
+    assert limiter.limit == 2
+    assert limiter.stats()["decreases_by_reason"] == {"latency_spike": 1}
+
+
+async def test_queued_calls_are_admitted_in_order(limiter):
+    permits = [await limiter.acquire() for _ in range(4)]
+    order = []
+
+    async def queued(name):
+        permit = await limiter.acquire()
+        order.append(name)
+        return permit
+
+    waiting = [asyncio.create_task(queued(name)) for name in ("first", "second")]
+    await asyncio.sleep(0)
+    assert limiter.queue_length == 2
+    assert not limiter.has_headroom()
+
+    limiter.release(permits.pop())
+    limiter.release(permits.pop())
+    await asyncio.gather(*waiting)
+    assert order == ["first", "second"]
+    assert limiter.in_flight == 4
+
+
+async def test_full_queue_and_long_wait_are_throttled(limiter):
+    for _ in range(4):
+        await limiter.acquire()
+    waiting = [asyncio.create_task(limiter.acquire()) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(ThrottledException) as full:
+        await limiter.acquire()
+    assert full.value.details["reason"] == "queue_full"
+
+    outcomes = await asyncio.gather(*waiting, return_exceptions=True)
+    assert [outcome.details["reason"] for outcome in outcomes] == ["timeout", "timeout"]
+    assert limiter.queue_length == 0
+    assert limiter.in_flight == 4
+
+
+async def test_cancelled_call_returns_its_slot_without_signal(limiter):
+    task = asyncio.create_task(limiter.run(asyncio.Event().wait))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert limiter.in_flight == 0
+    assert limiter.limit == 4
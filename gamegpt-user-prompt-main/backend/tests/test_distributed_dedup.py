@@ -0,0 +1,216 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.distributed_dedup import DistributedDeduplicator
+
+
+@pytest.fixture
+def dedup_settings(settings, monkeypatch):
+    monkeypatch.setattr(settings, "DEDUP_KEY_PREFIX", "test:dedup:")
+    monkeypatch.setattr(settings, "DEDUP_LEASE_TTL_MS", 300)
+    monkeypatch.setattr(settings, "DEDUP_RESULT_TTL", 60)
+    monkeypatch.setattr(settings, "DEDUP_MAX_WAIT", 5)
+    monkeypatch.setattr(settings, "DEDUP_POLL_INTERVAL", 0.02)
+    return settings
+
+
+def replicas(redis, count):
+    """Deduplicators for separate replicas sharing one Redis"""
+    return [DistributedDeduplicator(redis) for _ in range(count)]
+
+
+class Generation:
+    """A pipeline run that records when it started and can be held open"""
+
+    def __init__(self, result=None, error=None, duration=0.0):
+        self.result = result if result is not None else {"title": "game"}
+        self.error = error
+        self.duration = duration
+        self.started_at = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self):
+        self.started_at.append(time.monotonic())
+        await self.release.wait()
+        await asyncio.sleep(self.duration)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def start_owner(dedup, generation, key="k"):
+    """Start a run and return once it holds the lease and is generating"""
+    generation.release.clear()
+    task = asyncio.create_task(dedup.run(key, generation))
+    while not generation.started_at:
+        await asyncio.sleep(0)
+    return task
+
+
+async def test_result_fans_out_to_waiters(dedup_settings, redis):
+    owner, *waiters = replicas(redis, 4)
+    generation = Generation(result={"title": "shared"})
+
+    owner_task = await start_owner(owner, generation)
+    waiting = [asyncio.create_task(waiter.run("k", Generation())) for waiter in waiters]
+    await asyncio.sleep(0.05)
+    generation.release.set()
+
+    assert await owner_task == {"title": "shared"}
+    assert await asyncio.gather(*waiting) == [{"title": "shared"}] * 3
+    assert len(generation.started_at) == 1
+    assert all(waiter.stats()["shared_results"] == 1 for waiter in waiters)
+    assert redis.calls["publish"] == 1
+
+
+async def test_later_request_reads_stored_result(dedup_settings, redis):
+    first, second = replicas(redis, 2)
+    await first.run("k", Generation(result={"title": "stored"}))
+
+    generation = Generation()
+    assert await second.run("k", generation) == {"title": "stored"}
+    assert not generation.started_at
+    assert second.stats()["shared_results"] == 1
+
+
+async def test_waiter_takes_over_expired_lease(dedup_settings, redis):
+    dedup = DistributedDeduplicator(redis)
+    # A crashed owner: its lease is never renewed or released, and no result appears
+    await redis.set("test:dedup:k:lease", "crashed-owner", nx=True, px=100)
+    generation = Generation(result={"title": "recovered"})
+
+    assert await dedup.run("k", generation) == {"title": "recovered"}
+    assert len(generation.started_at) == 1
+    stats = dedup.stats()
+    assert stats["lease_takeovers"] == 1
+    assert stats["owned"] == 1
+    assert await redis.get("test:dedup:k:result") is not None
+
+
+async def test_only_one_waiter_takes_over(dedup_settings, redis):
+    waiters = replicas(redis, 3)
+    await redis.set("test:dedup:k:lease", "crashed-owner", nx=True, px=100)
+    generations = [Generation(result={"title": "recovered"}, duration=0.05) for _ in waiters]
+
+    results = await asyncio.gather(*(waiter.run("k", gen) for waiter, gen in zip(waiters, generations)))
+
+    assert results == [{"title": "recovered"}] * 3
+    assert sum(len(gen.started_at) for gen in generations) == 1
+    assert sum(waiter.stats()["lease_takeovers"] for waiter in waiters) == 1
+
+
+async def test_owner_failure_hands_lease_to_one_waiter(dedup_settings, redis):
+    owner, *waiters = replicas(redis, 4)
+    owner_generation = Generation(error=RuntimeError("gemini down"))
+
+    owner_task = await start_owner(owner, owner_generation)
+    generations = [Generation(result={"title": "retry"}, duration=0.05) for _ in waiters]
+    waiting = [asyncio.create_task(waiter.run("k", gen)) for waiter, gen in zip(waiters, generations)]
+    await asyncio.sleep(0.05)
+    owner_generation.release.set()
+
+    with pytest.raises(RuntimeError):
+        await owner_task
+    assert await asyncio.gather(*waiting) == [{"title": "retry"}] * 3
+
+    # One retry behind the lease, not a burst of local generations
+    assert sum(len(gen.started_at) for gen in generations) == 1
+    assert sum(waiter.stats()["owner_failures"] for waiter in waiters) == 1
+    assert sum(waiter.stats()["shared_results"] for waiter in waiters) == 2
+    assert await redis.get("test:dedup:k:failed") is None
+
+
+async def test_repeated_failure_is_retried_one_waiter_at_a_time(dedup_settings, redis):
+    owner, *waiters = replicas(redis, 3)
+    owner_task = await start_owner(owner, Generation(error=RuntimeError("429")))
+    generations = [Generation(error=RuntimeError("429"), duration=0.05) for _ in waiters]
+    waiting = [asyncio.create_task(waiter.run("k", gen)) for waiter, gen in zip(waiters, generations)]
+    await asyncio.sleep(0.05)
+    owner_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await owner_task
+
+    outcomes = await asyncio.gather(*waiting, return_exceptions=True)
+
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    starts = sorted(gen.started_at[0] for gen in generations)
+    assert starts[1] - starts[0] >= 0.05
+
+
+async def test_next_owner_clears_failure_marker(dedup_settings, redis):
+    first, second = replicas(redis, 2)
+    with pytest.raises(RuntimeError):
+        await first.run("k", Generation(error=RuntimeError("gemini down")))
+    assert await redis.get("test:dedup:k:failed") is not None
+
+    assert await second.run("k", Generation(result={"title": "retry"})) == {"title": "retry"}
+    assert await redis.get("test:dedup:k:failed") is None
+
+
+async def test_cancelled_owner_hands_lease_to_one_waiter(dedup_settings, redis):
+    owner, *waiters = replicas(redis, 3)
+    owner_task = await start_owner(owner, Generation())
+    generations = [Generation(result={"title": "recovered"}, duration=0.05) for _ in waiters]
+    waiting = [asyncio.create_task(waiter.run("k", gen)) for waiter, gen in zip(waiters, generations)]
+    await asyncio.sleep(0.05)
+
+    owner_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await owner_task
+
+    assert await asyncio.gather(*waiting) == [{"title": "recovered"}] * 2
+    assert sum(len(gen.started_at) for gen in generations) == 1
+    assert await redis.get("test:dedup:k:failed") is None
+
+
+async def test_heartbeat_survives_transient_renew_error(dedup_settings, redis):
+    owner, waiter = replicas(redis, 2)
+    redis.fail_next["eval"] = 1  # The first renewal fails
+    generation = Generation(result={"title": "slow"}, duration=0.6)  # Two lease TTLs
+
+    owner_task = asyncio.create_task(owner.run("k", generation))
+    await asyncio.sleep(0.5)
+    assert await redis.get("test:dedup:k:lease") is not None
+
+    waiter_generation = Generation()
+    assert await waiter.run("k", waiter_generation) == {"title": "slow"}
+    assert await owner_task == {"title": "slow"}
+    assert not waiter_generation.started_at
+    assert waiter.stats()["lease_takeovers"] == 0
+    assert owner.stats()["redis_errors"] == 1
+
+
+async def test_heartbeat_stops_before_release(dedup_settings, redis):
+    dedup = DistributedDeduplicator(redis)
+    await dedup.run("k", Generation(duration=0.25))
+    evals = redis.calls["eval"]
+
+    await asyncio.sleep(0.15)  # Longer than the renew interval
+    assert redis.calls["eval"] == evals
+    assert await redis.get("test:dedup:k:lease") is None
+
+
+async def test_redis_down_generates_locally(dedup_settings, redis):
+    redis.down = True
+    dedup = DistributedDeduplicator(redis)
+    generation = Generation(result={"title": "local"})
+
+    assert await dedup.run("k", generation) == {"title": "local"}
+    assert len(generation.started_at) == 1
+    assert dedup.stats()["redis_errors"] == 1
+
+
+async def test_polls_without_pubsub(dedup_settings, redis, monkeypatch):
+    owner, waiter = replicas(redis, 2)
+    monkeypatch.setattr(waiter, "_subscribe", lambda key: asyncio.sleep(0))  # Always poll
+    generation = Generation(result={"title": "polled"})
+
+    owner_task = await start_owner(owner, generation)
+    waiting = asyncio.create_task(waiter.run("k", Generation()))
+    await asyncio.sleep(0.05)
+    generation.release.set()
+
+    assert await owner_task == await waiting == {"title": "polled"}
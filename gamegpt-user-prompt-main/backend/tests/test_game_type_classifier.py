@@ -0,0 +1,47 @@
+import pytest
+
+from app.services.game_type_classifier import GameTypeClassifier, classify_category
+from app.services.prompt_templates import GameType
+
+
+@pytest.fixture
+def classifier():
+    return GameTypeClassifier()
+
+
+@pytest.mark.parametrize("prompt, expected", [
+    ("A quiz about stress", [GameType.QUIZ]),
+    ("A crossword for teens", [GameType.WORD_PUZZLE]),
+    # Runner-ups within half of the top score are kept, best first
+    ("A quiz with a memory round", [GameType.QUIZ, GameType.MEMORY_MATCH]),
+    # ... weaker ones are not ("picture" is a puzzle-assembly cue)
+    ("A crossword with a picture", [GameType.WORD_PUZZLE]),
+    # At most three types
+    ("quiz, then memory, sort and adventure", [GameType.QUIZ, GameType.MEMORY_MATCH, GameType.SORTING]),
+])
+def test_selects_types_within_relative_threshold(classifier, prompt, expected):
+    assert classifier.classify(prompt) == expected
+
+
+@pytest.mark.parametrize("prompt", [
+    "Help me feel better",
+    "Check in on how I feel",  # one weak cue below min_score
+    "Something about anxiety",
+])
+def test_weak_or_no_signal_selects_nothing(classifier, prompt):
+    assert classifier.classify(prompt) == []
+
+
+def test_hyphenated_and_bigram_cues(classifier):
+    assert classifier.score("drag-drop game")[GameType.DRAG_DROP] == 5 + 4 + 2
+    assert classifier.classify("fill in the blanks") == [GameType.FILL_BLANK]
+
+
+@pytest.mark.parametrize("text, category", [
+    ("A quiz about stress", "stress-reduction"),
+    ("Mindful breathing", "mindfulness"),
+    ("Stress and anxiety", None),  # tied: no answer rather than a wrong one
+    ("A quiz about planets", None),
+])
+def test_classify_category(text, category):
+    assert classify_category(text) == category
@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from app.services.generation_cache import (
+    CACHE_FRESH, CACHE_MISS, CACHE_STALE, CacheEntry, GenerationCache, MemoryCacheTier
+)
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache_settings(settings, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "CACHE_TTL", 60)
+    monkeypatch.setattr(settings, "CACHE_STALE_TTL", 600)
+    monkeypatch.setattr(settings, "CACHE_MAX_ENTRIES", 2)
+    return settings
+
+
+def counting_generator(*values):
+    calls = []
+
+    async def generate():
+        calls.append(len(calls))
+        return values[min(len(calls), len(values)) - 1]
+
+    return generate, calls
+
+
+def test_memory_tier_evicts_least_recently_used():
+    tier = MemoryCacheTier(max_entries=2)
+    entry = CacheEntry(value={}, fresh_until=100, stale_until=200)
+    tier.set("a", entry)
+    tier.set("b", entry)
+    assert tier.get("a", now=0) is entry  # "a" is now the most recently used
+
+    tier.set("c", entry)
+
+    assert tier.get("b", now=0) is None
+    assert tier.get("a", now=0) is entry
+    assert tier.get("c", now=0) is entry
+    assert tier.evictions == 1
+
+
+def test_memory_tier_drops_expired_entries():
+    tier = MemoryCacheTier(max_entries=2)
+    tier.set("a", CacheEntry(value={}, fresh_until=100, stale_until=200))
+
+    assert tier.get("a", now=200) is None
+    assert len(tier) == 0
+    assert tier.expirations == 1
+
+
+async def test_lru_eviction_through_cache(cache_settings, clock):
+    cache = GenerationCache(clock=clock)
+    for key in ("a", "b", "c"):
+        await cache.set(key, {"id": key})
+
+    assert await cache.get("a") == (None, CACHE_MISS)
+    assert await cache.get("c") == ({"id": "c"}, CACHE_FRESH)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 2
+
+
+async def test_stale_value_is_served_while_refreshing(cache_settings, clock):
+    cache = GenerationCache(clock=clock)
+    generate, calls = counting_generator({"version": 1}, {"version": 2})
+
+    assert await cache.get_or_generate("k", generate) == {"version": 1}
+    clock.now += 120  # past CACHE_TTL, within CACHE_STALE_TTL
+
+    # Both callers get the stale value at once; only one background refresh runs
+    assert await cache.get_or_generate("k", generate) == {"version": 1}
+    assert await cache.get_or_generate("k", generate) == {"version": 1}
+    assert len(cache._refresh_tasks) == 1
+    await asyncio.gather(*cache._refresh_tasks)
+
+    assert await cache.get("k") == ({"version": 2}, CACHE_FRESH)
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert stats["stale_hits"] == 2
+    assert stats["refreshes"] == 1
+
+
+async def test_failed_refresh_keeps_serving_stale(cache_settings, clock):
+    cache = GenerationCache(clock=clock)
+    await cache.set("k", {"version": 1})
+    clock.now += 120
+
+    async def failing():
+        raise RuntimeError("gemini down")
+
+    assert await cache.get_or_generate("k", failing) == {"version": 1}
+    await asyncio.gather(*cache._refresh_tasks)
+
+    assert await cache.get("k") == ({"version": 1}, CACHE_STALE)
+    assert cache.stats()["refresh_failures"] == 1
+    assert not cache._refreshing  # A later stale hit may retry
+
+
+async def test_value_past_stale_ttl_is_regenerated(cache_settings, clock):
+    cache = GenerationCache(clock=clock)
+    generate, calls = counting_generator({"version": 1}, {"version": 2})
+
+    await cache.get_or_generate("k", generate)
+    clock.now += 601
+
+    assert await cache.get_or_generate("k", generate) == {"version": 2}
+    assert not cache._refresh_tasks
+    assert len(calls) == 2
+
+
+async def test_redis_tier_is_shared_between_instances(cache_settings, clock, redis):
+    first = GenerationCache(redis_client=redis, clock=clock)
+    second = GenerationCache(redis_client=redis, clock=clock)
+    await first.set("k", {"id": 1})
+
+    assert await second.get("k") == ({"id": 1}, CACHE_FRESH)
+    assert second.stats()["redis_hits"] == 1
+    assert await second.get("k") == ({"id": 1}, CACHE_FRESH)
+    assert second.stats()["memory_hits"] == 1
+
+
+async def test_redis_down_falls_back_to_memory(cache_settings, clock, redis):
+    redis.down = True
+    cache = GenerationCache(redis_client=redis, clock=clock)
+    generate, calls = counting_generator({"id": 1})
+
+    assert await cache.get_or_generate("k", generate) == {"id": 1}
+    assert await cache.get_or_generate("k", generate) == {"id": 1}
+
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["redis_errors"] == 2  # The first lookup and the write
+
+
+async def test_close_cancels_refreshes(cache_settings, clock):
+    cache = GenerationCache(clock=clock)
+    await cache.set("k", {"version": 1})
+    clock.now += 120
+    started = asyncio.Event()
+
+    async def hanging():
+        started.set()
+        await asyncio.Event().wait()
+
+    await cache.get_or_generate("k", hanging)
+    await started.wait()
+    await cache.close()
+
+    assert not cache._refresh_tasks
@@ -0,0 +1,112 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.core.exceptions import ErrorCode, ExternalServiceException
+from app.models.game_schemas import GameGenerationRequest
+from app.services.job_manager import JobManager
+from app.services.job_store import MemoryJobStore
+from benchmarks.llm_outputs import load_game
+
+REQUEST = GameGenerationRequest(prompt="a quiz about stress")
+
+
+class Pipeline:
+    """generate() returning a game, or raising the given error"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    async def generate(self, request, client_id=None):
+        self.calls.append((request.prompt, client_id))
+        if self.error is not None:
+            raise self.error
+        game = load_game("quiz")
+        return SimpleNamespace(id=game["id"], dict=lambda: game)
+
+
+class Webhook:
+    """Records callback bodies and answers with the given status"""
+
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.bodies = []
+
+    def client(self):
+        def handle(request):
+            self.bodies.append(request.read())
+            return httpx.Response(self.status_code)
+        return httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+
+@pytest.fixture
+def job_settings(settings, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_WORKERS", 1)
+    monkeypatch.setattr(settings, "JOB_QUEUE_SIZE", 2)
+    monkeypatch.setattr(settings, "JOB_WEBHOOK_MAX_ATTEMPTS", 1)
+    return settings
+
+
+async def finished(manager, job_id):
+    for _ in range(200):
+        job = await manager.get(job_id)
+        if job.finished and not manager._webhook_tasks:
+            return job
+        await asyncio.sleep(0.005)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+async def test_job_runs_and_notifies_callback(job_settings):
+    pipeline, webhook = Pipeline(), Webhook()
+    manager = JobManager(pipeline, MemoryJobStore(), webhook_client=webhook.client())
+    await manager.start()
+    try:
+        job = await manager.submit(REQUEST, callback_url="http://hooks.test/done", client_id="ip:1.2.3.4")
+        job = await finished(manager, job.id)
+    finally:
+        await manager.stop()
+
+    assert job.status == "succeeded"
+    assert job.result == load_game("quiz")
+    assert job.callback_status == "delivered"
+    assert pipeline.calls == [("a quiz about stress", "ip:1.2.3.4")]
+    assert len(webhook.bodies) == 1 and b'"succeeded"' in webhook.bodies[0]
+    assert manager.stats()["succeeded"] == 1
+
+
+async def test_failed_generation_records_error(job_settings):
+    error = ExternalServiceException("quota", ErrorCode.GEMINI_RATE_LIMIT, "gemini", status_code=429)
+    webhook = Webhook(status_code=500)
+    manager = JobManager(Pipeline(error=error), MemoryJobStore(), webhook_client=webhook.client())
+    await manager.start()
+    try:
+        job = await manager.submit(REQUEST, callback_url="http://hooks.test/done")
+        job = await finished(manager, job.id)
+    finally:
+        await manager.stop()
+
+    assert job.status == "failed"
+    assert job.error["code"] == "GEMINI_RATE_LIMIT"
+    assert job.status_code == 429
+    assert job.callback_status == "failed"
+    assert manager.stats()["callbacks_failed"] == 1
+
+
+async def test_full_queue_rejects_and_stop_fails_queued_jobs(job_settings):
+    # Workers not started: jobs stay queued
+    manager = JobManager(Pipeline(), MemoryJobStore(), webhook_client=Webhook().client())
+    queued = [await manager.submit(REQUEST) for _ in range(2)]
+
+    with pytest.raises(HTTPException) as rejected:
+        await manager.submit(REQUEST)
+    assert rejected.value.status_code == 503
+    assert manager.stats()["rejected_queue_full"] == 1
+
+    await manager.stop()
+    for job in queued:
+        stored = await manager.get(job.id)
+        assert stored.status == "failed" and stored.status_code == 503
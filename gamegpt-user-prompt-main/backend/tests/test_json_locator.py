@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from app.services.json_locator import locate_json_object
+
+
+def located(text):
+    span = locate_json_object(text)
+    return None if span is None else text[span.start:span.end]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1}', '{"a": 1}'),
+    ('Here you go:\n```json\n{"a": 1}\n```\nEnjoy!', '{"a": 1}'),
+    ('Use {name} for the player.\n{"title": "{name} quest"}', '{"title": "{name} quest"}'),
+    ('{"a": "}"} then f() {}', '{"a": "}"}'),
+    ('{"a": "say \\"}\\" twice"}', '{"a": "say \\"}\\" twice"}'),
+    ('{"a": {"b": [1, {"c": 2}]}} trailing', '{"a": {"b": [1, {"c": 2}]}}'),
+    ("no object here", None),
+])
+def test_locates_outermost_object(text, expected):
+    assert located(text) == expected
+
+
+def test_brace_in_quoted_prose_is_overtaken():
+    """A '{' in quoted prose must not end the real object at a brace inside its strings"""
+    text = 'prose "quote { x" then {"a": "}"} end'
+    span = locate_json_object(text)
+    assert text[span.start:span.end] == '{"a": "}"}'
+    assert span.complete and span.valid
+
+
+def test_invalid_object_is_kept_for_repair():
+    """A malformed game is still the candidate, not a smaller valid object before it"""
+    text = '{"x": 1} then {"title": "Quiz", "items": [1, 2,], "theme": "dark"}'
+    span = locate_json_object(text)
+    assert text[span.start:span.end] == '{"title": "Quiz", "items": [1, 2,], "theme": "dark"}'
+    assert span.complete and not span.valid
+
+
+def test_truncated_object_runs_to_end():
+    text = 'Sure! {"title": "Quiz", "questions": [{"q": "a"'
+    span = locate_json_object(text)
+    assert (span.start, span.end, span.complete) == (6, len(text), False)
+
+
+@pytest.mark.parametrize("text", [
+    "{}" * 100_000,
+    "{" * 100_000 + "}" * 100_000,
+    '{"' + '\\"' * 100_000 + '"}',
+    'x "{" ' * 50_000,
+])
+def test_adversarial_inputs_are_linear(text):
+    started = time.perf_counter()
+    locate_json_object(text)
+    assert time.perf_counter() - started < 2
@@ -0,0 +1,94 @@
+import json
+import random
+import time
+
+import pytest
+
+from app.services.json_repair import repair_json
+from benchmarks.json_repair import CORRUPTIONS, Renderer, is_prefix_of, random_document
+
+# Random documents per corruption; python -m benchmarks.json_repair --cases N runs more
+CASES = 300
+
+
+@pytest.mark.parametrize("corruption", list(CORRUPTIONS))
+def test_fuzz_properties(corruption):
+    """
+    A corrupted document repairs to the original value (a prefix of it when
+    truncated), and repairing the result changes nothing
+    """
+    rng = random.Random(f"tests/{corruption}")
+    options = CORRUPTIONS[corruption]
+    for case in range(CASES):
+        original = random_document(rng)
+        text = Renderer(rng, **options).render(original)
+
+        repaired = repair_json(text)
+        value = json.loads(repaired)
+
+        if options.get("truncated"):
+            assert is_prefix_of(value, original), (case, text)
+        else:
+            assert value == original, (case, text)
+        assert repair_json(repaired) == repaired, (case, text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1,}', {"a": 1}),
+    ('{"a": 1 "b": [1 2]}', {"a": 1, "b": [1, 2]}),
+    ("{'a': 'it\\'s', 'b': None, 'c': True}", {"a": "it's", "b": None, "c": True}),
+    ('{title: "x", score: 5}', {"title": "x", "score": 5}),
+    ('{{"a": {"b": 1}}}', {"a": {"b": 1}}),
+    ('Here you go: {"a": "}"} and more', {"a": "}"}),
+    ('{"a": "line\nbreak"}', {"a": "line\nbreak"}),
+    ('{"a": [1, 2}', {"a": [1, 2]}),
+])
+def test_repairs(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"url": http://x.com}', {"url": "http://x.com"}),
+    ('{"url": http://x.com/a?b=1, "b": 1}', {"url": "http://x.com/a?b=1", "b": 1}),
+    ('{"note": see the docs\n"b": 2}', {"note": "see the docs", "b": 2}),
+    ('{"time": 5:30}', {"time": "5:30"}),
+    ('{"a": None: see notes}', {"a": "None: see notes"}),
+    ('[plain words, more]', ["plain words", "more"]),
+    ('{"a": x "quoted, with comma" y}', {"a": 'x "quoted, with comma" y'}),
+    ('{a:5,b:6}', {"a": 5, "b": 6}),
+    ('{a: true b: 6}', {"a": True, "b": 6}),
+])
+def test_unquoted_values_are_kept_whole(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": "cut', {"a": "cut"}),
+    ('{"a": 1, "b": tr', {"a": 1, "b": True}),
+    ('{"a": 1, "b"', {"a": 1}),
+    ('{"a": 1, "b": http://x', {"a": 1}),
+    ('[1, 2, {"c": [3', [1, 2, {"c": [3]}]),
+    ('{"a": "\\u00', {"a": ""}),
+])
+def test_truncated_text_is_closed(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+def test_text_without_json_is_returned_unchanged():
+    assert repair_json("no json here") == "no json here"
+
+
+@pytest.mark.parametrize("text", [
+    "[" * 100_000,
+    "{" + "]" * 100_000,
+    "[" + "[" * 50_000 + "}" * 50_000,
+    '{"a": 1,, "c":' + '{"b":' * 20_000 + "]" * 20_000,
+    '["' + '\\"' * 50_000,
+    "[" + "see http://x.com, " * 5_000,
+    '{"a": x' + ' "y' * 30_000,
+])
+def test_adversarial_inputs_stay_linear(text):
+    started = time.perf_counter()
+    repair_json(text)
+    # Linear repair takes well under 100 ms here; a quadratic one takes minutes
+    assert time.perf_counter() - started < 2
@@ -0,0 +1,105 @@
+import pytest
+
+from app.core.exceptions import ErrorCode, ExternalServiceException
+from app.services.llm_service import GeminiReply, LLMService
+
+
+@pytest.fixture
+def continuation_settings(settings, monkeypatch):
+    monkeypatch.setattr(settings, "CONTINUATION_ENABLED", True)
+    monkeypatch.setattr(settings, "CONTINUATION_MAX_ROUNDS", 2)
+    monkeypatch.setattr(settings, "STRUCTURED_OUTPUT_ENABLED", False)
+    return settings
+
+
+def reply(text, finish_reason="STOP", output_tokens=10):
+    return GeminiReply(text, finish_reason, prompt_tokens=100, output_tokens=output_tokens, seconds=0.01)
+
+
+def rate_limited():
+    return ExternalServiceException(
+        message="Gemini API rate limit exceeded", error_code=ErrorCode.RATE_LIMIT_EXCEEDED, service_name="gemini"
+    )
+
+
+async def scripted(llm_service, monkeypatch, replies):
+    """Replace Gemini calls with replies (or exceptions) in order; returns the payloads sent"""
+    sent = []
+
+    async def request(payload):
+        sent.append(payload)
+        outcome = replies.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(llm_service, "_request", request)
+    return sent
+
+
+@pytest.fixture
+def llm_service(continuation_settings):
+    # No connection is opened: every Gemini call is scripted
+    return LLMService()
+
+
+async def test_cut_off_response_is_continued(llm_service, monkeypatch):
+    sent = await scripted(llm_service, monkeypatch, [
+        reply('{"title": "Stress', "MAX_TOKENS"),
+        reply(' Quiz", "type": "quiz"}')
+    ])
+
+    text = await llm_service.generate_response("prompt")
+
+    assert text == '{"title": "Stress Quiz", "type": "quiz"}'
+    assert sent[1]["contents"][1] == {"role": "model", "parts": [{"text": '{"title": "Stress'}]}
+    stats = llm_service.continuation_stats()
+    assert stats["continuation_requests"] == 1
+    assert stats["continuation_errors"] == 0
+
+
+async def test_failed_continuation_keeps_partial_output(llm_service, monkeypatch):
+    await scripted(llm_service, monkeypatch, [reply('{"title": "Stress', "MAX_TOKENS"), rate_limited()])
+
+    assert await llm_service.generate_response("prompt") == '{"title": "Stress'
+    stats = llm_service.continuation_stats()
+    assert stats["continuation_errors"] == 1
+    assert stats["still_truncated"] == 0
+
+
+async def test_failure_in_a_later_round_keeps_earlier_pieces(llm_service, monkeypatch):
+    await scripted(llm_service, monkeypatch, [
+        reply('{"title": "Stress', "MAX_TOKENS"),
+        reply(' Quiz", "type"', "MAX_TOKENS"),
+        TimeoutError("read timed out")
+    ])
+
+    assert await llm_service.generate_response("prompt") == '{"title": "Stress Quiz", "type"'
+    assert llm_service.continuation_stats()["continuation_errors"] == 1
+
+
+async def test_rounds_are_bounded(llm_service, monkeypatch):
+    await scripted(llm_service, monkeypatch, [
+        reply("[1", "MAX_TOKENS"), reply(", 2", "MAX_TOKENS"), reply(", 3", "MAX_TOKENS")
+    ])
+
+    assert await llm_service.generate_response("prompt") == "[1, 2, 3"
+    stats = llm_service.continuation_stats()
+    assert stats["continuation_requests"] == 2
+    assert stats["still_truncated"] == 1
+
+
+async def test_first_call_errors_still_fail_the_generation(llm_service, monkeypatch):
+    await scripted(llm_service, monkeypatch, [rate_limited()])
+
+    with pytest.raises(ExternalServiceException):
+        await llm_service.generate_response("prompt")
+
+
+async def test_disabled_continuation_returns_cut_off_text(llm_service, continuation_settings, monkeypatch):
+    monkeypatch.setattr(continuation_settings, "CONTINUATION_ENABLED", False)
+    sent = await scripted(llm_service, monkeypatch, [reply('{"title": "Stress', "MAX_TOKENS")])
+
+    assert await llm_service.generate_response("prompt") == '{"title": "Stress'
+    assert len(sent) == 1
+    assert llm_service.continuation_stats()["truncated_responses"] == 1
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import main
+from app.core.metrics import Gauge, MetricsRegistry
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.concurrency_limiter import AdaptiveConcurrencyLimiter
+
+
+def sample_lines(text, name):
+    return [line for line in text.splitlines() if line.startswith(name + "{") or line.startswith(name + " ")]
+
+
+def test_gauges_follow_stage_metrics():
+    text = MetricsRegistry().prometheus([
+        Gauge("gamegpt_test_ratio", "A test gauge", [({"cache": "a"}, 0.5), ({"cache": "b"}, 1)]),
+        Gauge("gamegpt_test_plain", "Unlabelled", [({}, 3)])
+    ])
+
+    assert "# TYPE gamegpt_test_ratio gauge" in text
+    assert sample_lines(text, "gamegpt_test_ratio") == ['gamegpt_test_ratio{cache="a"} 0.5', 'gamegpt_test_ratio{cache="b"} 1']
+    assert sample_lines(text, "gamegpt_test_plain") == ["gamegpt_test_plain 3"]
+    assert text.index("gamegpt_stage_requests_total") < text.index("gamegpt_test_ratio")
+
+
+def services_with(breaker, limiter):
+    cache = SimpleNamespace(stats=lambda: {"hit_rate": 0.25, "entries": 7, "depth": 2})
+    return SimpleNamespace(
+        get_llm_service=lambda: SimpleNamespace(circuit_breaker=breaker, concurrency_limiter=limiter),
+        get_generation_cache=lambda: cache,
+        get_semantic_cache=lambda: cache,
+        get_warm_pool=lambda: cache
+    )
+
+
+def test_service_gauges_report_breaker_and_limiter(settings, monkeypatch):
+    monkeypatch.setattr(settings, "BREAKER_ENABLED", True)
+    monkeypatch.setattr(settings, "AIMD_INITIAL_LIMIT", 6)
+    breaker = CircuitBreaker()
+    limiter = AdaptiveConcurrencyLimiter()
+    breaker.state = "open"
+
+    text = MetricsRegistry().prometheus(main.service_gauges(services_with(breaker, limiter)))
+
+    assert sample_lines(text, "gamegpt_circuit_breaker_state") == ['gamegpt_circuit_breaker_state{dependency="gemini"} 2']
+    assert sample_lines(text, "gamegpt_concurrency_limit") == ['gamegpt_concurrency_limit{dependency="gemini"} 6']
+    assert sample_lines(text, "gamegpt_concurrency_queue_length") == ['gamegpt_concurrency_queue_length{dependency="gemini"} 0']
+    assert 'gamegpt_cache_hit_ratio{cache="semantic"} 0.25' in text
+    assert 'gamegpt_cache_entries{cache="warm_pool"} 2' in text
@@ -0,0 +1,213 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+
+from app.core.client_identity import scope_client_id
+from app.core.rate_limit_middleware import RateLimitMiddleware, charge_extra
+from app.services.rate_limiter import MemoryRateLimitBackend, RateLimiter
+
+
+class Clock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def limit_settings(settings, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_REQUESTS", 3)
+    monkeypatch.setattr(settings, "RATE_LIMIT_WINDOW", 30)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(settings, "RATE_LIMIT_EXEMPT_PATHS", "/health")
+    monkeypatch.setattr(settings, "CLIENT_ID_TRUST_API_KEY", False)
+    return settings
+
+
+def http_scope(path="/generate", ip="10.0.0.1", api_key=None):
+    headers = [(b"host", b"testserver")]
+    if api_key is not None:
+        headers.append((b"x-api-key", api_key.encode()))
+    return {"type": "http", "method": "POST", "path": path, "headers": headers, "client": (ip, 50000)}
+
+
+async def call(middleware, scope):
+    """Drive the middleware once; returns (status, headers dict, body)"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    start = messages[0]
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], dict(start["headers"]), body
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def test_bucket_allows_burst_then_refills_evenly():
+    clock = Clock()
+    backend = MemoryRateLimitBackend(capacity=3, window=30, clock=clock)
+
+    assert [backend.check("c").allowed for _ in range(4)] == [True, True, True, False]
+    clock.now += 10  # One request's worth of refill
+    assert backend.check("c").allowed
+    assert not backend.check("c").allowed
+
+
+def test_buckets_are_per_client():
+    backend = MemoryRateLimitBackend(capacity=1, window=30, clock=Clock())
+
+    assert backend.check("a").allowed
+    assert backend.check("b").allowed
+    assert not backend.check("a").allowed
+
+
+def test_cost_takes_several_tokens():
+    backend = MemoryRateLimitBackend(capacity=10, window=10, clock=Clock())
+
+    result = backend.check("c", cost=4)
+    assert result.allowed and result.remaining == 6
+
+    denied = backend.check("c", cost=7)
+    assert not denied.allowed
+    assert denied.remaining == 6  # A denied check takes nothing
+    assert denied.retry_after == 1
+
+
+def test_decision_header_values():
+    backend = MemoryRateLimitBackend(capacity=3, window=30, clock=Clock())
+    for _ in range(3):
+        result = backend.check("c")
+
+    assert (result.limit, result.remaining, result.reset_after, result.retry_after) == (3, 0, 30, 0)
+    denied = backend.check("c")
+    assert denied.retry_after == 10
+
+
+def test_idle_buckets_are_evicted():
+    clock = Clock()
+    backend = MemoryRateLimitBackend(capacity=3, window=30, clock=clock)
+    backend.check("idle")
+    clock.now += 31
+    for index in range(backend.EVICT_EVERY):
+        backend.check(f"active-{index % 2}")
+
+    assert len(backend) == 2
+
+
+def test_client_id_ignores_api_key_unless_trusted():
+    scope = http_scope(api_key="rotating-key")
+
+    assert scope_client_id(scope) == "ip:10.0.0.1"
+    assert scope_client_id(scope, trust_api_key=True) == "key:rotating-key"
+    assert scope_client_id(http_scope(), trust_api_key=True) == "ip:10.0.0.1"
+
+
+async def test_middleware_rejects_with_headers(limit_settings):
+    limiter = RateLimiter()
+    middleware = RateLimitMiddleware(ok_app, get_limiter=lambda: limiter)
+
+    for remaining in (b"2", b"1", b"0"):
+        status, headers, _ = await call(middleware, http_scope())
+        assert status == 200
+        assert headers[b"ratelimit-remaining"] == remaining
+        assert headers[b"ratelimit-policy"] == b"3;w=30"
+
+    status, headers, body = await call(middleware, http_scope())
+    assert status == 429
+    assert headers[b"retry-after"] == b"10"
+    assert json.loads(body)["detail"]["code"] == "RATE_LIMIT_EXCEEDED"
+    assert limiter.stats()["limited"] == 1
+
+
+async def test_rotating_api_keys_share_the_ip_bucket(limit_settings):
+    limiter = RateLimiter()
+    middleware = RateLimitMiddleware(ok_app, get_limiter=lambda: limiter)
+
+    statuses = [(await call(middleware, http_scope(api_key=f"key-{index}")))[0] for index in range(4)]
+
+    assert statuses == [200, 200, 200, 429]
+
+
+async def test_trusted_api_keys_get_their_own_buckets(limit_settings, monkeypatch):
+    monkeypatch.setattr(limit_settings, "CLIENT_ID_TRUST_API_KEY", True)
+    limiter = RateLimiter()
+    middleware = RateLimitMiddleware(ok_app, get_limiter=lambda: limiter)
+
+    statuses = [(await call(middleware, http_scope(api_key=f"key-{index}")))[0] for index in range(4)]
+
+    assert statuses == [200] * 4
+
+
+async def test_exempt_paths_and_disabled_limiter_pass_through(limit_settings, monkeypatch):
+    limiter = RateLimiter()
+    middleware = RateLimitMiddleware(ok_app, get_limiter=lambda: limiter)
+
+    for _ in range(5):
+        status, headers, _ = await call(middleware, http_scope(path="/health"))
+        assert status == 200 and b"ratelimit-limit" not in headers
+
+    monkeypatch.setattr(limit_settings, "RATE_LIMIT_ENABLED", False)
+    for _ in range(5):
+        assert (await call(middleware, http_scope()))[0] == 200
+
+
+async def test_redis_error_falls_back_to_memory(limit_settings, monkeypatch):
+    monkeypatch.setattr(limit_settings, "RATE_LIMIT_BACKEND", "redis")
+
+    class BrokenRedis:
+        def register_script(self, script):
+            async def run(keys, args):
+                raise ConnectionError("redis down")
+            return run
+
+    limiter = RateLimiter(redis_client=BrokenRedis())
+
+    assert (await limiter.check("ip:10.0.0.1")).allowed
+    assert limiter.stats()["redis_errors"] == 1
+    assert len(limiter.memory) == 1
+
+
+def batch_app(limiter):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, get_limiter=lambda: limiter)
+
+    @app.post("/generate/batch")
+    async def batch(items: int, request: Request):
+        await charge_extra(request.scope, limiter, items - 1)
+        return {"items": items}
+
+    return app
+
+
+async def test_batch_is_charged_per_item(limit_settings, monkeypatch):
+    monkeypatch.setattr(limit_settings, "RATE_LIMIT_REQUESTS", 10)
+    limiter = RateLimiter()
+    transport = httpx.ASGITransport(app=batch_app(limiter), client=("10.0.0.1", 50000))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/generate/batch", params={"items": 6})
+        assert response.status_code == 200
+        assert response.headers["ratelimit-remaining"] == "4"
+
+        response = await client.post("/generate/batch", params={"items": 6})
+        assert response.status_code == 429
+        assert response.json()["detail"]["code"] == "RATE_LIMIT_EXCEEDED"
+        assert response.headers["ratelimit-remaining"] == "3"  # Only the middleware's token was taken
+        assert int(response.headers["retry-after"]) > 0
+
+        response = await client.post("/generate/batch", params={"items": 3})
+        assert response.status_code == 200
+        assert response.headers["ratelimit-remaining"] == "0"
@@ -0,0 +1,50 @@
+from app.models.game_schemas import PuzzleAssemblyContent
+from app.services.response_schema import CONTENT_MODELS, build_response_schema, model_schema
+
+
+def test_all_types_schema_covers_every_expressible_type():
+    schema = build_response_schema()
+
+    assert schema is not None
+    expected = [game_type for game_type in CONTENT_MODELS if game_type != "anxiety-adventure"]
+    assert schema["properties"]["type"]["enum"] == expected
+    assert len(schema["properties"]["content"]["anyOf"]) == len(expected)
+
+
+def test_server_fields_are_left_out():
+    properties = build_response_schema(["quiz"])["properties"]
+
+    assert "generatedAt" not in properties
+    assert "version" not in properties
+
+
+def test_single_type_is_not_wrapped_in_any_of():
+    content = build_response_schema(["quiz"])["properties"]["content"]
+
+    assert content["type"] == "OBJECT"
+    assert "questions" in content["properties"]
+
+
+def test_puzzle_position_is_a_fixed_object():
+    pieces = model_schema(PuzzleAssemblyContent)["properties"]["pieces"]
+    position = pieces["items"]["properties"]["correctPosition"]
+
+    assert position["type"] == "OBJECT"
+    assert position["properties"] == {"x": {"type": "INTEGER"}, "y": {"type": "INTEGER"}}
+    assert position["required"] == ["x", "y"]
+
+
+def test_unexpressible_type_is_dropped_not_the_whole_schema():
+    schema = build_response_schema(["anxiety-adventure", "quiz"])
+
+    assert schema["properties"]["type"]["enum"] == ["quiz"]
+    assert build_response_schema(["anxiety-adventure"]) is None
+
+
+def test_refs_are_inlined_and_limits_kept():
+    schema = build_response_schema(["word-puzzle"])
+    content = schema["properties"]["content"]
+
+    assert "$ref" not in str(schema)
+    assert content["properties"]["gridSize"]["minimum"] == 10
+    assert content["properties"]["gridSize"]["maximum"] == 20
@@ -0,0 +1,140 @@
+import pytest
+
+from app.core.exceptions import ErrorCode, ExternalServiceException, ValidationException
+from app.services.retry import RetryBudget, RetryEngine, is_retryable
+
+
+def gemini_error(status_code=None, code=ErrorCode.GEMINI_API_ERROR, **details):
+    return ExternalServiceException("gemini failed", code, "gemini", status_code=status_code, details=details)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Flaky:
+    """Fails with the given errors, then returns "ok" """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def engine(delays, budget=None, rng=lambda: 1.0, **options):
+    async def sleep(seconds):
+        delays.append(seconds)
+
+    options.setdefault("max_attempts", 3)
+    return RetryEngine(
+        base_delay=0.5, max_delay=8, max_retry_after=20,
+        budget=budget or RetryBudget(ratio=0.2, min_per_second=0, max_tokens=10),
+        sleep=sleep, rng=rng, **options
+    )
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (gemini_error(code=ErrorCode.GEMINI_RATE_LIMIT), True),
+    (gemini_error(code=ErrorCode.TIMEOUT_ERROR), True),
+    (gemini_error(503), True),
+    (gemini_error(429), True),
+    (gemini_error(400), False),
+    (gemini_error(operation="connection"), True),
+    (gemini_error(operation="parse"), False),
+    (ValidationException("bad", ErrorCode.INVALID_REQUEST), False),
+    (RuntimeError("boom"), False),
+])
+def test_classification(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_backoff_doubles_up_to_max_delay():
+    retry = engine([])
+    assert [retry.backoff(n) for n in range(1, 7)] == [0.5, 1.0, 2.0, 4.0, 8.0, 8.0]
+
+
+def test_full_jitter_scales_the_ceiling():
+    assert engine([], rng=lambda: 0.25).backoff(3) == 0.5
+
+
+async def test_retries_transient_errors_until_success():
+    delays = []
+    retry = engine(delays)
+    fn = Flaky(gemini_error(503), gemini_error(503))
+
+    assert await retry.run("generate", fn) == "ok"
+    assert fn.calls == 3
+    assert delays == [0.5, 1.0]
+    stats = retry.stats()
+    assert stats["retries"] == 2
+    assert stats["succeeded_after_retry"] == 1
+    assert stats["retries_by_code"] == {"GEMINI_API_ERROR": 2}
+
+
+async def test_gives_up_after_max_attempts():
+    retry = engine([])
+    fn = Flaky(*(gemini_error(503) for _ in range(5)))
+
+    with pytest.raises(ExternalServiceException):
+        await retry.run("generate", fn)
+    assert fn.calls == 3
+    assert retry.stats()["exhausted"] == 1
+
+
+async def test_permanent_error_is_not_retried():
+    retry = engine([])
+    fn = Flaky(gemini_error(400))
+
+    with pytest.raises(ExternalServiceException):
+        await retry.run("generate", fn)
+    assert fn.calls == 1
+    assert retry.stats()["not_retryable"] == 1
+
+
+async def test_honours_retry_after_with_jitter():
+    delays = []
+    retry = engine(delays, rng=lambda: 0.5)
+    assert await retry.run("generate", Flaky(gemini_error(429, retry_after_seconds=3))) == "ok"
+    assert delays == [3.25]
+    assert retry.stats()["retry_after_honored"] == 1
+
+
+async def test_retry_after_beyond_limit_is_surfaced():
+    retry = engine([])
+    fn = Flaky(gemini_error(429, retry_after_seconds=60))
+
+    with pytest.raises(ExternalServiceException):
+        await retry.run("generate", fn)
+    assert fn.calls == 1
+    assert retry.stats()["retry_after_too_long"] == 1
+
+
+async def test_budget_caps_retries_to_a_share_of_requests():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=1)
+    retry = engine([], budget=budget, max_attempts=2)
+
+    assert await retry.run("generate", Flaky(gemini_error(503))) == "ok"
+    with pytest.raises(ExternalServiceException):
+        await retry.run("generate", Flaky(gemini_error(503)))
+    assert retry.stats()["budget_rejections"] == 1
+
+
+def test_budget_refills_over_time():
+    clock = Clock()
+    budget = RetryBudget(ratio=0.2, min_per_second=0.5, max_tokens=2, clock=clock)
+    assert budget.try_acquire() and budget.try_acquire()
+    assert not budget.try_acquire()
+
+    clock.now = 2.0
+    assert budget.try_acquire()
+    clock.now = 100.0
+    assert budget.tokens == 2
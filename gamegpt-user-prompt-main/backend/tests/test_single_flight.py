@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+class Upstream:
+    """An upstream call that blocks until released and counts its invocations"""
+
+    def __init__(self, result="game"):
+        self.result = result
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    upstream = Upstream()
+
+    callers = [asyncio.create_task(flight.do("k", upstream)) for _ in range(5)]
+    await upstream.started.wait()
+    upstream.release.set()
+
+    assert await asyncio.gather(*callers) == ["game"] * 5
+    assert upstream.calls == 1
+    stats = flight.stats()
+    assert stats["leader_calls"] == 1
+    assert stats["coalesced_calls"] == 4
+    assert stats["inflight"] == 0
+
+
+async def test_cancelled_first_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    upstream = Upstream()
+
+    leader = asyncio.create_task(flight.do("k", upstream))
+    await upstream.started.wait()
+    follower = asyncio.create_task(flight.do("k", upstream))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    upstream.release.set()
+
+    assert await follower == "game"
+    assert upstream.calls == 1
+    assert flight.stats()["cancelled_waiters"] == 1
+
+
+async def test_call_finishes_after_every_caller_is_cancelled():
+    flight = SingleFlight()
+    upstream = Upstream()
+
+    caller = asyncio.create_task(flight.do("k", upstream))
+    await upstream.started.wait()
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+
+    # A caller arriving before the call finishes still joins it
+    late = asyncio.create_task(flight.do("k", upstream))
+    await asyncio.sleep(0)
+    upstream.release.set()
+
+    assert await late == "game"
+    assert upstream.calls == 1
+
+
+async def test_failure_is_shared_and_not_cached():
+    flight = SingleFlight()
+    upstream = Upstream(result=RuntimeError("gemini down"))
+
+    callers = [asyncio.create_task(flight.do("k", upstream)) for _ in range(3)]
+    await upstream.started.wait()
+    upstream.release.set()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert upstream.calls == 1
+
+    upstream.result = "game"
+    assert await flight.do("k", upstream) == "game"
+    assert upstream.calls == 2
+
+
+async def test_close_cancels_inflight_calls():
+    flight = SingleFlight()
+    upstream = Upstream()
+
+    caller = asyncio.create_task(flight.do("k", upstream))
+    await upstream.started.wait()
+    await flight.close()
+
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    assert flight.stats()["inflight"] == 0
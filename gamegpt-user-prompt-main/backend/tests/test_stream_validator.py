@@ -0,0 +1,79 @@
+import pytest
+
+from app.services.stream_parser import EVENT_FIELD, EVENT_ITEM, StreamEvent
+from app.services.stream_validator import (
+    ABORT_INVALID_FIELD, ABORT_INVALID_ITEM, ABORT_PROSE, ABORT_REPETITION, ABORT_RUNAWAY,
+    ABORT_WRONG_COLLECTION, ABORT_WRONG_TYPE, StreamAbort, StreamingValidator
+)
+
+
+def field(name, value):
+    return StreamEvent(EVENT_FIELD, [name], value)
+
+
+def item(collection, index, value):
+    return StreamEvent(EVENT_ITEM, ["content", collection, index], value)
+
+
+def question(index, text=None):
+    return {
+        "id": f"q{index}", "question": text or f"Question {index}?", "type": "true-false",
+        "options": ["True", "False"], "correctAnswer": "True", "explanation": "Because."
+    }
+
+
+def aborted(reason, call, *args):
+    with pytest.raises(StreamAbort) as abort:
+        call(*args)
+    assert abort.value.reason == reason
+
+
+def test_valid_quiz_passes():
+    validator = StreamingValidator(expected_type="quiz")
+    validator.check_event(field("type", "quiz"))
+    validator.check_event(field("difficulty", "easy"))
+    for index in range(3):
+        validator.check_event(item("questions", index, question(index)))
+    assert validator.item_count == 3
+
+
+def test_invalid_enum_and_wrong_type():
+    aborted(ABORT_INVALID_FIELD, StreamingValidator().check_event, field("difficulty", "extreme"))
+    aborted(ABORT_WRONG_TYPE, StreamingValidator(expected_type="quiz").check_event, field("type", "sorting"))
+
+
+def test_items_before_type_are_checked_when_it_arrives():
+    validator = StreamingValidator()
+    validator.check_event(item("pairs", 0, {"id": "p1"}))
+    aborted(ABORT_WRONG_COLLECTION, validator.check_event, field("type", "quiz"))
+
+
+def test_item_missing_required_fields():
+    validator = StreamingValidator()
+    validator.check_event(field("type", "quiz"))
+    aborted(ABORT_INVALID_ITEM, validator.check_event, item("questions", 0, {"id": "q1", "question": "?"}))
+
+
+def test_renumbered_repeats_abort():
+    validator = StreamingValidator(max_duplicates=2)
+    validator.check_event(field("type", "quiz"))
+    validator.check_event(item("questions", 0, question(0, "Same?")))
+    validator.check_event(item("questions", 1, question(1, "Same?")))
+    aborted(ABORT_REPETITION, validator.check_event, item("questions", 2, question(2, "Same?")))
+
+
+def test_runaway_item_count():
+    validator = StreamingValidator(max_items=2)
+    validator.check_event(field("type", "quiz"))
+    validator.check_event(item("questions", 0, question(0)))
+    validator.check_event(item("questions", 1, question(1)))
+    aborted(ABORT_RUNAWAY, validator.check_event, item("questions", 2, question(2)))
+
+
+def test_prose_preamble_and_looping_output():
+    validator = StreamingValidator(prose_limit=50)
+    validator.check_progress("```json\n", started=False)
+    aborted(ABORT_PROSE, validator.check_progress, "I'd be happy to help! " * 5, False)
+
+    looping = StreamingValidator(loop_block=20, loop_repeats=3)
+    aborted(ABORT_REPETITION, looping.check_progress, '{"a": [' + '"again and again", ' * 20, True)
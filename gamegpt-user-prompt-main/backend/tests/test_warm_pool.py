@@ -0,0 +1,99 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.game_schemas import GameGenerationRequest
+from app.services.warm_pool import PooledGame, WarmPool
+
+BUCKET = ("quiz", "stress-reduction", "medium")
+
+
+class Pipeline:
+    """Refill pipeline returning a game for the requested bucket"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def run(self, request):
+        self.requests.append(request)
+        game = {"id": f"game-{len(self.requests)}", "type": request.gameType,
+                "category": "stress-reduction", "difficulty": request.difficulty}
+        return SimpleNamespace(dict=lambda: game)
+
+
+@pytest.fixture
+def pool_settings(settings, monkeypatch):
+    monkeypatch.setattr(settings, "WARM_POOL_ENABLED", True)
+    monkeypatch.setattr(settings, "WARM_POOL_SIZE", 2)
+    monkeypatch.setattr(settings, "WARM_POOL_LOW_WATER", 1)
+    monkeypatch.setattr(settings, "WARM_POOL_MAX_SERVES", 1)
+    monkeypatch.setattr(settings, "WARM_POOL_MAX_AGE", 60)
+    monkeypatch.setattr(settings, "WARM_POOL_MAX_INFLIGHT", 4)
+    return settings
+
+
+@pytest.fixture
+def pipeline():
+    return Pipeline()
+
+
+@pytest.fixture
+def warm_pool(pool_settings, pipeline, monkeypatch):
+    pool = WarmPool(
+        pipeline,
+        prompt_builder=None,
+        http_pool=SimpleNamespace(in_flight=0),
+        circuit_breaker=SimpleNamespace(enabled=False, state="closed"),
+        buckets=[BUCKET]
+    )
+    monkeypatch.setattr(pool, "candidate_buckets", lambda request: [BUCKET])
+    return pool
+
+
+def pool_game(pool, game_id, age=0.0):
+    pool._pools[BUCKET].append(PooledGame(game={"id": game_id}, created_at=time.monotonic() - age))
+
+
+REQUEST = GameGenerationRequest(prompt="a quiz about stress")
+
+
+def test_take_serves_each_client_once(warm_pool):
+    pool_game(warm_pool, "a")
+    pool_game(warm_pool, "b")
+
+    assert warm_pool.take(REQUEST, "client")["id"] == "a"
+    assert warm_pool.take(REQUEST, "client")["id"] == "b"
+    assert warm_pool.take(REQUEST, "client") is None
+    assert warm_pool.stats()["hits"] == 2
+
+
+def test_take_drops_games_past_max_age(warm_pool):
+    pool_game(warm_pool, "stale", age=120)
+    pool_game(warm_pool, "fresh", age=10)
+
+    assert warm_pool.take(REQUEST, "client")["id"] == "fresh"
+    stats = warm_pool.stats()
+    assert stats["expired"] == 1
+    assert stats["depth"] == 0
+
+
+def test_zero_max_age_keeps_games(warm_pool):
+    warm_pool.max_age = 0
+    pool_game(warm_pool, "old", age=10 ** 6)
+
+    assert warm_pool.take(REQUEST, "client")["id"] == "old"
+    assert warm_pool.stats()["expired"] == 0
+
+
+async def test_refill_replaces_expired_games(warm_pool, pipeline):
+    pool_game(warm_pool, "stale", age=120)
+    pool_game(warm_pool, "stale-too", age=90)
+
+    warm_pool._schedule_refills()
+    await asyncio.gather(*warm_pool._refill_tasks)
+
+    assert len(pipeline.requests) == 2
+    assert [pooled.game["id"] for pooled in warm_pool._pools[BUCKET]] == ["game-1", "game-2"]
+    assert warm_pool.stats()["expired"] == 2
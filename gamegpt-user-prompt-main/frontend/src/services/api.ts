@@ -34,22 +34,10 @@ class ApiService {
    */
   async generateGame(request: GameRequest): Promise<GameSchema> {
     try {
-      // Convert complex GameRequest to simple prompt string that backend expects
+      // Free-text parts go into the prompt; structured fields are sent as-is so the
+      // backend can pick the game type and prune its prompt templates
       let prompt = `Create a ${request.gameType || 'therapeutic'} game: ${request.description}`;
       
-      // Add additional context to the prompt
-      if (request.difficulty) {
-        prompt += ` (Difficulty: ${request.difficulty})`;
-      }
-      if (request.targetAge) {
-        prompt += ` (Target age: ${request.targetAge})`;
-      }
-      if (request.estimatedTime) {
-        prompt += ` (Estimated time: ${request.estimatedTime} minutes)`;
-      }
-      if (request.theme) {
-        prompt += ` (Theme: ${request.theme})`;
-      }
       if (request.learningObjectives) {
         prompt += ` (Learning objectives: ${request.learningObjectives})`;
       }
@@ -57,7 +45,15 @@ class ApiService {
         prompt += ` (Special requirements: ${request.customRequirements})`;
       }
       
-      const requestBody = { prompt };
+      const requestBody = {
+        prompt,
+        gameType: request.gameType || undefined,
+        difficulty: request.difficulty || undefined,
+        targetAge: request.targetAge || undefined,
+        // Backend accepts 5-30 minutes
+        estimatedTime: request.estimatedTime ? Math.min(30, Math.max(5, request.estimatedTime)) : undefined,
+        theme: request.theme || undefined,
+      };
       
       const response = await fetch(`${this.baseUrl}/generate`, {
         method: 'POST',